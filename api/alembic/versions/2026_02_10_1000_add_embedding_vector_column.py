@@ -0,0 +1,40 @@
+"""add binary embedding_vector column to products
+
+Revision ID: 6d7e8f9a0b1c
+Revises: 4e5f6a7b8c9d
+Create Date: 2026-02-10
+
+Adds products.embedding_vector: the embedding as raw little-endian float32
+bytes (3072 bytes for 768 dims) instead of ~4x larger JSON text. Readers
+decode it with np.frombuffer.
+
+The JSON column is left in place for a dual-read/dual-write period; populate
+the new column with scripts/backfill_embedding_vectors.py (resumable).
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "6d7e8f9a0b1c"
+down_revision = "4e5f6a7b8c9d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # bytea rather than pgvector's vector(768): pgvector is not enabled on every
+    # host (see 540e4f4fca35), and similarity is computed in-process by the
+    # resident EmbeddingIndex, so server-side vector operators are not needed.
+    op.add_column(
+        "products",
+        sa.Column(
+            "embedding_vector",
+            sa.LargeBinary(),
+            nullable=True,
+            comment="Embedding as little-endian float32 bytes (768 dims)",
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("products", "embedding_vector")
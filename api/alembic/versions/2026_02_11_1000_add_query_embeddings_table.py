@@ -0,0 +1,38 @@
+"""add query_embeddings table (durable query embedding cache)
+
+Revision ID: 7e8f9a0b1c2d
+Revises: 6d7e8f9a0b1c
+Create Date: 2026-02-11
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "7e8f9a0b1c2d"
+down_revision = "6d7e8f9a0b1c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "query_embeddings",
+        sa.Column("cache_key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("dimension", sa.Integer(), nullable=False),
+        sa.Column("query_text", sa.Text(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        "idx_query_embeddings_model_last_used",
+        "query_embeddings",
+        ["model", "dimension", "last_used_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("idx_query_embeddings_model_last_used", table_name="query_embeddings")
+    op.drop_table("query_embeddings")
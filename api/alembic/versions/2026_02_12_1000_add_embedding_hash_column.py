@@ -0,0 +1,38 @@
+"""add embedding_hash column to products
+
+Revision ID: 8f9a0b1c2d3e
+Revises: 7e8f9a0b1c2d
+Create Date: 2026-02-12
+
+Adds products.embedding_hash: sha256 of "<model>:<dimension>:<embedding text>"
+for the stored embedding. Embedding pipelines compare it with the hash of
+the freshly built text and only call the embedding API when it differs.
+
+Existing rows start with NULL (re-embedded on the next --regenerate run);
+scripts/backfill_embeddings.py --adopt-existing stamps rows whose stored
+embedding_text still matches without calling the API.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "8f9a0b1c2d3e"
+down_revision = "7e8f9a0b1c2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "products",
+        sa.Column(
+            "embedding_hash",
+            sa.String(64),
+            nullable=True,
+            comment="sha256 of model:dimension:embedding_text for the stored embedding",
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("products", "embedding_hash")
@@ -0,0 +1,46 @@
+"""add product_features table (precomputed ranking features)
+
+Revision ID: 9a0b1c2d3e4f
+Revises: 8f9a0b1c2d3e
+Create Date: 2026-02-13
+
+One row per product with the normalized type, capacity, material/color and
+their family bitmasks, and a style bitmask, derived by
+services/product_features.py. The table starts empty; populate it with
+scripts/rebuild_product_features.py (rows missing a feature row count as
+stale, so "--stale" fills it in).
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "9a0b1c2d3e4f"
+down_revision = "8f9a0b1c2d3e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "product_features",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("features_version", sa.SmallInteger(), nullable=False),
+        sa.Column("product_type", sa.String(30), nullable=True),
+        sa.Column("capacity", sa.SmallInteger(), nullable=True),
+        sa.Column("material", sa.String(100), nullable=True),
+        sa.Column("material_family_mask", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("color", sa.String(50), nullable=True),
+        sa.Column("color_family_mask", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("primary_style", sa.String(50), nullable=True),
+        sa.Column("secondary_style", sa.String(50), nullable=True),
+        sa.Column("style_mask", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("source_updated_at", sa.DateTime(), nullable=True),
+        sa.Column("source_attribute_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("computed_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("idx_product_features_version", "product_features", ["features_version"])
+
+
+def downgrade():
+    op.drop_index("idx_product_features_version", table_name="product_features")
+    op.drop_table("product_features")
@@ -0,0 +1,54 @@
+"""add products.search_vector (generated tsvector) and text search indexes
+
+Revision ID: 0b1c2d3e4f5a
+Revises: 9a0b1c2d3e4f
+Create Date: 2026-02-14
+
+Keyword search used case-insensitive word-boundary regexes (~* '\\yterm\\y')
+on name, brand and description, which no index can serve. This adds:
+
+- products.search_vector: generated, stored tsvector over name (weight A),
+  brand (B) and description (C) with the 'simple' configuration (lower-case,
+  no stemming, no stop words, so lexeme matches keep word-boundary
+  semantics), with a GIN index for @@ queries;
+- pg_trgm GIN indexes on name and brand for the ILIKE '%...%' filters.
+
+Adding the generated column rewrites the products table once.
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "0b1c2d3e4f5a"
+down_revision = "9a0b1c2d3e4f"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "products",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)),
+    )
+    op.create_index("idx_product_search_vector", "products", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "idx_product_name_trgm", "products", ["name"], postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+    )
+    op.create_index(
+        "idx_product_brand_trgm", "products", ["brand"], postgresql_using="gin", postgresql_ops={"brand": "gin_trgm_ops"}
+    )
+
+
+def downgrade():
+    op.drop_index("idx_product_brand_trgm", table_name="products")
+    op.drop_index("idx_product_name_trgm", table_name="products")
+    op.drop_index("idx_product_search_vector", table_name="products")
+    op.drop_column("products", "search_vector")
@@ -0,0 +1,44 @@
+"""add product_neighbours table (precomputed similar items)
+
+Revision ID: 1c2d3e4f5a6b
+Revises: 0b1c2d3e4f5a
+Create Date: 2026-02-15
+
+One row per embedded product with its nearest neighbours (same category,
+price-band aware) as an id array and a score array, computed from the
+embedding matrix by services/product_neighbours.py. The GIN index on
+neighbour_ids finds the lists that contain a re-embedded product during
+incremental refresh. The table starts empty; populate it with
+scripts/rebuild_product_neighbours.py (rows missing a list count as stale,
+so "--stale" fills it in).
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "1c2d3e4f5a6b"
+down_revision = "0b1c2d3e4f5a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "product_neighbours",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("neighbours_version", sa.SmallInteger(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("neighbour_ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("scores", postgresql.ARRAY(postgresql.REAL()), nullable=False),
+        sa.Column("in_band_count", sa.SmallInteger(), nullable=False, server_default="0"),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("idx_product_neighbours_category", "product_neighbours", ["category_id"])
+    op.create_index("idx_product_neighbours_neighbour_ids", "product_neighbours", ["neighbour_ids"], postgresql_using="gin")
+
+
+def downgrade():
+    op.drop_index("idx_product_neighbours_neighbour_ids", table_name="product_neighbours")
+    op.drop_index("idx_product_neighbours_category", table_name="product_neighbours")
+    op.drop_table("product_neighbours")
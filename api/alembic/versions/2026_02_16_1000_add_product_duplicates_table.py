@@ -0,0 +1,37 @@
+"""add product_duplicates table (near-duplicate clusters)
+
+Revision ID: 2d3e4f5a6b7c
+Revises: 1c2d3e4f5a6b
+Create Date: 2026-02-16
+
+One row per product that has a near duplicate, mapping it to its cluster
+(the lowest product id of the cluster), found with MinHash/LSH over product
+names by services/near_duplicates.py. The table starts empty; populate it
+with scripts/find_near_duplicates.py, which replaces it on every run.
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "2d3e4f5a6b7c"
+down_revision = "1c2d3e4f5a6b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "product_duplicates",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("cluster_id", sa.Integer(), nullable=False),
+        sa.Column("similarity", postgresql.REAL(), nullable=False),
+        sa.Column("detector_version", sa.SmallInteger(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("idx_product_duplicates_cluster", "product_duplicates", ["cluster_id"])
+
+
+def downgrade():
+    op.drop_index("idx_product_duplicates_cluster", table_name="product_duplicates")
+    op.drop_table("product_duplicates")
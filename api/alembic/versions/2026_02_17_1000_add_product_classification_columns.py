@@ -0,0 +1,38 @@
+"""add products.product_type / is_accessory / classification_version
+
+Revision ID: 3e4f5a6b7c8d
+Revises: 2d3e4f5a6b7c
+Create Date: 2026-02-17
+
+Deterministic name classification (services/product_classification.py),
+so recommendation candidate queries filter accessories on an indexed column
+instead of a full-text condition over ~30 words per row. The columns start
+NULL (unclassified, which the candidate query still checks by name); fill
+them with scripts/reclassify_products.py --stale.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "3e4f5a6b7c8d"
+down_revision = "2d3e4f5a6b7c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("products", sa.Column("product_type", sa.String(30), nullable=True))
+    op.add_column("products", sa.Column("is_accessory", sa.Boolean(), nullable=True))
+    op.add_column("products", sa.Column("classification_version", sa.SmallInteger(), nullable=True))
+    op.create_index("ix_products_product_type", "products", ["product_type"])
+    op.create_index("idx_product_available_accessory", "products", ["is_available", "is_accessory"])
+    op.create_index("idx_product_classification_version", "products", ["classification_version"])
+
+
+def downgrade():
+    op.drop_index("idx_product_classification_version", table_name="products")
+    op.drop_index("idx_product_available_accessory", table_name="products")
+    op.drop_index("ix_products_product_type", table_name="products")
+    op.drop_column("products", "classification_version")
+    op.drop_column("products", "is_accessory")
+    op.drop_column("products", "product_type")
@@ -0,0 +1,33 @@
+"""key product_features staleness on a hash of the feature inputs
+
+Revision ID: 4f5a6b7c8d9e
+Revises: 3e4f5a6b7c8d
+Create Date: 2026-02-18
+
+Re-crawls bump products.last_updated and product_attributes.updated_at
+without changing anything features are derived from, which marked every
+re-crawled product stale. Rows now store source_hash (md5 of name, styles
+and attribute rows, services/product_features.py) instead. Existing rows
+start NULL and report stale; refill them with
+scripts/rebuild_product_features.py --stale.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "4f5a6b7c8d9e"
+down_revision = "3e4f5a6b7c8d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("product_features", sa.Column("source_hash", sa.String(32), nullable=True))
+    op.drop_column("product_features", "source_attribute_count")
+    op.drop_column("product_features", "source_updated_at")
+
+
+def downgrade():
+    op.add_column("product_features", sa.Column("source_updated_at", sa.DateTime(), nullable=True))
+    op.add_column("product_features", sa.Column("source_attribute_count", sa.Integer(), nullable=False, server_default="0"))
+    op.drop_column("product_features", "source_hash")
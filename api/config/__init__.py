@@ -1 +0,0 @@
-# Config package
@@ -84,6 +84,29 @@ class Settings(BaseSettings):
     # Caching
     cache_ttl: int = 300  # 5 minutes
 
+    # Semantic search
+    embedding_index_enabled: bool = True  # Keep product embeddings resident in memory
+    embedding_index_refresh_interval: int = 60  # Seconds between incremental index refreshes
+    embedding_index_quantization: str = "none"  # Scan matrix storage: none (float32) | float16 | int8
+    embedding_index_rerank_depth: int = 300  # Quantized hits re-scored with full-precision vectors
+    query_embedding_cache_durable: bool = True  # Persist query embeddings in the query_embeddings table
+    query_embedding_latency_budget_ms: int = 400  # Remote query embedding wait before the local fallback answers
+    local_embedder_path: str = ""  # Trained local query embedder (.npz); empty = no local fallback
+    embedding_snapshot_dir: str = ""  # Shared memory-mapped index snapshots for multi-worker deployments
+    embedding_snapshot_max_changes: int = 5000  # Changed rows that trigger a new snapshot (followers apply fewer as deltas)
+    embedding_snapshot_max_age: int = 1800  # Seconds before pending changes are published in a new snapshot
+    embedding_ann_enabled: bool = False  # Approximate (IVF) candidate selection for large catalogs
+    embedding_ann_nprobe: int = 32  # Minimum IVF lists probed per query
+    embedding_ann_lists: int = 0  # IVF lists to train (0 = sqrt(rows))
+    embedding_ann_path: str = ""  # Optional .npz file to persist trained IVF centroids
+    facet_index_enabled: bool = True  # Keep per-product facet columns resident for result facet counts
+    facet_index_refresh_interval: int = 60  # Seconds between incremental facet index refreshes
+    attribute_index_enabled: bool = True  # Keep attribute value -> product postings resident for strict filtering
+    attribute_index_refresh_interval: int = 60  # Seconds between incremental attribute index refreshes
+    search_snapshot_ttl: int = 900  # Seconds a pagination cursor stays valid
+    search_snapshot_max_entries: int = 2000  # Result snapshots kept per process (LRU)
+    search_snapshot_max_mb: int = 64  # Memory cap for result snapshots per process
+
     # Security
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
@@ -3,7 +3,7 @@ Database connection and session management
 """
 from contextlib import contextmanager
 from typing import Generator
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 import logging
@@ -52,6 +52,9 @@ class DatabaseManager:
     def create_tables(self):
         """Create all database tables"""
         try:
+            with self.engine.begin() as connection:
+                # products name/brand trigram indexes use gin_trgm_ops
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             Base.metadata.create_all(bind=self.engine)
             logger.info("Database tables created successfully")
         except Exception as e:
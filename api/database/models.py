@@ -5,9 +5,25 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, REAL, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 Base = declarative_base()
 
@@ -159,17 +175,40 @@ class Product(Base):
     stock_status = Column(String(20), default="in_stock")
 
     # Vector embedding for semantic search (768 dimensions for Google text-embedding-004)
-    # Stored as JSON array of floats, converted to pgvector for similarity search
-    embedding = Column(Text, nullable=True)  # JSON array of 768 floats
+    # embedding_vector is the compact binary form (little-endian float32, see services/embedding_codec.py);
+    # the legacy JSON column is still dual-written until every reader has moved to the binary column
+    embedding = Column(Text, nullable=True)  # JSON array of 768 floats (legacy)
+    embedding_vector = Column(LargeBinary, nullable=True)  # 768 float32 = 3072 bytes
     embedding_text = Column(Text, nullable=True)  # Text that was embedded
+    embedding_hash = Column(String(64), nullable=True)  # sha256(model:dimension:embedding_text), skips unchanged rows
     embedding_updated_at = Column(DateTime, nullable=True)
 
+    # Full-text search: name (A), brand (B), description (C), maintained by Postgres ('simple' config, no stemming).
+    # Deferred so ordinary product loads don't fetch it; queried through services/search_service.text_search_condition
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(brand, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+        )
+    )
+
     # Style classification (from Gemini Vision or NLP)
     primary_style = Column(String(50), nullable=True, index=True)  # e.g., "modern", "minimalist"
     secondary_style = Column(String(50), nullable=True)  # Optional secondary style
     style_confidence = Column(Float, nullable=True)  # 0.0 to 1.0
     style_extraction_method = Column(String(50), nullable=True)  # "gemini_vision", "text_nlp", "manual"
 
+    # Deterministic name classification (services/product_classification.py), set at ingest and by
+    # scripts/reclassify_products.py; a NULL or older classification_version means not yet (re)classified
+    product_type = Column(String(30), nullable=True, index=True)  # KEYWORD_CATEGORIES key, e.g. "sofas", "rugs"
+    is_accessory = Column(Boolean, nullable=True)  # Swatches, covers, parts... never recommended as furniture
+    classification_version = Column(SmallInteger, nullable=True)
+
     # Category relationship
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     category = relationship("Category", back_populates="products")
@@ -184,6 +223,11 @@ class Product(Base):
         Index("idx_product_price_category", "price", "category_id"),
         Index("idx_product_brand_category", "brand", "category_id"),
         Index("idx_product_styles", "primary_style", "secondary_style"),
+        Index("idx_product_available_accessory", "is_available", "is_accessory"),
+        Index("idx_product_classification_version", "classification_version"),
+        Index("idx_product_search_vector", "search_vector", postgresql_using="gin"),
+        Index("idx_product_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("idx_product_brand_trgm", "brand", postgresql_using="gin", postgresql_ops={"brand": "gin_trgm_ops"}),
     )
 
     def __repr__(self):
@@ -256,6 +300,104 @@ class ProductAttribute(Base):
         return f"<ProductAttribute(product_id={self.product_id}, name='{self.attribute_name}', value='{self.attribute_value[:50]}...')>"
 
 
+class ProductFeatures(Base):
+    """
+    Precomputed ranking features, one row per product.
+
+    Derived from the product row and its attributes by
+    services/product_features.py (the scraper pipeline and attribute
+    extraction rebuild it at ingest), so ranking reads normalized values
+    and integer family/style bitmasks instead of re-parsing names and
+    attribute rows per request. A row is stale when features_version is
+    older than FEATURES_VERSION or source_hash no longer matches the
+    product's name, styles and attribute rows.
+    """
+
+    __tablename__ = "product_features"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    features_version = Column(SmallInteger, nullable=False)
+
+    product_type = Column(String(30), nullable=True)  # Normalized, e.g. "3-seater", "sectional", "queen"
+    capacity = Column(SmallInteger, nullable=True)  # Seating capacity
+    material = Column(String(100), nullable=True)  # Lower-cased primary material
+    material_family_mask = Column(Integer, default=0, nullable=False)  # Bit per RankingService.MATERIAL_FAMILIES entry
+    color = Column(String(50), nullable=True)  # Lower-cased primary color
+    color_family_mask = Column(Integer, default=0, nullable=False)  # Bit per RankingService.COLOR_FAMILIES entry
+    primary_style = Column(String(50), nullable=True)  # Lower-cased
+    secondary_style = Column(String(50), nullable=True)
+    style_mask = Column(Integer, default=0, nullable=False)  # Bit per PREDEFINED_STYLES entry (primary | secondary)
+
+    # Staleness bookkeeping
+    source_hash = Column(String(32), nullable=True)  # md5 of name, styles and attribute rows (product_features.source_hash)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("idx_product_features_version", "features_version"),)
+
+    def __repr__(self):
+        return f"<ProductFeatures(product_id={self.product_id}, type='{self.product_type}', v={self.features_version})>"
+
+
+class ProductNeighbours(Base):
+    """
+    Precomputed "similar items" list, one row per embedded product.
+
+    The nearest neighbours of the product's embedding among available
+    products of the same category, best first, built by
+    services/product_neighbours.py (scripts/rebuild_product_neighbours.py).
+    The first in_band_count entries are within the product's price band; the
+    rest fill the list from outside it. A row is stale when
+    neighbours_version is older than NEIGHBOURS_VERSION, the product was
+    re-embedded after computed_at, or it moved to another category.
+    """
+
+    __tablename__ = "product_neighbours"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    neighbours_version = Column(SmallInteger, nullable=False)
+    category_id = Column(Integer, nullable=True)  # Category the neighbours were drawn from
+
+    neighbour_ids = Column(ARRAY(Integer), nullable=False)  # Best first
+    scores = Column(ARRAY(REAL), nullable=False)  # Cosine similarity per neighbour
+    in_band_count = Column(SmallInteger, default=0, nullable=False)  # Leading neighbours within the price band
+
+    computed_at = Column(DateTime, nullable=False)  # Time of the embedding index the list was computed from
+
+    __table_args__ = (
+        Index("idx_product_neighbours_category", "category_id"),
+        Index("idx_product_neighbours_neighbour_ids", "neighbour_ids", postgresql_using="gin"),
+    )
+
+    def __repr__(self):
+        return f"<ProductNeighbours(product_id={self.product_id}, n={len(self.neighbour_ids or [])}, v={self.neighbours_version})>"
+
+
+class ProductDuplicate(Base):
+    """
+    Near-duplicate cluster membership, one row per product that has a duplicate.
+
+    Products listed more than once (typically the same item at several
+    stores) share a cluster_id, the lowest product id of the cluster.
+    Written by services/duplicate_clusters.py
+    (scripts/find_near_duplicates.py), which replaces the whole table on each
+    run; search can collapse a cluster to its best-ranked member. Products
+    without a row have no known duplicate.
+    """
+
+    __tablename__ = "product_duplicates"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    cluster_id = Column(Integer, nullable=False)  # Lowest product id of the cluster
+    similarity = Column(REAL, nullable=False)  # Best name-shingle Jaccard to another member
+    detector_version = Column(SmallInteger, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("idx_product_duplicates_cluster", "cluster_id"),)
+
+    def __repr__(self):
+        return f"<ProductDuplicate(product_id={self.product_id}, cluster_id={self.cluster_id})>"
+
+
 class ScrapingLog(Base):
     """Logs for scraping operations"""
 
@@ -977,6 +1119,32 @@ class SystemSettings(Base):
         return f"<SystemSettings(key='{self.key}')>"
 
 
+class QueryEmbedding(Base):
+    """
+    Durable tier of the query embedding cache.
+
+    Shared by all API workers and kept across deploys. Keyed by
+    sha256(model:dimension:normalized query text) so a model change never
+    serves stale vectors.
+    """
+
+    __tablename__ = "query_embeddings"
+
+    cache_key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    query_text = Column(Text, nullable=False)  # Normalized (lowercased, stripped) query
+    embedding = Column(LargeBinary, nullable=False)  # float32 bytes, see services.embedding_codec
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("idx_query_embeddings_model_last_used", "model", "dimension", "last_used_at"),)
+
+    def __repr__(self):
+        return f"<QueryEmbedding(key='{self.cache_key[:12]}', query='{self.query_text[:30]}')>"
+
+
 class FloorTile(Base):
     """
     Floor tile catalog for visualization.
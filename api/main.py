@@ -55,6 +55,10 @@ try:
         wall_textures,
     )
     from routers.curated import warm_curated_looks_cache
+    from services.attribute_index import initialize_attribute_index, refresh_attribute_index
+    from services.embedding_index import initialize_embedding_index, refresh_embedding_index
+    from services.embedding_service import initialize_embedding_service
+    from services.facet_index import initialize_facet_index, refresh_facet_index
     from services.furniture_removal_service import furniture_removal_service
 
     from core.config import settings
@@ -93,6 +97,10 @@ except ImportError as e:
     settings = FallbackSettings()
     furniture_cleanup_available = False
     warm_curated_looks_cache = None
+    initialize_embedding_index = None
+    initialize_embedding_service = None
+    initialize_facet_index = None
+    initialize_attribute_index = None
     AsyncSessionLocal = None
 
     def setup_logging():
@@ -113,6 +121,39 @@ async def periodic_furniture_cleanup():
             logger.error(f"Error in periodic furniture cleanup: {e}")
 
 
+# Background task for keeping the in-memory embedding index fresh
+async def periodic_embedding_index_refresh():
+    """Background task that applies product/embedding changes to the resident search index"""
+    while True:
+        await asyncio.sleep(settings.embedding_index_refresh_interval)
+        try:
+            await refresh_embedding_index(AsyncSessionLocal)
+        except Exception as e:
+            logger.error(f"Error refreshing embedding index: {e}")
+
+
+# Background task for keeping the in-memory facet columns fresh
+async def periodic_facet_index_refresh():
+    """Background task that applies product changes to the resident facet index"""
+    while True:
+        await asyncio.sleep(settings.facet_index_refresh_interval)
+        try:
+            await refresh_facet_index(AsyncSessionLocal)
+        except Exception as e:
+            logger.error(f"Error refreshing facet index: {e}")
+
+
+# Background task for keeping the in-memory attribute postings fresh
+async def periodic_attribute_index_refresh():
+    """Background task that re-indexes products whose attributes changed"""
+    while True:
+        await asyncio.sleep(settings.attribute_index_refresh_interval)
+        try:
+            await refresh_attribute_index(AsyncSessionLocal)
+        except Exception as e:
+            logger.error(f"Error refreshing attribute index: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -210,6 +251,43 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Failed to warm curated looks cache: {e}")
 
+    # Load product embeddings into memory so semantic search never fetches vectors from Postgres
+    index_refresh_task = None
+    if initialize_embedding_index and AsyncSessionLocal and settings.embedding_index_enabled:
+        try:
+            await initialize_embedding_index(AsyncSessionLocal)
+            index_refresh_task = asyncio.create_task(periodic_embedding_index_refresh())
+            logger.info(f"✅ Started embedding index refresh task (every {settings.embedding_index_refresh_interval}s)")
+        except Exception as e:
+            logger.error(f"Failed to load embedding index, semantic search will scan the database: {e}")
+
+    # Load per-product facet columns so result facets never need COUNT queries
+    facet_refresh_task = None
+    if initialize_facet_index and AsyncSessionLocal and settings.facet_index_enabled:
+        try:
+            await initialize_facet_index(AsyncSessionLocal)
+            facet_refresh_task = asyncio.create_task(periodic_facet_index_refresh())
+            logger.info(f"✅ Started facet index refresh task (every {settings.facet_index_refresh_interval}s)")
+        except Exception as e:
+            logger.error(f"Failed to load facet index, search results will have no facets: {e}")
+
+    # Load attribute postings so strict attribute filtering never queries product_attributes per candidate
+    attribute_refresh_task = None
+    if initialize_attribute_index and AsyncSessionLocal and settings.attribute_index_enabled:
+        try:
+            await initialize_attribute_index(AsyncSessionLocal)
+            attribute_refresh_task = asyncio.create_task(periodic_attribute_index_refresh())
+            logger.info(f"✅ Started attribute index refresh task (every {settings.attribute_index_refresh_interval}s)")
+        except Exception as e:
+            logger.error(f"Failed to load attribute index, strict attribute filtering will query the database: {e}")
+
+    # Attach the durable query embedding cache and warm the in-process tier from it
+    if initialize_embedding_service and AsyncSessionLocal:
+        try:
+            await initialize_embedding_service(AsyncSessionLocal)
+        except Exception as e:
+            logger.error(f"Failed to warm query embedding cache: {e}")
+
     # Database connection is managed by SQLAlchemy async session
     # No explicit connect/disconnect needed
     logger.info("Application started")
@@ -227,6 +305,27 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             logger.info("Furniture cleanup task cancelled")
 
+    if index_refresh_task:
+        index_refresh_task.cancel()
+        try:
+            await index_refresh_task
+        except asyncio.CancelledError:
+            logger.info("Embedding index refresh task cancelled")
+
+    if facet_refresh_task:
+        facet_refresh_task.cancel()
+        try:
+            await facet_refresh_task
+        except asyncio.CancelledError:
+            logger.info("Facet index refresh task cancelled")
+
+    if attribute_refresh_task:
+        attribute_refresh_task.cancel()
+        try:
+            await attribute_refresh_task
+        except asyncio.CancelledError:
+            logger.info("Attribute index refresh task cancelled")
+
     logger.info("Application stopped")
 
 
@@ -344,6 +443,27 @@ async def debug_info():
     }
 
 
+# Semantic search internals: embedding index size/freshness, query embedding batching, result snapshots, query analysis
+@app.get("/debug/search")
+async def debug_search():
+    """Embedding index and query embedding statistics"""
+    from services.attribute_index import get_attribute_index
+    from services.embedding_index import get_embedding_index
+    from services.embedding_service import get_embedding_service
+    from services.facet_index import get_facet_index
+    from services.search_service import get_query_analyzer
+    from services.search_snapshots import get_search_snapshot_store
+
+    return {
+        "embedding_index": get_embedding_index().stats(),
+        "facet_index": get_facet_index().stats(),
+        "attribute_index": get_attribute_index().stats(),
+        "query_embeddings": get_embedding_service().get_query_embedding_stats(),
+        "search_snapshots": get_search_snapshot_store().stats(),
+        "query_analyzer": get_query_analyzer().stats(),
+    }
+
+
 # OpenAI API test endpoint
 @app.get("/debug/openai")
 async def test_openai():
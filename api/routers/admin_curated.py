@@ -4,7 +4,7 @@ Admin API routes for managing curated looks
 import logging
 import re
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from schemas.curated import (
@@ -17,12 +17,17 @@ from schemas.curated import (
     CuratedLookUpdate,
 )
 from services.search_service import (
-    expand_search_query_grouped,
-    get_exclusion_terms,
+    BRAND_WEIGHT,
+    analyze_query,
+    build_keyword_conditions,
+    name_matches_any,
     semantic_search_products,
-    should_exclude_product,
+    text_search_condition,
+    tsquery_phrase,
 )
-from sqlalchemy import and_, case, delete, func, or_, select
+from services.facet_index import result_facets
+from services.search_snapshots import get_search_snapshot_store
+from sqlalchemy import case, delete, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -139,6 +144,236 @@ async def get_product_categories(
         raise HTTPException(status_code=500, detail="Error fetching categories")
 
 
+async def _search_look_product_ids(
+    query: Optional[str],
+    category_id: Optional[int],
+    source_websites: Optional[List[str]],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    colors: Optional[str],
+    styles: Optional[str],
+    materials: Optional[str],
+    use_semantic: bool,
+    db: AsyncSession,
+) -> Tuple[List[int], Dict[int, float], List[bool]]:
+    """
+    Full retrieval for search_products_for_look: semantic + keyword merge.
+
+    Returns (ordered product ids, semantic similarity per id, primary-match flag per id).
+    """
+    semantic_product_ids: Dict[int, float] = {}
+    search_groups = []
+    semantic_threshold = 0.3
+    semantic_only_threshold = 0.5  # Semantic hits without a keyword match need this similarity
+
+    # Step 1: Try semantic search first (for products with embeddings)
+    # Get all semantic matches (we'll paginate the combined results later)
+    if query and use_semantic:
+        try:
+            semantic_product_ids = await semantic_search_products(
+                query_text=query,
+                db=db,
+                category_ids=[category_id] if category_id else None,
+                source_websites=source_websites,
+                min_price=min_price,
+                max_price=max_price,
+                limit=10000,  # Get all semantic matches, pagination happens later
+                min_score=semantic_threshold,
+            )
+            logger.info(f"[SEARCH] Semantic search returned {len(semantic_product_ids)} products")
+        except Exception as e:
+            logger.warning(f"[SEARCH] Semantic search failed, falling back to keyword: {e}")
+            semantic_product_ids = {}
+
+    # Step 2: Build keyword search query (for products without embeddings or as fallback)
+    # Only ids and names are needed to merge and count; full rows are loaded for the page in Step 5
+    search_query = select(Product.id, Product.name).where(Product.is_available.is_(True))
+
+    logger.info(f"[SEARCH DEBUG] query='{query}', source_websites={source_websites}")
+
+    # Apply text search if query provided (with synonym expansion for name only)
+    if query:
+        # Synonym-expanded groups (AND between groups, OR within) as one full-text condition
+        keyword_condition, search_groups = build_keyword_conditions(query)
+        logger.info(f"Search query '{query}' expanded to groups: {search_groups}")
+        if search_groups:
+            search_query = search_query.where(keyword_condition)
+
+    # Filter by category if specified
+    if category_id:
+        search_query = search_query.where(Product.category_id == category_id)
+
+    # Filter by store(s) if specified
+    if source_websites:
+        search_query = search_query.where(Product.source_website.in_(source_websites))
+
+    # Filter by price range
+    if min_price is not None:
+        search_query = search_query.where(Product.price >= min_price)
+    if max_price is not None:
+        search_query = search_query.where(Product.price <= max_price)
+
+    # Filter by colors (search in name, description, color field)
+    if colors:
+        color_list = [c.strip().lower() for c in colors.split(",")]
+        color_conditions = []
+        for color in color_list:
+            color_conditions.append(or_(Product.name.ilike(f"%{color}%"), Product.description.ilike(f"%{color}%")))
+        if color_conditions:
+            search_query = search_query.where(or_(*color_conditions))
+
+    # Filter by styles (uses Product.primary_style field)
+    if styles:
+        style_list = [s.strip().lower() for s in styles.split(",") if s.strip()]
+        if style_list:
+            # OR logic: match any of the selected styles
+            search_query = search_query.where(func.lower(Product.primary_style).in_(style_list))
+
+    # Filter by materials (uses ProductAttribute with material/material_primary)
+    if materials:
+        material_list = [m.strip().lower() for m in materials.split(",") if m.strip()]
+        if material_list:
+            # Subquery to find products with matching materials in ProductAttribute
+            material_subquery = (
+                select(ProductAttribute.product_id)
+                .where(ProductAttribute.attribute_name.in_(["material", "material_primary"]))
+                .where(func.lower(ProductAttribute.attribute_value).in_(material_list))
+            )
+            search_query = search_query.where(Product.id.in_(material_subquery))
+
+    # Order by: match priority (name > brand > description), then price
+    # This ensures "paintings" shows actual paintings first, not rugs that mention paintings
+    if query:
+        # Build name match condition for ALL expanded search terms (flatten the groups)
+        all_search_terms = [term for group in search_groups for term in group]
+        # Case expression to prioritize matches by field:
+        # - Priority 0: Name matches ANY synonym (most relevant - actual paintings/wall art)
+        # - Priority 1: Brand matches
+        # - Priority 2: Description matches (least relevant - rugs mentioning paintings)
+        match_priority = case(
+            (name_matches_any(all_search_terms), 0),  # Name matches any synonym - highest priority
+            (text_search_condition(tsquery_phrase(query, BRAND_WEIGHT)), 1),  # Brand match - medium priority
+            else_=2,  # Description only match - lowest priority
+        )
+        search_query = search_query.order_by(match_priority, Product.price.desc().nullslast())
+    else:
+        search_query = search_query.order_by(Product.price.desc().nullslast())
+
+    # Get all keyword matches (no limit - we paginate combined results)
+    search_query = search_query.limit(10000)
+
+    result = await db.execute(search_query)
+    keyword_products = result.fetchall()
+    product_names: Dict[int, str] = {p.id: p.name for p in keyword_products}
+
+    # STEP 3: Merge semantic and keyword results into ordered list of product IDs
+    # Priority: semantic matches first (sorted by similarity), then keyword-only matches
+    ordered_product_ids: List[int] = []
+    semantic_scores: Dict[int, float] = {}
+    seen_product_ids = set()
+
+    # Get exclusion terms for the query (e.g., "center table" excludes "dining")
+    analysis = analyze_query(query) if query else None
+    exclusion_terms = list(analysis.exclusions) if analysis else []
+    if exclusion_terms:
+        logger.info(f"[SEARCH] Exclusion terms for '{query}': {exclusion_terms}")
+
+    # Helper: Check if product name matches ALL search groups (for primary match)
+    def name_matches_all_groups(product_name: str, groups: List[List[str]]) -> bool:
+        """Check if product name contains at least one term from EACH group."""
+        if not groups:
+            return True
+        name_lower = product_name.lower()
+        # Normalize: "L - Shaped" -> "l-shaped"
+        name_normalized = re.sub(r"\s*-\s*", "-", name_lower)
+        name_spaced = re.sub(r"-", " ", name_lower)  # Also try with spaces
+
+        for group in groups:
+            group_matched = False
+            for term in group:
+                term_normalized = re.sub(r"\s*-\s*", "-", term.lower())
+                # Check various forms
+                if term_normalized in name_normalized or term_normalized in name_spaced:
+                    group_matched = True
+                    break
+                # Also check with spaces
+                term_spaced = re.sub(r"-", " ", term.lower())
+                if term_spaced in name_lower or term_spaced in name_spaced:
+                    group_matched = True
+                    break
+            if not group_matched:
+                return False
+        return True
+
+    if semantic_product_ids:
+        # First, include products from semantic search that ALSO match keyword search
+        # This prevents "carpet" search from returning cushions/curtains just because they're semantically similar
+        # (semantic_product_ids is already ordered best first)
+
+        # Get the set of keyword-matching product IDs
+        keyword_product_ids = {p.id for p in keyword_products}
+
+        # Fetch names for semantic-only products (exclusion checks and primary/related counts)
+        if exclusion_terms or search_groups:
+            semantic_only_ids = [
+                pid
+                for pid, similarity in semantic_product_ids.items()
+                if pid not in keyword_product_ids and similarity >= semantic_only_threshold
+            ]
+            if semantic_only_ids:
+                names_query = select(Product.id, Product.name).where(Product.id.in_(semantic_only_ids))
+                names_result = await db.execute(names_query)
+                product_names.update({row[0]: row[1] for row in names_result.fetchall()})
+
+        excluded_count = 0
+        for product_id, similarity in semantic_product_ids.items():
+            if similarity >= semantic_threshold:
+                # Only include semantic results that also match keyword search
+                # OR have very high similarity (>= 0.5) for genuine semantic matches
+                if product_id in keyword_product_ids or similarity >= semantic_only_threshold:
+                    # Check exclusion terms
+                    product_name = product_names.get(product_id, "")
+                    if exclusion_terms and analysis.excludes(product_name):
+                        excluded_count += 1
+                        continue
+
+                    ordered_product_ids.append(product_id)
+                    semantic_scores[product_id] = similarity
+                    seen_product_ids.add(product_id)
+
+        logger.info(
+            f"[SEARCH] Added {len(seen_product_ids)} semantic results (threshold={semantic_threshold}, keyword-filtered, {excluded_count} excluded)"
+        )
+
+    # Add keyword-only results (products without embeddings or below semantic threshold)
+    excluded_keyword_count = 0
+    for p in keyword_products:
+        if p.id not in seen_product_ids:
+            # Check exclusion terms
+            if exclusion_terms and analysis.excludes(p.name):
+                excluded_keyword_count += 1
+                continue
+            ordered_product_ids.append(p.id)
+            seen_product_ids.add(p.id)
+
+    if excluded_keyword_count > 0:
+        logger.info(f"[SEARCH] Excluded {excluded_keyword_count} keyword results due to exclusion terms")
+
+    # Primary match = product name contains ALL search terms (using synonym groups)
+    # This is more accurate than similarity threshold for specific queries like "L-shaped sofa"
+    if search_groups:
+        primary_flags = [name_matches_all_groups(product_names.get(pid, ""), search_groups) for pid in ordered_product_ids]
+    else:
+        # No search query - all are primary matches
+        primary_flags = [True] * len(ordered_product_ids)
+    total_primary = sum(primary_flags)
+    logger.info(
+        f"[SEARCH] Total counts: {total_primary} primary, {len(ordered_product_ids) - total_primary} related "
+        f"(out of {len(ordered_product_ids)})"
+    )
+    return ordered_product_ids, semantic_scores, primary_flags
+
+
 @router.get("/search/products")
 async def search_products_for_look(
     query: Optional[str] = Query(None, min_length=1),
@@ -152,14 +387,12 @@ async def search_products_for_look(
     use_semantic: bool = Query(True, description="Use semantic search (embeddings) when available"),
     page: int = Query(1, ge=1, description="Page number for pagination"),
     page_size: int = Query(50, ge=1, le=200, description="Number of products per page"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by an earlier page of the same search"),
     current_user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
     """Search for products to add to a curated look. Uses semantic search + keyword fallback with pagination."""
     try:
-        semantic_product_ids: Dict[int, float] = {}
-        search_groups = []
-
         # Parse comma-separated stores into a list
         source_websites: Optional[List[str]] = None
         if source_website:
@@ -167,259 +400,49 @@ async def search_products_for_look(
             if not source_websites:
                 source_websites = None
 
-        # Step 1: Try semantic search first (for products with embeddings)
-        # Get all semantic matches (we'll paginate the combined results later)
-        if query and use_semantic:
-            try:
-                semantic_product_ids = await semantic_search_products(
-                    query_text=query,
-                    db=db,
-                    category_ids=[category_id] if category_id else None,
-                    source_websites=source_websites,
-                    min_price=min_price,
-                    max_price=max_price,
-                    limit=10000,  # Get all semantic matches, pagination happens later
-                )
-                logger.info(f"[SEARCH] Semantic search returned {len(semantic_product_ids)} products")
-            except Exception as e:
-                logger.warning(f"[SEARCH] Semantic search failed, falling back to keyword: {e}")
-                semantic_product_ids = {}
-
-        # Step 2: Build keyword search query (for products without embeddings or as fallback)
-        search_query = select(Product).options(selectinload(Product.images)).where(Product.is_available.is_(True))
-
-        logger.info(f"[SEARCH DEBUG] query='{query}', source_websites={source_websites}, page={page}")
-
-        # Apply text search if query provided (with synonym expansion for name only)
-        if query:
-            # Use grouped expansion for AND logic between word groups
-            search_groups = expand_search_query_grouped(query)
-            logger.info(f"Search query '{query}' expanded to groups: {search_groups}")
-
-            # Build AND conditions: product must match at least one term from EACH group
-            # Example: "L-shaped sofa" -> must match (l-shaped OR l-shapeds) AND (sofa OR couch OR settee)
-            and_conditions = []
-            for group in search_groups:
-                group_conditions = []
-                for term in group:
-                    escaped_term = re.escape(term)
-                    # Use PostgreSQL regex with word boundaries (\y) for accurate matching
-                    group_conditions.append(Product.name.op("~*")(rf"\y{escaped_term}\y"))
-                if group_conditions:
-                    # OR within each group
-                    and_conditions.append(or_(*group_conditions))
-
-            # Broad terms that should NOT match in description (too many false positives)
-            BROAD_TERMS = {"decor", "art", "furniture", "home", "living", "style", "design"}
-
-            # Also match original query in brand and description with word boundaries
-            escaped_query = re.escape(query)
-            query_lower = query.lower().strip()
-
-            original_query_conditions = [
-                Product.brand.op("~*")(rf"\y{escaped_query}\y"),
-            ]
-
-            # Only match description for specific (non-broad) terms
-            if query_lower not in BROAD_TERMS:
-                original_query_conditions.append(Product.description.op("~*")(rf"\y{escaped_query}\y"))
-
-            # Final condition: (all AND conditions from groups) OR (original query in brand/description)
-            if and_conditions:
-                # AND between all groups
-                grouped_condition = and_(*and_conditions)
-                # OR with brand/description match for full phrase
-                all_conditions = [grouped_condition] + original_query_conditions
-                search_query = search_query.where(or_(*all_conditions))
-
-        # Filter by category if specified
-        if category_id:
-            search_query = search_query.where(Product.category_id == category_id)
-
-        # Filter by store(s) if specified
-        if source_websites:
-            search_query = search_query.where(Product.source_website.in_(source_websites))
-
-        # Filter by price range
-        if min_price is not None:
-            search_query = search_query.where(Product.price >= min_price)
-        if max_price is not None:
-            search_query = search_query.where(Product.price <= max_price)
-
-        # Filter by colors (search in name, description, color field)
-        if colors:
-            color_list = [c.strip().lower() for c in colors.split(",")]
-            color_conditions = []
-            for color in color_list:
-                color_conditions.append(or_(Product.name.ilike(f"%{color}%"), Product.description.ilike(f"%{color}%")))
-            if color_conditions:
-                search_query = search_query.where(or_(*color_conditions))
-
-        # Filter by styles (uses Product.primary_style field)
-        if styles:
-            style_list = [s.strip().lower() for s in styles.split(",") if s.strip()]
-            if style_list:
-                # OR logic: match any of the selected styles
-                search_query = search_query.where(func.lower(Product.primary_style).in_(style_list))
-
-        # Filter by materials (uses ProductAttribute with material/material_primary)
-        if materials:
-            material_list = [m.strip().lower() for m in materials.split(",") if m.strip()]
-            if material_list:
-                # Subquery to find products with matching materials in ProductAttribute
-                material_subquery = (
-                    select(ProductAttribute.product_id)
-                    .where(ProductAttribute.attribute_name.in_(["material", "material_primary"]))
-                    .where(func.lower(ProductAttribute.attribute_value).in_(material_list))
-                )
-                search_query = search_query.where(Product.id.in_(material_subquery))
-
-        # Order by: match priority (name > brand > description), then price
-        # This ensures "paintings" shows actual paintings first, not rugs that mention paintings
-        if query:
-            escaped_query = re.escape(query)
-            # Build name match condition for ALL expanded search terms (flatten the groups)
-            all_search_terms = [term for group in search_groups for term in group]
-            name_match_conditions = [Product.name.op("~*")(rf"\y{re.escape(term)}\y") for term in all_search_terms]
-            # Case expression to prioritize matches by field:
-            # - Priority 0: Name matches ANY synonym (most relevant - actual paintings/wall art)
-            # - Priority 1: Brand matches
-            # - Priority 2: Description matches (least relevant - rugs mentioning paintings)
-            match_priority = case(
-                (or_(*name_match_conditions), 0),  # Name matches any synonym - highest priority
-                (Product.brand.op("~*")(rf"\y{escaped_query}\y"), 1),  # Brand match - medium priority
-                else_=2,  # Description only match - lowest priority
+        # Later pages slice the result snapshot of the first page instead of re-running the search
+        snapshots = get_search_snapshot_store()
+        fingerprint = snapshots.fingerprint(
+            query=query,
+            category_id=category_id,
+            source_websites=source_websites,
+            min_price=min_price,
+            max_price=max_price,
+            colors=colors,
+            styles=styles,
+            materials=materials,
+            use_semantic=use_semantic,
+        )
+        snapshot = snapshots.get(cursor, fingerprint)
+        if snapshot is None:
+            ordered_product_ids, semantic_scores, primary_flags = await _search_look_product_ids(
+                query,
+                category_id,
+                source_websites,
+                min_price,
+                max_price,
+                colors,
+                styles,
+                materials,
+                use_semantic,
+                db,
             )
-            search_query = search_query.order_by(match_priority, Product.price.desc().nullslast())
-        else:
-            search_query = search_query.order_by(Product.price.desc().nullslast())
-
-        # Get all keyword matches (no limit - we paginate combined results)
-        search_query = search_query.limit(10000)
-
-        result = await db.execute(search_query)
-        keyword_products = result.scalars().unique().all()
-
-        # STEP 3: Merge semantic and keyword results into ordered list of product IDs
-        # Priority: semantic matches first (sorted by similarity), then keyword-only matches
-        ordered_product_ids: List[int] = []
-        semantic_scores: Dict[int, float] = {}
-        seen_product_ids = set()
-
-        # Get exclusion terms for the query (e.g., "center table" excludes "dining")
-        exclusion_terms = get_exclusion_terms(query) if query else []
-        if exclusion_terms:
-            logger.info(f"[SEARCH] Exclusion terms for '{query}': {exclusion_terms}")
-
-        # Helper: Check if product name matches ALL search groups (for primary match)
-        def name_matches_all_groups(product_name: str, groups: List[List[str]]) -> bool:
-            """Check if product name contains at least one term from EACH group."""
-            if not groups:
-                return True
-            name_lower = product_name.lower()
-            # Normalize: "L - Shaped" -> "l-shaped"
-            name_normalized = re.sub(r"\s*-\s*", "-", name_lower)
-            name_spaced = re.sub(r"-", " ", name_lower)  # Also try with spaces
-
-            for group in groups:
-                group_matched = False
-                for term in group:
-                    term_normalized = re.sub(r"\s*-\s*", "-", term.lower())
-                    # Check various forms
-                    if term_normalized in name_normalized or term_normalized in name_spaced:
-                        group_matched = True
-                        break
-                    # Also check with spaces
-                    term_spaced = re.sub(r"-", " ", term.lower())
-                    if term_spaced in name_lower or term_spaced in name_spaced:
-                        group_matched = True
-                        break
-                if not group_matched:
-                    return False
-            return True
-
-        if semantic_product_ids:
-            # First, include products from semantic search that ALSO match keyword search
-            # This prevents "carpet" search from returning cushions/curtains just because they're semantically similar
-            semantic_threshold = 0.3
-            semantic_sorted = sorted(semantic_product_ids.items(), key=lambda x: x[1], reverse=True)
-
-            # Get the set of keyword-matching product IDs and names
-            keyword_product_ids = {p.id for p in keyword_products}
-            keyword_product_names = {p.id: p.name for p in keyword_products}
-
-            # If we have exclusion terms, we need to fetch names for semantic-only products
-            semantic_only_names = {}
-            if exclusion_terms:
-                semantic_only_ids = [pid for pid, _ in semantic_sorted if pid not in keyword_product_ids]
-                if semantic_only_ids:
-                    names_query = select(Product.id, Product.name).where(Product.id.in_(semantic_only_ids))
-                    names_result = await db.execute(names_query)
-                    semantic_only_names = {row[0]: row[1] for row in names_result.fetchall()}
-
-            excluded_count = 0
-            for product_id, similarity in semantic_sorted:
-                if similarity >= semantic_threshold:
-                    # Only include semantic results that also match keyword search
-                    # OR have very high similarity (>= 0.5) for genuine semantic matches
-                    if product_id in keyword_product_ids or similarity >= 0.5:
-                        # Check exclusion terms
-                        product_name = keyword_product_names.get(product_id) or semantic_only_names.get(product_id, "")
-                        if exclusion_terms and should_exclude_product(product_name, exclusion_terms):
-                            excluded_count += 1
-                            continue
-
-                        ordered_product_ids.append(product_id)
-                        semantic_scores[product_id] = similarity
-                        seen_product_ids.add(product_id)
-
-            logger.info(
-                f"[SEARCH] Added {len(seen_product_ids)} semantic results (threshold={semantic_threshold}, keyword-filtered, {excluded_count} excluded)"
+            snapshot = snapshots.put(
+                fingerprint,
+                ordered_product_ids,
+                scores=[semantic_scores.get(product_id) for product_id in ordered_product_ids],
+                primary=primary_flags,
             )
 
-        # Add keyword-only results (products without embeddings or below semantic threshold)
-        excluded_keyword_count = 0
-        for p in keyword_products:
-            if p.id not in seen_product_ids:
-                # Check exclusion terms
-                if exclusion_terms and should_exclude_product(p.name, exclusion_terms):
-                    excluded_keyword_count += 1
-                    continue
-                ordered_product_ids.append(p.id)
-                seen_product_ids.add(p.id)
-
-        if excluded_keyword_count > 0:
-            logger.info(f"[SEARCH] Excluded {excluded_keyword_count} keyword results due to exclusion terms")
-
-        total_results = len(ordered_product_ids)
-
-        # Calculate total_primary and total_related by fetching ALL product names
-        # This is needed for accurate counts across pagination
-        total_primary = 0
-        total_related = 0
-        if ordered_product_ids and search_groups:
-            # Fetch just names for all products (efficient - no images/full data)
-            names_query = select(Product.id, Product.name).where(Product.id.in_(ordered_product_ids))
-            names_result = await db.execute(names_query)
-            all_products_names = {row[0]: row[1] for row in names_result.fetchall()}
-
-            for product_id in ordered_product_ids:
-                name = all_products_names.get(product_id, "")
-                if name_matches_all_groups(name, search_groups):
-                    total_primary += 1
-                else:
-                    total_related += 1
-
-            logger.info(f"[SEARCH] Total counts: {total_primary} primary, {total_related} related (out of {total_results})")
-        else:
-            # No search query - all are primary matches
-            total_primary = total_results
-            total_related = 0
+        total_results = len(snapshot)
+        total_primary = int(snapshot.primary.sum())
+        total_related = total_results - total_primary
 
         # STEP 4: Apply pagination
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
-        page_product_ids = ordered_product_ids[start_idx:end_idx]
+        page_entries = snapshot.page(start_idx, page_size)
+        page_product_ids = [entry[0] for entry in page_entries]
         has_more = end_idx < total_results
 
         # STEP 5: Fetch product details for this page
@@ -430,15 +453,9 @@ async def search_products_for_look(
 
             # Build response in the correct order
             final_products = []
-            for product_id in page_product_ids:
+            for product_id, similarity, is_primary in page_entries:
                 if product_id in products_map:
                     p = products_map[product_id]
-                    similarity = semantic_scores.get(product_id, 0)
-
-                    # Primary match = product name contains ALL search terms (using synonym groups)
-                    # This is more accurate than similarity threshold for specific queries like "L-shaped sofa"
-                    is_primary = name_matches_all_groups(p.name, search_groups) if search_groups else True
-
                     product_data = {
                         "id": p.id,
                         "name": p.name,
@@ -470,6 +487,8 @@ async def search_products_for_look(
             "page": page,
             "page_size": page_size,
             "has_more": has_more,
+            "cursor": snapshot.cursor,
+            "facets": result_facets(snapshot.ids),
         }
 
     except Exception as e:
@@ -3,7 +3,6 @@ Admin migration endpoints for one-time database updates.
 Includes backfill operations for embeddings and style classification.
 """
 import asyncio
-import json
 import logging
 from datetime import datetime
 from typing import Dict, Optional
@@ -54,6 +53,9 @@ class BackfillRequest(BaseModel):
     batch_size: int = 100
     limit: Optional[int] = None
     regenerate: bool = False
+    # Embedding backfill only: re-embed unchanged products / only count what would be re-embedded
+    force: bool = False
+    dry_run: bool = False
 
 
 # =====================================================================
@@ -61,91 +63,55 @@ class BackfillRequest(BaseModel):
 # =====================================================================
 
 
-async def _run_embedding_backfill(batch_size: int, limit: Optional[int], regenerate: bool):
-    """Background task to run embedding backfill."""
+async def _run_embedding_backfill(
+    batch_size: int, limit: Optional[int], regenerate: bool, force: bool = False, dry_run: bool = False
+):
+    """Background task to run embedding backfill through the bulk embedding engine."""
+    from services.embedding_rate_limiter import AdaptiveRateLimiter
     from services.embedding_service import get_embedding_service
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.future import select
 
-    from core.config import settings
+    from core.database import AsyncSessionLocal
 
     embedding_service = get_embedding_service()
-    engine = create_engine(settings.database_url, pool_pre_ping=True)
-    Session = sessionmaker(bind=engine)
+    rate_limiter = AdaptiveRateLimiter(embedding_service.MAX_CONCURRENT_REQUESTS)
 
     try:
         backfill_state.update_embeddings("running", started_at=datetime.utcnow().isoformat())
 
-        session = Session()
-        try:
+        async with AsyncSessionLocal() as session:
             # Get products needing embeddings
-            query = session.query(Product.id).filter(Product.is_available.is_(True))
+            query = select(Product.id).where(Product.is_available.is_(True))
             if not regenerate:
-                query = query.filter(Product.embedding.is_(None))
+                query = query.where(Product.embedding.is_(None), Product.embedding_vector.is_(None))
             query = query.order_by(Product.id)
             if limit:
                 query = query.limit(limit)
 
-            product_ids = [row[0] for row in query.all()]
+            product_ids = [row[0] for row in (await session.execute(query)).fetchall()]
             total = len(product_ids)
 
-            backfill_state.update_embeddings("running", total=total, processed=0, success=0, failed=0)
+            totals = {"processed": 0, "success": 0, "failed": 0, "skipped": 0, "would_embed": 0}
+            backfill_state.update_embeddings("running", total=total, dry_run=dry_run, **totals)
 
             logger.info(f"[EMBEDDING BACKFILL] Starting backfill for {total} products")
 
-            processed = 0
-            success = 0
-            failed = 0
-
             for i in range(0, total, batch_size):
-                batch_ids = product_ids[i : i + batch_size]
-
-                for product_id in batch_ids:
-                    try:
-                        product = session.query(Product).filter(Product.id == product_id).first()
-                        if not product:
-                            continue
-
-                        # Build embedding text
-                        embedding_text = embedding_service.build_product_embedding_text(product)
-
-                        # Generate embedding
-                        embedding = await embedding_service.generate_embedding(embedding_text, task_type="RETRIEVAL_DOCUMENT")
-
-                        if embedding:
-                            product.embedding = json.dumps(embedding)
-                            product.embedding_text = embedding_text
-                            product.embedding_updated_at = datetime.utcnow()
-                            success += 1
-                        else:
-                            failed += 1
-
-                    except Exception as e:
-                        logger.error(f"Error processing product {product_id}: {e}")
-                        failed += 1
-
-                    processed += 1
-                    await asyncio.sleep(0.5)  # Rate limiting
-
-                session.commit()
+                batch_stats = await embedding_service.batch_generate_embeddings(
+                    product_ids[i : i + batch_size], session, rate_limiter=rate_limiter, force=force, dry_run=dry_run
+                )
+                for key in totals:
+                    totals[key] += batch_stats[key]
 
                 backfill_state.update_embeddings(
                     "running",
-                    processed=processed,
-                    success=success,
-                    failed=failed,
-                    percent_complete=round(processed / total * 100, 1) if total > 0 else 0,
+                    products_per_minute=batch_stats["products_per_minute"],
+                    percent_complete=round(totals["processed"] / total * 100, 1) if total > 0 else 0,
+                    **totals,
                 )
 
-            session.commit()
-
-        finally:
-            session.close()
-
-        backfill_state.update_embeddings(
-            "completed", processed=processed, success=success, failed=failed, completed_at=datetime.utcnow().isoformat()
-        )
-        logger.info(f"[EMBEDDING BACKFILL] Completed: {success}/{total} successful")
+        backfill_state.update_embeddings("completed", completed_at=datetime.utcnow().isoformat(), **totals)
+        logger.info(f"[EMBEDDING BACKFILL] Completed: {totals}")
 
     except Exception as e:
         logger.error(f"[EMBEDDING BACKFILL] Failed: {e}", exc_info=True)
@@ -167,7 +133,9 @@ async def start_embedding_backfill(
     if backfill_state.embeddings["status"] == "running":
         raise HTTPException(status_code=409, detail="Embedding backfill is already running")
 
-    background_tasks.add_task(_run_embedding_backfill, request.batch_size, request.limit, request.regenerate)
+    background_tasks.add_task(
+        _run_embedding_backfill, request.batch_size, request.limit, request.regenerate, request.force, request.dry_run
+    )
 
     backfill_state.update_embeddings("starting")
 
@@ -176,6 +144,8 @@ async def start_embedding_backfill(
         "batch_size": request.batch_size,
         "limit": request.limit,
         "regenerate": request.regenerate,
+        "force": request.force,
+        "dry_run": request.dry_run,
     }
 
 
@@ -29,6 +29,7 @@ from services.budget_allocator import validate_and_adjust_budget_allocations
 from services.chatgpt_service import chatgpt_service
 from services.conversation_context import conversation_context_manager
 from services.embedding_service import get_embedding_service
+from services.facet_index import result_facets
 from services.google_ai_service import (
     RoomAnalysis,
     VisualizationRequest,
@@ -38,9 +39,12 @@ from services.google_ai_service import (
 )
 from services.ml_recommendation_model import ml_recommendation_model
 from services.nlp_processor import design_nlp_processor
+from services.product_features import load_product_features, user_type_and_capacity
 from services.ranking_service import get_ranking_service
 from services.recommendation_engine import RecommendationRequest, recommendation_engine
+from services.search_service import SemanticQuery, semantic_search_many
 from services.search_service import semantic_search_products as _shared_semantic_search
+from services.search_snapshots import get_search_snapshot_store
 from sqlalchemy import and_, case, func, literal, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -5979,14 +5983,10 @@ async def _get_category_based_recommendations(
     )
     logger.info(f"[CATEGORY RECS] Size keywords: {size_keywords}")
 
-    # Get semantic similarity scores if query provided
-    semantic_scores: Dict[int, float] = {}
+    # Query embedding for text intent scoring, shared by every category
+    query_embedding = None
     if semantic_query:
-        logger.info(f"[CATEGORY RECS] Running semantic search for: {semantic_query[:50]}...")
-        semantic_scores = await _semantic_search(
-            query_text=semantic_query, db=db, store_filter=selected_stores, limit=500  # Get top 500 for each category's pool
-        )
-        logger.info(f"[CATEGORY RECS] Got {len(semantic_scores)} semantic scores")
+        query_embedding = await get_embedding_service().get_query_embedding(semantic_query)
 
     # Normalize size keywords for flexible matching
     # Map various formats to a standard form for database search
@@ -6022,8 +6022,15 @@ async def _get_category_based_recommendations(
 
     products_by_category: Dict[str, List[dict]] = {}
 
-    async def fetch_category_products(category: CategoryRecommendation) -> Tuple[str, List[dict]]:
-        """Fetch products for a single category"""
+    async def fetch_category_candidates(
+        category: CategoryRecommendation,
+    ) -> Tuple[str, Optional[List[Product]], List[int], List[dict]]:
+        """Fetch candidate products for a single category.
+
+        Returns (category_id, candidates, matching category ids, product dicts);
+        candidates is None when the product dicts are already final (special
+        handling, errors).
+        """
         try:
             category_id = category.category_id
             keywords = CATEGORY_KEYWORDS.get(category_id, [category_id.replace("_", " ")])
@@ -6100,7 +6107,7 @@ async def _get_category_based_recommendations(
                         for p in products
                     ]
 
-                    return category_id, product_list
+                    return category_id, None, [], product_list
 
             # =====================================================================
             # CATEGORY-FIRST FILTERING with SIZE-SPECIFIC PRIORITIZATION
@@ -6207,7 +6214,21 @@ async def _get_category_based_recommendations(
             products = result.scalars().all()
 
             logger.info(f"[CATEGORY RECS] {category_id}: Fetched {len(products)} candidate products for scoring")
+            return category_id, products, matching_category_ids, []
 
+        except Exception as e:
+            logger.error(f"[CATEGORY RECS] Error fetching {category.category_id}: {e}")
+            return category.category_id, None, [], []
+
+    def rank_category_products(
+        category_id: str,
+        products: List[Product],
+        matching_category_ids: List[int],
+        semantic_scores: Dict[int, float],
+        product_features: Dict[int, Any],
+    ) -> List[dict]:
+        """Rank one category's candidates and convert them to product dicts"""
+        try:
             # =================================================================
             # RANKING: Use deterministic weighted scoring via RankingService
             # Formula: 0.45*vector + 0.15*attribute + 0.15*style + 0.10*material_color + 0.10*budget + 0.05*text_intent
@@ -6216,17 +6237,12 @@ async def _get_category_based_recommendations(
             # =================================================================
             ranking_service = get_ranking_service()
 
-            # Get query embedding for text intent scoring
-            query_embedding = None
-            if semantic_query:
-                embedding_service = get_embedding_service()
-                query_embedding = await embedding_service.get_query_embedding(semantic_query)
-
             # Extract user preferences for ranking
             # Use first style keyword as primary style, second as secondary
             user_primary_style = style_keywords[0] if style_keywords else None
             user_secondary_style = style_keywords[1] if len(style_keywords) > 1 else None
-            user_type = normalized_sizes[0] if normalized_sizes else None
+            # "three seater" -> ("3-seater", 3), the product_features vocabulary
+            user_type, user_capacity = user_type_and_capacity(normalized_sizes[0] if normalized_sizes else None)
             user_color = preferred_colors[0] if preferred_colors else None
 
             # Get category ID for attribute matching
@@ -6244,12 +6260,13 @@ async def _get_category_based_recommendations(
                 query_embedding=query_embedding,
                 user_category=user_category_id,
                 user_type=user_type,
-                user_capacity=None,  # Could be extracted from query if needed
+                user_capacity=user_capacity,
                 user_primary_style=user_primary_style,
                 user_secondary_style=user_secondary_style,
                 user_materials=preferred_materials if preferred_materials else None,
                 user_color=user_color,
                 user_budget_max=user_total_budget,  # Use user's total budget, not category allocation
+                features=product_features,
             )
 
             # Log top ranked products for debugging
@@ -6322,19 +6339,42 @@ async def _get_category_based_recommendations(
                 product_list.append(product_dict)
 
             logger.info(f"[CATEGORY RECS] Found {len(product_list)} products for {category_id}")
-            return category_id, product_list
+            return product_list
 
         except Exception as e:
-            logger.error(f"[CATEGORY RECS] Error fetching {category.category_id}: {e}")
-            return category.category_id, []
+            logger.error(f"[CATEGORY RECS] Error ranking {category_id}: {e}")
+            return []
+
+    # Fetch all categories' candidates in parallel for better performance
+    tasks = [fetch_category_candidates(cat) for cat in selected_categories]
+    candidates = await asyncio.gather(*tasks)
+    to_rank = [
+        (category_id, products, matching_ids) for category_id, products, matching_ids, _ in candidates if products is not None
+    ]
+
+    # Semantic similarity for every category's own candidates, scored in one pass over the
+    # embedding index (one query per category, masked to its candidates)
+    category_scores: List[Dict[int, float]] = [{} for _ in to_rank]
+    if semantic_query and to_rank:
+        logger.info(f"[CATEGORY RECS] Running semantic search for {len(to_rank)} categories: {semantic_query[:50]}...")
+        category_scores = await semantic_search_many(
+            [SemanticQuery(semantic_query, product_ids=[p.id for p in products]) for _, products, _ in to_rank],
+            db,
+            limit=max(len(products) for _, products, _ in to_rank),
+        )
+        logger.info(f"[CATEGORY RECS] Got {sum(len(scores) for scores in category_scores)} semantic scores")
+
+    # Precomputed type/capacity/material/color/style features for every category's candidates, in one
+    # query (products without a row score neutral there)
+    product_features = await load_product_features([p.id for _, products, _ in to_rank for p in products], db)
 
-    # Fetch all categories in parallel for better performance
-    tasks = [fetch_category_products(cat) for cat in selected_categories]
-    results = await asyncio.gather(*tasks)
+    ranked_lists = {}
+    for (category_id, products, matching_ids), scores in zip(to_rank, category_scores):
+        ranked_lists[category_id] = rank_category_products(category_id, products, matching_ids, scores, product_features)
 
     # Build result dict
-    for category_id, products in results:
-        products_by_category[category_id] = products
+    for category_id, products, _, product_list in candidates:
+        products_by_category[category_id] = product_list if products is None else ranked_lists[category_id]
 
     # Log summary
     total_products = sum(len(prods) for prods in products_by_category.values())
@@ -6620,152 +6660,149 @@ async def get_paginated_products(
         # This ensures "accent chairs" shows actual accent chairs first, not office chairs
         # ===================================================================
         if request.semantic_query:
-            # CRITICAL FIX: Expand semantic query with category synonyms
-            # "carpets" and "rugs" should return the same results since they're synonyms
-            # But their embeddings might be different, causing different search results
-            # By expanding the query with synonyms, we get more consistent results
-            # Use shared SEARCH_SYNONYMS for query expansion
-            from services.search_service import SEARCH_SYNONYMS as _SYNONYMS
-
-            query_lower = request.semantic_query.lower().strip()
-            synonyms = _SYNONYMS.get(query_lower)
-            expanded_query = " ".join(synonyms) if synonyms else request.semantic_query
-
-            if expanded_query != request.semantic_query:
-                logger.info(f"[PAGINATED] Expanded semantic query: '{request.semantic_query}' -> '{expanded_query}'")
-            logger.info(f"[PAGINATED] Using VECTOR SEARCH mode with query: {expanded_query}")
-
-            # Get vector similarity scores - semantic search handles relevance
-            # Optimization: Limit to 500 instead of 2000 - pagination will fetch more if needed
-            # This reduces the Python-side similarity computation time significantly
-            semantic_scores = await _semantic_search(
-                query_text=expanded_query,
-                db=db,
-                store_filter=request.selected_stores,
-                price_min=request.budget_min,
-                price_max=request.budget_max,
-                limit=500,  # Reduced from 2000 - pagination provides infinite scroll anyway
+            # Later pages slice the ordered result snapshot stored by the first page:
+            # O(page) per scroll and a stable order even if the catalog changes meanwhile
+            snapshots = get_search_snapshot_store()
+            fingerprint = snapshots.fingerprint(
+                session_id=session_id,
+                category_id=request.category_id,
+                semantic_query=request.semantic_query,
+                selected_stores=request.selected_stores,
+                budget_min=request.budget_min,
+                budget_max=request.budget_max,
             )
-            logger.info(f"[PAGINATED] Got {len(semantic_scores)} products from semantic search")
-
-            # CRITICAL FIX: Apply keyword filtering to prevent category confusion
-            # e.g., "wallpaper" shouldn't return "wall art" just because embeddings are similar
-            # Only apply for specific categories that tend to get confused
-            confusable_categories = {"wallpapers", "wall_art", "rugs", "carpets", "mats", "throws"}
-            if request.category_id in confusable_categories and semantic_scores:
-                # Filter semantic results by category keywords
-                keyword_filtered_ids = set()
-                keyword_conditions = []
-                for keyword in category_keywords:
-                    keyword_conditions.append(Product.name.ilike(f"%{keyword}%"))
-
-                if keyword_conditions:
-                    filter_query = (
-                        select(Product.id)
-                        .where(Product.is_available.is_(True))
-                        .where(Product.id.in_(list(semantic_scores.keys())))
-                        .where(or_(*keyword_conditions))
-                    )
-                    filter_result = await db.execute(filter_query)
-                    keyword_filtered_ids = {row[0] for row in filter_result.fetchall()}
+            snapshot = snapshots.get(request.cursor.snapshot_id if request.cursor else None, fingerprint)
+
+            if snapshot is None:
+                # CRITICAL FIX: Expand semantic query with category synonyms
+                # "carpets" and "rugs" should return the same results since they're synonyms
+                # But their embeddings might be different, causing different search results
+                # By expanding the query with synonyms, we get more consistent results
+                # Use shared SEARCH_SYNONYMS for query expansion
+                from services.search_service import SEARCH_SYNONYMS as _SYNONYMS
+
+                query_lower = request.semantic_query.lower().strip()
+                synonyms = _SYNONYMS.get(query_lower)
+                expanded_query = " ".join(synonyms) if synonyms else request.semantic_query
+
+                if expanded_query != request.semantic_query:
+                    logger.info(f"[PAGINATED] Expanded semantic query: '{request.semantic_query}' -> '{expanded_query}'")
+                logger.info(f"[PAGINATED] Using VECTOR SEARCH mode with query: {expanded_query}")
+
+                # Get vector similarity scores - semantic search handles relevance
+                # Optimization: Limit to 500 instead of 2000 - pagination will fetch more if needed
+                # This reduces the Python-side similarity computation time significantly
+                semantic_scores = await _semantic_search(
+                    query_text=expanded_query,
+                    db=db,
+                    store_filter=request.selected_stores,
+                    price_min=request.budget_min,
+                    price_max=request.budget_max,
+                    limit=500,  # Reduced from 2000 - pagination provides infinite scroll anyway
+                )
+                logger.info(f"[PAGINATED] Got {len(semantic_scores)} products from semantic search")
+
+                # CRITICAL FIX: Apply keyword filtering to prevent category confusion
+                # e.g., "wallpaper" shouldn't return "wall art" just because embeddings are similar
+                # Only apply for specific categories that tend to get confused
+                confusable_categories = {"wallpapers", "wall_art", "rugs", "carpets", "mats", "throws"}
+                if request.category_id in confusable_categories and semantic_scores:
+                    # Filter semantic results by category keywords
+                    keyword_filtered_ids = set()
+                    keyword_conditions = []
+                    for keyword in category_keywords:
+                        keyword_conditions.append(Product.name.ilike(f"%{keyword}%"))
+
+                    if keyword_conditions:
+                        filter_query = (
+                            select(Product.id)
+                            .where(Product.is_available.is_(True))
+                            .where(Product.id.in_(list(semantic_scores.keys())))
+                            .where(or_(*keyword_conditions))
+                        )
+                        filter_result = await db.execute(filter_query)
+                        keyword_filtered_ids = {row[0] for row in filter_result.fetchall()}
 
-                    original_count = len(semantic_scores)
-                    semantic_scores = {k: v for k, v in semantic_scores.items() if k in keyword_filtered_ids}
-                    logger.info(
-                        f"[PAGINATED] Keyword filter for '{request.category_id}': {original_count} -> {len(semantic_scores)} products "
-                        f"(keywords: {category_keywords[:3]}...)"
-                    )
+                        original_count = len(semantic_scores)
+                        semantic_scores = {k: v for k, v in semantic_scores.items() if k in keyword_filtered_ids}
+                        logger.info(
+                            f"[PAGINATED] Keyword filter for '{request.category_id}': {original_count} -> {len(semantic_scores)} products "
+                            f"(keywords: {category_keywords[:3]}...)"
+                        )
 
-                # Special exclusion for throws - exclude bed blankets (king/queen/double/single bed)
-                if request.category_id == "throws" and semantic_scores:
-                    bed_exclusions = [
-                        "king size",
-                        "queen size",
-                        "double bed",
-                        "single bed",
-                        "bed ac blanket",
-                        "bed blanket",
-                        "comforter",
-                        "dohar",
-                    ]
-                    exclusion_conditions = []
-                    for exclusion in bed_exclusions:
-                        exclusion_conditions.append(Product.name.ilike(f"%{exclusion}%"))
-
-                    # Get IDs of products that match exclusions (to remove them)
-                    exclude_query = (
-                        select(Product.id)
-                        .where(Product.id.in_(list(semantic_scores.keys())))
-                        .where(or_(*exclusion_conditions))
-                    )
-                    exclude_result = await db.execute(exclude_query)
-                    excluded_ids = {row[0] for row in exclude_result.fetchall()}
+                    # Special exclusion for throws - exclude bed blankets (king/queen/double/single bed)
+                    if request.category_id == "throws" and semantic_scores:
+                        bed_exclusions = [
+                            "king size",
+                            "queen size",
+                            "double bed",
+                            "single bed",
+                            "bed ac blanket",
+                            "bed blanket",
+                            "comforter",
+                            "dohar",
+                        ]
+                        exclusion_conditions = []
+                        for exclusion in bed_exclusions:
+                            exclusion_conditions.append(Product.name.ilike(f"%{exclusion}%"))
+
+                        # Get IDs of products that match exclusions (to remove them)
+                        exclude_query = (
+                            select(Product.id)
+                            .where(Product.id.in_(list(semantic_scores.keys())))
+                            .where(or_(*exclusion_conditions))
+                        )
+                        exclude_result = await db.execute(exclude_query)
+                        excluded_ids = {row[0] for row in exclude_result.fetchall()}
 
-                    before_exclusion = len(semantic_scores)
-                    semantic_scores = {k: v for k, v in semantic_scores.items() if k not in excluded_ids}
-                    logger.info(
-                        f"[PAGINATED] Throws exclusion filter: {before_exclusion} -> {len(semantic_scores)} products "
-                        f"(excluded {len(excluded_ids)} bed blankets)"
+                        before_exclusion = len(semantic_scores)
+                        semantic_scores = {k: v for k, v in semantic_scores.items() if k not in excluded_ids}
+                        logger.info(
+                            f"[PAGINATED] Throws exclusion filter: {before_exclusion} -> {len(semantic_scores)} products "
+                            f"(excluded {len(excluded_ids)} bed blankets)"
+                        )
+
+                if not semantic_scores:
+                    logger.warning(f"[PAGINATED] No semantic scores returned, falling back to empty result")
+                    return PaginatedProductsResponse(
+                        products=[],
+                        next_cursor=None,
+                        has_more=False,
+                        total_estimated=0,
                     )
 
-            if not semantic_scores:
-                logger.warning(f"[PAGINATED] No semantic scores returned, falling back to empty result")
-                return PaginatedProductsResponse(
-                    products=[],
-                    next_cursor=None,
-                    has_more=False,
-                    total_estimated=0,
+                # Snapshot the ids ordered by semantic similarity (descending); products load per page below
+                semantic_sorted = sorted(semantic_scores.items(), key=lambda x: x[1], reverse=True)
+                snapshot = snapshots.put(
+                    fingerprint,
+                    [product_id for product_id, _ in semantic_sorted],
+                    scores=[score for _, score in semantic_sorted],
                 )
+                logger.info(f"[PAGINATED] Snapshot of {len(snapshot)} products ordered by semantic similarity")
+
+            # Apply pagination using cursor (position after the cursor product in the snapshot)
+            start_idx = 0
+            if request.cursor:
+                position = snapshot.position(request.cursor.product_id)
+                if position is not None:
+                    start_idx = position + 1  # Start after the cursor product
+                logger.info(f"[PAGINATED] Starting from index {start_idx} (after product {request.cursor.product_id})")
+
+            # Get the page of products (only this page is loaded)
+            end_idx = start_idx + request.page_size
+            page_entries = snapshot.page(start_idx, request.page_size)
+            has_more = end_idx < len(snapshot)
 
-            # Fetch the actual product objects for products with semantic scores
-            # No keyword filtering - trust the semantic search results
-            product_ids = list(semantic_scores.keys())
             query = (
                 select(Product)
                 .options(selectinload(Product.images), selectinload(Product.attributes))
-                .where(Product.id.in_(product_ids))
+                .where(Product.id.in_([product_id for product_id, _, _ in page_entries]))
             )
             result = await db.execute(query)
-            all_products = result.scalars().all()
-            logger.info(f"[PAGINATED] Fetched {len(all_products)} products by ID from semantic search results")
-
-            # Debug: Log products by store
-            store_counts = {}
-            for p in all_products:
-                store = p.source_website or "unknown"
-                store_counts[store] = store_counts.get(store, 0) + 1
-            logger.info(f"[PAGINATED] Products by store: {store_counts}")
-
-            # Create lookup dict
-            products_by_id = {p.id: p for p in all_products}
-
-            # Build ordered list by semantic similarity (descending)
-            ordered_products: List[Tuple[Product, float]] = []
-            semantic_sorted = sorted(semantic_scores.items(), key=lambda x: x[1], reverse=True)
-            for product_id, score in semantic_sorted:
-                if product_id in products_by_id:
-                    ordered_products.append((products_by_id[product_id], score))
-
-            logger.info(f"[PAGINATED] Ordered {len(ordered_products)} products by semantic similarity")
-            if ordered_products:
-                top_3 = ordered_products[:3]
-                logger.info(f"[PAGINATED] Top 3: " + ", ".join([f"{p.name[:30]}:{s:.3f}" for p, s in top_3]))
-
-            # Apply pagination using cursor (offset-based for vector search)
-            start_idx = 0
-            if request.cursor:
-                # Find the position of the cursor product in the ordered list
-                cursor_product_id = request.cursor.product_id
-                for idx, (product, _) in enumerate(ordered_products):
-                    if product.id == cursor_product_id:
-                        start_idx = idx + 1  # Start after the cursor product
-                        break
-                logger.info(f"[PAGINATED] Starting from index {start_idx} (after product {cursor_product_id})")
-
-            # Get the page of products
-            end_idx = start_idx + request.page_size
-            page_products = ordered_products[start_idx:end_idx]
-            has_more = end_idx < len(ordered_products)
+            products_by_id = {p.id: p for p in result.scalars().all()}
+            page_products: List[Tuple[Product, float]] = [
+                (products_by_id[product_id], score) for product_id, score, _ in page_entries if product_id in products_by_id
+            ]
 
             # Build next cursor
             next_cursor = None
@@ -6774,6 +6811,7 @@ async def get_paginated_products(
                 next_cursor = PaginationCursor(
                     style_score=float(last_score),
                     product_id=last_product.id,
+                    snapshot_id=snapshot.cursor,
                 )
 
             # Convert to product dicts
@@ -6822,7 +6860,7 @@ async def get_paginated_products(
                 }
                 products.append(product_dict)
 
-            total_estimated = len(ordered_products)
+            total_estimated = len(snapshot)
 
             logger.info(
                 f"[PAGINATED VECTOR] Returning {len(products)} products for '{request.category_id}', "
@@ -6834,6 +6872,7 @@ async def get_paginated_products(
                 next_cursor=next_cursor,
                 has_more=has_more,
                 total_estimated=total_estimated,
+                facets=result_facets(snapshot.ids),
             )
 
         # ===================================================================
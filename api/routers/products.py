@@ -2,8 +2,7 @@
 Product API routes
 """
 import logging
-import re
-from typing import Dict, List, Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from schemas.products import (
@@ -16,19 +15,25 @@ from schemas.products import (
     ProductStatsResponse,
     ProductSummarySchema,
 )
+from services.duplicate_clusters import collapse_duplicate_ids, load_cluster_ids
+from services.facet_index import result_facets
+from services.hybrid_search import hybrid_candidates, hydrate_products
+from services.product_neighbours import DEFAULT_NEIGHBOURS, load_neighbours
 from services.search_service import (
-    build_keyword_conditions,
+    BRAND_WEIGHT,
+    DESCRIPTION_WEIGHT,
+    NAME_WEIGHT,
     expand_search_query_grouped,
-    get_exclusion_terms,
-    semantic_search_products,
-    should_exclude_product,
+    text_search_condition,
+    tsquery_any,
 )
-from sqlalchemy import and_, case, func, or_, select
+from services.search_snapshots import get_search_snapshot_store
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from core.database import get_db
-from database.models import Category, Product, ProductAttribute, ProductImage
+from database.models import Category, Product, ProductImage
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/products", tags=["products"])
@@ -78,28 +83,11 @@ def _format_product(product) -> dict:
     }
 
 
-def _name_matches_all_groups(product_name: str, groups: List[List[str]]) -> bool:
-    """Check if product name contains at least one term from EACH group."""
-    if not groups:
-        return True
-    name_lower = product_name.lower()
-    name_normalized = re.sub(r"\s*-\s*", "-", name_lower)
-    name_spaced = re.sub(r"-", " ", name_lower)
-
-    for group in groups:
-        group_matched = False
-        for term in group:
-            term_normalized = re.sub(r"\s*-\s*", "-", term.lower())
-            if term_normalized in name_normalized or term_normalized in name_spaced:
-                group_matched = True
-                break
-            term_spaced = re.sub(r"-", " ", term.lower())
-            if term_spaced in name_lower or term_spaced in name_spaced:
-                group_matched = True
-                break
-        if not group_matched:
-            return False
-    return True
+def _split_filter(value: Optional[str]) -> Optional[List[str]]:
+    """Lower-cased values of a comma-separated filter parameter (None when empty)."""
+    if not value:
+        return None
+    return [v.strip().lower() for v in value.split(",") if v.strip()] or None
 
 
 @router.get("/search")
@@ -114,6 +102,8 @@ async def search_products(
     materials: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor returned by an earlier page of the same search"),
+    collapse_duplicates: bool = Query(False, description="Show one listing per near-duplicate cluster"),
     db: AsyncSession = Depends(get_db),
 ):
     """Search products with semantic + keyword search and filters - public endpoint for design studio"""
@@ -127,178 +117,61 @@ async def search_products(
 
         logger.info(f"Search products: query={query}, sources={source_websites}, category={category_id}, page={page}")
 
-        # ---- Step 1: Semantic search (numpy-vectorized) ----
-        semantic_ids: Dict[int, float] = {}
-        if query:
-            try:
-                semantic_ids = await semantic_search_products(
-                    query_text=query,
-                    db=db,
-                    category_ids=[category_id] if category_id else None,
-                    source_websites=source_websites,
-                    min_price=min_price,
-                    max_price=max_price,
-                    limit=10000,
-                )
-                logger.info(f"[SEARCH] Semantic search returned {len(semantic_ids)} products")
-            except Exception as e:
-                logger.warning(f"[SEARCH] Semantic search failed, using keyword only: {e}")
-
-        # ---- Step 2: Keyword search (word-boundary + AND-grouped synonyms) ----
-        search_groups: List[List[str]] = []
-        base_query = (
-            select(Product)
-            .options(selectinload(Product.category), selectinload(Product.images))
-            .where(Product.is_available.is_(True))
+        filters = dict(colors=_split_filter(colors), styles=_split_filter(styles), materials=_split_filter(materials))
+        snapshots = get_search_snapshot_store()
+        fingerprint = snapshots.fingerprint(
+            query=query,
+            category_id=category_id,
+            source_websites=source_websites,
+            min_price=min_price,
+            max_price=max_price,
+            collapse_duplicates=collapse_duplicates,
+            **filters,
         )
 
-        if query:
-            where_clause, search_groups = build_keyword_conditions(query)
-            base_query = base_query.where(where_clause)
-
-        if category_id:
-            base_query = base_query.where(Product.category_id == category_id)
-        if source_websites:
-            base_query = base_query.where(Product.source_website.in_(source_websites))
-        if min_price is not None:
-            base_query = base_query.where(Product.price >= min_price)
-        if max_price is not None:
-            base_query = base_query.where(Product.price <= max_price)
-
-        # Filter by colors
-        if colors:
-            color_list = [c.strip().lower() for c in colors.split(",")]
-            color_conditions = []
-            for color in color_list:
-                color_conditions.append(or_(Product.name.ilike(f"%{color}%"), Product.description.ilike(f"%{color}%")))
-            if color_conditions:
-                base_query = base_query.where(or_(*color_conditions))
-
-        # Filter by styles
-        if styles:
-            style_list = [s.strip().lower() for s in styles.split(",") if s.strip()]
-            if style_list:
-                base_query = base_query.where(func.lower(Product.primary_style).in_(style_list))
-
-        # Filter by materials
-        if materials:
-            material_list = [m.strip().lower() for m in materials.split(",") if m.strip()]
-            if material_list:
-                material_subquery = (
-                    select(ProductAttribute.product_id)
-                    .where(ProductAttribute.attribute_name.in_(["material", "material_primary"]))
-                    .where(func.lower(ProductAttribute.attribute_value).in_(material_list))
-                )
-                base_query = base_query.where(Product.id.in_(material_subquery))
-
-        # Order by match priority (name > brand > description)
-        if query:
-            escaped_query = re.escape(query)
-            all_search_terms = [term for group in search_groups for term in group]
-            name_match_conditions = [Product.name.op("~*")(rf"\y{re.escape(term)}\y") for term in all_search_terms]
-            match_priority = case(
-                (or_(*name_match_conditions), 0) if name_match_conditions else (Product.id.isnot(None), 2),
-                (Product.brand.op("~*")(rf"\y{escaped_query}\y"), 1),
-                else_=2,
+        # ---- Later pages: slice the result snapshot of the first page ----
+        snapshot = snapshots.get(cursor, fingerprint)
+        if snapshot is None:
+            # ---- Phase 1: candidate ids (semantic + keyword, fused with RRF, exclusions applied) ----
+            candidates = await hybrid_candidates(
+                query,
+                db,
+                category_id=category_id,
+                source_websites=source_websites,
+                min_price=min_price,
+                max_price=max_price,
+                **filters,
             )
-            base_query = base_query.order_by(match_priority, Product.price.desc().nullslast())
-        else:
-            base_query = base_query.order_by(Product.price.desc().nullslast())
-
-        base_query = base_query.limit(10000)
-
-        keyword_result = await db.execute(base_query)
-        keyword_products = keyword_result.scalars().unique().all()
-        keyword_ids = {p.id for p in keyword_products}
-
-        # ---- Step 3: Merge semantic + keyword, apply exclusions ----
-        exclusion_terms = get_exclusion_terms(query) if query else []
-        if exclusion_terms:
-            logger.info(f"[SEARCH] Exclusion terms for '{query}': {exclusion_terms}")
-
-        ordered_product_ids: List[int] = []
-        semantic_scores: Dict[int, float] = {}
-        seen_ids: set = set()
-
-        SIMILARITY_THRESHOLD = 0.3
-
-        if semantic_ids:
-            keyword_product_names = {p.id: p.name for p in keyword_products}
-            semantic_sorted = sorted(semantic_ids.items(), key=lambda x: x[1], reverse=True)
-
-            # Fetch names for semantic-only products if we need exclusion checks
-            semantic_only_names: Dict[int, str] = {}
-            if exclusion_terms:
-                semantic_only_id_list = [pid for pid, _ in semantic_sorted if pid not in keyword_ids]
-                if semantic_only_id_list:
-                    names_query = select(Product.id, Product.name).where(Product.id.in_(semantic_only_id_list))
-                    names_result = await db.execute(names_query)
-                    semantic_only_names = {row[0]: row[1] for row in names_result.fetchall()}
-
-            for product_id, similarity in semantic_sorted:
-                if similarity >= SIMILARITY_THRESHOLD:
-                    if product_id in keyword_ids or similarity >= 0.5:
-                        product_name = keyword_product_names.get(product_id) or semantic_only_names.get(product_id, "")
-                        if exclusion_terms and should_exclude_product(product_name, exclusion_terms):
-                            continue
-                        ordered_product_ids.append(product_id)
-                        semantic_scores[product_id] = similarity
-                        seen_ids.add(product_id)
-
-        # Add keyword-only results
-        for p in keyword_products:
-            if p.id not in seen_ids:
-                if exclusion_terms and should_exclude_product(p.name, exclusion_terms):
-                    continue
-                ordered_product_ids.append(p.id)
-                seen_ids.add(p.id)
-
-        total_results = len(ordered_product_ids)
-
-        # ---- Calculate total_primary / total_related ----
-        total_primary = 0
-        total_related = 0
-        if ordered_product_ids and search_groups:
-            names_query = select(Product.id, Product.name).where(Product.id.in_(ordered_product_ids))
-            names_result = await db.execute(names_query)
-            all_product_names = {row[0]: row[1] for row in names_result.fetchall()}
-            for product_id in ordered_product_ids:
-                name = all_product_names.get(product_id, "")
-                if _name_matches_all_groups(name, search_groups):
-                    total_primary += 1
-                else:
-                    total_related += 1
-        else:
-            total_primary = total_results
-
-        # ---- Step 4: Paginate ----
+            ordered_ids = candidates.ordered_ids
+            if collapse_duplicates:
+                # The same item listed by several stores: keep its best-ranked listing
+                ordered_ids = collapse_duplicate_ids(ordered_ids, await load_cluster_ids(ordered_ids, db))
+            snapshot = snapshots.put(
+                fingerprint,
+                ordered_ids,
+                scores=[candidates.semantic_scores.get(product_id) for product_id in ordered_ids],
+                primary=[candidates.is_primary_match(product_id) for product_id in ordered_ids],
+            )
+
+        total_results = len(snapshot)
+        total_primary = int(snapshot.primary.sum())
+        total_related = total_results - total_primary
+
+        # ---- Paginate ----
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
-        page_product_ids = ordered_product_ids[start_idx:end_idx]
+        page_entries = snapshot.page(start_idx, page_size)
         has_more = end_idx < total_results
 
-        # ---- Step 5: Fetch product details for this page ----
-        if page_product_ids:
-            products_query = (
-                select(Product)
-                .options(selectinload(Product.category), selectinload(Product.images))
-                .where(Product.id.in_(page_product_ids))
-            )
-            products_result = await db.execute(products_query)
-            products_map = {p.id: p for p in products_result.scalars().unique().all()}
-
-            formatted_products = []
-            for product_id in page_product_ids:
-                if product_id in products_map:
-                    p = products_map[product_id]
-                    formatted = _format_product(p)
-                    formatted["is_primary_match"] = _name_matches_all_groups(p.name, search_groups) if search_groups else True
-                    formatted["similarity_score"] = (
-                        round(semantic_scores[product_id], 3) if product_id in semantic_scores else None
-                    )
-                    formatted_products.append(formatted)
-        else:
-            formatted_products = []
+        # ---- Phase 2: hydrate this page only (one query) ----
+        products_map = {p.id: p for p in await hydrate_products([entry[0] for entry in page_entries], db)}
+        formatted_products = []
+        for product_id, score, is_primary in page_entries:
+            if product_id in products_map:
+                formatted = _format_product(products_map[product_id])
+                formatted["is_primary_match"] = is_primary
+                formatted["similarity_score"] = round(score, 3) if score is not None else None
+                formatted_products.append(formatted)
 
         return {
             "products": formatted_products,
@@ -308,6 +181,9 @@ async def search_products(
             "page": page,
             "page_size": page_size,
             "has_more": has_more,
+            "cursor": snapshot.cursor,
+            # Counts over the whole result set (None while the facet index is loading)
+            "facets": result_facets(snapshot.ids),
         }
 
     except Exception as e:
@@ -339,26 +215,16 @@ async def get_products(
         query = select(Product).options(selectinload(Product.category), selectinload(Product.images))
         logger.info("Base query built with eager loading")
 
-        # Apply search with synonym expansion + word boundaries
+        # Apply search with synonym expansion + whole-word full-text matching:
+        # every group must match name, description or brand (one tsquery, served by the GIN index)
+        search_condition = None
         if search:
             search_groups = expand_search_query_grouped(search)
-            # Build AND conditions across groups, OR within each group
-            and_conditions = []
-            for group in search_groups:
-                group_conditions = []
-                for term in group:
-                    escaped_term = re.escape(term)
-                    group_conditions.append(
-                        or_(
-                            Product.name.op("~*")(rf"\y{escaped_term}\y"),
-                            Product.description.op("~*")(rf"\y{escaped_term}\y"),
-                            Product.brand.op("~*")(rf"\y{escaped_term}\y"),
-                        )
-                    )
-                if group_conditions:
-                    and_conditions.append(or_(*group_conditions))
-            if and_conditions:
-                query = query.where(and_(*and_conditions))
+            group_queries = [tsquery_any(group, NAME_WEIGHT + DESCRIPTION_WEIGHT + BRAND_WEIGHT) for group in search_groups]
+            group_queries = [f"({group_query})" for group_query in group_queries if group_query]
+            if group_queries:
+                search_condition = text_search_condition(" & ".join(group_queries))
+                query = query.where(search_condition)
 
         if category_id:
             query = query.where(Product.category_id == category_id)
@@ -400,23 +266,8 @@ async def get_products(
 
         # Get total count (must use same WHERE conditions)
         count_query = select(func.count()).select_from(Product)
-        if search:
-            count_and_conditions = []
-            for group in search_groups:
-                group_conditions = []
-                for term in group:
-                    escaped_term = re.escape(term)
-                    group_conditions.append(
-                        or_(
-                            Product.name.op("~*")(rf"\y{escaped_term}\y"),
-                            Product.description.op("~*")(rf"\y{escaped_term}\y"),
-                            Product.brand.op("~*")(rf"\y{escaped_term}\y"),
-                        )
-                    )
-                if group_conditions:
-                    count_and_conditions.append(or_(*group_conditions))
-            if count_and_conditions:
-                count_query = count_query.where(and_(*count_and_conditions))
+        if search_condition is not None:
+            count_query = count_query.where(search_condition)
 
         if category_id:
             count_query = count_query.where(Product.category_id == category_id)
@@ -561,10 +412,45 @@ async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Error fetching product details")
 
 
+@router.get("/{product_id}/similar")
+async def get_similar_products(
+    product_id: int,
+    limit: int = Query(12, ge=1, le=DEFAULT_NEIGHBOURS),
+    db: AsyncSession = Depends(get_db),
+):
+    """Similar available products (same category, similar price first) from the precomputed neighbour lists"""
+    try:
+        neighbours = await load_neighbours(product_id, db)
+        if neighbours is None:
+            # No list yet (not embedded, or not computed since): empty for a known product
+            exists = await db.execute(select(Product.id).where(Product.id == product_id))
+            if exists.scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+            neighbours = []
+
+        scores = dict(neighbours)
+        products = [p for p in await hydrate_products(list(scores), db) if p.is_available][:limit]
+        formatted_products = []
+        for product in products:
+            formatted = _format_product(product)
+            formatted["similarity_score"] = round(scores[product.id], 3)
+            formatted_products.append(formatted)
+
+        return {"product_id": product_id, "products": formatted_products, "total": len(formatted_products)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching similar products for {product_id}: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching similar products")
+
+
 @router.get("/stats/overview", response_model=ProductStatsResponse)
 async def get_product_stats(db: AsyncSession = Depends(get_db)):
     """Get product statistics and overview"""
     try:
+        # Counted in SQL, not from the facet index: that keeps deleted products and lags by its refresh interval
+
         # Total products
         total_query = select(func.count()).select_from(Product)
         total_result = await db.execute(total_query)
@@ -218,6 +218,7 @@ class PaginationCursor(BaseModel):
 
     style_score: float = Field(..., description="Style score of the last product in the previous page")
     product_id: int = Field(..., description="ID of the last product in the previous page")
+    snapshot_id: Optional[str] = Field(default=None, description="Result snapshot of the search (vector search mode)")
 
 
 class PaginatedProductsRequest(BaseModel):
@@ -247,6 +248,9 @@ class PaginatedProductsResponse(BaseModel):
     next_cursor: Optional[PaginationCursor] = Field(default=None, description="Cursor for next page (None if no more pages)")
     has_more: bool = Field(..., description="Whether there are more products to load")
     total_estimated: int = Field(..., description="Estimated total product count for this category")
+    facets: Optional[Dict[str, Any]] = Field(
+        default=None, description="Category/store/style/price-range counts of all results (vector mode, facet index loaded)"
+    )
 
 
 class CategoryProductsMetadata(BaseModel):
@@ -0,0 +1,133 @@
+"""
+Backfill products.embedding_vector from the legacy JSON products.embedding column.
+
+No embedding API calls are made: each JSON embedding is decoded and re-written
+as little-endian float32 bytes. Rows are walked in primary-key order with a
+keyset cursor, so the script can be stopped and resumed at any point.
+
+Usage:
+    python scripts/backfill_embedding_vectors.py [--batch-size 2000] [--resume] [--database-url URL]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+
+from core.config import settings
+from services.embedding_codec import decode_embedding_json, encode_embedding
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Checkpoint file for resume capability
+CHECKPOINT_FILE = Path(__file__).parent / ".embedding_vector_backfill_checkpoint.json"
+
+SELECT_BATCH = text(
+    """
+    SELECT id, embedding
+    FROM products
+    WHERE id > :last_id
+      AND embedding_vector IS NULL
+      AND embedding IS NOT NULL
+    ORDER BY id
+    LIMIT :batch_size
+    """
+)
+
+UPDATE_VECTOR = text("UPDATE products SET embedding_vector = :vector WHERE id = :id AND embedding_vector IS NULL")
+
+
+def load_checkpoint() -> Optional[Dict]:
+    """Load checkpoint from file."""
+    if CHECKPOINT_FILE.exists():
+        try:
+            with open(CHECKPOINT_FILE, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load checkpoint: {e}")
+    return None
+
+
+def save_checkpoint(stats: Dict):
+    """Save current progress to checkpoint file."""
+    try:
+        with open(CHECKPOINT_FILE, "w") as f:
+            json.dump({**stats, "timestamp": datetime.now().isoformat()}, f, indent=2)
+    except Exception as e:
+        logger.error(f"Failed to save checkpoint: {e}")
+
+
+def run(database_url: str, batch_size: int, resume: bool) -> Dict:
+    """Convert JSON embeddings to binary in batches. Returns final statistics."""
+    stats = {"last_processed_id": 0, "converted": 0, "invalid": 0}
+    if resume:
+        checkpoint = load_checkpoint()
+        if checkpoint:
+            stats.update({k: checkpoint.get(k, 0) for k in stats})
+            logger.info(f"Resuming from product ID {stats['last_processed_id']}")
+
+    engine = create_engine(database_url, pool_pre_ping=True)
+    start = time.time()
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(SELECT_BATCH, {"last_id": stats["last_processed_id"], "batch_size": batch_size}).fetchall()
+            if not rows:
+                break
+
+            params = []
+            for product_id, embedding_json in rows:
+                vector = decode_embedding_json(embedding_json)
+                if vector is None:
+                    stats["invalid"] += 1
+                    logger.warning(f"Product {product_id}: invalid JSON embedding, skipped")
+                    continue
+                params.append({"id": product_id, "vector": encode_embedding(vector)})
+
+            if params:
+                # executemany: one round trip per batch
+                conn.execute(UPDATE_VECTOR, params)
+
+        stats["converted"] += len(params)
+        stats["last_processed_id"] = rows[-1][0]
+        save_checkpoint(stats)
+
+        elapsed = time.time() - start
+        logger.info(
+            f"Converted {stats['converted']} (invalid {stats['invalid']}) up to id {stats['last_processed_id']} "
+            f"| {stats['converted'] / elapsed if elapsed > 0 else 0:.0f}/s"
+        )
+
+    if CHECKPOINT_FILE.exists():
+        CHECKPOINT_FILE.unlink()
+    logger.info(f"Backfill complete: {stats['converted']} converted, {stats['invalid']} invalid")
+    return stats
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Backfill binary embedding_vector from JSON embeddings")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Rows per batch (default: 2000)")
+    parser.add_argument("--resume", action="store_true", help="Resume from last checkpoint")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    run(database_url, args.batch_size, args.resume)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 """
 Backfill product embeddings using Google text-embedding-004.
 
-This script processes products in batches, generating vector embeddings
-for semantic search using the embedding service.
+This script processes products in pages through the bulk embedding engine
+of the embedding service (EmbeddingService.batch_generate_embeddings).
 
 Features:
-- Batch processing (configurable batch size)
+- Set-based prefetch of categories/attributes per page
+- Many texts per embed_content request, several requests in flight
+- Adaptive rate limiting (backs off on 429 / RESOURCE_EXHAUSTED)
+- One bulk UPDATE per page
+- Content-hash gating: products whose embedding text (and model) is
+  unchanged are skipped without an API call (--force overrides)
+- Dry-run mode reporting how many products would be re-embedded
 - Checkpoint for resume capability
-- Progress tracking and statistics
-- Rate limiting to avoid API throttling
+- Progress tracking and throughput (products/minute)
 
 Usage:
-    python scripts/backfill_embeddings.py [--batch-size 100] [--resume] [--limit 1000]
+    python scripts/backfill_embeddings.py [--batch-size 1000] [--concurrency 4] [--resume] [--limit 1000]
+    python scripts/backfill_embeddings.py --regenerate --dry-run [--adopt-existing]
 """
 import argparse
 import asyncio
@@ -26,11 +32,13 @@ from typing import Dict, List, Optional
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker
 
 from core.config import settings
-from database.models import Product, ProductAttribute, Category
+from database.models import Product
+from services.embedding_rate_limiter import AdaptiveRateLimiter
 from services.embedding_service import EmbeddingService
 
 # Configure logging
@@ -54,19 +62,27 @@ class EmbeddingBackfillProcessor:
     def __init__(
         self,
         database_url: str,
-        batch_size: int = 100,
-        rate_limit_delay: float = 0.5
+        batch_size: int = EmbeddingService.DOCUMENT_PAGE_SIZE,
+        concurrency: int = EmbeddingService.MAX_CONCURRENT_REQUESTS,
+        rate_limit_delay: float = 0.0,
+        force: bool = False,
+        dry_run: bool = False,
+        adopt_existing: bool = False
     ):
         self.database_url = database_url
         self.batch_size = batch_size
-        self.rate_limit_delay = rate_limit_delay
+        self.force = force
+        self.dry_run = dry_run
+        self.adopt_existing = adopt_existing
 
-        # Initialize database
-        self.engine = create_engine(database_url, pool_pre_ping=True)
-        self.Session = sessionmaker(bind=self.engine)
+        # Initialize database (async, same driver as the API)
+        async_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
+        self.engine = create_async_engine(async_url, pool_pre_ping=True)
+        self.Session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
 
-        # Initialize embedding service
+        # Initialize embedding service; one limiter for the whole run so backoff carries across pages
         self.embedding_service = EmbeddingService()
+        self.rate_limiter = AdaptiveRateLimiter(max_concurrency=concurrency, min_interval=rate_limit_delay)
 
         # Statistics
         self.stats = {
@@ -74,6 +90,8 @@ class EmbeddingBackfillProcessor:
             "success": 0,
             "failed": 0,
             "skipped": 0,
+            "adopted": 0,
+            "would_embed": 0,
             "start_time": None,
             "last_processed_id": 0
         }
@@ -116,131 +134,67 @@ class EmbeddingBackfillProcessor:
             CHECKPOINT_FILE.unlink()
             logger.info("Checkpoint cleared")
 
-    def get_products_to_process(
+    async def get_products_to_process(
         self,
         session,
         start_id: int = 0,
         limit: Optional[int] = None,
         regenerate: bool = False
-    ) -> List[Product]:
-        """Get products that need embedding generation."""
-        query = session.query(Product).filter(Product.id > start_id)
+    ) -> List[int]:
+        """Get IDs of products that need embedding generation."""
+        query = select(Product.id).where(Product.id > start_id)
 
         if not regenerate:
-            # Only products without embeddings
-            query = query.filter(Product.embedding.is_(None))
+            # Only products without embeddings (in either column)
+            query = query.where(Product.embedding.is_(None), Product.embedding_vector.is_(None))
 
         query = query.order_by(Product.id)
 
         if limit:
             query = query.limit(limit)
 
-        return query.all()
-
-    def get_category_name(self, session, category_id: int) -> Optional[str]:
-        """Get category name by ID."""
-        if not category_id:
-            return None
-        category = session.query(Category).filter(Category.id == category_id).first()
-        return category.name if category else None
-
-    def get_product_attributes(self, session, product_id: int) -> Dict[str, str]:
-        """Get product attributes as a dictionary."""
-        attributes = (
-            session.query(ProductAttribute)
-            .filter(ProductAttribute.product_id == product_id)
-            .all()
-        )
-        return {attr.attribute_name: attr.attribute_value for attr in attributes}
-
-    async def process_product(self, session, product: Product) -> bool:
-        """
-        Process a single product for embedding generation.
-
-        Returns True if successful, False otherwise.
-        """
-        try:
-            # Get category name
-            category_name = self.get_category_name(session, product.category_id)
-
-            # Get attributes
-            attributes = self.get_product_attributes(session, product.id)
-
-            # Build embedding text
-            embedding_text = self.embedding_service.build_product_embedding_text(
-                product,
-                category_name=category_name,
-                attributes=attributes
-            )
-
-            # Generate embedding
-            embedding = await self.embedding_service.generate_embedding(
-                embedding_text,
-                task_type="RETRIEVAL_DOCUMENT"
-            )
-
-            if embedding:
-                # Store as JSON string
-                product.embedding = json.dumps(embedding)
-                product.embedding_text = embedding_text
-                product.embedding_updated_at = datetime.utcnow()
-
-                self.stats["success"] += 1
-                logger.debug(f"Product {product.id}: Generated embedding ({len(embedding)} dims)")
-                return True
-            else:
-                self.stats["failed"] += 1
-                logger.warning(f"Product {product.id}: No embedding returned")
-                return False
-
-        except Exception as e:
-            logger.error(f"Error processing product {product.id}: {e}")
-            self.stats["failed"] += 1
-            return False
+        result = await session.execute(query)
+        return [row[0] for row in result.fetchall()]
 
     async def process_batch(self, product_ids: List[int]) -> int:
         """
-        Process a batch of products by ID.
+        Process a page of products by ID through the bulk embedding engine.
 
         Returns number of successfully processed products.
         """
-        session = self.Session()
-        successful = 0
-
-        try:
-            # Re-fetch products in THIS session so changes will be tracked
-            products = session.query(Product).filter(Product.id.in_(product_ids)).all()
-
-            for product in products:
-                success = await self.process_product(session, product)
-
-                if success:
-                    successful += 1
-
-                self.stats["total_processed"] += 1
-                self.stats["last_processed_id"] = product.id
+        async with self.Session() as session:
+            batch_stats = await self.embedding_service.batch_generate_embeddings(
+                product_ids,
+                session,
+                rate_limiter=self.rate_limiter,
+                force=self.force,
+                dry_run=self.dry_run,
+                adopt_unhashed=self.adopt_existing
+            )
 
-                # Rate limiting between API calls
-                await asyncio.sleep(self.rate_limit_delay)
+        for key in ("success", "failed", "skipped", "adopted", "would_embed"):
+            self.stats[key] += batch_stats[key]
+        self.stats["total_processed"] += batch_stats["processed"]
+        self.stats["last_processed_id"] = max(product_ids)
 
-            # Commit batch
-            session.commit()
+        if self.dry_run:
             logger.info(
-                f"Batch committed: {successful}/{len(products)} successful, "
-                f"total processed: {self.stats['total_processed']}"
+                f"Dry run: {batch_stats['would_embed']}/{batch_stats['processed']} would be re-embedded, "
+                f"{batch_stats['skipped']} unchanged, {batch_stats['adopted']} adoptable"
             )
+            return 0
 
-            # Save checkpoint after each batch
-            self.save_checkpoint()
+        logger.info(
+            f"Batch committed: {batch_stats['success']}/{batch_stats['processed']} successful, "
+            f"{batch_stats['skipped']} unchanged, "
+            f"{batch_stats['products_per_minute']:.0f} products/min, "
+            f"total processed: {self.stats['total_processed']}"
+        )
 
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Batch processing error: {e}")
-            raise
-        finally:
-            session.close()
+        # Save checkpoint after each batch
+        self.save_checkpoint()
 
-        return successful
+        return batch_stats["success"]
 
     async def run(
         self,
@@ -271,14 +225,10 @@ class EmbeddingBackfillProcessor:
                 logger.info(f"Resuming from product ID {start_id}")
 
         # Get product IDs to process (not full objects)
-        session = self.Session()
-        try:
-            products = self.get_products_to_process(session, start_id, limit, regenerate)
-            product_ids = [p.id for p in products]  # Extract IDs only
-            total_products = len(product_ids)
-            logger.info(f"Found {total_products} products to process")
-        finally:
-            session.close()
+        async with self.Session() as session:
+            product_ids = await self.get_products_to_process(session, start_id, limit, regenerate)
+        total_products = len(product_ids)
+        logger.info(f"Found {total_products} products to process")
 
         if total_products == 0:
             logger.info("No products need embedding generation")
@@ -296,21 +246,25 @@ class EmbeddingBackfillProcessor:
 
             # Progress report
             elapsed = time.time() - self.stats["start_time"]
-            rate = self.stats["total_processed"] / elapsed if elapsed > 0 else 0
-            remaining = total_products - (i + len(batch_ids))
+            done = i + len(batch_ids)
+            rate = done / elapsed if elapsed > 0 else 0
+            remaining = total_products - done
             eta = remaining / rate if rate > 0 else 0
 
             logger.info(
-                f"Progress: {self.stats['total_processed']}/{total_products} "
-                f"({100 * self.stats['total_processed'] / total_products:.1f}%) | "
-                f"Rate: {rate:.1f}/s | ETA: {eta/60:.1f} min"
+                f"Progress: {done}/{total_products} "
+                f"({100 * done / total_products:.1f}%) | "
+                f"Rate: {rate * 60:.0f} products/min | "
+                f"Concurrency: {self.rate_limiter.limit} | ETA: {eta/60:.1f} min"
             )
 
+        await self.engine.dispose()
+
         # Final report
         self._print_summary()
 
         # Clear checkpoint on successful completion
-        if not limit:  # Only clear if we processed all
+        if not limit and not self.dry_run:  # Only clear if we processed all
             self.clear_checkpoint()
 
     def _print_summary(self):
@@ -318,14 +272,23 @@ class EmbeddingBackfillProcessor:
         elapsed = time.time() - self.stats["start_time"] if self.stats["start_time"] else 0
 
         print("\n" + "=" * 60)
-        print("EMBEDDING BACKFILL COMPLETE")
+        print("EMBEDDING BACKFILL DRY RUN" if self.dry_run else "EMBEDDING BACKFILL COMPLETE")
         print("=" * 60)
         print(f"Total processed:    {self.stats['total_processed']}")
+        if self.dry_run:
+            print(f"Would re-embed:     {self.stats['would_embed']}")
+            print(f"Unchanged (hash):   {self.stats['skipped']}")
+            print(f"Adoptable:          {self.stats['adopted']}")
+            print("=" * 60)
+            return
         print(f"Success:            {self.stats['success']}")
         print(f"Failed:             {self.stats['failed']}")
-        print(f"Skipped:            {self.stats['skipped']}")
+        print(f"Skipped:            {self.stats['skipped']} (content hash unchanged)")
+        print(f"Adopted:            {self.stats['adopted']} (hash recorded, no API call)")
         print(f"Time elapsed:       {elapsed/60:.1f} minutes")
-        print(f"Average rate:       {self.stats['total_processed']/elapsed:.2f}/sec" if elapsed > 0 else "N/A")
+        print(f"Throughput:         {self.stats['success'] * 60 / elapsed:.0f} products/min" if elapsed > 0 else "N/A")
+        limiter_stats = self.rate_limiter.stats()
+        print(f"API requests:       {limiter_stats['requests']} ({limiter_stats['throttled']} throttled)")
         print("=" * 60)
 
 
@@ -337,8 +300,14 @@ async def main():
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=100,
-        help="Number of products to process per batch (default: 100)"
+        default=EmbeddingService.DOCUMENT_PAGE_SIZE,
+        help=f"Number of products per page / bulk UPDATE (default: {EmbeddingService.DOCUMENT_PAGE_SIZE})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=EmbeddingService.MAX_CONCURRENT_REQUESTS,
+        help=f"Maximum concurrent embed_content requests (default: {EmbeddingService.MAX_CONCURRENT_REQUESTS})"
     )
     parser.add_argument(
         "--resume",
@@ -354,8 +323,8 @@ async def main():
     parser.add_argument(
         "--rate-limit",
         type=float,
-        default=0.5,
-        help="Delay in seconds between API calls (default: 0.5)"
+        default=0.0,
+        help="Minimum delay in seconds between API request starts (default: 0, adaptive only)"
     )
     parser.add_argument(
         "--database-url",
@@ -366,7 +335,22 @@ async def main():
     parser.add_argument(
         "--regenerate",
         action="store_true",
-        help="Regenerate embeddings even for products that already have them"
+        help="Consider products that already have embeddings (only changed ones are re-embedded)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-embed even when the content hash is unchanged"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report how many products would be re-embedded without calling the API or writing"
+    )
+    parser.add_argument(
+        "--adopt-existing",
+        action="store_true",
+        help="Record hashes for unhashed rows whose stored embedding_text is unchanged instead of re-embedding"
     )
     parser.add_argument(
         "--clear-checkpoint",
@@ -383,21 +367,27 @@ async def main():
         sys.exit(1)
 
     # Check for Google AI API key
-    if not settings.google_ai_api_key:
+    if not settings.google_ai_api_key and not args.dry_run:
         logger.error("GOOGLE_AI_API_KEY not configured")
         sys.exit(1)
 
     logger.info(f"Database: {database_url[:50]}...")
     logger.info(f"Batch size: {args.batch_size}")
-    logger.info(f"Rate limit: {args.rate_limit}s delay")
+    logger.info(f"Concurrency: up to {args.concurrency} requests, min spacing {args.rate_limit}s")
     if args.regenerate:
-        logger.info("Regeneration mode: will update existing embeddings")
+        logger.info("Regeneration mode: will update existing embeddings whose content changed")
+    if args.dry_run:
+        logger.info("Dry run: no API calls, no writes")
 
     # Create processor
     processor = EmbeddingBackfillProcessor(
         database_url=database_url,
         batch_size=args.batch_size,
-        rate_limit_delay=args.rate_limit
+        concurrency=args.concurrency,
+        rate_limit_delay=args.rate_limit,
+        force=args.force,
+        dry_run=args.dry_run,
+        adopt_existing=args.adopt_existing
     )
 
     # Clear checkpoint if requested
@@ -413,10 +403,12 @@ async def main():
         )
     except KeyboardInterrupt:
         logger.info("Interrupted by user. Progress saved to checkpoint.")
-        processor.save_checkpoint()
+        if not args.dry_run:
+            processor.save_checkpoint()
     except Exception as e:
         logger.error(f"Backfill failed: {e}")
-        processor.save_checkpoint()
+        if not args.dry_run:
+            processor.save_checkpoint()
         raise
 
 
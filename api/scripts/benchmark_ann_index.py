@@ -0,0 +1,143 @@
+"""
+Recall-vs-latency report for the IVF backend of the embedding index.
+
+Runs the same queries through the exact scan and through IVF probing at
+several nprobe values, and reports recall@k against the exact results plus
+p50/p95 latency. Queries are perturbed catalog vectors, optionally with a
+category filter to check that filter-aware probing still returns full pages.
+
+Usage:
+    # Against the products table
+    python scripts/benchmark_ann_index.py [--limit 50] [--nprobe 4,8,16,32,64]
+
+    # Against a synthetic clustered catalog (no database needed)
+    python scripts/benchmark_ann_index.py --synthetic 100000
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.embedding_index import EmbeddingIndex
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def build_synthetic_index(n_rows: int, dimension: int = 768, n_categories: int = 40, seed: int = 0) -> EmbeddingIndex:
+    """Clustered random catalog: embeddings are noisy copies of a few hundred topic vectors."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(8, n_rows // 500), dimension)).astype(np.float32)
+    topic_of_row = rng.integers(0, topics.shape[0], n_rows)
+    vectors = topics[topic_of_row] + 0.6 * rng.normal(size=(n_rows, dimension)).astype(np.float32)
+
+    index = EmbeddingIndex(dimension=dimension)
+    stores = ["storea", "storeb", "storec", "stored"]
+    index.upsert_rows(
+        (i + 1, vectors[i], int(topic_of_row[i] % n_categories) + 1, stores[i % len(stores)], 1000.0 + i, True)
+        for i in range(n_rows)
+    )
+    index.loaded_at = time.time()
+    return index
+
+
+async def load_db_index() -> EmbeddingIndex:
+    from core.database import AsyncSessionLocal
+
+    index = EmbeddingIndex()
+    async with AsyncSessionLocal() as db:
+        await index.load(db)
+    return index
+
+
+def run_queries(index: EmbeddingIndex, queries: np.ndarray, limit: int, exact: bool, category_ids: Optional[List[int]]):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, category_ids=category_ids, limit=limit, exact=exact))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, np.asarray(timings)
+
+
+def report(
+    index: EmbeddingIndex, nprobes: List[int], limit: int, n_queries: int, category_ids: Optional[List[int]], seed: int = 1
+) -> List[Dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), min(n_queries, len(index)), replace=False)
+    queries = index.vectors[rows] + 0.05 * rng.normal(size=(rows.size, index.dimension)).astype(np.float32)
+
+    exact_results, exact_ms = run_queries(index, queries, limit, True, category_ids)
+    lines = [
+        {
+            "mode": "exact",
+            "nprobe": 0,
+            "recall": 1.0,
+            "p50_ms": np.percentile(exact_ms, 50),
+            "p95_ms": np.percentile(exact_ms, 95),
+        }
+    ]
+
+    for nprobe in nprobes:
+        index.ann_nprobe = nprobe
+        ann_results, ann_ms = run_queries(index, queries, limit, False, category_ids)
+        recalls = [len(set(a) & set(e)) / len(e) if e else 1.0 for a, e in zip(ann_results, exact_results)]
+        lines.append(
+            {
+                "mode": "ivf",
+                "nprobe": nprobe,
+                "recall": float(np.mean(recalls)),
+                "p50_ms": np.percentile(ann_ms, 50),
+                "p95_ms": np.percentile(ann_ms, 95),
+            }
+        )
+    return lines
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="IVF embedding index recall/latency report")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use a synthetic catalog of N rows instead of the DB")
+    parser.add_argument("--limit", type=int, default=50, help="Top-k per query (default: 50)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries (default: 200)")
+    parser.add_argument("--nprobe", type=str, default="4,8,16,32,64", help="Comma-separated nprobe values")
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (default: sqrt(rows))")
+    parser.add_argument("--category", type=int, action="append", help="Category filter (repeatable)")
+    parser.add_argument("--save", type=str, default=None, help="Save trained centroids to this .npz path")
+    args = parser.parse_args()
+
+    index = build_synthetic_index(args.synthetic) if args.synthetic else await load_db_index()
+    if len(index) == 0:
+        logger.error("Index is empty")
+        sys.exit(1)
+
+    start = time.time()
+    ann, row_lists = index.train_ann(n_lists=args.lists or None)
+    index.attach_ann(ann, row_lists)
+    # Force IVF probing even on small catalogs so the report is meaningful
+    index.ANN_MIN_CANDIDATES = 0
+    logger.info(f"Built IVF index with {ann.n_lists} lists over {len(index)} rows in {time.time() - start:.1f}s")
+    if args.save:
+        ann.save(args.save)
+        logger.info(f"Saved centroids to {args.save}")
+
+    nprobes = [int(n) for n in args.nprobe.split(",") if n]
+    lines = report(index, nprobes, args.limit, args.queries, args.category)
+
+    print("\n" + "=" * 60)
+    print(f"IVF RECALL vs LATENCY  (rows={len(index)}, lists={ann.n_lists}, k={args.limit})")
+    print("=" * 60)
+    print(f"{'mode':<8}{'nprobe':>8}{'recall@k':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for line in lines:
+        print(f"{line['mode']:<8}{line['nprobe']:>8}{line['recall']:>12.3f}{line['p50_ms']:>10.2f}{line['p95_ms']:>10.2f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
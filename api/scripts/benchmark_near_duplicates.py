@@ -0,0 +1,263 @@
+"""
+Offline benchmark of the MinHash/LSH near-duplicate engine on synthetic catalogs.
+
+Generates a deterministic catalog per size from the benchmark_search vocabulary:
+every base product has a unique collection name ("Velora Grey Oak Coffee
+Table", brand Casa). A share of base products is listed again by other stores under a
+reworded name (reordered words, " - " / ", " / " in " separators, other case,
+missing brand) - the true duplicates - and another share has a colour variant
+from the same collection, which must NOT be merged.
+
+Per size, reports the time of each stage (shingling, MinHash signatures, LSH
+candidates, verification, connected components), the number of candidate pairs
+against the n * (n - 1) / 2 pairs of the pairwise detector it replaces, and the
+pair precision / recall of the resulting clusters. With --confirm-embeddings the
+products also get synthetic word-sum embeddings and pairs are confirmed by cosine.
+
+Usage:
+    python scripts/benchmark_near_duplicates.py
+    python scripts/benchmark_near_duplicates.py --sizes 10000 100000 500000 --output near_duplicates.json
+    python scripts/benchmark_near_duplicates.py --sizes 100000 --threshold 0.75 --confirm-embeddings
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from scripts.benchmark_search import BRANDS, CATEGORIES, COLORS, MATERIALS, STORES, WordVectors, git_commit
+from services.near_duplicates import (
+    DEFAULT_BANDS,
+    DEFAULT_COSINE_THRESHOLD,
+    DEFAULT_NUM_PERM,
+    DEFAULT_THRESHOLD,
+    DEFAULT_WINDOW,
+    STOP_WORDS,
+    MinHasher,
+    candidate_pairs,
+    connected_components,
+    pair_cosine,
+    pair_jaccard,
+    normalize_text,
+    shingle_hashes,
+)
+
+DUPLICATE_SHARE = 0.15  # Share of base products listed again by other stores
+VARIANT_SHARE = 0.15  # Share of base products with a colour variant (not a duplicate)
+EMBEDDING_DIMENSION = 64
+EMBEDDING_NOISE = 0.15  # Per-listing embedding noise (a reworded duplicate keeps cosine ~0.98)
+
+SYLLABLES = ["ra", "ve", "lo", "mi", "ta", "ko", "sa", "ni", "du", "le", "po", "ari", "zen", "mor", "ka", "li", "bo", "ne"]
+
+
+def collection_name(index: int) -> str:
+    """Unique pronounceable word for a base product index (base-len(SYLLABLES) digits)."""
+    syllables = []
+    index += len(SYLLABLES) ** 2  # At least three syllables
+    while index:
+        index, digit = divmod(index, len(SYLLABLES))
+        syllables.append(SYLLABLES[digit])
+    return "".join(syllables).capitalize()
+
+
+def reword(collection: str, color: str, material: str, noun: str, rng: np.random.Generator) -> str:
+    """Another store's name for the same item."""
+    variants = [
+        f"{collection} {noun} in {color} {material}",
+        f"{collection} - {color} {material} {noun}",
+        f"{noun} {collection}, {material}, {color}",
+        f"{collection.upper()} {color} {material} {noun.upper()}",
+        f"The {collection} {material} {noun} ({color})",
+    ]
+    return variants[rng.integers(len(variants))]
+
+
+class DuplicateCatalog:
+    """Names, brands and ground-truth groups of ``n`` synthetic products."""
+
+    def __init__(self, n: int, seed: int = 0, dimension: int = 0):
+        rng = np.random.default_rng(seed)
+        nouns = [noun for _, _, category_nouns, _ in CATEGORIES for noun in category_nouns]
+        self.names: List[str] = []
+        self.brands: List[Optional[str]] = []
+        self.stores: List[str] = []
+        self.groups: List[int] = []  # Base product of each row: rows with the same group are duplicates
+
+        base = 0
+        while len(self.names) < n:
+            collection = collection_name(base)
+            color, material, noun = (
+                COLORS[rng.integers(len(COLORS))],
+                MATERIALS[rng.integers(len(MATERIALS))],
+                nouns[rng.integers(len(nouns))],
+            )
+            brand = BRANDS[rng.integers(len(BRANDS))]
+            stores = rng.permutation(len(STORES))
+            self._add(f"{collection} {color} {material} {noun}", brand, STORES[stores[0]], base)
+
+            draw = rng.random()
+            if draw < DUPLICATE_SHARE:
+                for store in stores[1 : 1 + rng.integers(1, 3)]:
+                    listed_brand = brand if rng.random() < 0.8 else None
+                    self._add(reword(collection, color, material, noun, rng), listed_brand, STORES[store], base)
+            elif draw < DUPLICATE_SHARE + VARIANT_SHARE:
+                base += 1
+                other = COLORS[(COLORS.index(color) + 1 + rng.integers(len(COLORS) - 1)) % len(COLORS)]
+                self._add(f"{collection} {other} {material} {noun}", brand, STORES[stores[0]], base)
+            base += 1
+
+        del self.names[n:], self.brands[n:], self.stores[n:], self.groups[n:]
+        self.groups_array = np.array(self.groups, dtype=np.int64)
+
+        self.vectors = None
+        if dimension:
+            words = WordVectors(dimension, seed)
+            noise = rng.normal(size=(n, dimension)).astype(np.float32) * (EMBEDDING_NOISE / dimension**0.5)
+            self.vectors = np.stack(
+                [words.embed(" ".join(w for w in normalize_text(name).split() if w not in STOP_WORDS)) for name in self.names]
+            )
+            self.vectors += noise
+            self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+
+    def _add(self, name: str, brand: Optional[str], store: str, group: int):
+        self.names.append(name)
+        self.brands.append(brand)
+        self.stores.append(store)
+        self.groups.append(group)
+
+    def true_pairs(self) -> int:
+        _, counts = np.unique(self.groups_array, return_counts=True)
+        return int((counts * (counts - 1) // 2).sum())
+
+
+def cluster_quality(labels: np.ndarray, groups: np.ndarray, true_pairs: int) -> Dict[str, float]:
+    """Pair precision / recall of the clusters: a pair is predicted when both rows share a label."""
+    _, label_counts = np.unique(labels, return_counts=True)
+    predicted = int((label_counts * (label_counts - 1) // 2).sum())
+    _, joint_counts = np.unique(np.stack((labels, groups)), axis=1, return_counts=True)
+    correct = int((joint_counts * (joint_counts - 1) // 2).sum())
+    return {
+        "predicted_pairs": predicted,
+        "true_pairs": true_pairs,
+        "precision": round(correct / predicted, 4) if predicted else 1.0,
+        "recall": round(correct / true_pairs, 4) if true_pairs else 1.0,
+    }
+
+
+def run(catalog: DuplicateCatalog, args) -> Dict[str, Any]:
+    timings = {}
+    start = time.perf_counter()
+    shingle_sets = [shingle_hashes(name, brand) for name, brand in zip(catalog.names, catalog.brands)]
+    timings["shingle"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    signatures = MinHasher(args.num_perm).signatures(shingle_sets)
+    timings["signature"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valid = np.fromiter((len(s) > 0 for s in shingle_sets), dtype=bool, count=len(shingle_sets))
+    pairs = candidate_pairs(signatures, args.bands, args.window, valid)
+    timings["lsh"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    confirmed = pair_jaccard(shingle_sets, pairs) >= args.threshold
+    if catalog.vectors is not None:
+        rows = np.flatnonzero(confirmed)
+        confirmed[rows] = pair_cosine(catalog.vectors, pairs[rows]) >= args.cosine_threshold
+    timings["verify"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = connected_components(len(catalog.names), pairs[confirmed])
+    timings["components"] = time.perf_counter() - start
+
+    n = len(catalog.names)
+    return {
+        "products": n,
+        "seconds": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "total_seconds": round(sum(timings.values()), 3),
+        "candidate_pairs": int(len(pairs)),
+        "all_pairs": n * (n - 1) // 2,
+        "confirmed_pairs": int(confirmed.sum()),
+        "clusters": int((np.bincount(labels) > 1).sum()),
+        "quality": cluster_quality(labels, catalog.groups_array, catalog.true_pairs()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate benchmark on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000], help="Catalog sizes")
+    parser.add_argument("--seed", type=int, default=0, help="Catalog seed (default: 0)")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Estimated Jaccard (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--num-perm", type=int, default=DEFAULT_NUM_PERM, help=f"MinHash permutations (default: {DEFAULT_NUM_PERM})"
+    )
+    parser.add_argument("--bands", type=int, default=DEFAULT_BANDS, help=f"LSH bands (default: {DEFAULT_BANDS})")
+    parser.add_argument(
+        "--window", type=int, default=DEFAULT_WINDOW, help=f"Bucket pairing window (default: {DEFAULT_WINDOW})"
+    )
+    parser.add_argument("--confirm-embeddings", action="store_true", help="Also confirm pairs by synthetic embedding cosine")
+    parser.add_argument(
+        "--cosine-threshold",
+        type=float,
+        default=DEFAULT_COSINE_THRESHOLD,
+        help=f"Embedding cosine (default: {DEFAULT_COSINE_THRESHOLD})",
+    )
+    parser.add_argument("--output", type=str, default=None, help="JSON report path")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        build_start = time.perf_counter()
+        catalog = DuplicateCatalog(size, args.seed, EMBEDDING_DIMENSION if args.confirm_embeddings else 0)
+        build_seconds = time.perf_counter() - build_start
+        result = run(catalog, args)
+        result["build_seconds"] = round(build_seconds, 2)
+        results.append(result)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "threshold": args.threshold,
+            "num_perm": args.num_perm,
+            "bands": args.bands,
+            "window": args.window,
+            "cosine_threshold": args.cosine_threshold if args.confirm_embeddings else None,
+        },
+        "results": results,
+        "process": {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+    print("\n" + "=" * 60)
+    print(f"NEAR-DUPLICATE BENCHMARK  (threshold={args.threshold}, perms={args.num_perm}, bands={args.bands})")
+    print("=" * 60)
+    print(f"{'products':>9}{'total s':>9}{'sig s':>8}{'lsh s':>8}{'cands':>10}{'prec':>8}{'recall':>8}")
+    for result in results:
+        quality = result["quality"]
+        print(
+            f"{result['products']:>9}{result['total_seconds']:>9.2f}{result['seconds']['signature']:>8.2f}"
+            f"{result['seconds']['lsh']:>8.2f}{result['candidate_pairs']:>10}{quality['precision']:>8.3f}{quality['recall']:>8.3f}"
+        )
+    print(f"Max RSS: {report['process']['max_rss_mb']:.0f} MB")
+    if args.output:
+        print(f"Report: {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
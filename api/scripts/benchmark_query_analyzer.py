@@ -0,0 +1,162 @@
+"""
+Per-query and per-product cost of query understanding: linear scans vs the compiled analyzer.
+
+Per query: synonym grouping + exclusion lookup, done the previous way (scan every
+SEARCH_SYNONYMS / SEARCH_EXCLUSIONS key for each word), by the compiled QueryAnalyzer
+with caching disabled (cold: every query analyzed from scratch) and through its LRU
+(warm: repeated queries). Per product: the exclusion check on a product name,
+should_exclude_product vs AnalyzedQuery.excludes. Also checks that the cold analyzer
+agrees with the linear scan wherever the query has no multi-word synonym key.
+
+Usage:
+    python scripts/benchmark_query_analyzer.py [--repeat 2000] [--products 10000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.query_analyzer import QueryAnalyzer
+from services.search_service import (
+    KEYWORD_CATEGORIES,
+    SEARCH_EXCLUSIONS,
+    SEARCH_SYNONYMS,
+    normalize_singular_plural,
+    should_exclude_product,
+)
+
+QUERIES = [
+    "sofa",
+    "L-shaped sofa",
+    "3 seater velvet sofa",
+    "coffee table",
+    "round marble centre table",
+    "bedside tables",
+    "chest of drawers",
+    "wall art",
+    "floor lamp",
+    "jute rugs",
+    "terracotta planters",
+    "mirrors",
+    "sheesham wood dining table",
+    "blackout curtains",
+    "queen bed with storage",
+]
+
+NAME_WORDS = ["Oak", "Walnut", "Sheesham", "Velvet", "Marble", "Round", "Nested", "Handmade", "Set of 2"]
+NAME_TYPES = ["Coffee Table", "Center Table with Drawer", "Side Table", "Dining Table", "Console", "Nightstand", "End Table"]
+
+
+def legacy_groups(query: str) -> List[List[str]]:
+    """Previous expand_search_query_grouped: a scan of SEARCH_SYNONYMS per word."""
+    query_lower = query.lower().strip()
+    words = query_lower.split()
+    if len(words) == 1:
+        for key, synonyms in SEARCH_SYNONYMS.items():
+            if key == query_lower:
+                return [synonyms]
+        word_forms = normalize_singular_plural(query_lower)
+        for form in word_forms:
+            for key, synonyms in SEARCH_SYNONYMS.items():
+                if key == form:
+                    return [synonyms]
+        return [word_forms]
+    groups = []
+    for word in words:
+        for key, synonyms in SEARCH_SYNONYMS.items():
+            if key == word:
+                groups.append(list(synonyms))
+                break
+        else:
+            groups.append(normalize_singular_plural(word))
+    return groups
+
+
+def legacy_exclusions(query: str) -> List[str]:
+    """Previous get_exclusion_terms: exact key, else a substring scan of every key."""
+    query_lower = query.lower().strip()
+    if query_lower in SEARCH_EXCLUSIONS:
+        return SEARCH_EXCLUSIONS[query_lower]
+    for key, exclusions in SEARCH_EXCLUSIONS.items():
+        if key in query_lower:
+            return exclusions
+    return []
+
+
+def per_op_ns(fn: Callable[[], None], operations: int, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / operations * 1e9)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark linear-scan vs compiled query analysis")
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the query set (default: 2000)")
+    parser.add_argument("--products", type=int, default=10000, help="Product names per exclusion check (default: 10000)")
+    args = parser.parse_args()
+
+    build_start = time.perf_counter()
+    warm = QueryAnalyzer(SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES, normalize_singular_plural)
+    build_ms = (time.perf_counter() - build_start) * 1000
+    cold = QueryAnalyzer(SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES, normalize_singular_plural, cache_size=0)
+
+    mismatches = []
+    for query in QUERIES:
+        analysis = cold.analyze(query)
+        if [set(g) for g in analysis.groups] != [set(g) for g in legacy_groups(query)]:
+            mismatches.append(f"{query!r}: {[len(g) for g in legacy_groups(query)]} -> {[len(g) for g in analysis.groups]}")
+        assert list(analysis.exclusions) == legacy_exclusions(query), query
+
+    queries = QUERIES * args.repeat
+
+    def run_legacy():
+        for query in queries:
+            legacy_groups(query)
+            legacy_exclusions(query)
+
+    def run_cold():
+        for query in queries:
+            cold.analyze(query)
+
+    def run_warm():
+        for query in queries:
+            warm.analyze(query)
+
+    legacy_query_ns = per_op_ns(run_legacy, len(queries))
+    cold_query_ns = per_op_ns(run_cold, len(queries))
+    warm_query_ns = per_op_ns(run_warm, len(queries))
+
+    rng = random.Random(0)
+    names = [f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_TYPES)} {i}" for i in range(args.products)]
+    analysis = warm.analyze("center table")
+    terms = list(analysis.exclusions)
+    assert [should_exclude_product(name, terms) for name in names] == [analysis.excludes(name) for name in names]
+
+    legacy_product_ns = per_op_ns(lambda: [should_exclude_product(name, terms) for name in names], len(names))
+    compiled_product_ns = per_op_ns(lambda: [analysis.excludes(name) for name in names], len(names))
+
+    print("\n" + "=" * 60)
+    print(f"QUERY ANALYSIS  ({len(QUERIES)} queries x {args.repeat}, {args.products} product names)")
+    print("=" * 60)
+    print(f"Analyzer build:                 {build_ms:.2f} ms")
+    print(f"Per query, linear scan:         {legacy_query_ns / 1000:.2f} us")
+    print(f"Per query, compiled (cold):     {cold_query_ns / 1000:.2f} us")
+    print(f"Per query, compiled (LRU hit):  {warm_query_ns / 1000:.2f} us")
+    print(f"Per product, exclusion check:   {legacy_product_ns:.0f} ns -> {compiled_product_ns:.0f} ns")
+    print(f"Grouping changes (multi-word synonym keys now form one group): {len(mismatches)}")
+    for line in mismatches:
+        print(f"  {line}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Per-request latency of RankingService.rank_products: columnar vs row-wise.
+
+Builds synthetic candidate lists shaped like the chat category fan-out
+(768-dim binary embeddings, styles, materials, colors, prices) and times the
+columnar rank_products against the row-wise reference implementation with
+all preferences set, reporting p50 latency, speedup and the largest score
+difference between the two.
+
+Usage:
+    python scripts/benchmark_ranking.py [--sizes 100,500,2000] [--repeat 20]
+"""
+import argparse
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.embedding_codec import encode_embedding
+from services.ranking_service import RankingService
+
+STYLES = ["modern", "minimalist", "boho", "scandinavian", "industrial", "traditional", "japandi", None]
+MATERIALS = ["oak", "walnut", "velvet", "linen", "steel", "marble", "rattan", "leather", None]
+COLORS = ["brown", "grey", "beige", "navy", "white", "black", "olive", "terracotta", None]
+TYPES = ["3-seater", "2-seater", "sectional", "l-shaped", "4-seater", None]
+
+
+@dataclass
+class SyntheticProduct:
+    id: int
+    category_id: int
+    primary_style: Optional[str]
+    secondary_style: Optional[str]
+    material_primary: Optional[str]
+    color_primary: Optional[str]
+    type: Optional[str]
+    capacity: Optional[int]
+    price: float
+    embedding_vector: bytes
+    embedding: Optional[str] = None
+
+
+def build_candidates(n: int, dimension: int = 768, seed: int = 0) -> List[SyntheticProduct]:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dimension)).astype(np.float32)
+    return [
+        SyntheticProduct(
+            id=i + 1,
+            category_id=int(rng.integers(1, 4)),
+            primary_style=STYLES[rng.integers(len(STYLES))],
+            secondary_style=STYLES[rng.integers(len(STYLES))],
+            material_primary=MATERIALS[rng.integers(len(MATERIALS))],
+            color_primary=COLORS[rng.integers(len(COLORS))],
+            type=TYPES[rng.integers(len(TYPES))],
+            capacity=int(rng.integers(1, 7)),
+            price=float(rng.uniform(5000, 150000)),
+            embedding_vector=encode_embedding(vectors[i]),
+        )
+        for i in range(n)
+    ]
+
+
+def time_ms(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark columnar vs row-wise product ranking")
+    parser.add_argument("--sizes", type=str, default="100,500,2000", help="Candidate list sizes (default: 100,500,2000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per size (default: 20)")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (default: 768)")
+    args = parser.parse_args()
+
+    service = RankingService()
+    query = np.random.default_rng(1).normal(size=args.dimension).tolist()
+    preferences = dict(
+        query_embedding=query,
+        user_category=2,
+        user_type="3-seater",
+        user_capacity=3,
+        user_primary_style="modern",
+        user_secondary_style="minimalist",
+        user_materials=["wood", "velvet"],
+        user_color="grey",
+        user_budget_max=60000,
+    )
+
+    lines = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        products = build_candidates(size, args.dimension)
+        vector_scores = {p.id: (p.id % 97) / 97 for p in products}
+
+        def columnar():
+            return service.rank_products(products, vector_scores, **preferences)
+
+        def rowwise():
+            return service._rank_products_rowwise(products, vector_scores, **preferences)
+
+        reference = {rp.product.id: rp.final_score for rp in rowwise()}
+        max_diff = max(abs(rp.final_score - reference[rp.product.id]) for rp in columnar())
+
+        rowwise_ms = time_ms(rowwise, args.repeat)
+        columnar_ms = time_ms(columnar, args.repeat)
+        lines.append((size, rowwise_ms, columnar_ms, rowwise_ms / columnar_ms if columnar_ms else 0.0, max_diff))
+
+    print("\n" + "=" * 60)
+    print(f"RANKING LATENCY  (p50 of {args.repeat} runs, dim={args.dimension}, all preferences set)")
+    print("=" * 60)
+    print(f"{'candidates':>10}{'rowwise ms':>13}{'columnar ms':>13}{'speedup':>10}{'max diff':>12}")
+    for size, rowwise_ms, columnar_ms, speedup, max_diff in lines:
+        print(f"{size:>10}{rowwise_ms:>13.2f}{columnar_ms:>13.2f}{speedup:>9.1f}x{max_diff:>12.1e}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,619 @@
+"""
+Offline search latency and relevance benchmark on a synthetic catalog.
+
+Generates a deterministic catalog (realistic names built from category nouns,
+materials and colors; categories, prices, stores, styles) with deterministic
+fake embeddings: every word has a fixed pseudo-random vector (seeded by a hash of
+the word), a product embeds as the normalized sum of its word vectors plus
+per-product noise, and queries embed the same way. Similarity therefore follows
+shared vocabulary, so relevance metrics are meaningful without Gemini. A share
+of products carry a second material in the name ("... with Walnut Legs"), which
+keyword matching cannot tell from the primary one.
+
+Stages, each timed per query:
+- semantic: search_service.semantic_search_products (embedding index, or the
+  Postgres DB-scan path with --backend postgres --db-scan)
+- keyword: memory backend - whole-word match of the analyzer's synonym groups over
+  an inverted index of names (stand-in for the search_vector @@ query);
+  postgres backend - the build_keyword_conditions query
+- hybrid: RRF of the semantic and keyword rankings with exclusions (memory), or
+  the fused order from hybrid_candidates (postgres)
+- ranking: RankingService.rank_products over the top hybrid candidates with
+  precomputed product features
+
+A product is relevant to a golden query when it is in the query's category and
+has its material / color. Reports p50/p95/p99 latency, throughput, tracemalloc
+peak and max RSS, and P@10 / P@100 / MRR / NDCG@10 per stage as JSON (sorted
+keys, so two runs diff cleanly); --compare prints the latency/relevance deltas
+against an earlier report.
+
+The postgres backend seeds a throwaway schema (dropped afterwards unless --keep)
+in the database given by --database-url; it needs pg_trgm like the migrations.
+There is no SQLite backend: the keyword SQL is PostgreSQL full-text search.
+
+Usage:
+    python scripts/benchmark_search.py --products 10000 --output benchmark.json
+    python scripts/benchmark_search.py --products 500000 --dimension 256 --output big.json --compare benchmark.json
+    python scripts/benchmark_search.py --backend postgres --database-url postgresql://localhost/omnishop_bench
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+import services.embedding_index as embedding_index_module
+import services.search_service as search_service
+from scripts.evaluate_search_quality import mean_reciprocal_rank, ndcg_at_k, precision_at_k
+from services.embedding_codec import encode_embedding
+from services.embedding_index import EmbeddingIndex
+from services.hybrid_search import SEMANTIC_ONLY_THRESHOLD, SIMILARITY_THRESHOLD, hybrid_candidates, reciprocal_rank_fusion
+from services.product_features import derive_product_features
+from services.ranking_service import RankingService
+from services.search_service import analyze_query, build_keyword_conditions, semantic_search_products
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Category, Product
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SCHEMA = "search_benchmark"
+CANDIDATE_LIMIT = 1000
+RANK_DEPTH = 200
+NOISE = 1.0  # Expected norm of the per-product noise vector (word vectors have norm 1)
+
+# (category_id, category name, product nouns, price range)
+CATEGORIES = [
+    (1, "Sofas", ["Sofa", "3 Seater Sofa", "2 Seater Sofa", "L-Shaped Sofa", "Sectional Sofa", "Loveseat"], (15000, 150000)),
+    (2, "Chairs", ["Armchair", "Accent Chair", "Dining Chair", "Lounge Chair", "Rocking Chair"], (4000, 45000)),
+    (3, "Coffee Tables", ["Coffee Table", "Center Table", "Round Coffee Table", "Nesting Coffee Table"], (5000, 60000)),
+    (4, "Side Tables", ["Side Table", "End Table", "Round Side Table"], (2500, 25000)),
+    (5, "Dining Tables", ["Dining Table", "6 Seater Dining Table", "4 Seater Dining Table"], (15000, 120000)),
+    (6, "Beds", ["Queen Bed", "King Bed", "Bed with Storage", "Platform Bed"], (18000, 140000)),
+    (7, "Storage", ["Bookshelf", "Chest of Drawers", "Wardrobe", "Cabinet", "Sideboard"], (8000, 90000)),
+    (8, "Lighting", ["Floor Lamp", "Table Lamp", "Pendant Light", "Chandelier", "Wall Sconce"], (1500, 40000)),
+    (9, "Rugs", ["Rug", "Runner Rug", "Dhurrie", "Area Rug", "Kilim"], (2000, 50000)),
+    (10, "Decor", ["Vase", "Planter", "Wall Art", "Mirror", "Sculpture"], (500, 20000)),
+]
+MATERIALS = ["Oak", "Walnut", "Sheesham", "Teak", "Velvet", "Linen", "Leather", "Marble", "Brass", "Jute", "Rattan", "Metal"]
+COLORS = ["Grey", "Beige", "Navy", "Green", "Black", "White", "Brown", "Blue", "Mustard", "Terracotta"]
+STYLES = ["modern", "minimalist", "scandinavian", "boho", "industrial", "mid_century_modern", "japandi", "indian_contemporary"]
+STORES = ["pepperfry", "urbanladder", "woodenstreet", "ikea", "westelm", "fabindia"]
+ACCENT_PARTS = ["Legs", "Frame", "Base", "Inlay"]
+ACCENT_SHARE = 0.3  # Share of products named "... with <material> <part>" (keyword confounders)
+ACCENT_WEIGHT = 0.8  # Weight of the accent material in their embedding
+BRANDS = ["Casa", "Nook", "Loom & Co", "Timber Lane", "Studio Nine", "Hearth", "Aster", "Kiln"]
+
+# (query, category_id, required material, required color)
+GOLDEN_QUERIES = [
+    ("velvet sofa", 1, "Velvet", None),
+    ("grey linen sofa", 1, "Linen", "Grey"),
+    ("leather armchair", 2, "Leather", None),
+    ("walnut coffee table", 3, "Walnut", None),
+    ("marble center table", 3, "Marble", None),
+    ("teak side table", 4, "Teak", None),
+    ("sheesham dining table", 5, "Sheesham", None),
+    ("oak bed", 6, "Oak", None),
+    ("walnut chest of drawers", 7, "Walnut", None),
+    ("brass floor lamp", 8, "Brass", None),
+    ("jute rug", 9, "Jute", None),
+    ("blue rug", 9, None, "Blue"),
+    ("terracotta planter", 10, None, "Terracotta"),
+    ("black metal lamp", 8, "Metal", "Black"),
+    ("rattan lounge chair", 2, "Rattan", None),
+]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic catalog and embeddings
+# ---------------------------------------------------------------------------
+
+
+class WordVectors:
+    """Fixed pseudo-random unit vector per lower-cased word (seeded by a stable hash)."""
+
+    def __init__(self, dimension: int, seed: int):
+        self.dimension = dimension
+        self.seed = seed
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    def __call__(self, word: str) -> np.ndarray:
+        word = word.lower()
+        vector = self._vectors.get(word)
+        if vector is None:
+            digest = hashlib.blake2b(f"{self.seed}:{word}".encode(), digest_size=8).digest()
+            vector = np.random.default_rng(int.from_bytes(digest, "little")).normal(size=self.dimension).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            self._vectors[word] = vector
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        words = [word for word in text.replace("-", " ").split() if word.isalnum()]
+        if not words:
+            return np.zeros(self.dimension, dtype=np.float32)
+        vector = np.sum([self(word) for word in words], axis=0)
+        return vector / np.linalg.norm(vector)
+
+
+class SyntheticEmbeddingService:
+    """Query embeddings from WordVectors (stands in for the Gemini-backed EmbeddingService)."""
+
+    def __init__(self, words: WordVectors):
+        self.words = words
+
+    async def get_query_embedding(self, text: str) -> List[float]:
+        return self.words.embed(text).tolist()
+
+
+class SyntheticCatalog:
+    """Column arrays for ``n`` products plus their embeddings (float32, unit norm)."""
+
+    def __init__(self, n: int, dimension: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.words = WordVectors(dimension, seed)
+        self.ids = np.arange(1, n + 1, dtype=np.int64)
+
+        nouns = [(cat_id, noun) for cat_id, _, category_nouns, _ in CATEGORIES for noun in category_nouns]
+        self.noun_idx = rng.integers(len(nouns), size=n)
+        self.material_idx = rng.integers(len(MATERIALS), size=n)
+        self.color_idx = rng.integers(len(COLORS), size=n)
+        self.style_idx = rng.integers(len(STYLES), size=n)
+        self.store_idx = rng.integers(len(STORES), size=n)
+        self.brand_idx = rng.integers(len(BRANDS), size=n)
+        self.accent_idx = np.where(rng.random(n) < ACCENT_SHARE, rng.integers(len(MATERIALS), size=n), -1)
+        self.category_ids = np.array([nouns[i][0] for i in self.noun_idx], dtype=np.int64)
+
+        price_ranges = {cat_id: price_range for cat_id, _, _, price_range in CATEGORIES}
+        low = np.array([price_ranges[c][0] for c in self.category_ids], dtype=np.float64)
+        high = np.array([price_ranges[c][1] for c in self.category_ids], dtype=np.float64)
+        self.prices = np.round(low + (high - low) * rng.beta(2, 5, size=n), -1)
+
+        self.names = [
+            f"{COLORS[c]} {MATERIALS[m]} {nouns[k][1]}" + (f" with {MATERIALS[a]} {ACCENT_PARTS[k % 4]}" if a >= 0 else "")
+            for c, m, k, a in zip(
+                self.color_idx.tolist(), self.material_idx.tolist(), self.noun_idx.tolist(), self.accent_idx.tolist()
+            )
+        ]
+
+        # Embedding = normalize(color + material + noun words + style + accent material + noise), in blocks
+        noun_vectors = np.stack([self.words.embed(noun) * len(noun.split()) ** 0.5 for _, noun in nouns])
+        material_vectors = np.stack([self.words(word) for word in MATERIALS])
+        color_vectors = np.stack([self.words(word) for word in COLORS])
+        style_vectors = np.stack([self.words(word.replace("_", " ").split()[0]) for word in STYLES])
+        noise_scale = NOISE / dimension**0.5
+        self.embeddings = np.empty((n, dimension), dtype=np.float32)
+        for start in range(0, n, 8192):
+            end = min(n, start + 8192)
+            block = (
+                noun_vectors[self.noun_idx[start:end]]
+                + material_vectors[self.material_idx[start:end]]
+                + color_vectors[self.color_idx[start:end]]
+                + 0.5 * style_vectors[self.style_idx[start:end]]
+                + ACCENT_WEIGHT * (self.accent_idx[start:end, None] >= 0) * material_vectors[self.accent_idx[start:end]]
+                + noise_scale * rng.normal(size=(end - start, dimension)).astype(np.float32)
+            )
+            self.embeddings[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def product(self, i: int) -> SimpleNamespace:
+        return SimpleNamespace(
+            id=int(self.ids[i]),
+            name=self.names[i],
+            category_id=int(self.category_ids[i]),
+            price=float(self.prices[i]),
+            primary_style=STYLES[self.style_idx[i]],
+            secondary_style=None,
+        )
+
+    def attributes(self, i: int) -> Dict[str, str]:
+        return {"material_primary": MATERIALS[self.material_idx[i]], "color_primary": COLORS[self.color_idx[i]]}
+
+    def features(self) -> Dict[int, SimpleNamespace]:
+        """product_id -> product_features row; products with the same name and style share one row."""
+        rows: Dict[Tuple[str, int], SimpleNamespace] = {}
+        features = {}
+        for i in range(len(self)):
+            key = (self.names[i], int(self.style_idx[i]))
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = SimpleNamespace(**derive_product_features(self.product(i), self.attributes(i)))
+            features[int(self.ids[i])] = row
+        return features
+
+    def relevant_ids(self, category_id: int, material: Optional[str], color: Optional[str]) -> Set[int]:
+        mask = self.category_ids == category_id
+        if material:
+            mask &= self.material_idx == MATERIALS.index(material)
+        if color:
+            mask &= self.color_idx == COLORS.index(color)
+        return set(self.ids[mask].tolist())
+
+
+class NameIndex:
+    """Inverted index of lower-cased name words: whole-word synonym-group matching in memory."""
+
+    def __init__(self, ids: np.ndarray, names: List[str], prices: np.ndarray):
+        self.names = {int(pid): name for pid, name in zip(ids.tolist(), names)}
+        # Keyword results are ordered like the SQL: price descending, then id
+        self._order = {int(pid): rank for rank, pid in enumerate(ids[np.lexsort((ids, -prices))].tolist())}
+        self._padded = {pid: f" {name.lower().replace('-', ' ')} " for pid, name in self.names.items()}
+        self._postings: Dict[str, Set[int]] = {}
+        for pid, padded in self._padded.items():
+            for word in padded.split():
+                self._postings.setdefault(word, set()).add(pid)
+
+    def term_ids(self, term: str) -> Set[int]:
+        words = term.lower().replace("-", " ").split()
+        if not words:
+            return set()
+        ids = set.intersection(*[self._postings.get(word, set()) for word in words])
+        if len(words) == 1:
+            return ids
+        phrase = f" {' '.join(words)} "
+        return {pid for pid in ids if phrase in self._padded[pid]}
+
+    def search(self, groups, limit: int) -> List[int]:
+        """Ids whose name matches at least one term of every group, in SQL order, at most ``limit``."""
+        matched: Optional[Set[int]] = None
+        for group in groups:
+            group_ids = set().union(*[self.term_ids(term) for term in group])
+            matched = group_ids if matched is None else matched & group_ids
+        return sorted(matched or (), key=self._order.__getitem__)[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    total_seconds = samples.sum() / 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+        "qps": round(len(samples) / total_seconds, 1) if total_seconds else 0.0,
+        "samples": len(samples),
+    }
+
+
+def relevance_summary(results: Dict[str, List[int]], relevant: Dict[str, Set[int]]) -> Dict[str, float]:
+    metrics = {"precision_at_10": [], "precision_at_100": [], "mrr": [], "ndcg_at_10": []}
+    for query, retrieved in results.items():
+        metrics["precision_at_10"].append(precision_at_k(relevant[query], retrieved, 10))
+        metrics["precision_at_100"].append(precision_at_k(relevant[query], retrieved, 100))
+        metrics["mrr"].append(mean_reciprocal_rank(relevant[query], retrieved))
+        metrics["ndcg_at_10"].append(ndcg_at_k(relevant[query], retrieved, 10))
+    return {name: round(float(np.mean(values)), 4) for name, values in metrics.items()}
+
+
+async def run_stage(
+    name: str, stage: Callable[[str], Any], queries: List[str], repeat: int
+) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """Time ``stage`` on every query ``repeat`` times; the tracemalloc peak comes from one extra traced pass."""
+    samples, results = [], {}
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            results[query] = await stage(query)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    for query in queries:
+        await stage(query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = latency_summary(samples)
+    summary["peak_traced_mb"] = round(peak / 1e6, 2)
+    logger.warning(f"[BENCHMARK] {name}: p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms qps={summary['qps']}")
+    return summary, results
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class MemoryBackend:
+    """Embedding index + in-memory name index; no database."""
+
+    name = "memory"
+
+    def __init__(self, catalog: SyntheticCatalog):
+        self.catalog = catalog
+        self.names = NameIndex(catalog.ids, catalog.names, catalog.prices)
+        self.db = None
+
+    async def setup(self):
+        index = EmbeddingIndex(dimension=self.catalog.embeddings.shape[1])
+        index.upsert_rows(
+            (int(pid), vector, int(cat), STORES[store], float(price), True)
+            for pid, vector, cat, store, price in zip(
+                self.catalog.ids,
+                self.catalog.embeddings,
+                self.catalog.category_ids,
+                self.catalog.store_idx,
+                self.catalog.prices,
+            )
+        )
+        index.loaded_at = index.refreshed_at = time.time()  # Loaded from the catalog rather than by load(db)
+        embedding_index_module._embedding_index = index
+
+    async def semantic(self, query: str) -> Dict[int, float]:
+        return await semantic_search_products(query, self.db, limit=CANDIDATE_LIMIT, min_score=SIMILARITY_THRESHOLD)
+
+    async def keyword(self, query: str) -> List[int]:
+        return self.names.search(analyze_query(query).groups, CANDIDATE_LIMIT)
+
+    async def hybrid(self, query: str) -> Tuple[List[int], Dict[int, float]]:
+        """Fused candidate ids (best first) and their semantic scores."""
+        analysis = analyze_query(query)
+        semantic_hits = await self.semantic(query)
+        keyword_ranking = self.names.search(analysis.groups, CANDIDATE_LIMIT)
+        keyword_ids = set(keyword_ranking)
+        semantic_ranking = [
+            pid for pid, score in semantic_hits.items() if pid in keyword_ids or score >= SEMANTIC_ONLY_THRESHOLD
+        ]
+        fused = reciprocal_rank_fusion([semantic_ranking, keyword_ranking])
+        ordered_ids = [pid for pid in fused if not analysis.excludes(self.names.names[pid])]
+        return ordered_ids, semantic_hits
+
+    async def teardown(self):
+        embedding_index_module._embedding_index = None
+
+
+class PostgresBackend(MemoryBackend):
+    """Seeds a throwaway schema; keyword and hybrid stages run hybrid_candidates against it."""
+
+    name = "postgres"
+
+    def __init__(self, catalog: SyntheticCatalog, database_url: str, db_scan: bool, keep: bool):
+        super().__init__(catalog)
+        self.database_url = database_url
+        self.db_scan = db_scan
+        self.keep = keep
+        self.engine = None
+
+    def _seed(self):
+        engine = create_engine(self.database_url)
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            connection.execute(text(f"SET LOCAL search_path TO {SCHEMA}, public"))
+            Category.__table__.create(connection)
+            Product.__table__.create(connection)
+            connection.execute(
+                insert(Category.__table__),
+                [{"id": cat_id, "name": name, "slug": name.lower().replace(" ", "-")} for cat_id, name, _, _ in CATEGORIES],
+            )
+            catalog = self.catalog
+            for start in range(0, len(catalog), 5000):
+                rows = []
+                for i in range(start, min(len(catalog), start + 5000)):
+                    product = catalog.product(i)
+                    rows.append(
+                        {
+                            "id": product.id,
+                            "external_id": f"bench-{product.id}",
+                            "name": product.name,
+                            "description": f"{STYLES[catalog.style_idx[i]].replace('_', ' ')} {product.name.lower()}",
+                            "price": product.price,
+                            "brand": BRANDS[catalog.brand_idx[i]],
+                            "source_website": STORES[catalog.store_idx[i]],
+                            "source_url": f"https://example.com/p/{product.id}",
+                            "category_id": product.category_id,
+                            "is_available": True,
+                            "primary_style": product.primary_style,
+                            "embedding_vector": encode_embedding(catalog.embeddings[i]),
+                        }
+                    )
+                connection.execute(insert(Product.__table__), rows)
+            connection.execute(text("ANALYZE products"))
+        engine.dispose()
+
+    async def setup(self):
+        self._seed()
+        self.engine = create_async_engine(
+            self.database_url.replace("postgresql://", "postgresql+asyncpg://"),
+            connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}},
+        )
+        self.db = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)()
+        if not self.db_scan:
+            index = EmbeddingIndex(dimension=self.catalog.embeddings.shape[1])
+            await index.load(self.db)
+            embedding_index_module._embedding_index = index
+
+    async def keyword(self, query: str) -> List[int]:
+        where_clause, _ = build_keyword_conditions(query)
+        keyword_query = (
+            select(Product.id)
+            .where(Product.is_available.is_(True), where_clause)
+            .order_by(Product.price.desc().nullslast(), Product.id)
+            .limit(CANDIDATE_LIMIT)
+        )
+        return list((await self.db.execute(keyword_query)).scalars())
+
+    async def hybrid(self, query: str) -> Tuple[List[int], Dict[int, float]]:
+        candidates = await hybrid_candidates(query, self.db, limit=CANDIDATE_LIMIT)
+        return candidates.ordered_ids, candidates.semantic_scores
+
+    async def teardown(self):
+        await super().teardown()
+        if self.db is not None:
+            await self.db.close()
+        if self.engine is not None:
+            await self.engine.dispose()
+        if not self.keep:
+            engine = create_engine(self.database_url)
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    lines = []
+    for stage, summary in current["latency"].items():
+        before = previous.get("latency", {}).get(stage)
+        if before:
+            change = (summary["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            lines.append(f"{stage:<10} p95 {before['p95_ms']:>9.2f} -> {summary['p95_ms']:>9.2f} ms ({change:+.1f}%)")
+    for stage, metrics in current["relevance"].items():
+        before = previous.get("relevance", {}).get(stage)
+        if before:
+            lines.append(f"{stage:<10} ndcg@10 {before['ndcg_at_10']:.4f} -> {metrics['ndcg_at_10']:.4f}")
+    return lines
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline search latency / relevance benchmark on a synthetic catalog")
+    parser.add_argument("--products", type=int, default=10000, help="Synthetic catalog size (default: 10000)")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (default: 768)")
+    parser.add_argument("--seed", type=int, default=0, help="Catalog / embedding seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the golden queries (default: 5)")
+    parser.add_argument("--backend", choices=["memory", "postgres"], default="memory", help="Where the catalog lives")
+    parser.add_argument("--database-url", type=str, default=None, help="Postgres URL for --backend postgres")
+    parser.add_argument("--db-scan", action="store_true", help="Postgres: semantic search by DB scan instead of the index")
+    parser.add_argument("--keep", action="store_true", help="Postgres: keep the seeded schema")
+    parser.add_argument("--output", type=str, default="search_benchmark.json", help="JSON report path")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    # Per-query service logs would dominate the timings
+    logging.getLogger("services").setLevel(logging.WARNING)
+
+    if args.backend == "postgres" and not args.database_url:
+        parser.error("--backend postgres requires --database-url")
+
+    build_start = time.perf_counter()
+    catalog = SyntheticCatalog(args.products, args.dimension, args.seed)
+    features = catalog.features()
+    build_seconds = time.perf_counter() - build_start
+
+    if args.backend == "postgres":
+        backend = PostgresBackend(catalog, args.database_url, args.db_scan, args.keep)
+    else:
+        backend = MemoryBackend(catalog)
+
+    search_service._embedding_service = SyntheticEmbeddingService(catalog.words)
+    ranking_service = RankingService()
+    products_by_id = {int(pid): i for i, pid in enumerate(catalog.ids.tolist())}
+    queries = [query for query, _, _, _ in GOLDEN_QUERIES]
+    relevant = {query: catalog.relevant_ids(cat, material, color) for query, cat, material, color in GOLDEN_QUERIES}
+    preferences = {
+        query: {"user_materials": [material.lower()] if material else None, "user_color": color.lower() if color else None}
+        for query, _, material, color in GOLDEN_QUERIES
+    }
+
+    async def semantic(query: str) -> List[int]:
+        return list(await backend.semantic(query))
+
+    async def hybrid(query: str) -> List[int]:
+        return (await backend.hybrid(query))[0]
+
+    async def ranked(query: str) -> List[int]:
+        candidate_ids, scores = await backend.hybrid(query)
+        products = [catalog.product(products_by_id[pid]) for pid in candidate_ids[:RANK_DEPTH]]
+        ranked_products = ranking_service.rank_products(products, scores, features=features, **preferences[query])
+        return [rp.product.id for rp in ranked_products]
+
+    setup_start = time.perf_counter()
+    await backend.setup()
+    setup_seconds = time.perf_counter() - setup_start
+    try:
+        latency, relevance = {}, {}
+        for name, stage in (
+            ("semantic", semantic),
+            ("keyword", backend.keyword),
+            ("hybrid", hybrid),
+            ("ranking", ranked),
+        ):
+            latency[name], results = await run_stage(name, stage, queries, args.repeat)
+            relevance[name] = relevance_summary(results, relevant)
+    finally:
+        await backend.teardown()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "backend": backend.name + (" (db scan)" if getattr(backend, "db_scan", False) else ""),
+            "products": args.products,
+            "dimension": args.dimension,
+            "seed": args.seed,
+            "queries": len(queries),
+            "repeat": args.repeat,
+        },
+        "catalog": {
+            "build_seconds": round(build_seconds, 2),
+            "setup_seconds": round(setup_seconds, 2),
+            "embeddings_mb": round(catalog.embeddings.nbytes / 1e6, 1),
+            "relevant_per_query": round(float(np.mean([len(ids) for ids in relevant.values()])), 1),
+        },
+        "latency": latency,
+        "relevance": relevance,
+        "process": {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+    print("\n" + "=" * 60)
+    print(f"SEARCH BENCHMARK  ({args.products} products, dim={args.dimension}, backend={report['meta']['backend']})")
+    print("=" * 60)
+    print(f"{'stage':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'qps':>9}{'P@10':>8}{'P@100':>8}{'MRR':>8}{'NDCG@10':>9}")
+    for name, summary in latency.items():
+        metrics = relevance[name]
+        print(
+            f"{name:<10}{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}{summary['qps']:>9.1f}"
+            f"{metrics['precision_at_10']:>8.3f}{metrics['precision_at_100']:>8.3f}{metrics['mrr']:>8.3f}{metrics['ndcg_at_10']:>9.3f}"
+        )
+    print(f"Catalog build: {build_seconds:.1f}s, max RSS: {report['process']['max_rss_mb']:.0f} MB")
+    if args.compare:
+        print("-" * 60)
+        for line in compare_reports(json.loads(Path(args.compare).read_text()), report):
+            print(line)
+    print(f"Report: {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
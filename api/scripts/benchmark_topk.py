@@ -0,0 +1,119 @@
+"""
+Latency and memory of the semantic-search DB-scan scoring: full sort vs streaming top-k.
+
+Builds a synthetic catalog of binary embeddings (as stored in
+products.embedding_vector) split into result partitions, then scores it the
+old way (decode every row, stack one matrix, full argsort) and the streaming
+way (search_service._score_chunk into a StreamingTopK per partition) for
+each k. Reports p50 latency, the tracemalloc peak of one run and the
+process max RSS, and checks both return the same ids.
+
+Usage:
+    python scripts/benchmark_topk.py [--products 100000] [--k 20,200,10000] [--repeat 5]
+"""
+import argparse
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from services.embedding_codec import encode_embedding, read_embedding
+from services.search_service import SCAN_CHUNK_SIZE, _score_chunk
+from services.topk import StreamingTopK
+
+
+def build_partitions(n: int, dimension: int, chunk_size: int, seed: int = 0) -> List[List[Tuple[int, bytes, None]]]:
+    rng = np.random.default_rng(seed)
+    partitions = []
+    for start in range(0, n, chunk_size):
+        vectors = rng.normal(size=(min(chunk_size, n - start), dimension)).astype(np.float32)
+        partitions.append([(start + i + 1, encode_embedding(vector), None) for i, vector in enumerate(vectors)])
+    return partitions
+
+
+def full_sort(partitions, query: np.ndarray, k: int) -> List[int]:
+    """Previous DB-scan path: materialize every row, score once, sort everything."""
+    product_ids, embeddings = [], []
+    for rows in partitions:
+        for product_id, embedding_vector, embedding_json in rows:
+            product_ids.append(product_id)
+            embeddings.append(read_embedding(embedding_vector, embedding_json))
+    matrix = np.stack(embeddings).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1
+    scores = (matrix @ query) / norms
+    order = np.argsort(scores)[::-1][:k]
+    return [product_ids[i] for i in order]
+
+
+def streaming(partitions, query: np.ndarray, k: int) -> List[int]:
+    top = StreamingTopK(k)
+    for rows in partitions:
+        _score_chunk(rows, query, top)
+    return [product_id for product_id, _ in top]
+
+
+def measure(fn: Callable[[], List[int]], repeat: int) -> Tuple[float, float, List[int]]:
+    """(p50 ms, tracemalloc peak MB, result) - the peak is taken from a separate traced run."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples), peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-sort vs streaming top-k semantic scoring")
+    parser.add_argument("--products", type=int, default=100000, help="Synthetic catalog size (default: 100000)")
+    parser.add_argument("--k", type=str, default="20,200,10000", help="Result sizes (default: 20,200,10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per k (default: 5)")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (default: 768)")
+    parser.add_argument(
+        "--chunk-size", type=int, default=SCAN_CHUNK_SIZE, help=f"Rows per partition (default: {SCAN_CHUNK_SIZE})"
+    )
+    args = parser.parse_args()
+
+    partitions = build_partitions(args.products, args.dimension, args.chunk_size)
+    query = np.random.default_rng(1).normal(size=args.dimension).astype(np.float32)
+    query /= np.linalg.norm(query)
+
+    lines = []
+    for k in [int(s) for s in args.k.split(",") if s]:
+        full_ms, full_mb, full_ids = measure(lambda: full_sort(partitions, query, k), args.repeat)
+        stream_ms, stream_mb, stream_ids = measure(lambda: streaming(partitions, query, k), args.repeat)
+        same = len(set(full_ids) ^ set(stream_ids)) == 0
+        lines.append((k, full_ms, stream_ms, full_mb, stream_mb, same))
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print("\n" + "=" * 76)
+    print(
+        f"SEMANTIC TOP-K  (p50 of {args.repeat} runs, {args.products} products, dim={args.dimension}, chunk={args.chunk_size})"
+    )
+    print("=" * 76)
+    print(f"{'k':>7}{'full ms':>11}{'stream ms':>11}{'speedup':>9}{'full peak MB':>15}{'stream peak MB':>17}{'same':>6}")
+    for k, full_ms, stream_ms, full_mb, stream_mb, same in lines:
+        speedup = full_ms / stream_ms if stream_ms else 0.0
+        print(
+            f"{k:>7}{full_ms:>11.1f}{stream_ms:>11.1f}{speedup:>8.1f}x{full_mb:>15.1f}{stream_mb:>17.1f}{'yes' if same else 'NO':>6}"
+        )
+    print(f"Process max RSS: {max_rss_mb:.0f} MB (includes the synthetic catalog)")
+    print("=" * 76)
+
+
+if __name__ == "__main__":
+    main()
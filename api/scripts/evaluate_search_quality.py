@@ -6,23 +6,34 @@ and computes standard IR metrics: Precision@K, Recall@K, MRR, NDCG.
 
 Usage:
     python scripts/evaluate_search_quality.py [--threshold 0.7]
+
+    # recall@k / memory / latency of float16 and int8 index storage vs float32
+    python scripts/evaluate_search_quality.py --quantization-report
+
+    # /products/search hybrid retrieval: RRF vs the previous merge order, p95 latency, bytes fetched
+    python scripts/evaluate_search_quality.py --hybrid-report
 """
 import argparse
 import asyncio
-import json
 import logging
 import sys
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import create_engine, text
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from core.config import settings
+from services.embedding_codec import read_embedding
+from services.embedding_index import EmbeddingIndex
 from services.embedding_service import get_embedding_service
+from services.hybrid_search import FUSION_CONCAT, FUSION_RRF, hybrid_candidates, hydrate_products
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -181,30 +192,32 @@ class SearchQualityEvaluator:
             if not query_embedding:
                 return []
 
-            # Get products with embeddings
+            # Get products with embeddings (binary column, JSON only for rows not yet backfilled)
             result = session.execute(
                 text("""
-                    SELECT id, embedding, name, primary_style
+                    SELECT id, embedding_vector,
+                           CASE WHEN embedding_vector IS NULL THEN embedding END,
+                           name, primary_style
                     FROM products
                     WHERE is_available = true
-                    AND embedding IS NOT NULL
+                    AND (embedding_vector IS NOT NULL OR embedding IS NOT NULL)
                     LIMIT 1000
                 """)
             )
             rows = result.fetchall()
 
+            query_vec = np.asarray(query_embedding, dtype=np.float32)
+            query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+
             # Calculate similarities
             results = []
-            for product_id, embedding_json, name, style in rows:
-                try:
-                    product_embedding = json.loads(embedding_json)
-                    similarity = self.embedding_service.compute_cosine_similarity(
-                        query_embedding,
-                        product_embedding
-                    )
-                    results.append((product_id, similarity, name, style))
-                except Exception:
+            for product_id, embedding_vector, embedding_json, name, style in rows:
+                product_embedding = read_embedding(embedding_vector, embedding_json)
+                if product_embedding is None or product_embedding.shape != query_vec.shape:
                     continue
+                norm = np.linalg.norm(product_embedding)
+                similarity = float(product_embedding @ query_vec / norm) if norm else 0.0
+                results.append((product_id, similarity, name, style))
 
             # Sort by similarity
             results.sort(key=lambda x: x[1], reverse=True)
@@ -339,6 +352,126 @@ class SearchQualityEvaluator:
         }
 
 
+    def load_index_rows(self) -> List[Tuple]:
+        """Every product embedding as EmbeddingIndex rows (full precision)."""
+        session = self.Session()
+        try:
+            result = session.execute(
+                text("""
+                    SELECT id, embedding_vector,
+                           CASE WHEN embedding_vector IS NULL THEN embedding END,
+                           category_id, source_website, price, is_available
+                    FROM products
+                    WHERE embedding_vector IS NOT NULL OR embedding IS NOT NULL
+                """)
+            )
+            return [
+                (product_id, read_embedding(vector, embedding_json), category_id, store, price, available)
+                for product_id, vector, embedding_json, category_id, store, price, available in result.fetchall()
+            ]
+        finally:
+            session.close()
+
+    async def evaluate_quantization(self, k: int = 10) -> Dict:
+        """Compare float16/int8 index storage (with exact re-rank) against float32 on the golden queries."""
+        rows = self.load_index_rows()
+        full_vectors = {row[0]: row[1] for row in rows if row[1] is not None}
+
+        indexes = {}
+        for mode in ("none", "float16", "int8"):
+            index = EmbeddingIndex(quantization=mode)
+            index.upsert_rows(rows)
+            indexes[mode] = index
+
+        query_embeddings = []
+        for test_case in SEARCH_TEST_CASES:
+            embedding = await self.embedding_service.get_query_embedding(test_case["query"])
+            if embedding:
+                query_embeddings.append(embedding)
+
+        exact_results = [indexes["none"].search(q, limit=k) for q in query_embeddings]
+
+        report = {}
+        for mode, index in indexes.items():
+            recalls, timings = [], []
+            for query_embedding, expected in zip(query_embeddings, exact_results):
+                start = time.perf_counter()
+                if mode == "none":
+                    result = index.search(query_embedding, limit=k)
+                else:
+                    shortlist = index.search(query_embedding, limit=max(k, index.rerank_depth))
+                    result = index.rerank(query_embedding, shortlist, full_vectors, k)
+                timings.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(set(result) & set(expected)) / len(expected) if expected else 1.0)
+            report[mode] = {
+                "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else 0.0,
+                "memory_mb": index.stats()["memory_mb"],
+                "p50_ms": round(float(np.percentile(timings, 50)), 2) if timings else 0.0,
+                "p95_ms": round(float(np.percentile(timings, 95)), 2) if timings else 0.0,
+            }
+
+        return {"k": k, "rows": len(indexes["none"]), "num_queries": len(query_embeddings), "modes": report}
+
+    async def evaluate_hybrid(self, k: int = 10, page_size: int = 50, repeat: int = 3) -> Dict:
+        """
+        /products/search retrieval per fusion mode: relevance metrics, p50/p95
+        latency and approximate bytes fetched (candidates + first page).
+        """
+        engine = create_async_engine(self.database_url.replace("postgresql://", "postgresql+asyncpg://"))
+        AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        report = {}
+        try:
+            for fusion in (FUSION_CONCAT, FUSION_RRF):
+                metrics = {"precision_at_k": [], "recall_at_k": [], "mrr": [], "ndcg_at_k": []}
+                timings, fetched = [], []
+                for test_case in SEARCH_TEST_CASES:
+                    relevant_ids = self.find_relevant_products(test_case)
+                    for _ in range(repeat):
+                        async with AsyncSessionLocal() as db:
+                            start = time.perf_counter()
+                            candidates = await hybrid_candidates(test_case["query"], db, fusion=fusion)
+                            page = await hydrate_products(candidates.ordered_ids[:page_size], db)
+                            timings.append((time.perf_counter() - start) * 1000)
+                        fetched.append(candidates.bytes_fetched + sum(_orm_bytes(product) for product in page))
+                    if not relevant_ids:
+                        continue
+                    retrieved_ids = candidates.ordered_ids
+                    metrics["precision_at_k"].append(precision_at_k(relevant_ids, retrieved_ids, k))
+                    metrics["recall_at_k"].append(recall_at_k(relevant_ids, retrieved_ids, k))
+                    metrics["mrr"].append(mean_reciprocal_rank(relevant_ids, retrieved_ids))
+                    metrics["ndcg_at_k"].append(ndcg_at_k(relevant_ids, retrieved_ids, k))
+
+                report[fusion] = {
+                    **{metric: round(float(np.mean(values)), 3) if values else 0.0 for metric, values in metrics.items()},
+                    "p50_ms": round(float(np.percentile(timings, 50)), 1),
+                    "p95_ms": round(float(np.percentile(timings, 95)), 1),
+                    "kb_per_request": round(float(np.mean(fetched)) / 1024, 1),
+                }
+        finally:
+            await engine.dispose()
+
+        return {"k": k, "page_size": page_size, "num_queries": len(SEARCH_TEST_CASES), "modes": report}
+
+
+def _orm_bytes(product) -> int:
+    """Approximate size of a hydrated product row plus its images (8 bytes per non-string value)."""
+    total = 0
+    for obj in [product] + list(product.images or []):
+        unloaded = inspect(obj).unloaded  # Deferred columns (search_vector) are not fetched
+        for column in obj.__table__.columns:
+            if column.key in unloaded:
+                continue
+            value = getattr(obj, column.key, None)
+            if isinstance(value, str):
+                total += len(value.encode("utf-8"))
+            elif isinstance(value, (bytes, bytearray)):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+
 # =====================================================================
 # MAIN
 # =====================================================================
@@ -366,6 +499,16 @@ async def main():
         default=None,
         help="Database URL (default: from settings)"
     )
+    parser.add_argument(
+        "--quantization-report",
+        action="store_true",
+        help="Report recall@K, memory and latency of quantized index storage instead"
+    )
+    parser.add_argument(
+        "--hybrid-report",
+        action="store_true",
+        help="Report relevance, p95 latency and bytes fetched of /products/search hybrid retrieval (RRF vs previous merge)"
+    )
 
     args = parser.parse_args()
 
@@ -376,6 +519,31 @@ async def main():
 
     evaluator = SearchQualityEvaluator(database_url)
 
+    if args.quantization_report:
+        report = await evaluator.evaluate_quantization(k=args.k)
+        print("=" * 60)
+        print(f"QUANTIZED INDEX REPORT (rows={report['rows']}, queries={report['num_queries']}, K={report['k']})")
+        print("=" * 60)
+        print("Latency covers scan + re-rank; the re-rank DB fetch is not included.")
+        print(f"{'mode':<10}{'recall@K':>10}{'memory MB':>12}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode, line in report["modes"].items():
+            print(f"{mode:<10}{line['recall_at_k']:>10.4f}{line['memory_mb']:>12.1f}{line['p50_ms']:>10.2f}{line['p95_ms']:>10.2f}")
+        return
+
+    if args.hybrid_report:
+        report = await evaluator.evaluate_hybrid(k=args.k)
+        print("=" * 60)
+        print(f"HYBRID RETRIEVAL REPORT (queries={report['num_queries']}, K={report['k']}, page={report['page_size']})")
+        print("=" * 60)
+        print("concat = previous order (semantic hits, then keyword-only hits); rrf = reciprocal rank fusion")
+        print(f"{'fusion':<8}{'P@K':>7}{'R@K':>7}{'MRR':>7}{'NDCG':>7}{'p50 ms':>9}{'p95 ms':>9}{'KB/req':>9}")
+        for fusion, line in report["modes"].items():
+            print(
+                f"{fusion:<8}{line['precision_at_k']:>7.3f}{line['recall_at_k']:>7.3f}{line['mrr']:>7.3f}"
+                f"{line['ndcg_at_k']:>7.3f}{line['p50_ms']:>9.1f}{line['p95_ms']:>9.1f}{line['kb_per_request']:>9.1f}"
+            )
+        return
+
     print("=" * 60)
     print("SEARCH QUALITY EVALUATION")
     print("=" * 60)
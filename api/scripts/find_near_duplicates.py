@@ -0,0 +1,163 @@
+"""
+Find near-duplicate products and rebuild the product_duplicates table.
+
+Loads the name and brand of every product in id-keyset pages, runs the
+MinHash/LSH engine (services/near_duplicates.py) over the whole catalog in
+memory, and replaces the product_duplicates clusters in one transaction.
+With --confirm-embeddings, pairs of products that both have an embedding must
+also reach --cosine-threshold (vectors read from an EmbeddingIndex load).
+
+Usage:
+    python scripts/find_near_duplicates.py [--threshold 0.8] [--confirm-embeddings]
+    python scripts/find_near_duplicates.py --dry-run --show 20
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from database.models import Product
+from services.duplicate_clusters import DUPLICATES_VERSION, cluster_rows, write_duplicate_clusters
+from services.embedding_index import EmbeddingIndex
+from services.embedding_service import EmbeddingService
+from services.near_duplicates import DEFAULT_COSINE_THRESHOLD, DEFAULT_THRESHOLD, find_near_duplicates
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20000
+
+
+class IndexVectors:
+    """Row-indexable view of the index vectors of ``product_ids`` (rows without an embedding read index row 0)."""
+
+    def __init__(self, index: EmbeddingIndex, product_ids: np.ndarray):
+        index_row = {product_id: row for row, product_id in enumerate(index.product_ids.tolist())}
+        rows = np.array([index_row.get(product_id, -1) for product_id in product_ids.tolist()], dtype=np.int64)
+        self.has_vector = rows >= 0
+        self.index_rows = np.maximum(rows, 0)
+        self.index = index
+
+    def __getitem__(self, rows: np.ndarray) -> np.ndarray:
+        return self.index.decoded_vectors(self.index_rows[rows])
+
+
+async def load_products(Session) -> Tuple[np.ndarray, List[str], List[Optional[str]]]:
+    """(ids, names, brands) of every product, in id-keyset pages."""
+    ids, names, brands = [], [], []
+    last_id = 0
+    async with Session() as db:
+        while True:
+            query = (
+                select(Product.id, Product.name, Product.brand)
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(PAGE_SIZE)
+            )
+            rows = (await db.execute(query)).fetchall()
+            if not rows:
+                break
+            for product_id, name, brand in rows:
+                ids.append(product_id)
+                names.append(name)
+                brands.append(brand)
+            last_id = rows[-1][0]
+    return np.array(ids, dtype=np.int64), names, brands
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate products (MinHash/LSH) and store their clusters")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Name shingle Jaccard (default: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument("--confirm-embeddings", action="store_true", help="Also require embedding cosine for embedded pairs")
+    parser.add_argument(
+        "--cosine-threshold",
+        type=float,
+        default=DEFAULT_COSINE_THRESHOLD,
+        help=f"Embedding cosine (default: {DEFAULT_COSINE_THRESHOLD})",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report the clusters without writing them")
+    parser.add_argument("--show", type=int, default=0, help="Print this many of the largest clusters")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"), pool_pre_ping=True)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        start_time = time.time()
+        computed_at = datetime.utcnow()
+        product_ids, names, brands = await load_products(Session)
+        logger.info(f"Loaded {len(product_ids)} products")
+
+        vectors = None
+        if args.confirm_embeddings:
+            index = EmbeddingIndex(dimension=EmbeddingService.EMBEDDING_DIMENSION)
+            async with Session() as db:
+                await index.load(db)
+            vectors = IndexVectors(index, product_ids)
+            logger.info(f"{int(vectors.has_vector.sum())} products have an embedding")
+
+        detect_start = time.time()
+        result = find_near_duplicates(
+            names,
+            brands,
+            vectors=vectors,
+            has_vector=vectors.has_vector if vectors is not None else None,
+            threshold=args.threshold,
+            cosine_threshold=args.cosine_threshold,
+        )
+        detect_seconds = time.time() - detect_start
+        rows = cluster_rows(product_ids, result)
+
+        written = 0
+        if not args.dry_run:
+            async with Session() as db:
+                written = await write_duplicate_clusters(rows, db, computed_at)
+        elapsed = time.time() - start_time
+    finally:
+        await engine.dispose()
+
+    clusters = result.clusters()
+    if args.show:
+        print("\nLargest clusters:")
+        for cluster in sorted(clusters, key=len, reverse=True)[: args.show]:
+            print(f"  [{len(cluster)}]")
+            for row in cluster[:5]:
+                print(f"    {product_ids[row]}: {names[row]} ({brands[row] or '-'})")
+
+    print("\n" + "=" * 60)
+    print("NEAR-DUPLICATE DETECTION SUMMARY")
+    print("=" * 60)
+    print(f"Detector version:   {DUPLICATES_VERSION}")
+    print(f"Products:           {len(product_ids)}")
+    print(f"Candidate pairs:    {result.candidates}")
+    print(f"Confirmed pairs:    {len(result.pairs)}")
+    print(f"Clusters:           {len(clusters)} ({len(rows)} products)")
+    print(f"Rows written:       {written}" + (" (dry run)" if args.dry_run else ""))
+    print(f"Detection:          {detect_seconds:.1f}s")
+    print(f"Elapsed:            {elapsed:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
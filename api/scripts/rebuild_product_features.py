@@ -0,0 +1,130 @@
+"""
+Rebuild the precomputed ranking features (product_features table).
+
+Modes:
+- default: recompute every product, in id-ordered pages
+- --stale: recompute only products whose row is missing, built by an older
+  FEATURES_VERSION, or whose name / styles / attributes no longer match
+  the row's source_hash
+- --check: report how many rows are stale and exit 1 if any (no writes),
+  for cron / deploy checks
+
+Each page costs one product read, one attribute read and one upsert.
+
+Usage:
+    python scripts/rebuild_product_features.py [--batch-size 1000] [--limit 5000]
+    python scripts/rebuild_product_features.py --stale
+    python scripts/rebuild_product_features.py --check
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from database.models import Product
+from services.product_features import FEATURES_VERSION, rebuild_product_features, stale_product_ids_query
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def count_stale(Session) -> int:
+    async with Session() as db:
+        result = await db.execute(select(func.count()).select_from(stale_product_ids_query().subquery()))
+        return result.scalar() or 0
+
+
+async def select_product_ids(Session, stale_only: bool, limit: Optional[int]) -> List[int]:
+    async with Session() as db:
+        if stale_only:
+            result = await db.execute(stale_product_ids_query(limit))
+        else:
+            query = select(Product.id).order_by(Product.id)
+            if limit:
+                query = query.limit(limit)
+            result = await db.execute(query)
+        return list(result.scalars().all())
+
+
+async def rebuild(Session, product_ids: List[int], batch_size: int) -> dict:
+    stats = {"processed": 0, "written": 0, "failed_pages": 0}
+    total_pages = (len(product_ids) + batch_size - 1) // batch_size
+
+    for page, start in enumerate(range(0, len(product_ids), batch_size), 1):
+        page_ids = product_ids[start : start + batch_size]
+        async with Session() as db:
+            try:
+                stats["written"] += await rebuild_product_features(page_ids, db)
+            except Exception as e:
+                await db.rollback()
+                stats["failed_pages"] += 1
+                logger.error(f"Page {page}/{total_pages} failed: {e}")
+        stats["processed"] += len(page_ids)
+        logger.info(f"Page {page}/{total_pages}: {stats['processed']}/{len(product_ids)} products")
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild precomputed product ranking features")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Products per page / upsert (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of products to rebuild")
+    parser.add_argument("--stale", action="store_true", help="Only rebuild missing or stale rows")
+    parser.add_argument("--check", action="store_true", help="Report the number of stale rows and exit 1 if any")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"), pool_pre_ping=True)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        if args.check:
+            stale = await count_stale(Session)
+            print(f"Stale product features (version {FEATURES_VERSION}): {stale}")
+            sys.exit(1 if stale else 0)
+
+        start_time = time.time()
+        product_ids = await select_product_ids(Session, stale_only=args.stale, limit=args.limit)
+        logger.info(f"Rebuilding features for {len(product_ids)} products ({'stale only' if args.stale else 'all'})")
+        stats = await rebuild(Session, product_ids, args.batch_size)
+        elapsed = time.time() - start_time
+    finally:
+        await engine.dispose()
+
+    print("\n" + "=" * 60)
+    print("PRODUCT FEATURES REBUILD SUMMARY")
+    print("=" * 60)
+    print(f"Features version:   {FEATURES_VERSION}")
+    print(f"Products processed: {stats['processed']}")
+    print(f"Rows written:       {stats['written']}")
+    print(f"Failed pages:       {stats['failed_pages']}")
+    print(f"Elapsed:            {elapsed:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
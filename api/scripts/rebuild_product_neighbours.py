@@ -0,0 +1,147 @@
+"""
+Rebuild the precomputed "similar items" lists (product_neighbours table).
+
+Loads every product embedding into an EmbeddingIndex, then computes each
+product's nearest neighbours within its category (price-band aware) with
+one matrix product per block of products.
+
+Modes:
+- default: recompute every embedded product, in pages
+- --stale: incremental refresh for products added, re-embedded or moved to
+  another category since their list was computed: recomputes their lists,
+  the lists that contain them and the lists they now enter
+- --check: report how many products are stale and exit 1 if any (no writes),
+  for cron / deploy checks
+
+Usage:
+    python scripts/rebuild_product_neighbours.py [--neighbours 24] [--price-band 2.0]
+    python scripts/rebuild_product_neighbours.py --stale
+    python scripts/rebuild_product_neighbours.py --check
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from services.embedding_index import EmbeddingIndex
+from services.embedding_service import EmbeddingService
+from services.product_neighbours import (
+    DEFAULT_NEIGHBOURS,
+    NEIGHBOURS_VERSION,
+    PRICE_BAND,
+    affected_product_ids,
+    rebuild_product_neighbours,
+    stale_product_ids_query,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def count_stale(Session) -> int:
+    async with Session() as db:
+        result = await db.execute(select(func.count()).select_from(stale_product_ids_query().subquery()))
+        return result.scalar() or 0
+
+
+async def rebuild(Session, index: EmbeddingIndex, product_ids: List[int], computed_at: datetime, args) -> dict:
+    stats = {"processed": 0, "written": 0, "failed_pages": 0}
+    total_pages = (len(product_ids) + args.batch_size - 1) // args.batch_size
+
+    for page, start in enumerate(range(0, len(product_ids), args.batch_size), 1):
+        page_ids = product_ids[start : start + args.batch_size]
+        async with Session() as db:
+            try:
+                stats["written"] += await rebuild_product_neighbours(
+                    index, page_ids, db, computed_at, limit=args.neighbours, price_band=args.price_band
+                )
+            except Exception as e:
+                await db.rollback()
+                stats["failed_pages"] += 1
+                logger.error(f"Page {page}/{total_pages} failed: {e}")
+        stats["processed"] += len(page_ids)
+        logger.info(f"Page {page}/{total_pages}: {stats['processed']}/{len(product_ids)} products")
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild precomputed product neighbour lists")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Products per page / upsert (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--neighbours", type=int, default=DEFAULT_NEIGHBOURS, help=f"Neighbours per product (default: {DEFAULT_NEIGHBOURS})"
+    )
+    parser.add_argument("--price-band", type=float, default=PRICE_BAND, help=f"Price band factor (default: {PRICE_BAND})")
+    parser.add_argument("--stale", action="store_true", help="Only refresh products added or re-embedded since")
+    parser.add_argument("--check", action="store_true", help="Report the number of stale products and exit 1 if any")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"), pool_pre_ping=True)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        if args.check:
+            stale = await count_stale(Session)
+            print(f"Stale product neighbours (version {NEIGHBOURS_VERSION}): {stale}")
+            sys.exit(1 if stale else 0)
+
+        start_time = time.time()
+        # Lists are as fresh as the index: products re-embedded during the run stay stale for the next one
+        computed_at = datetime.utcnow()
+        index = EmbeddingIndex(dimension=EmbeddingService.EMBEDDING_DIMENSION)
+        async with Session() as db:
+            await index.load(db)
+            if args.stale:
+                changed = list((await db.execute(stale_product_ids_query())).scalars().all())
+                product_ids = await affected_product_ids(index, changed, db, args.neighbours, args.price_band)
+                logger.info(f"{len(changed)} stale products affect {len(product_ids)} neighbour lists")
+            else:
+                changed = []
+                product_ids = index.product_ids.tolist()
+        stats = await rebuild(Session, index, product_ids, computed_at, args)
+        elapsed = time.time() - start_time
+    finally:
+        await engine.dispose()
+
+    print("\n" + "=" * 60)
+    print("PRODUCT NEIGHBOURS REBUILD SUMMARY")
+    print("=" * 60)
+    print(f"Neighbours version: {NEIGHBOURS_VERSION}")
+    print(f"Index rows:         {len(index)}")
+    if args.stale:
+        print(f"Stale products:     {len(changed)}")
+    print(f"Lists processed:    {stats['processed']}")
+    print(f"Rows written:       {stats['written']}")
+    print(f"Failed pages:       {stats['failed_pages']}")
+    print(f"Elapsed:            {elapsed:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Backfill / re-run the product-type and accessory classification (products.product_type,
+products.is_accessory, products.classification_version).
+
+Modes:
+- default: reclassify every product, in id-ordered pages
+- --stale: only products never classified or classified by an older
+  CLASSIFICATION_VERSION (run this after bumping the version)
+- --check: report how many products need classification and exit 1 if any
+  (no writes), for cron / deploy checks
+
+Each page costs one product read and one executemany update; progress is
+logged per page with the running product, accessory and changed counts.
+
+Usage:
+    python scripts/reclassify_products.py [--batch-size 2000] [--limit 5000]
+    python scripts/reclassify_products.py --stale
+    python scripts/reclassify_products.py --check
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from database.models import Product
+from services.product_classification import CLASSIFICATION_VERSION, reclassify_products, unclassified_product_ids_query
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+async def count_unclassified(Session) -> int:
+    async with Session() as db:
+        result = await db.execute(select(func.count()).select_from(unclassified_product_ids_query().subquery()))
+        return result.scalar() or 0
+
+
+async def select_product_ids(Session, stale_only: bool, limit: Optional[int]) -> List[int]:
+    async with Session() as db:
+        if stale_only:
+            result = await db.execute(unclassified_product_ids_query(limit))
+        else:
+            query = select(Product.id).order_by(Product.id)
+            if limit:
+                query = query.limit(limit)
+            result = await db.execute(query)
+        return list(result.scalars().all())
+
+
+async def reclassify(Session, product_ids: List[int], batch_size: int) -> dict:
+    stats = {"processed": 0, "classified": 0, "accessories": 0, "changed": 0, "failed_pages": 0}
+    total_pages = (len(product_ids) + batch_size - 1) // batch_size
+    start_time = time.time()
+
+    for page, start in enumerate(range(0, len(product_ids), batch_size), 1):
+        page_ids = product_ids[start : start + batch_size]
+        async with Session() as db:
+            try:
+                counts = await reclassify_products(page_ids, db)
+                for key, value in counts.items():
+                    stats[key] += value
+            except Exception as e:
+                await db.rollback()
+                stats["failed_pages"] += 1
+                logger.error(f"Page {page}/{total_pages} failed: {e}")
+        stats["processed"] += len(page_ids)
+        rate = stats["processed"] / max(time.time() - start_time, 1e-6)
+        logger.info(
+            f"Page {page}/{total_pages}: {stats['processed']}/{len(product_ids)} products "
+            f"({stats['accessories']} accessories, {stats['changed']} changed, {rate:.0f}/s)"
+        )
+
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Classify product types and accessories")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Products per page / update (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of products to classify")
+    parser.add_argument("--stale", action="store_true", help="Only classify unclassified or outdated products")
+    parser.add_argument("--check", action="store_true", help="Report the number of unclassified products and exit 1 if any")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"), pool_pre_ping=True)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        if args.check:
+            unclassified = await count_unclassified(Session)
+            print(f"Unclassified products (version {CLASSIFICATION_VERSION}): {unclassified}")
+            sys.exit(1 if unclassified else 0)
+
+        start_time = time.time()
+        product_ids = await select_product_ids(Session, stale_only=args.stale, limit=args.limit)
+        logger.info(f"Classifying {len(product_ids)} products ({'stale only' if args.stale else 'all'})")
+        stats = await reclassify(Session, product_ids, args.batch_size)
+        elapsed = time.time() - start_time
+    finally:
+        await engine.dispose()
+
+    print("\n" + "=" * 60)
+    print("PRODUCT CLASSIFICATION SUMMARY")
+    print("=" * 60)
+    print(f"Classification version: {CLASSIFICATION_VERSION}")
+    print(f"Products processed:     {stats['processed']}")
+    print(f"Products classified:    {stats['classified']}")
+    print(f"Accessories:            {stats['accessories']}")
+    print(f"Changed:                {stats['changed']}")
+    print(f"Failed pages:           {stats['failed_pages']}")
+    print(f"Elapsed:                {elapsed:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
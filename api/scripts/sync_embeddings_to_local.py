@@ -5,7 +5,7 @@ This copies embedding data for products that exist in both databases.
 import asyncio
 import os
 import sys
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import asyncpg
 
@@ -16,20 +16,25 @@ LOCAL_DB_URL = os.environ.get("LOCAL_DATABASE_URL", "postgresql://sahityapandiri
 BATCH_SIZE = 500
 
 
-async def get_prod_embeddings(prod_conn: asyncpg.Connection, external_ids: List[str]) -> Dict[str, Tuple[str, str]]:
-    """Fetch embeddings from production for given external_ids."""
+async def get_prod_embeddings(
+    prod_conn: asyncpg.Connection, external_ids: List[str]
+) -> Dict[str, Tuple[Optional[str], Optional[bytes], str, Optional[str]]]:
+    """Fetch embeddings (legacy JSON + binary float32 + content hash) from production for given external_ids."""
     if not external_ids:
         return {}
 
     rows = await prod_conn.fetch(
         """
-        SELECT external_id, embedding, embedding_text
+        SELECT external_id, embedding, embedding_vector, embedding_text, embedding_hash
         FROM products
-        WHERE external_id = ANY($1) AND embedding IS NOT NULL
+        WHERE external_id = ANY($1) AND (embedding IS NOT NULL OR embedding_vector IS NOT NULL)
         """,
         external_ids,
     )
-    return {row["external_id"]: (row["embedding"], row["embedding_text"]) for row in rows}
+    return {
+        row["external_id"]: (row["embedding"], row["embedding_vector"], row["embedding_text"], row["embedding_hash"])
+        for row in rows
+    }
 
 
 async def sync_embeddings():
@@ -47,7 +52,7 @@ async def sync_embeddings():
             """
             SELECT id, external_id, source_website
             FROM products
-            WHERE embedding IS NULL AND external_id IS NOT NULL
+            WHERE embedding IS NULL AND embedding_vector IS NULL AND external_id IS NOT NULL
             ORDER BY source_website, id
             """
         )
@@ -78,15 +83,18 @@ async def sync_embeddings():
             for product in batch:
                 ext_id = product["external_id"]
                 if ext_id in prod_embeddings:
-                    embedding, embedding_text = prod_embeddings[ext_id]
+                    embedding, embedding_vector, embedding_text, embedding_hash = prod_embeddings[ext_id]
                     await local_conn.execute(
                         """
                         UPDATE products
-                        SET embedding = $1, embedding_text = $2, embedding_updated_at = NOW()
-                        WHERE id = $3
+                        SET embedding = $1, embedding_vector = $2, embedding_text = $3, embedding_hash = $4,
+                            embedding_updated_at = NOW()
+                        WHERE id = $5
                         """,
                         embedding,
+                        embedding_vector,
                         embedding_text,
+                        embedding_hash,
                         product["id"],
                     )
                     updated_count += 1
@@ -101,7 +109,7 @@ async def sync_embeddings():
             """
             SELECT source_website,
                    COUNT(*) as total,
-                   COUNT(embedding) as with_embeddings
+                   COUNT(COALESCE(embedding_vector, embedding::bytea)) as with_embeddings
             FROM products
             WHERE is_available = true
             GROUP BY source_website
@@ -0,0 +1,182 @@
+"""
+Train the local (CPU-only) query embedder and measure its recall against Gemini.
+
+Training pairs, read from the database:
+- every product's embedding_text with its stored Gemini document vector
+- every cached query (query_embeddings table) with its Gemini query vector,
+  weighted --query-weight times higher: short queries are what the local
+  path serves, and these pairs teach it the query side of the space
+
+The golden queries (evaluate_search_quality.SEARCH_TEST_CASES) are held out
+of training. For each of them the remote vector (query cache, else a Gemini call)
+and the local vector retrieve their top-k products from the catalog; the
+reported recall is the share of the remote top-k the local vector also
+returns, per query and on average.
+
+Usage:
+    python scripts/train_local_embedder.py --output /data/local_embedder.npz
+    python scripts/train_local_embedder.py --output local_embedder.npz --features 8192 --k 50
+Then set LOCAL_EMBEDDER_PATH to the output file.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from database.models import Product, QueryEmbedding
+from scripts.evaluate_search_quality import SEARCH_TEST_CASES
+from services.embedding_codec import decode_embedding, read_embedding
+from services.embedding_service import EmbeddingService
+from services.local_embedder import DEFAULT_FEATURES, LocalEmbedder, neighbour_recall
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 5000
+
+
+async def load_product_pairs(Session, limit: int = 0) -> Tuple[List[str], List[np.ndarray]]:
+    """(embedding_text, document vector) for every embedded product, in id-keyset pages."""
+    texts, vectors = [], []
+    last_id = 0
+    async with Session() as db:
+        while not limit or len(texts) < limit:
+            query = (
+                select(Product.id, Product.embedding_text, Product.embedding_vector, Product.embedding)
+                .where(Product.embedding_text.isnot(None), Product.id > last_id)
+                .order_by(Product.id)
+                .limit(PAGE_SIZE)
+            )
+            rows = (await db.execute(query)).fetchall()
+            if not rows:
+                break
+            for _, text, embedding_vector, embedding_json in rows:
+                vector = read_embedding(embedding_vector, embedding_json)
+                if vector is not None and vector.shape == (EmbeddingService.EMBEDDING_DIMENSION,):
+                    texts.append(text)
+                    vectors.append(vector)
+            last_id = rows[-1][0]
+    return texts[: limit or None], vectors[: limit or None]
+
+
+async def load_query_pairs(Session) -> Tuple[List[str], List[np.ndarray]]:
+    """(normalized query, query vector) from the durable query embedding cache for the current model."""
+    async with Session() as db:
+        result = await db.execute(
+            select(QueryEmbedding.query_text, QueryEmbedding.embedding).where(
+                QueryEmbedding.model == EmbeddingService.MODEL_NAME,
+                QueryEmbedding.dimension == EmbeddingService.EMBEDDING_DIMENSION,
+            )
+        )
+        pairs = [(text, decode_embedding(embedding)) for text, embedding in result.fetchall()]
+    pairs = [(text, vector) for text, vector in pairs if vector is not None]
+    return [text for text, _ in pairs], [vector for _, vector in pairs]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Train the local fallback query embedder")
+    parser.add_argument("--output", type=str, default=settings.local_embedder_path or "local_embedder.npz")
+    parser.add_argument(
+        "--features", type=int, default=DEFAULT_FEATURES, help=f"Hashed features, a power of two (default: {DEFAULT_FEATURES})"
+    )
+    parser.add_argument("--ridge", type=float, default=1.0, help="Ridge regularization (default: 1.0)")
+    parser.add_argument("--query-weight", type=float, default=4.0, help="Weight of cached query pairs (default: 4.0)")
+    parser.add_argument("--k", type=int, default=50, help="Top-k products compared for recall (default: 50)")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum product pairs (default: all)")
+    parser.add_argument("--database-url", type=str, default=None, help="Database URL (default: from settings)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.database_url
+    if not database_url:
+        logger.error("No database URL configured")
+        sys.exit(1)
+
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"), pool_pre_ping=True)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    golden = [case["query"].lower().strip() for case in SEARCH_TEST_CASES]
+    try:
+        product_texts, product_vectors = await load_product_pairs(Session, args.limit)
+        query_texts, query_vectors = await load_query_pairs(Session)
+        held_out = set(golden)
+        query_pairs = [(text, vector) for text, vector in zip(query_texts, query_vectors) if text not in held_out]
+        logger.info(f"Training pairs: {len(product_texts)} products, {len(query_pairs)} cached queries")
+        if not product_texts:
+            logger.error("No embedded products to train on")
+            sys.exit(1)
+    finally:
+        await engine.dispose()
+
+    # Remote vectors of the golden queries: query cache first, Gemini for the rest
+    cached = dict(zip(query_texts, query_vectors))
+    service = EmbeddingService()
+    remote = [
+        cached[query] if query in cached else await service.generate_embedding(query, "RETRIEVAL_QUERY") for query in golden
+    ]
+
+    start_time = time.time()
+    texts = product_texts + [text for text, _ in query_pairs]
+    targets = np.stack(product_vectors + [vector for _, vector in query_pairs])
+    weights = [1.0] * len(product_texts) + [args.query_weight] * len(query_pairs)
+    embedder = LocalEmbedder.fit(
+        texts,
+        targets,
+        weights=weights,
+        n_features=args.features,
+        ridge=args.ridge,
+        model=f"{EmbeddingService.MODEL_NAME}:{EmbeddingService.EMBEDDING_DIMENSION}",
+    )
+    train_seconds = time.time() - start_time
+    embedder.save(args.output)
+
+    corpus = np.stack(product_vectors)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    evaluated = [(query, vector) for query, vector in zip(golden, remote) if vector is not None]
+    local = [embedder.embed(query) for query, _ in evaluated]
+    evaluated = [
+        (query, vector, local_vector) for (query, vector), local_vector in zip(evaluated, local) if local_vector is not None
+    ]
+    recalls = np.array([])
+    if evaluated:
+        recalls = neighbour_recall(
+            np.stack([np.asarray(vector, dtype=np.float32) for _, vector, _ in evaluated]),
+            np.stack([local_vector for _, _, local_vector in evaluated]),
+            corpus,
+            args.k,
+        )
+
+    embed_start = time.perf_counter()
+    for query in golden * 20:
+        embedder.embed(query)
+    embed_ms = (time.perf_counter() - embed_start) * 1000 / (len(golden) * 20)
+
+    print("\n" + "=" * 60)
+    print("LOCAL EMBEDDER TRAINING SUMMARY")
+    print("=" * 60)
+    print(f"Output:              {args.output}")
+    print(f"Projection:          {embedder.n_features} x {embedder.dimension} ({embedder.projection.nbytes / 1e6:.1f} MB)")
+    print(f"Training pairs:      {len(product_texts)} products + {len(query_pairs)} queries")
+    print(f"Training time:       {train_seconds:.1f}s")
+    print(f"Local embed latency: {embed_ms:.3f} ms/query")
+    print(f"Golden queries:      {len(evaluated)}/{len(golden)} evaluated")
+    for (query, _, _), recall in zip(evaluated, recalls):
+        print(f"  {query:<40} recall@{args.k} {recall:.2f}")
+    if recalls.size:
+        print(f"Mean recall@{args.k} vs remote: {recalls.mean():.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""
+Approximate nearest-neighbour (IVF-flat) backend for the embedding index.
+
+A spherical k-means coarse quantizer partitions the pre-normalized product
+vectors into ``n_lists`` inverted lists. A query scores the centroids, probes
+the closest lists and runs the exact dot product only over rows in those
+lists, so per-query work drops from O(N) vector dot products to roughly
+O(N * nprobe / n_lists).
+
+Probing is filter-aware: lists are ranked among those that still hold rows
+passing the category/store/price mask, and probing continues past ``nprobe``
+until enough filtered candidates have been gathered for the requested limit.
+Selective filters therefore never come back short.
+
+The quantizer only stores centroids; per-row list assignments live next to
+the other filter columns in ``EmbeddingIndex`` so incremental upserts and
+compaction keep them aligned.
+
+Used by: services.embedding_index.EmbeddingIndex (optional backend).
+"""
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """Spherical k-means coarse quantizer with filter-aware list probing."""
+
+    # Format version of the saved .npz file
+    FORMAT_VERSION = 1
+
+    # Rows assigned per matrix product (bounds the N x n_lists score buffer)
+    ASSIGN_CHUNK_SIZE = 16384
+
+    # Gather at least this many filtered candidates per requested result
+    CANDIDATE_FACTOR = 4
+
+    def __init__(self, centroids: np.ndarray, trained_rows: int = 0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.trained_rows = trained_rows
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def dimension(self) -> int:
+        return int(self.centroids.shape[1])
+
+    @staticmethod
+    def default_n_lists(n_rows: int) -> int:
+        """sqrt(N) lists keeps both centroid scoring and list scans small."""
+        return max(1, min(n_rows, int(round(np.sqrt(n_rows)))))
+
+    # ------------------------------------------------------------------
+    # Build / persist
+    # ------------------------------------------------------------------
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+        max_train_rows: int = 50000,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Train centroids with spherical k-means on (a sample of) normalized vectors."""
+        start_time = time.time()
+        n_rows = vectors.shape[0]
+        if n_rows == 0:
+            raise ValueError("Cannot train an IVF index on zero vectors")
+        n_lists = min(n_lists or cls.default_n_lists(n_rows), n_rows)
+
+        rng = np.random.default_rng(seed)
+        if n_rows > max_train_rows:
+            sample = vectors[np.sort(rng.choice(n_rows, max_train_rows, replace=False))]
+        else:
+            sample = vectors
+        sample = np.asarray(sample, dtype=np.float32)
+
+        index = cls(sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy(), trained_rows=n_rows)
+        for _ in range(n_iter):
+            assignments = index.assign(sample)
+            sums = np.zeros_like(index.centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1)
+
+            # Re-seed empty lists with random training rows
+            empty = norms == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1)
+            norms[norms == 0] = 1.0
+            index.centroids = (sums / norms[:, None]).astype(np.float32)
+
+        logger.info(
+            f"[ANN INDEX] Trained {n_lists} lists on {sample.shape[0]}/{n_rows} vectors in {time.time() - start_time:.2f}s"
+        )
+        return index
+
+    def save(self, path: Union[str, Path]):
+        """Write centroids to ``path`` (.npz) atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                trained_rows=np.int64(self.trained_rows),
+                format_version=np.int64(self.FORMAT_VERSION),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "IVFIndex":
+        """Load centroids saved by :meth:`save`."""
+        with np.load(path) as data:
+            if int(data["format_version"]) != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported IVF index format in {path}")
+            return cls(data["centroids"], trained_rows=int(data["trained_rows"]))
+
+    # ------------------------------------------------------------------
+    # Assignment / probing
+    # ------------------------------------------------------------------
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest list for each (normalized) vector."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], self.ASSIGN_CHUNK_SIZE):
+            chunk = vectors[start : start + self.ASSIGN_CHUNK_SIZE]
+            assignments[start : start + chunk.shape[0]] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def probe(
+        self, query_vec: np.ndarray, row_lists: np.ndarray, candidate_rows: np.ndarray, limit: int, nprobe: int
+    ) -> np.ndarray:
+        """Restrict ``candidate_rows`` (rows passing the filter mask) to the probed lists.
+
+        Lists with no filtered rows are skipped, and probing extends beyond
+        ``nprobe`` until at least ``limit * CANDIDATE_FACTOR`` candidates are
+        covered (or every list has been probed).
+        """
+        candidate_lists = row_lists[candidate_rows]
+        list_counts = np.bincount(candidate_lists, minlength=self.n_lists)
+
+        nonempty = np.flatnonzero(list_counts)
+        order = nonempty[np.argsort(-(self.centroids[nonempty] @ query_vec), kind="stable")]
+
+        covered = np.cumsum(list_counts[order])
+        needed = int(np.searchsorted(covered, limit * self.CANDIDATE_FACTOR)) + 1
+        n_probe = min(max(nprobe, needed), order.size)
+        if n_probe >= order.size:
+            return candidate_rows
+
+        probed = np.zeros(self.n_lists, dtype=bool)
+        probed[order[:n_probe]] = True
+        return candidate_rows[probed[candidate_lists]]
@@ -16,6 +16,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Product, ProductAttribute
+from services.product_features import rebuild_product_features
 
 logger = logging.getLogger(__name__)
 
@@ -437,6 +438,9 @@ class AttributeExtractionService:
                 )
                 stored_count += 1
 
+            # Keep the precomputed ranking features in step with the attributes
+            await self._refresh_product_features(db, product_id)
+
             await db.commit()
             self.logger.info(f"Stored {stored_count} attributes for product {product_id}")
             return stored_count
@@ -446,6 +450,14 @@ class AttributeExtractionService:
             await db.rollback()
             raise
 
+    async def _refresh_product_features(self, db: AsyncSession, product_id: int):
+        """Recompute the product_features row in the same transaction; on failure the staleness check picks it up."""
+        try:
+            async with db.begin_nested():
+                await rebuild_product_features([product_id], db, commit=False)
+        except Exception as e:
+            self.logger.warning(f"Could not refresh product features for product {product_id}: {e}")
+
     async def _store_attribute(
         self,
         db: AsyncSession,
@@ -0,0 +1,310 @@
+"""
+Process-resident inverted index over the categorical product attributes.
+
+Strict attribute filtering used to query ``product_attributes`` once per
+candidate and attribute (color, material, texture, pattern, style). The
+attribute index keeps, for every ``(attribute_name, normalized value)`` of
+INDEXED_ATTRIBUTES, the sorted ids of the products carrying it (int32, one
+posting per key), and answers filters as product-id bitmaps: NumPy bool
+arrays indexed by product id, built from the postings on demand and composed
+with ``&``, ``|`` and ``negate``. Lookups by value (exact or any predicate
+over the value vocabulary) never touch the database.
+
+Like the facet index it is loaded at startup in id-keyset chunks and
+refreshed from ``updated_at``: every product with a changed attribute has
+all of its postings replaced. Products above ``max_product_id`` (created
+after the last load/refresh) are not covered and must be checked against the
+database; attribute rows deleted without another change to the product stay
+indexed until the next full load.
+
+Used by: services/recommendation_engine.py (strict attribute filtering and
+candidate prefiltering)
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database.models import Product, ProductAttribute
+
+logger = logging.getLogger(__name__)
+
+# (product_id, attribute_name, attribute_value)
+AttributeRow = Tuple[int, str, Optional[str]]
+
+# Attributes with a small vocabulary worth indexing (dimensions and free text are not)
+INDEXED_ATTRIBUTES = (
+    "color_primary",
+    "color_secondary",
+    "color_accent",
+    "material_primary",
+    "material_secondary",
+    "texture",
+    "pattern",
+    "style",
+    "furniture_type",
+)
+
+
+def normalize_value(value: str) -> str:
+    """Lowercase with runs of whitespace collapsed, the form values are indexed and looked up in."""
+    return " ".join(value.lower().split())
+
+
+def _sorted_unique(ids: np.ndarray) -> np.ndarray:
+    ids = np.sort(ids)
+    if ids.size:
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+    return ids
+
+
+class AttributeIndex:
+    """Postings of every indexed (attribute_name, value) and product-id bitmaps over them."""
+
+    # Attribute rows fetched per round trip during a full load
+    LOAD_CHUNK_SIZE = 50000
+    # Changed products whose attributes are re-read per round trip during a refresh
+    REFRESH_CHUNK_SIZE = 5000
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # attribute_name -> normalized value -> sorted unique product ids
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        self.max_product_id = 0
+        self.watermark: Optional[datetime] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def covers(self, product_id: int) -> bool:
+        """Whether the index is authoritative for ``product_id`` (known when last loaded/refreshed)."""
+        return self.is_loaded and product_id <= self.max_product_id
+
+    def stats(self) -> Dict[str, object]:
+        """Return size and freshness information for logging/debug endpoints."""
+        postings = [ids for values in self.postings.values() for ids in values.values()]
+        return {
+            "loaded": self.is_loaded,
+            "keys": len(postings),
+            "entries": sum(ids.size for ids in postings),
+            "attributes": {name: len(values) for name, values in self.postings.items()},
+            "max_product_id": self.max_product_id,
+            "memory_mb": round(sum(ids.nbytes for ids in postings) / (1024 * 1024), 1),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+
+    def values(self, attribute_name: str) -> List[str]:
+        """Indexed (normalized) values of ``attribute_name``."""
+        return list(self.postings.get(attribute_name, ()))
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def replace_products(self, product_ids: Iterable[int], rows: Iterable[AttributeRow]) -> Dict[str, int]:
+        """Replace the postings of ``product_ids`` with ``rows`` (their complete current indexed attributes)."""
+        removed_ids = _sorted_unique(np.fromiter(product_ids, dtype=np.int64).astype(np.int32))
+        removed = 0
+        if removed_ids.size:
+            for name, values in self.postings.items():
+                for value, ids in list(values.items()):
+                    positions = np.minimum(np.searchsorted(removed_ids, ids), removed_ids.size - 1)
+                    keep = removed_ids[positions] != ids
+                    if keep.all():
+                        continue
+                    removed += int(ids.size - keep.sum())
+                    if keep.any():
+                        values[value] = ids[keep]
+                    else:
+                        del values[value]
+
+        added = 0
+        for (name, value), ids in self._group_rows(rows).items():
+            values = self.postings.setdefault(name, {})
+            existing = values.get(value)
+            values[value] = ids if existing is None else _sorted_unique(np.concatenate((existing, ids)))
+            added += ids.size
+            self.max_product_id = max(self.max_product_id, int(ids[-1]))
+        self.postings = {name: values for name, values in self.postings.items() if values}
+        return {"removed": removed, "added": added}
+
+    @staticmethod
+    def _group_rows(rows: Iterable[AttributeRow]) -> Dict[Tuple[str, str], np.ndarray]:
+        grouped: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for product_id, name, value in rows:
+            if value and name in INDEXED_ATTRIBUTES:
+                value = normalize_value(value)
+                if value:
+                    grouped[(name, value)].append(product_id)
+        return {key: _sorted_unique(np.array(ids, dtype=np.int32)) for key, ids in grouped.items()}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    async def _load_max_product_id(self, db: AsyncSession):
+        result = await db.execute(select(func.max(Product.id)))
+        self.max_product_id = max(self.max_product_id, result.scalar() or 0)
+
+    def _advance_watermark(self, db_rows):
+        for row in db_rows:
+            if row[-1] is not None and (self.watermark is None or row[-1] > self.watermark):
+                self.watermark = row[-1]
+
+    async def load(self, db: AsyncSession) -> Dict[str, int]:
+        """Full (re)load of every indexed attribute row, in id-keyset chunks."""
+        start_time = time.time()
+        self._reset()
+
+        rows: List[AttributeRow] = []
+        last_id = 0
+        while True:
+            query = (
+                select(
+                    ProductAttribute.id,
+                    ProductAttribute.product_id,
+                    ProductAttribute.attribute_name,
+                    ProductAttribute.attribute_value,
+                    ProductAttribute.updated_at,
+                )
+                .where(ProductAttribute.id > last_id, ProductAttribute.attribute_name.in_(INDEXED_ATTRIBUTES))
+                .order_by(ProductAttribute.id)
+                .limit(self.LOAD_CHUNK_SIZE)
+            )
+            chunk = (await db.execute(query)).fetchall()
+            if not chunk:
+                break
+            rows.extend(row[1:4] for row in chunk)
+            self._advance_watermark(chunk)
+            last_id = chunk[-1][0]
+        counts = self.replace_products((), rows)
+        await self._load_max_product_id(db)
+
+        self.loaded_at = self.refreshed_at = time.time()
+        logger.info(
+            f"[ATTRIBUTE INDEX] Loaded {counts['added']} attribute values "
+            f"({self.stats()['keys']} keys) in {self.loaded_at - start_time:.2f}s"
+        )
+        return counts
+
+    async def refresh(self, db: AsyncSession) -> Dict[str, int]:
+        """Re-index products with attributes changed since the last load/refresh (``>=`` on the watermark)."""
+        if not self.is_loaded or self.watermark is None:
+            return await self.load(db)
+
+        result = await db.execute(
+            select(ProductAttribute.product_id)
+            .where(ProductAttribute.updated_at >= self.watermark, ProductAttribute.attribute_name.in_(INDEXED_ATTRIBUTES))
+            .distinct()
+        )
+        changed = [row[0] for row in result.fetchall()]
+
+        counts = {"removed": 0, "added": 0}
+        for start in range(0, len(changed), self.REFRESH_CHUNK_SIZE):
+            product_ids = changed[start : start + self.REFRESH_CHUNK_SIZE]
+            chunk = (
+                await db.execute(
+                    select(
+                        ProductAttribute.product_id,
+                        ProductAttribute.attribute_name,
+                        ProductAttribute.attribute_value,
+                        ProductAttribute.updated_at,
+                    ).where(
+                        ProductAttribute.product_id.in_(product_ids),
+                        ProductAttribute.attribute_name.in_(INDEXED_ATTRIBUTES),
+                    )
+                )
+            ).fetchall()
+            chunk_counts = self.replace_products(product_ids, (row[:3] for row in chunk))
+            counts = {key: counts[key] + chunk_counts[key] for key in counts}
+            self._advance_watermark(chunk)
+        await self._load_max_product_id(db)
+
+        self.refreshed_at = time.time()
+        logger.debug(f"[ATTRIBUTE INDEX] Refresh re-indexed {len(changed)} products {counts}")
+        return counts
+
+    # ------------------------------------------------------------------
+    # Bitmaps
+    # ------------------------------------------------------------------
+    def empty(self) -> np.ndarray:
+        """Bitmap with no product set (index = product id, covered ids only)."""
+        return np.zeros(self.max_product_id + 1, dtype=bool)
+
+    def negate(self, bitmap: np.ndarray) -> np.ndarray:
+        """Covered products not in ``bitmap`` (product id 0 is never set)."""
+        negated = ~bitmap
+        negated[0] = False
+        return negated
+
+    def _bitmap_of(self, postings: Iterable[np.ndarray]) -> np.ndarray:
+        bitmap = self.empty()
+        for ids in postings:
+            bitmap[ids] = True
+        return bitmap
+
+    def bitmap(self, attribute_names: Sequence[str], values: Iterable[str]) -> np.ndarray:
+        """Products with any of ``values`` (exact, after normalization) in any of ``attribute_names``."""
+        wanted = {normalize_value(value) for value in values if value}
+        return self._bitmap_of(
+            self.postings[name][value]
+            for name in attribute_names
+            if name in self.postings
+            for value in wanted
+            if value in self.postings[name]
+        )
+
+    def matching(self, attribute_names: Sequence[str], predicate: Callable[[str], bool]) -> np.ndarray:
+        """Products with a value accepted by ``predicate`` (called with each normalized value) in any of ``attribute_names``."""
+        return self._bitmap_of(
+            ids for name in attribute_names for value, ids in self.postings.get(name, {}).items() if predicate(value)
+        )
+
+    def contains(self, bitmap: np.ndarray, product_ids: Sequence[int]) -> np.ndarray:
+        """Membership of each of ``product_ids`` in ``bitmap`` (ids outside it are not members)."""
+        ids = np.asarray(product_ids, dtype=np.int64)
+        inside = (ids >= 0) & (ids < bitmap.size)
+        members = np.zeros(ids.size, dtype=bool)
+        members[inside] = bitmap[ids[inside]]
+        return members
+
+    @staticmethod
+    def product_ids(bitmap: np.ndarray) -> np.ndarray:
+        """Ascending product ids set in ``bitmap``."""
+        return np.flatnonzero(bitmap)
+
+
+# Singleton instance
+_attribute_index: Optional[AttributeIndex] = None
+
+
+def get_attribute_index() -> AttributeIndex:
+    """Get or create the attribute index singleton."""
+    global _attribute_index
+    if _attribute_index is None:
+        _attribute_index = AttributeIndex()
+    return _attribute_index
+
+
+async def initialize_attribute_index(db_session_factory) -> None:
+    """Load the attribute index on startup."""
+    async with db_session_factory() as db:
+        await get_attribute_index().load(db)
+
+
+async def refresh_attribute_index(db_session_factory) -> Dict[str, int]:
+    """Incrementally refresh the attribute index (loads it if not yet loaded)."""
+    async with db_session_factory() as db:
+        return await get_attribute_index().refresh(db)
@@ -0,0 +1,99 @@
+"""
+Near-duplicate clusters in the database (``product_duplicates`` table).
+
+services/near_duplicates.py finds the clusters; this module stores and reads
+them:
+
+- ``cluster_rows``: table rows for the clusters of a NearDuplicates result
+  (cluster_id = lowest product id of the cluster, similarity = the member's
+  best confirmed pair);
+- ``write_duplicate_clusters``: replace the table with a new set of rows;
+- ``load_cluster_ids``: cluster of each given product that has one;
+- ``collapse_duplicate_ids``: keep the first (best-ranked) member of each
+  cluster in an ordered result list.
+
+Rows written by an older DUPLICATES_VERSION are ignored when read, so a
+detector change takes effect only after the next full run.
+
+Used by: routers/products.py (/products/search?collapse_duplicates=true), scripts/find_near_duplicates.py
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import numpy as np
+from services.near_duplicates import NearDuplicates
+from sqlalchemy import delete, insert
+from sqlalchemy.future import select
+
+from database.models import ProductDuplicate
+
+logger = logging.getLogger(__name__)
+
+DUPLICATES_VERSION = 1
+
+# Rows per INSERT statement
+WRITE_BATCH = 5000
+
+
+def cluster_rows(product_ids: Sequence[int], result: NearDuplicates) -> List[dict]:
+    """One row per product in a cluster of two or more, for ``result`` computed over ``product_ids`` (by row)."""
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    if len(result.pairs) == 0:
+        return []
+    cluster_ids = np.full(len(product_ids), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(cluster_ids, result.labels, product_ids)
+    best = np.zeros(len(product_ids), dtype=np.float32)
+    np.maximum.at(best, result.pairs[:, 0], result.similarity)
+    np.maximum.at(best, result.pairs[:, 1], result.similarity)
+
+    rows = np.unique(result.pairs)
+    return [
+        {
+            "product_id": int(product_ids[row]),
+            "cluster_id": int(cluster_ids[result.labels[row]]),
+            "similarity": float(best[row]),
+        }
+        for row in rows
+    ]
+
+
+async def write_duplicate_clusters(rows: List[dict], db, computed_at: datetime) -> int:
+    """Replace the table with ``rows`` (one transaction); returns the number of rows written."""
+    await db.execute(delete(ProductDuplicate))
+    for start in range(0, len(rows), WRITE_BATCH):
+        values = [
+            {**row, "detector_version": DUPLICATES_VERSION, "computed_at": computed_at}
+            for row in rows[start : start + WRITE_BATCH]
+        ]
+        await db.execute(insert(ProductDuplicate).values(values))
+    await db.commit()
+    logger.info(f"[DUPLICATES] Wrote {len(rows)} products in {len({row['cluster_id'] for row in rows})} clusters")
+    return len(rows)
+
+
+async def load_cluster_ids(product_ids: Sequence[int], db) -> Dict[int, int]:
+    """product_id -> cluster_id for the ``product_ids`` that belong to a current-version cluster."""
+    if not product_ids:
+        return {}
+    result = await db.execute(
+        select(ProductDuplicate.product_id, ProductDuplicate.cluster_id).where(
+            ProductDuplicate.product_id.in_(list(product_ids)),
+            ProductDuplicate.detector_version == DUPLICATES_VERSION,
+        )
+    )
+    return dict(result.fetchall())
+
+
+def collapse_duplicate_ids(ordered_ids: Sequence[int], cluster_ids: Dict[int, int]) -> List[int]:
+    """``ordered_ids`` with every cluster reduced to its first member (order otherwise unchanged)."""
+    seen = set()
+    collapsed = []
+    for product_id in ordered_ids:
+        cluster_id = cluster_ids.get(product_id)
+        if cluster_id is not None:
+            if cluster_id in seen:
+                continue
+            seen.add(cluster_id)
+        collapsed.append(product_id)
+    return collapsed
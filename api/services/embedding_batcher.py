@@ -0,0 +1,125 @@
+"""
+Single-flight, micro-batching front-end for embedding API calls.
+
+The Gemini SDK call is blocking, so it always runs in a worker thread. On
+top of that:
+
+- single-flight: concurrent requests for the same text share one future,
+  so twenty users typing "sofa" at once cost one embedding;
+- micro-batching: distinct texts arriving within ``max_wait_ms`` of each
+  other are sent as one multi-content ``embed_content`` request (up to
+  ``max_batch_size`` texts).
+
+Used by: EmbeddingService.get_query_embedding
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Synchronous function embedding a list of texts; returns one vector (or None) per text
+BatchEmbedFn = Callable[[List[str]], List[Optional[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """Coalesces and micro-batches embedding requests for one task type."""
+
+    def __init__(self, embed_batch: BatchEmbedFn, max_batch_size: int = 100, max_wait_ms: float = 5.0):
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._stats = {
+            "requests": 0,
+            "coalesced": 0,
+            "api_calls": 0,
+            "batched_texts": 0,
+            "max_batch_size": 0,
+            "failed_calls": 0,
+            "api_time_ms": 0.0,
+        }
+
+    def stats(self) -> Dict[str, float]:
+        """Request/batch counters.
+
+        ``calls_saved`` counts API calls avoided versus one call per request:
+        every coalesced request, plus ``size - 1`` for every batch.
+        """
+        stats = dict(self._stats)
+        stats["calls_saved"] = stats["coalesced"] + stats["batched_texts"] - stats["api_calls"]
+        stats["avg_batch_size"] = round(stats["batched_texts"] / stats["api_calls"], 2) if stats["api_calls"] else 0.0
+        stats["inflight"] = len(self._inflight)
+        stats["api_time_ms"] = round(stats["api_time_ms"], 1)
+        return stats
+
+    def _bind_loop(self):
+        """Futures belong to one event loop; start fresh if called from a new one (e.g. scripts, tests)."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._inflight = {}
+            self._pending = []
+            self._flush_handle = None
+            self._tasks = set()
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """Embed ``text``, sharing the API call with identical and near-simultaneous requests."""
+        self._bind_loop()
+        self._stats["requests"] += 1
+
+        future = self._inflight.get(text)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = self._loop.create_future()
+        self._inflight[text] = future
+        self._pending.append(text)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        texts, self._pending = self._pending, []
+        if texts:
+            # Keep a reference so the task is not garbage-collected mid-flight
+            task = self._loop.create_task(self._run_batch(texts))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, texts: List[str]):
+        start_time = time.time()
+        try:
+            vectors = await asyncio.to_thread(self._embed_batch, texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            logger.error(f"Error generating embeddings for batch of {len(texts)}: {e}")
+            self._stats["failed_calls"] += 1
+            vectors = [None] * len(texts)
+
+        self._stats["api_calls"] += 1
+        self._stats["batched_texts"] += len(texts)
+        self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(texts))
+        self._stats["api_time_ms"] += (time.time() - start_time) * 1000
+
+        for text, vector in zip(texts, vectors):
+            future = self._inflight.pop(text, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
@@ -0,0 +1,62 @@
+"""
+Binary encoding for product embeddings.
+
+Embeddings are stored in ``products.embedding_vector`` as raw little-endian
+float32 bytes (768 * 4 = 3072 bytes), roughly 4x smaller than the legacy
+JSON text in ``products.embedding`` and decodable with ``np.frombuffer``
+without any parsing.
+
+During the dual-read period readers prefer the binary column and fall back
+to the JSON column for rows the backfill has not reached yet.
+"""
+import json
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+
+def encode_embedding(embedding: Union[Sequence[float], np.ndarray]) -> bytes:
+    """Encode an embedding as little-endian float32 bytes."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def decode_embedding(data: Optional[Union[bytes, memoryview]]) -> Optional[np.ndarray]:
+    """Decode float32 bytes into a (read-only) vector, or None if invalid.
+
+    Accepts bytes (asyncpg) as well as memoryview (psycopg2 bytea).
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        return None
+    if not len(data) or len(data) % EMBEDDING_DTYPE.itemsize:
+        return None
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def decode_embedding_json(embedding_json: Optional[str]) -> Optional[np.ndarray]:
+    """Decode a legacy JSON-text embedding into a float32 vector, or None if invalid."""
+    if not embedding_json:
+        return None
+    try:
+        vector = np.asarray(json.loads(embedding_json), dtype=np.float32)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return None
+    if vector.ndim != 1 or vector.size == 0:
+        return None
+    return vector
+
+
+def read_embedding(
+    embedding_vector: Optional[Union[bytes, memoryview]], embedding_json: Optional[str] = None
+) -> Optional[np.ndarray]:
+    """Dual-read: prefer the binary column, fall back to the JSON column."""
+    vector = decode_embedding(embedding_vector)
+    if vector is not None:
+        return vector
+    return decode_embedding_json(embedding_json)
+
+
+def read_product_embedding(product) -> Optional[np.ndarray]:
+    """Dual-read the embedding of a Product (or any object with the same attributes)."""
+    return read_embedding(getattr(product, "embedding_vector", None), getattr(product, "embedding", None))
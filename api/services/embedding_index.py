@@ -0,0 +1,954 @@
+"""
+Process-resident embedding index for semantic product search.
+
+Holds every product embedding as a single pre-normalized float32 matrix,
+together with companion filter columns (category_id, source_website, price,
+is_available). The index is loaded once at startup and refreshed
+incrementally from ``last_updated`` / ``embedding_updated_at``, so a filtered
+top-k query becomes one masked matrix-vector product and never touches
+Postgres for vectors.
+
+An optional IVF backend (services.ann_index) can be attached for large
+catalogs; it narrows the scored rows to the probed lists while the filter
+mask stays exact.
+
+The scan matrix can be stored as float16 or int8 (services.embedding_quantization)
+to cut per-process memory 2-4x; ``search_reranked`` then re-scores the head of
+the shortlist against full-precision vectors fetched from Postgres.
+
+With EMBEDDING_SNAPSHOT_DIR set, one worker builds the index and publishes
+immutable snapshots; the others serve copy-on-write memory-mapped copies and
+apply the changes made since the snapshot from their own incremental refresh
+(services.embedding_snapshot).
+
+Used by: search_service.semantic_search_products (falls back to the
+DB-scan path while the index is not loaded).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from services.ann_index import IVFIndex
+from services.embedding_codec import read_embedding
+from services.embedding_quantization import QUANTIZATION_MODES, ScalarQuantizer, create_quantizer
+from services.embedding_snapshot import EmbeddingSnapshotStore
+from services.topk import DEFAULT_CHUNK_SIZE, StreamingTopK, iter_chunks
+from sqlalchemy import case, func, null, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from core.config import settings
+from database.models import Product
+
+logger = logging.getLogger(__name__)
+
+# (product_id, embedding, category_id, source_website, price, is_available)
+IndexRow = Tuple[int, Optional[Sequence[float]], Optional[int], Optional[str], Optional[float], Optional[bool]]
+
+
+class SnapshotHeadroomError(RuntimeError):
+    """A snapshot-backed index has no spare rows left for inserted deltas."""
+
+
+class EmbeddingIndex:
+    """In-memory, pre-normalized product embedding matrix with filter columns."""
+
+    # Rows fetched per round trip during a full load
+    LOAD_CHUNK_SIZE = 5000
+
+    # Below this fraction of selected rows, gather the candidate rows before
+    # the matrix-vector product instead of scoring the whole matrix
+    GATHER_THRESHOLD = 0.25
+
+    # Gathered rows scored per chunk (bounds the temporary row copy)
+    SCORE_CHUNK_ROWS = DEFAULT_CHUNK_SIZE
+
+    # Below this many filtered candidates the exact scan is already cheap
+    ANN_MIN_CANDIDATES = 10000
+
+    # Retrain the IVF centroids once this fraction of rows was assigned incrementally
+    ANN_RETRAIN_FRACTION = 0.5
+
+    # Rows sampled from the index to train IVF centroids
+    ANN_TRAIN_ROWS = 50000
+
+    # Rows sampled across the catalog to fit the int8 quantizer ranges
+    QUANTIZER_SAMPLE_ROWS = 20000
+
+    # Column buffers grow by this factor when an insert does not fit
+    GROWTH_FACTOR = 1.5
+
+    # Row-aligned columns held in over-allocated buffers (ann_lists is replaced with the IVF backend)
+    BUFFERED_FIELDS = ("product_ids", "vectors", "category_ids", "store_codes", "prices", "is_available")
+
+    def __init__(self, dimension: int = 768, ann_nprobe: int = 32, quantization: str = "none", rerank_depth: int = 300):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown embedding quantization mode: {quantization!r}")
+        self.dimension = dimension
+        self.ann: Optional[IVFIndex] = None
+        self.ann_nprobe = ann_nprobe
+        self.quantization = quantization
+        self.rerank_depth = rerank_depth
+        self._reset()
+
+    def _reset(self):
+        self.quantizer: Optional[ScalarQuantizer] = None
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, self.dimension), dtype=self._storage_dtype())
+        self.category_ids = np.empty(0, dtype=np.int32)
+        self.store_codes = np.empty(0, dtype=np.int32)
+        self.prices = np.empty(0, dtype=np.float32)
+        self.is_available = np.empty(0, dtype=bool)
+        self.ann_lists = np.empty(0, dtype=np.int32)
+        self.ann_assigned = 0
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._row_by_id: Dict[int, int] = {}
+        self._store_names: List[str] = []
+        self._store_lookup: Dict[str, int] = {}
+        self.watermark: Optional[datetime] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+        self.snapshot_backed = False
+        self.snapshot_version: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return int(self.product_ids.shape[0])
+
+    def stats(self) -> Dict[str, object]:
+        """Return size and freshness information for logging/debug endpoints."""
+        return {
+            "loaded": self.is_loaded,
+            "rows": len(self),
+            "searchable_rows": int(self.is_available.sum()),
+            "stores": len(self._store_names),
+            "quantization": self.quantization,
+            "memory_mb": round(self.vectors.nbytes / (1024 * 1024), 1),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "ann_lists": self.ann.n_lists if self.ann else None,
+            "snapshot_version": self.snapshot_version,
+        }
+
+    def _storage_dtype(self):
+        return {"none": np.float32, "float16": np.float16, "int8": np.int8}[self.quantization]
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Convert normalized float32 rows to the storage representation."""
+        if self.quantization == "none":
+            return vectors
+        if self.quantizer is None:
+            # load() fits on a catalog-wide sample first; this only covers direct upserts
+            self.quantizer = create_quantizer(self.quantization, vectors)
+        return self.quantizer.encode(vectors)
+
+    def decoded_vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Stored rows as float32 (approximate when quantized)."""
+        stored = self.vectors if rows is None else self.vectors[rows]
+        return stored if self.quantizer is None else self.quantizer.decode(stored)
+
+    def _scores(self, rows: Optional[np.ndarray], query_vec: np.ndarray) -> np.ndarray:
+        """Dot products of stored rows (all rows if ``rows`` is None) with a normalized query.
+
+        A (Q, D) query matrix gives a (rows, Q) score matrix.
+        """
+        stored = self.vectors if rows is None else self.vectors[rows]
+        if self.quantizer is None:
+            return stored @ query_vec.T
+        return self.quantizer.scores(stored, query_vec)
+
+    def _store_code(self, source_website: Optional[str]) -> int:
+        if not source_website:
+            return -1
+        code = self._store_lookup.get(source_website)
+        if code is None:
+            code = len(self._store_names)
+            self._store_names.append(source_website)
+            self._store_lookup[source_website] = code
+        return code
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def upsert_rows(self, rows: Iterable[IndexRow]) -> Dict[str, int]:
+        """Insert, update or drop rows in the index.
+
+        Rows without a usable embedding (or with the wrong dimension) are
+        treated as deletions. Vectors are normalized once here so queries
+        only need a dot product.
+
+        Re-applying a row identical to the stored one is not counted, so all
+        counts being zero means the index did not change.
+
+        A snapshot-backed index accepts inserts only while the snapshot's
+        spare rows last; otherwise :class:`SnapshotHeadroomError` is raised
+        before anything is changed.
+
+        Returns:
+            Dict with counts: {"inserted": N, "updated": N, "removed": N}
+        """
+        if self.snapshot_backed:
+            rows = list(rows)
+            self._resolve_snapshot_rows(row[0] for row in rows)
+            inserts = {row[0] for row in rows if row[1] is not None and row[0] not in self._row_by_id}
+            if len(self) + len(inserts) > self.capacity:
+                raise SnapshotHeadroomError(
+                    f"{len(inserts)} inserts exceed the snapshot's {self.capacity - len(self)} spare rows"
+                )
+
+        counts = {"inserted": 0, "updated": 0, "removed": 0}
+
+        new_ids: List[int] = []
+        new_vectors: List[np.ndarray] = []
+        new_meta: List[Tuple[int, int, float, bool]] = []
+        removed_rows: List[int] = []
+
+        for product_id, embedding, category_id, source_website, price, is_available in rows:
+            vector = None
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                if vector.shape != (self.dimension,):
+                    vector = None
+
+            row = self._row_by_id.get(product_id)
+
+            if vector is None:
+                if row is not None:
+                    removed_rows.append(row)
+                    counts["removed"] += 1
+                continue
+
+            norm = float(np.linalg.norm(vector))
+            if norm > 0:
+                vector = vector / norm
+
+            meta = (
+                category_id if category_id is not None else -1,
+                self._store_code(source_website),
+                float(price) if price is not None else np.nan,
+                bool(is_available),
+            )
+
+            if row is not None:
+                encoded = self._encode(vector[None, :])[0]
+                if self._row_unchanged(row, encoded, meta):
+                    continue
+                self.vectors[row] = encoded
+                self.category_ids[row], self.store_codes[row], self.prices[row], self.is_available[row] = meta
+                if self.ann is not None:
+                    self.ann_lists[row] = self.ann.assign(vector)[0]
+                    self.ann_assigned += 1
+                counts["updated"] += 1
+            else:
+                new_ids.append(product_id)
+                new_vectors.append(vector)
+                new_meta.append(meta)
+                counts["inserted"] += 1
+
+        if new_ids:
+            start = len(self)
+            category_ids, store_codes, prices, available = zip(*new_meta)
+            stacked = np.stack(new_vectors).astype(np.float32, copy=False)
+            self._append_columns(
+                {
+                    "product_ids": np.asarray(new_ids, dtype=np.int64),
+                    "vectors": self._encode(stacked),
+                    "category_ids": np.asarray(category_ids, dtype=np.int32),
+                    "store_codes": np.asarray(store_codes, dtype=np.int32),
+                    "prices": np.asarray(prices, dtype=np.float32),
+                    "is_available": np.asarray(available, dtype=bool),
+                }
+            )
+            if self.ann is not None:
+                self.ann_lists = np.concatenate([self.ann_lists, self.ann.assign(stacked)])
+                self.ann_assigned += len(new_ids)
+            for offset, product_id in enumerate(new_ids):
+                self._row_by_id[product_id] = start + offset
+
+        if removed_rows:
+            self._compact(removed_rows)
+
+        return counts
+
+    @property
+    def capacity(self) -> int:
+        """Rows the column buffers hold before the next reallocation."""
+        buffer = self._buffers.get("product_ids")
+        return len(self) if buffer is None else int(buffer.shape[0])
+
+    def reserve(self, rows: int):
+        """Make room for ``rows`` rows in total.
+
+        Column attributes are views of the first ``len(self)`` rows of these
+        buffers, so an insert copies only the new rows until a buffer is full.
+        """
+        if rows <= self.capacity and self._buffers:
+            return
+        size = len(self)
+        for field in self.BUFFERED_FIELDS:
+            current = getattr(self, field)
+            buffer = np.empty((max(rows, size),) + current.shape[1:], dtype=current.dtype)
+            buffer[:size] = current
+            self._buffers[field] = buffer
+            setattr(self, field, buffer[:size])
+
+    def _append_columns(self, columns: Dict[str, np.ndarray]):
+        """Append rows to every buffered column, growing the buffers geometrically."""
+        size = len(self)
+        new_size = size + len(columns["product_ids"])
+        if not self._buffers or new_size > self.capacity:
+            self.reserve(max(new_size, int(self.capacity * self.GROWTH_FACTOR)))
+        for field, values in columns.items():
+            buffer = self._buffers[field]
+            buffer[size:new_size] = values
+            setattr(self, field, buffer[:new_size])
+
+    def _row_unchanged(self, row: int, encoded: np.ndarray, meta: Tuple[int, int, float, bool]) -> bool:
+        category_id, store_code, price, is_available = meta
+        old_price = self.prices[row]
+        same_price = old_price == np.float32(price) or (np.isnan(old_price) and np.isnan(price))
+        return bool(
+            same_price
+            and self.category_ids[row] == category_id
+            and self.store_codes[row] == store_code
+            and self.is_available[row] == is_available
+            and np.array_equal(self.vectors[row], encoded)
+        )
+
+    def _compact(self, removed_rows: List[int]):
+        """Physically drop rows and rebuild the id -> row lookup.
+
+        A snapshot-backed index tombstones the rows instead: shifting them
+        would privately copy most of the mapped pages.
+        """
+        if self.snapshot_backed:
+            for product_id in self.product_ids[removed_rows].tolist():
+                self._row_by_id.pop(product_id, None)
+            self.product_ids[removed_rows] = -1
+            self.is_available[removed_rows] = False
+            return
+
+        keep = np.ones(len(self), dtype=bool)
+        keep[removed_rows] = False
+        for field in self.BUFFERED_FIELDS:
+            kept = getattr(self, field)[keep]
+            buffer = self._buffers[field]
+            buffer[: kept.shape[0]] = kept
+            setattr(self, field, buffer[: kept.shape[0]])
+        if self.ann is not None:
+            self.ann_lists = self.ann_lists[keep]
+        self._row_by_id = {int(pid): row for row, pid in enumerate(self.product_ids)}
+
+    # ------------------------------------------------------------------
+    # ANN backend
+    # ------------------------------------------------------------------
+    def attach_ann(self, ann: IVFIndex, row_lists: Optional[np.ndarray] = None):
+        """Use ``ann`` for candidate selection, assigning every current row to a list."""
+        if ann.dimension != self.dimension:
+            raise ValueError(f"IVF index dimension {ann.dimension} != {self.dimension}")
+        if row_lists is None:
+            row_lists = self.assign_ann_lists(ann)
+        self.ann, self.ann_lists = ann, row_lists
+        self.ann_assigned = 0
+
+    def detach_ann(self):
+        """Go back to exact scans for every query."""
+        self.ann = None
+        self.ann_lists = np.empty(0, dtype=np.int32)
+        self.ann_assigned = 0
+
+    def assign_ann_lists(self, ann: IVFIndex) -> np.ndarray:
+        """IVF list of every current row, decoding quantized rows one chunk at a time."""
+        row_lists = np.empty(len(self), dtype=np.int32)
+        for start in range(0, len(self), ann.ASSIGN_CHUNK_SIZE):
+            rows = np.arange(start, min(start + ann.ASSIGN_CHUNK_SIZE, len(self)))
+            row_lists[rows] = ann.assign(self.decoded_vectors(rows))
+        return row_lists
+
+    def train_ann(self, n_lists: Optional[int] = None, seed: int = 0) -> Tuple[IVFIndex, np.ndarray]:
+        """Train an IVF quantizer on the current vectors (CPU-bound; safe to run in a thread).
+
+        Returns (ann, row_lists) to pass to :meth:`attach_ann` once done, so
+        readers never see centroids and assignments from different builds.
+        """
+        rows = np.arange(len(self))
+        if len(self) > self.ANN_TRAIN_ROWS:
+            rows = np.sort(np.random.default_rng(seed).choice(len(self), self.ANN_TRAIN_ROWS, replace=False))
+        ann = IVFIndex.train(self.decoded_vectors(rows), n_lists=n_lists, seed=seed)
+        ann.trained_rows = len(self)
+        return ann, self.assign_ann_lists(ann)
+
+    @property
+    def ann_needs_retrain(self) -> bool:
+        """True once incremental assignments have drifted far from the trained centroids."""
+        return self.ann is not None and self.ann_assigned > self.ANN_RETRAIN_FRACTION * max(self.ann.trained_rows, 1)
+
+    # ------------------------------------------------------------------
+    # Shared snapshots
+    # ------------------------------------------------------------------
+    def attach_snapshot(
+        self,
+        manifest: Dict,
+        arrays: Dict[str, np.ndarray],
+        quantizer: Optional[ScalarQuantizer],
+        ann: Optional[IVFIndex],
+        ann_lists: Optional[np.ndarray],
+    ):
+        """Serve from copy-on-write snapshot arrays (see services.embedding_snapshot).
+
+        ``arrays`` hold ``manifest["capacity"]`` rows, of which the first
+        ``manifest["rows"]`` are in use; the rest take inserted deltas. The
+        id -> row lookup is filled lazily for the ids that deltas touch.
+        """
+        self.quantization = manifest["quantization"]
+        self._reset()
+        rows = manifest["rows"]
+        for field, array in arrays.items():
+            self._buffers[field] = array
+            setattr(self, field, array[:rows])
+        self.quantizer = quantizer
+        self._store_names = list(manifest["stores"])
+        self._store_lookup = {name: code for code, name in enumerate(self._store_names)}
+        if ann is not None:
+            self.ann, self.ann_lists = ann, ann_lists
+        else:
+            self.detach_ann()
+        self.watermark = datetime.fromisoformat(manifest["watermark"]) if manifest.get("watermark") else None
+        self.snapshot_version = manifest["version"]
+        self.snapshot_backed = True
+        self.loaded_at = self.refreshed_at = time.time()
+
+    def _resolve_snapshot_rows(self, product_ids: Iterable[int]):
+        """Add the snapshot rows of ``product_ids`` to the lazily built id -> row lookup."""
+        ids = np.fromiter(product_ids, dtype=np.int64)
+        rows = np.flatnonzero(np.isin(self.product_ids, ids))
+        self._row_by_id.update(zip(self.product_ids[rows].tolist(), rows.tolist()))
+
+    def _advance_watermark(self, timestamps: Iterable[Optional[datetime]]):
+        for ts in timestamps:
+            if ts is not None and (self.watermark is None or ts > self.watermark):
+                self.watermark = ts
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _columns():
+        return (
+            Product.id,
+            Product.embedding_vector,
+            # Dual-read: only transfer the legacy JSON text for rows not yet backfilled
+            case((Product.embedding_vector.is_(None), Product.embedding), else_=null()),
+            Product.category_id,
+            Product.source_website,
+            Product.price,
+            Product.is_available,
+            Product.last_updated,
+            Product.embedding_updated_at,
+        )
+
+    def _apply_db_rows(self, db_rows) -> Dict[str, int]:
+        """Decode DB rows, upsert them and advance the watermark."""
+        index_rows = []
+        timestamps = []
+        for (
+            product_id,
+            embedding_vector,
+            embedding_json,
+            category_id,
+            source_website,
+            price,
+            is_available,
+            last_updated,
+            embedded_at,
+        ) in db_rows:
+            vector = read_embedding(embedding_vector, embedding_json)
+            index_rows.append((product_id, vector, category_id, source_website, price, is_available))
+            timestamps.append(last_updated)
+            timestamps.append(embedded_at)
+        counts = self.upsert_rows(index_rows)
+        self._advance_watermark(timestamps)
+        return counts
+
+    @staticmethod
+    def _has_embedding():
+        return or_(Product.embedding_vector.isnot(None), Product.embedding.isnot(None))
+
+    async def _fit_quantizer(self, db: AsyncSession):
+        """Fit the quantizer on a random sample of the whole catalog before loading.
+
+        Fitting on the first id chunk would clip components of later rows
+        that fall outside its ranges.
+        """
+        sample_ids = (
+            select(Product.id)
+            .where(self._has_embedding())
+            .order_by(func.random())
+            .limit(self.QUANTIZER_SAMPLE_ROWS)
+            .scalar_subquery()
+        )
+        query = select(
+            Product.embedding_vector,
+            case((Product.embedding_vector.is_(None), Product.embedding), else_=null()),
+        ).where(Product.id.in_(sample_ids))
+        result = await db.execute(query)
+        sample = []
+        for embedding_vector, embedding_json in result.fetchall():
+            vector = read_embedding(embedding_vector, embedding_json)
+            if vector is not None and vector.shape == (self.dimension,):
+                sample.append(vector / (np.linalg.norm(vector) or 1.0))
+        if sample:
+            self.quantizer = create_quantizer(self.quantization, np.stack(sample).astype(np.float32, copy=False))
+
+    async def load(self, db: AsyncSession) -> Dict[str, int]:
+        """Full (re)load of every product embedding, in id-keyset chunks.
+
+        The column buffers are sized from a row count up front, so the chunks
+        are written in place instead of re-stacking the matrix per chunk.
+        """
+        start_time = time.time()
+        self._reset()
+
+        expected = await db.scalar(select(func.count()).select_from(Product).where(self._has_embedding()))
+        self.reserve(int(expected or 0))
+        if self.quantization == "int8":
+            await self._fit_quantizer(db)
+
+        totals = {"inserted": 0, "updated": 0, "removed": 0}
+        last_id = 0
+        while True:
+            query = (
+                select(*self._columns())
+                .where(self._has_embedding())
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(self.LOAD_CHUNK_SIZE)
+            )
+            result = await db.execute(query)
+            rows = result.fetchall()
+            if not rows:
+                break
+            counts = self._apply_db_rows(rows)
+            for key in totals:
+                totals[key] += counts[key]
+            last_id = rows[-1][0]
+
+        self.loaded_at = self.refreshed_at = time.time()
+        logger.info(
+            f"[EMBEDDING INDEX] Loaded {len(self)} vectors ({self.stats()['memory_mb']} MB) "
+            f"in {self.loaded_at - start_time:.2f}s"
+        )
+        return totals
+
+    async def refresh(self, db: AsyncSession) -> Dict[str, int]:
+        """Apply products changed since the last load/refresh.
+
+        Uses ``>=`` on the watermark so rows sharing the boundary timestamp are
+        re-applied rather than missed; upserts are idempotent.
+        """
+        if not self.is_loaded or self.watermark is None:
+            return await self.load(db)
+
+        query = select(*self._columns()).where(
+            or_(Product.last_updated >= self.watermark, Product.embedding_updated_at >= self.watermark)
+        )
+        result = await db.execute(query)
+        rows = result.fetchall()
+        counts = self._apply_db_rows(rows)
+        self.refreshed_at = time.time()
+
+        if counts["inserted"] or counts["removed"]:
+            logger.info(f"[EMBEDDING INDEX] Refresh applied {counts} (rows={len(self)})")
+        else:
+            logger.debug(f"[EMBEDDING INDEX] Refresh applied {counts} (rows={len(self)})")
+        return counts
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    def build_mask(
+        self,
+        category_ids: Optional[List[int]] = None,
+        source_websites: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> np.ndarray:
+        """Boolean row mask equivalent to the SQL filters in semantic search.
+
+        NULL prices never satisfy a price bound, matching ``price >= x`` in SQL.
+        """
+        mask = self.is_available.copy()
+        if category_ids:
+            mask &= np.isin(self.category_ids, np.asarray(category_ids, dtype=np.int32))
+        if source_websites:
+            codes = [self._store_lookup[s] for s in source_websites if s in self._store_lookup]
+            if not codes:
+                return np.zeros(len(self), dtype=bool)
+            mask &= np.isin(self.store_codes, np.asarray(codes, dtype=np.int32))
+        with np.errstate(invalid="ignore"):
+            if min_price is not None:
+                mask &= self.prices >= min_price
+            if max_price is not None:
+                mask &= self.prices <= max_price
+        return mask
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        category_ids: Optional[List[int]] = None,
+        source_websites: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 500,
+        exact: bool = False,
+        min_score: Optional[float] = None,
+    ) -> Dict[int, float]:
+        """Filtered top-k cosine search.
+
+        Uses the attached ANN backend for large candidate sets unless
+        ``exact`` is set. Gathered candidate rows are scored in chunks of
+        SCORE_CHUNK_ROWS into a StreamingTopK, so the temporary copy stays
+        bounded however many rows pass the filters. Scores below
+        ``min_score`` are dropped.
+
+        Returns dict mapping product_id -> similarity, ordered best first.
+        """
+        if limit <= 0 or len(self) == 0:
+            return {}
+
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query_vec))
+        if query_vec.shape != (self.dimension,) or query_norm == 0:
+            return {}
+        query_vec = query_vec / query_norm
+
+        mask = self.build_mask(category_ids, source_websites, min_price, max_price)
+        candidate_rows = np.flatnonzero(mask)
+        if candidate_rows.size == 0:
+            return {}
+
+        if not exact and self.ann is not None and candidate_rows.size > self.ANN_MIN_CANDIDATES:
+            candidate_rows = self.ann.probe(query_vec, self.ann_lists, candidate_rows, limit, self.ann_nprobe)
+
+        # Collect candidate row numbers; mapped to product ids once at the end
+        top = StreamingTopK(limit, min_score)
+        if candidate_rows.size < self.GATHER_THRESHOLD * len(self):
+            for rows in iter_chunks(candidate_rows, self.SCORE_CHUNK_ROWS):
+                top.push(rows, self._scores(rows, query_vec))
+        else:
+            # Contiguous product over the whole matrix (no row copy), then keep the candidates
+            top.push(candidate_rows, self._scores(None, query_vec)[candidate_rows])
+
+        rows, scores = top.items()
+        return {int(pid): float(score) for pid, score in zip(self.product_ids[rows], scores)}
+
+    def product_mask(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Boolean row mask of the available rows among ``product_ids``."""
+        ids = np.fromiter(product_ids, dtype=np.int64)
+        return np.isin(self.product_ids, ids) & self.is_available
+
+    def search_many(
+        self,
+        query_embeddings: Sequence[Optional[Sequence[float]]],
+        masks: Sequence[Optional[np.ndarray]],
+        limit: int = 500,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[int, float]]:
+        """Filtered top-k for several queries in one pass over the matrix.
+
+        ``masks[i]`` restricts query i (from :meth:`build_mask` / :meth:`product_mask`;
+        None means every available row). Identical query vectors are scored
+        once; the distinct ones are stacked into a (Q, D) matrix and the rows
+        in the union of the masks are scored against all of them with one
+        matrix product per SCORE_CHUNK_ROWS chunk, each query keeping its own
+        StreamingTopK. Always exact: ANN lists are probed per query, which
+        would defeat the shared pass.
+
+        Returns one dict (product_id -> similarity, best first) per query;
+        empty for a missing or zero query vector.
+        """
+        results: List[Dict[int, float]] = [{} for _ in query_embeddings]
+        if limit <= 0 or len(self) == 0:
+            return results
+
+        # Normalize and deduplicate: query i is scored by column columns[i] of the query matrix
+        columns: Dict[int, int] = {}
+        distinct: Dict[bytes, int] = {}
+        vectors: List[np.ndarray] = []
+        for i, embedding in enumerate(query_embeddings):
+            if embedding is None:
+                continue
+            query_vec = np.asarray(embedding, dtype=np.float32)
+            query_norm = float(np.linalg.norm(query_vec))
+            if query_vec.shape != (self.dimension,) or query_norm == 0:
+                continue
+            key = query_vec.tobytes()
+            if key not in distinct:
+                distinct[key] = len(vectors)
+                vectors.append(query_vec / query_norm)
+            columns[i] = distinct[key]
+        if not columns:
+            return results
+
+        query_masks = {i: self.is_available if masks[i] is None else masks[i] for i in columns}
+        candidate_rows = np.flatnonzero(np.logical_or.reduce(list(query_masks.values())))
+        if candidate_rows.size == 0:
+            return results
+
+        query_matrix = np.stack(vectors)
+        tops = {i: StreamingTopK(limit, min_score) for i in columns}
+        for rows in iter_chunks(candidate_rows, self.SCORE_CHUNK_ROWS):
+            scores = self._scores(rows, query_matrix)
+            for i, top in tops.items():
+                selected = query_masks[i][rows]
+                top.push(rows[selected], scores[selected, columns[i]])
+
+        for i, top in tops.items():
+            rows, scores = top.items()
+            results[i] = {int(pid): float(score) for pid, score in zip(self.product_ids[rows], scores)}
+        return results
+
+    def rerank(
+        self,
+        query_embedding: Sequence[float],
+        shortlist: Dict[int, float],
+        full_vectors: Dict[int, np.ndarray],
+        limit: int,
+    ) -> Dict[int, float]:
+        """Re-score the first ``rerank_depth`` shortlist entries with full-precision vectors.
+
+        Entries without a full vector keep their approximate score; entries
+        past the re-rank depth keep their approximate order after the head.
+        """
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+
+        ids = list(shortlist)
+        head = ids[: self.rerank_depth]
+        rescored = {}
+        for pid in head:
+            vector = full_vectors.get(pid)
+            norm = float(np.linalg.norm(vector)) if vector is not None and vector.shape == query_vec.shape else 0.0
+            rescored[pid] = float(vector @ query_vec) / norm if norm else shortlist[pid]
+
+        ordered = sorted(rescored.items(), key=lambda item: item[1], reverse=True)
+        ordered.extend((pid, shortlist[pid]) for pid in ids[len(head) :])
+        return dict(ordered[:limit])
+
+    async def fetch_full_vectors(self, db: AsyncSession, product_ids: List[int]) -> Dict[int, np.ndarray]:
+        """Full-precision embeddings for ``product_ids`` (dual-read from Postgres)."""
+        if not product_ids:
+            return {}
+        query = select(
+            Product.id,
+            Product.embedding_vector,
+            case((Product.embedding_vector.is_(None), Product.embedding), else_=null()),
+        ).where(Product.id.in_(product_ids))
+        result = await db.execute(query)
+        vectors = {}
+        for product_id, embedding_vector, embedding_json in result.fetchall():
+            vector = read_embedding(embedding_vector, embedding_json)
+            if vector is not None:
+                vectors[product_id] = vector
+        return vectors
+
+    async def search_reranked(
+        self,
+        db: AsyncSession,
+        query_embedding: Sequence[float],
+        category_ids: Optional[List[int]] = None,
+        source_websites: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 500,
+        min_score: Optional[float] = None,
+    ) -> Dict[int, float]:
+        """:meth:`search`, plus an exact re-rank of the shortlist head when quantized.
+
+        With quantization ``min_score`` is applied after the re-rank, to exact scores.
+        """
+        if self.quantization == "none":
+            return self.search(
+                query_embedding, category_ids, source_websites, min_price, max_price, limit, min_score=min_score
+            )
+
+        shortlist = self.search(
+            query_embedding, category_ids, source_websites, min_price, max_price, max(limit, self.rerank_depth)
+        )
+        full_vectors = await self.fetch_full_vectors(db, list(shortlist)[: self.rerank_depth])
+        reranked = self.rerank(query_embedding, shortlist, full_vectors, limit)
+        if min_score is None:
+            return reranked
+        return {pid: score for pid, score in reranked.items() if score >= min_score}
+
+    async def search_many_reranked(
+        self,
+        db: AsyncSession,
+        query_embeddings: Sequence[Optional[Sequence[float]]],
+        masks: Sequence[Optional[np.ndarray]],
+        limit: int = 500,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[int, float]]:
+        """:meth:`search_many`, plus an exact re-rank of each shortlist head when quantized.
+
+        Full-precision vectors for every shortlist head are fetched in one query.
+        """
+        if self.quantization == "none":
+            return self.search_many(query_embeddings, masks, limit, min_score)
+
+        shortlists = self.search_many(query_embeddings, masks, max(limit, self.rerank_depth))
+        head_ids = {pid for shortlist in shortlists for pid in list(shortlist)[: self.rerank_depth]}
+        full_vectors = await self.fetch_full_vectors(db, list(head_ids))
+        results = []
+        for query_embedding, shortlist in zip(query_embeddings, shortlists):
+            reranked = self.rerank(query_embedding, shortlist, full_vectors, limit) if shortlist else {}
+            if min_score is not None:
+                reranked = {pid: score for pid, score in reranked.items() if score >= min_score}
+            results.append(reranked)
+        return results
+
+
+# Singleton instance
+_embedding_index: Optional[EmbeddingIndex] = None
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """Get or create the embedding index singleton."""
+    global _embedding_index
+    if _embedding_index is None:
+        _embedding_index = EmbeddingIndex(
+            ann_nprobe=settings.embedding_ann_nprobe,
+            quantization=settings.embedding_index_quantization,
+            rerank_depth=settings.embedding_index_rerank_depth,
+        )
+    return _embedding_index
+
+
+async def build_ann_index(index: EmbeddingIndex) -> None:
+    """Train (off the event loop), attach and optionally persist the IVF backend."""
+    if len(index) < index.ANN_MIN_CANDIDATES:
+        logger.info(f"[EMBEDDING INDEX] {len(index)} rows; exact scan only, no IVF backend built")
+        return
+    ann, row_lists = await asyncio.to_thread(index.train_ann, settings.embedding_ann_lists or None)
+    index.attach_ann(ann, row_lists)
+    if settings.embedding_ann_path:
+        try:
+            await asyncio.to_thread(ann.save, settings.embedding_ann_path)
+        except OSError as e:
+            logger.warning(f"[EMBEDDING INDEX] Could not save IVF index to {settings.embedding_ann_path}: {e}")
+
+
+async def _attach_ann_index(index: EmbeddingIndex) -> None:
+    """Attach the IVF backend from disk if a compatible file exists, else build it."""
+    path = settings.embedding_ann_path
+    if path and Path(path).exists():
+        try:
+            ann = IVFIndex.load(path)
+            index.attach_ann(ann, await asyncio.to_thread(index.assign_ann_lists, ann))
+            logger.info(f"[EMBEDDING INDEX] Loaded IVF index ({ann.n_lists} lists) from {path}")
+            return
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"[EMBEDDING INDEX] Ignoring IVF index at {path}: {e}")
+    await build_ann_index(index)
+
+
+_snapshot_store: Optional[EmbeddingSnapshotStore] = None
+
+
+def get_snapshot_store() -> Optional[EmbeddingSnapshotStore]:
+    """Shared snapshot store, or None when every worker keeps a private index."""
+    global _snapshot_store
+    if _snapshot_store is None and settings.embedding_snapshot_dir:
+        _snapshot_store = EmbeddingSnapshotStore(settings.embedding_snapshot_dir)
+    return _snapshot_store
+
+
+async def _load_from_database(index: EmbeddingIndex, db_session_factory) -> None:
+    async with db_session_factory() as db:
+        await index.load(db)
+    if settings.embedding_ann_enabled:
+        await _attach_ann_index(index)
+
+
+def _map_latest_snapshot(index: EmbeddingIndex, store: EmbeddingSnapshotStore) -> bool:
+    """Swap to the newest published snapshot. Returns True if the index changed."""
+    manifest = store.read_manifest()
+    if manifest is None or manifest["version"] == index.snapshot_version:
+        return False
+    if manifest["dimension"] != index.dimension:
+        logger.warning(f"[EMBEDDING INDEX] Snapshot dimension {manifest['dimension']} != {index.dimension}; ignored")
+        return False
+    store.map_into(index, manifest)
+    logger.info(f"[EMBEDDING INDEX] Mapped snapshot {manifest['version']} ({manifest['rows']} rows)")
+    return True
+
+
+async def _publish_snapshot(index: EmbeddingIndex, store: EmbeddingSnapshotStore) -> None:
+    # Inserts count towards the change threshold, so followers never need more spare rows
+    await asyncio.to_thread(store.write, index, settings.embedding_snapshot_max_changes)
+
+
+async def initialize_embedding_index(db_session_factory) -> None:
+    """Load the embedding index on startup.
+
+    With a snapshot store, only the builder worker loads from Postgres; the
+    other workers map the latest snapshot (or keep using the DB fallback
+    until the builder has published one).
+    """
+    index = get_embedding_index()
+    store = get_snapshot_store()
+    if store is None or store.try_become_builder():
+        await _load_from_database(index, db_session_factory)
+        if store is not None:
+            await _publish_snapshot(index, store)
+        return
+    _map_latest_snapshot(index, store)
+
+
+async def refresh_embedding_index(db_session_factory) -> Dict[str, int]:
+    """Incrementally refresh the embedding index (loads it if not yet loaded).
+
+    The snapshot builder publishes a new snapshot only once its unpublished
+    changes pass ``embedding_snapshot_max_changes`` or
+    ``embedding_snapshot_max_age``. Followers swap to a new snapshot when the
+    manifest changes and otherwise apply the rows changed since their
+    snapshot through the same incremental DB refresh; they take over as
+    builder if the previous builder has gone away.
+    """
+    index = get_embedding_index()
+    store = get_snapshot_store()
+    if store is not None and not store.is_builder:
+        if not store.try_become_builder():
+            _map_latest_snapshot(index, store)
+            if not index.is_loaded or index.watermark is None:
+                return {"inserted": 0, "updated": 0, "removed": 0}
+            try:
+                async with db_session_factory() as db:
+                    return await index.refresh(db)
+            except SnapshotHeadroomError as e:
+                logger.info(f"[EMBEDDING INDEX] Waiting for the next snapshot: {e}")
+                return {"inserted": 0, "updated": 0, "removed": 0}
+        await _load_from_database(index, db_session_factory)
+        await _publish_snapshot(index, store)
+        return {"inserted": len(index), "updated": 0, "removed": 0}
+
+    async with db_session_factory() as db:
+        counts = await index.refresh(db)
+    retrained = index.ann_needs_retrain
+    if retrained:
+        logger.info(f"[EMBEDDING INDEX] {index.ann_assigned} incremental IVF assignments; retraining")
+        await build_ann_index(index)
+    if store is not None:
+        store.record_changes(counts)
+        if retrained or store.snapshot_due(settings.embedding_snapshot_max_changes, settings.embedding_snapshot_max_age):
+            await _publish_snapshot(index, store)
+    return counts
@@ -0,0 +1,74 @@
+"""
+Query embedding providers behind EmbeddingService.get_query_embedding.
+
+- RemoteEmbeddingProvider: the Gemini embed_content call, through the
+  single-flight / micro-batching EmbeddingBatcher.
+- LocalEmbeddingProvider: the in-process hashed n-gram embedder
+  (services/local_embedder.py); sub-millisecond, lower quality.
+
+EmbeddingService waits on the remote provider for at most the configured
+latency budget, then answers from the fallback provider (if one is
+attached) while the remote call finishes in the background and fills the
+query cache for the next identical query.
+
+Used by: services.embedding_service.EmbeddingService
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from services.embedding_batcher import EmbeddingBatcher
+from services.local_embedder import LocalEmbedder
+
+
+class EmbeddingProvider:
+    """Embeds normalized query text into the product embedding space."""
+
+    name = "provider"
+
+    async def embed_query(self, text: str) -> Optional[List[float]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class RemoteEmbeddingProvider(EmbeddingProvider):
+    """Gemini embed_content via the query batcher."""
+
+    name = "gemini"
+
+    def __init__(self, batcher: EmbeddingBatcher):
+        self.batcher = batcher
+
+    async def embed_query(self, text: str) -> Optional[List[float]]:
+        return await self.batcher.embed(text)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.batcher.stats()
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """CPU-only LocalEmbedder, computed inline on the event loop (well under a millisecond)."""
+
+    name = "local"
+
+    def __init__(self, embedder: LocalEmbedder):
+        self.embedder = embedder
+        self._stats = {"requests": 0, "empty": 0, "time_ms": 0.0}
+
+    async def embed_query(self, text: str) -> Optional[List[float]]:
+        start_time = time.perf_counter()
+        vector = self.embedder.embed(text)
+        self._stats["requests"] += 1
+        self._stats["time_ms"] += (time.perf_counter() - start_time) * 1000
+        if vector is None:
+            self._stats["empty"] += 1
+            return None
+        return vector.tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["avg_ms"] = round(stats["time_ms"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["model"] = self.embedder.model
+        stats["trained_rows"] = self.embedder.trained_rows
+        return stats
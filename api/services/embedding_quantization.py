@@ -0,0 +1,102 @@
+"""
+Scalar quantization for the resident embedding index.
+
+``float16`` halves and ``int8`` quarters the memory of the float32 scan
+matrix. int8 codes use a per-dimension offset/scale fitted on a random
+sample of the catalog (EmbeddingIndex.load draws it before the first chunk):
+
+    x ~= offset + scale * code,   code in [-127, 127]
+
+so a query scores codes directly as ``(q * scale) . code + q . offset``
+without materializing float32 vectors for the whole catalog. Quantized
+scores are approximate; EmbeddingIndex re-ranks the head of the shortlist
+against full-precision vectors.
+"""
+from typing import Optional
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+
+class ScalarQuantizer:
+    """Base class: encode/decode rows and score codes against a float32 query."""
+
+    dtype = np.float32
+
+    # Rows converted to float32 per block while scoring
+    SCORE_CHUNK_SIZE = 8192
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _prepare_query(self, query_vec: np.ndarray):
+        """Return (weights, bias) so that score = block.astype(float32) @ weights.T + bias."""
+        return query_vec, 0.0
+
+    def scores(self, codes: np.ndarray, query_vec: np.ndarray) -> np.ndarray:
+        """Scores of every code row: shape (N,) for one query vector, (N, Q) for a (Q, D) query matrix."""
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        weights, bias = self._prepare_query(query_vec)
+        out = np.empty((codes.shape[0],) + query_vec.shape[:-1], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.SCORE_CHUNK_SIZE):
+            block = codes[start : start + self.SCORE_CHUNK_SIZE]
+            out[start : start + block.shape[0]] = block.astype(np.float32) @ weights.T + bias
+        return out
+
+
+class Float16Quantizer(ScalarQuantizer):
+    """Half-precision storage (~1e-3 relative error on normalized vectors)."""
+
+    dtype = np.float16
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+
+class Int8Quantizer(ScalarQuantizer):
+    """Per-dimension affine int8 codes."""
+
+    dtype = np.int8
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, margin: float = 0.1) -> "Int8Quantizer":
+        """Fit per-dimension ranges, widened by ``margin`` so later rows rarely clip."""
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        pad = (high - low) * margin
+        low, high = low - pad, high + pad
+        scale = (high - low) / 254.0
+        scale[scale == 0] = 1e-6
+        return cls(offset=(high + low) / 2.0, scale=scale)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.offset) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def _prepare_query(self, query_vec: np.ndarray):
+        return query_vec * self.scale, query_vec @ self.offset
+
+
+def create_quantizer(mode: str, sample: np.ndarray) -> Optional[ScalarQuantizer]:
+    """Build the quantizer for ``mode`` (None for full-precision storage)."""
+    if mode == "none":
+        return None
+    if mode == "float16":
+        return Float16Quantizer()
+    if mode == "int8":
+        return Int8Quantizer.fit(sample)
+    raise ValueError(f"Unknown embedding quantization mode: {mode!r} (expected one of {QUANTIZATION_MODES})")
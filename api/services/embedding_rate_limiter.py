@@ -0,0 +1,91 @@
+"""
+Adaptive concurrency limit for bulk embedding API requests.
+
+Bulk document embedding keeps several ``embed_content`` requests in flight.
+The limit adapts AIMD-style to what the API currently accepts:
+
+- a throttled response (HTTP 429 / RESOURCE_EXHAUSTED) halves the number of
+  concurrent requests and doubles a shared cool-down before the next start;
+- every ``limit`` consecutive successes raise the limit by one (up to
+  ``max_concurrency``) and halve the cool-down.
+
+Used by: EmbeddingService.batch_generate_embeddings, scripts/backfill_embeddings.py
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True if ``error`` is the API telling us to slow down (retryable)."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+class AdaptiveRateLimiter:
+    """AIMD limit on concurrent requests, with an optional minimum spacing between starts."""
+
+    MIN_BACKOFF = 1.0  # seconds of cool-down after the first throttle
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, max_concurrency: int = 4, min_interval: float = 0.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = max(0.0, min_interval)
+        self.limit = self.max_concurrency
+        self.backoff = 0.0
+        self._active = 0
+        self._successes = 0
+        self._next_start = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._stats = {"requests": 0, "throttled": 0, "min_limit": self.limit}
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        stats["limit"] = self.limit
+        stats["backoff"] = self.backoff
+        return stats
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one request slot; waits for capacity, spacing and any cool-down."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + max(self.min_interval, self.backoff)
+
+        try:
+            if start > now:
+                await asyncio.sleep(start - now)
+            self._stats["requests"] += 1
+            yield
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit = min(self.max_concurrency, self.limit + 1)
+            self.backoff = self.backoff / 2 if self.backoff >= 2 * self.MIN_BACKOFF else 0.0
+
+    def on_throttle(self):
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        self.backoff = min(self.MAX_BACKOFF, max(self.MIN_BACKOFF, self.backoff * 2))
+        self._next_start = max(self._next_start, time.monotonic() + self.backoff)
+        self._stats["throttled"] += 1
+        self._stats["min_limit"] = min(self._stats["min_limit"], self.limit)
+        logger.warning(f"[EMBEDDING RATE LIMIT] Throttled: concurrency -> {self.limit}, cool-down {self.backoff:.1f}s")
@@ -9,10 +9,18 @@ import hashlib
 import json
 import logging
 import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
 from google import genai
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_codec import encode_embedding
+from services.embedding_providers import EmbeddingProvider, LocalEmbeddingProvider, RemoteEmbeddingProvider
+from services.embedding_rate_limiter import AdaptiveRateLimiter, is_rate_limit_error
+from services.local_embedder import LocalEmbedder
+from services.query_embedding_cache import QueryEmbeddingCache
+from sqlalchemy import bindparam, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -22,6 +30,16 @@ from database.models import Category, Product, ProductAttribute
 logger = logging.getLogger(__name__)
 
 
+class PageEmbeddingText(NamedTuple):
+    """Freshly built embedding text for one product plus what is stored for it."""
+
+    product_id: int
+    text: str
+    stored_hash: Optional[str]
+    stored_text: Optional[str]
+    has_embedding: bool
+
+
 class EmbeddingService:
     """Service for generating and managing product embeddings."""
 
@@ -30,17 +48,35 @@ class EmbeddingService:
     EMBEDDING_DIMENSION = 768
 
     # Caching configuration
-    QUERY_CACHE_TTL = 3600  # 1 hour TTL for query cache
-    MAX_CACHE_SIZE = 1000  # Maximum cached queries
+    MAX_CACHE_SIZE = 1000  # Maximum queries in the in-process (hot) LRU tier
+    WARM_CACHE_SIZE = 500  # Durable-tier entries bulk-loaded by warm_cache
 
-    # Rate limiting
-    BATCH_SIZE = 100
-    RATE_LIMIT_DELAY = 0.5  # seconds between batches
+    # Bulk document embedding
+    DOCUMENT_PAGE_SIZE = 1000  # products loaded, embedded and written back per page
+    MAX_CONCURRENT_REQUESTS = 4  # ceiling of the adaptive embed_content concurrency limit
+    MAX_EMBED_ATTEMPTS = 5  # per request, retrying only throttled responses
+
+    # Query micro-batching: distinct queries arriving within this window share one API call
+    QUERY_BATCH_WAIT_MS = 5.0
+    MAX_TEXTS_PER_REQUEST = 100  # embed_content limit on contents per call
+
+    # Dual-write period: keep the legacy JSON column populated alongside embedding_vector
+    WRITE_JSON_EMBEDDING = True
 
     def __init__(self):
         """Initialize the embedding service."""
         self.client = None
-        self._query_cache: Dict[str, Dict[str, Any]] = {}
+        self._query_cache = QueryEmbeddingCache(self.MODEL_NAME, self.EMBEDDING_DIMENSION, max_size=self.MAX_CACHE_SIZE)
+        self._query_batcher = EmbeddingBatcher(
+            lambda texts: self._embed_texts_sync(texts, "RETRIEVAL_QUERY"),
+            max_batch_size=self.MAX_TEXTS_PER_REQUEST,
+            max_wait_ms=self.QUERY_BATCH_WAIT_MS,
+        )
+        self.query_provider: EmbeddingProvider = RemoteEmbeddingProvider(self._query_batcher)
+        self.fallback_provider: Optional[EmbeddingProvider] = None
+        self.query_latency_budget_ms = settings.query_embedding_latency_budget_ms
+        self._remote_tasks: Set[asyncio.Task] = set()
+        self._fallback_stats = {"timeouts": 0, "failures": 0, "unavailable": 0, "late_cached": 0}
         self._initialize_client()
 
     def _initialize_client(self):
@@ -71,19 +107,13 @@ class EmbeddingService:
             return None
 
         try:
-            # Truncate text if too long (model limit is ~8000 tokens)
-            truncated_text = text[:8000] if len(text) > 8000 else text
-
-            result = self.client.models.embed_content(
-                model=self.MODEL_NAME,
-                contents=truncated_text,
-                config={"task_type": task_type, "output_dimensionality": self.EMBEDDING_DIMENSION},
-            )
+            # Blocking SDK call: run it off the event loop
+            embeddings = await asyncio.to_thread(self._embed_texts_sync, [text], task_type)
+            embedding = embeddings[0] if embeddings else None
 
-            if result and result.embeddings:
-                embedding = result.embeddings[0].values
+            if embedding:
                 logger.debug(f"Generated embedding with {len(embedding)} dimensions")
-                return list(embedding)
+                return embedding
 
             logger.warning("No embedding returned from API")
             return None
@@ -92,10 +122,41 @@ class EmbeddingService:
             logger.error(f"Error generating embedding: {e}")
             return None
 
+    def _embed_texts_sync(self, texts: List[str], task_type: str) -> List[Optional[List[float]]]:
+        """
+        Embed several texts in one blocking embed_content request.
+
+        Must not be called on the event loop; use asyncio.to_thread or the
+        query batcher.
+
+        Returns:
+            One embedding (or None) per input text, in order
+        """
+        if not self.client:
+            raise RuntimeError("Embedding client not initialized")
+
+        # Truncate text if too long (model limit is ~8000 tokens)
+        contents = [text[:8000] for text in texts]
+
+        result = self.client.models.embed_content(
+            model=self.MODEL_NAME,
+            contents=contents if len(contents) > 1 else contents[0],
+            config={"task_type": task_type, "output_dimensionality": self.EMBEDDING_DIMENSION},
+        )
+
+        embeddings = list(result.embeddings or []) if result else []
+        if len(embeddings) != len(texts):
+            logger.warning(f"Expected {len(texts)} embeddings from API, got {len(embeddings)}")
+            return [None] * len(texts)
+        return [list(embedding.values) if embedding.values else None for embedding in embeddings]
+
     async def get_query_embedding(self, query: str) -> Optional[List[float]]:
         """
         Get embedding for user query with caching.
 
+        With a fallback provider attached, answers from it when the remote
+        provider exceeds the latency budget, fails or is not configured.
+
         Args:
             query: User's search query
 
@@ -104,41 +165,121 @@ class EmbeddingService:
         """
         # Normalize query for cache key
         normalized_query = query.lower().strip()
-        cache_key = hashlib.md5(normalized_query.encode()).hexdigest()
+        cache_key = self._query_cache.key(normalized_query)
 
-        # Check cache
-        if cache_key in self._query_cache:
-            cached = self._query_cache[cache_key]
-            if time.time() - cached["timestamp"] < self.QUERY_CACHE_TTL:
-                logger.debug(f"Query embedding cache hit for: {query[:50]}...")
-                return cached["embedding"]
+        # Check hot LRU, then the durable tier
+        cached = await self._query_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Query embedding cache hit for: {query[:50]}...")
+            return cached
 
-        # Generate new embedding
-        embedding = await self.generate_embedding(query, task_type="RETRIEVAL_QUERY")
+        if not normalized_query:
+            logger.warning("Empty text provided for embedding")
+            return None
+        if not self.client:
+            if self.fallback_provider is not None:
+                self._fallback_stats["unavailable"] += 1
+                return await self.fallback_provider.embed_query(normalized_query)
+            logger.error("Embedding client not initialized")
+            return None
 
-        if embedding:
-            # Cache the result
-            self._query_cache[cache_key] = {"embedding": embedding, "timestamp": time.time()}
+        if self.fallback_provider is None or self.query_latency_budget_ms <= 0:
+            # Generate new embedding (coalesced with identical in-flight queries, micro-batched with others)
+            embedding = await self.query_provider.embed_query(normalized_query)
+            if embedding:
+                self._query_cache.put(cache_key, normalized_query, embedding)
+            return embedding
+
+        return await self._embed_query_within_budget(normalized_query, cache_key)
 
-            # Prune cache if too large
-            if len(self._query_cache) > self.MAX_CACHE_SIZE:
-                self._prune_cache()
+    async def _embed_query_within_budget(self, normalized_query: str, cache_key: str) -> Optional[List[float]]:
+        """
+        Remote embedding if it arrives within the latency budget, else the fallback provider's.
 
-        return embedding
+        A remote call that misses the budget keeps running and fills the query
+        cache when it completes. Fallback vectors are never cached: the cache
+        is keyed by the remote model.
+        """
+        remote = asyncio.ensure_future(self.query_provider.embed_query(normalized_query))
+        try:
+            embedding = await asyncio.wait_for(asyncio.shield(remote), self.query_latency_budget_ms / 1000.0)
+        except asyncio.TimeoutError:
+            self._fallback_stats["timeouts"] += 1
+            self._remote_tasks.add(remote)
+            remote.add_done_callback(lambda task: self._cache_late_embedding(task, cache_key, normalized_query))
+            logger.info(
+                f"Remote query embedding exceeded {self.query_latency_budget_ms}ms, using {self.fallback_provider.name}"
+            )
+            return await self.fallback_provider.embed_query(normalized_query)
+        except Exception as e:
+            logger.warning(f"Remote query embedding failed, using {self.fallback_provider.name}: {e}")
+            embedding = None
 
-    def _prune_cache(self):
-        """Remove oldest entries from cache."""
-        if len(self._query_cache) <= self.MAX_CACHE_SIZE:
+        if embedding:
+            self._query_cache.put(cache_key, normalized_query, embedding)
+            return embedding
+        self._fallback_stats["failures"] += 1
+        return await self.fallback_provider.embed_query(normalized_query)
+
+    def _cache_late_embedding(self, task: asyncio.Task, cache_key: str, normalized_query: str):
+        self._remote_tasks.discard(task)
+        if task.cancelled() or task.exception() is not None:
             return
+        embedding = task.result()
+        if embedding:
+            self._fallback_stats["late_cached"] += 1
+            self._query_cache.put(cache_key, normalized_query, embedding)
+
+    def use_fallback_provider(self, provider: Optional[EmbeddingProvider], latency_budget_ms: Optional[int] = None):
+        """Answer queries from ``provider`` when the remote provider is over budget, failing or unconfigured."""
+        self.fallback_provider = provider
+        if latency_budget_ms is not None:
+            self.query_latency_budget_ms = latency_budget_ms
+
+    def get_query_embedding_stats(self) -> Dict[str, Any]:
+        """Query embedding batching/coalescing counters plus cache hit/miss ratios."""
+        stats = {"api": self.query_provider.stats(), "cache": self._query_cache.stats()}
+        if self.fallback_provider is not None:
+            stats["fallback"] = {
+                **self._fallback_stats,
+                "provider": self.fallback_provider.name,
+                "latency_budget_ms": self.query_latency_budget_ms,
+                **self.fallback_provider.stats(),
+            }
+        return stats
 
-        # Sort by timestamp and remove oldest 20%
-        sorted_keys = sorted(self._query_cache.keys(), key=lambda k: self._query_cache[k]["timestamp"])
-        keys_to_remove = sorted_keys[: int(len(sorted_keys) * 0.2)]
+    def attach_durable_query_cache(self, session_factory):
+        """Persist query embeddings in the query_embeddings table (shared across workers/deploys)."""
+        self._query_cache.attach_durable_tier(session_factory)
 
-        for key in keys_to_remove:
-            del self._query_cache[key]
+    @classmethod
+    def embedding_content_hash(cls, embedding_text: str) -> str:
+        """
+        Hash identifying an embedding's exact input.
 
-        logger.info(f"Pruned {len(keys_to_remove)} entries from query cache")
+        Covers the model and output dimensionality as well as the text, so a
+        model change invalidates every stored hash.
+        """
+        return hashlib.sha256(f"{cls.MODEL_NAME}:{cls.EMBEDDING_DIMENSION}:{embedding_text}".encode()).hexdigest()
+
+    def apply_embedding(self, product: Product, embedding: List[float], embedding_text: str) -> None:
+        """
+        Store a generated embedding on a product.
+
+        Writes the compact binary column and, during the dual-write period,
+        the legacy JSON column as well.
+
+        Args:
+            product: The Product model instance to update
+            embedding: The embedding vector
+            embedding_text: The text that was embedded
+        """
+        product.embedding_vector = encode_embedding(embedding)
+        if self.WRITE_JSON_EMBEDDING:
+            product.embedding = json.dumps([float(v) for v in embedding])
+        product.embedding_text = embedding_text
+        product.embedding_hash = self.embedding_content_hash(embedding_text)
+        product.embedding_updated_at = datetime.utcnow()
 
     def build_product_embedding_text(
         self, product: Product, category_name: Optional[str] = None, attributes: Optional[Dict[str, str]] = None
@@ -212,6 +353,32 @@ class EmbeddingService:
 
         return "\n".join(parts)
 
+    async def product_embedding_text(self, product: Product, db: AsyncSession) -> str:
+        """
+        Build the embedding text for a single product, fetching its category and attributes.
+
+        Args:
+            product: The Product model instance
+            db: Database session for fetching related data
+
+        Returns:
+            Text for embedding
+        """
+        # Get category name
+        category_name = None
+        if product.category_id:
+            result = await db.execute(select(Category.name).where(Category.id == product.category_id))
+            category_row = result.first()
+            if category_row:
+                category_name = category_row[0]
+
+        # Get attributes
+        result = await db.execute(select(ProductAttribute).where(ProductAttribute.product_id == product.id))
+        attributes_rows = result.scalars().all()
+        attributes = {attr.attribute_name: attr.attribute_value for attr in attributes_rows}
+
+        return self.build_product_embedding_text(product, category_name=category_name, attributes=attributes)
+
     async def generate_product_embedding(self, product: Product, db: AsyncSession) -> Optional[Tuple[List[float], str]]:
         """
         Generate embedding for a single product.
@@ -224,21 +391,7 @@ class EmbeddingService:
             Tuple of (embedding, embedding_text) or None on error
         """
         try:
-            # Get category name
-            category_name = None
-            if product.category_id:
-                result = await db.execute(select(Category.name).where(Category.id == product.category_id))
-                category_row = result.first()
-                if category_row:
-                    category_name = category_row[0]
-
-            # Get attributes
-            result = await db.execute(select(ProductAttribute).where(ProductAttribute.product_id == product.id))
-            attributes_rows = result.scalars().all()
-            attributes = {attr.attribute_name: attr.attribute_value for attr in attributes_rows}
-
-            # Build embedding text
-            embedding_text = self.build_product_embedding_text(product, category_name=category_name, attributes=attributes)
+            embedding_text = await self.product_embedding_text(product, db)
 
             # Generate embedding
             embedding = await self.generate_embedding(embedding_text, task_type="RETRIEVAL_DOCUMENT")
@@ -252,75 +405,263 @@ class EmbeddingService:
             logger.error(f"Error generating embedding for product {product.id}: {e}")
             return None
 
-    async def batch_generate_embeddings(
-        self, product_ids: List[int], db: AsyncSession, progress_callback: Optional[Callable[[int, int], None]] = None
-    ) -> Dict[str, int]:
+    # ------------------------------------------------------------------
+    # Bulk document embedding
+    # ------------------------------------------------------------------
+    async def build_page_embedding_texts(self, product_ids: List[int], db: AsyncSession) -> List[PageEmbeddingText]:
         """
-        Generate embeddings for multiple products in batches.
+        Build embedding texts for a page of products.
 
-        Args:
-            product_ids: List of product IDs to process
-            db: Database session
-            progress_callback: Optional callback(processed, total) for progress updates
+        Categories and attributes for the whole page are fetched with one
+        set-based query each instead of two queries per product.
 
         Returns:
-            Dict with stats: {"processed": N, "success": N, "failed": N}
+            PageEmbeddingText per product (with its stored hash/text), ordered by product ID
         """
-        stats = {"processed": 0, "success": 0, "failed": 0}
-        total = len(product_ids)
+        result = await db.execute(
+            select(
+                Product.id,
+                Product.name,
+                Product.description,
+                Product.category_id,
+                Product.primary_style,
+                Product.secondary_style,
+                Product.brand,
+                Product.embedding_hash,
+                Product.embedding_text,
+                (Product.embedding_vector.isnot(None) | Product.embedding.isnot(None)).label("has_embedding"),
+            )
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+        )
+        products = result.fetchall()
+        if not products:
+            return []
+
+        category_names: Dict[int, str] = {}
+        category_ids = {product.category_id for product in products if product.category_id}
+        if category_ids:
+            result = await db.execute(select(Category.id, Category.name).where(Category.id.in_(category_ids)))
+            category_names = {category_id: name for category_id, name in result.fetchall()}
+
+        attributes: Dict[int, Dict[str, str]] = defaultdict(dict)
+        result = await db.execute(
+            select(ProductAttribute.product_id, ProductAttribute.attribute_name, ProductAttribute.attribute_value).where(
+                ProductAttribute.product_id.in_([product.id for product in products])
+            )
+        )
+        for product_id, name, value in result.fetchall():
+            attributes[product_id][name] = value
+
+        return [
+            PageEmbeddingText(
+                product_id=product.id,
+                text=self.build_product_embedding_text(
+                    product, category_name=category_names.get(product.category_id), attributes=attributes.get(product.id)
+                ),
+                stored_hash=product.embedding_hash,
+                stored_text=product.embedding_text,
+                has_embedding=bool(product.has_embedding),
+            )
+            for product in products
+        ]
 
-        for i in range(0, total, self.BATCH_SIZE):
-            batch_ids = product_ids[i : i + self.BATCH_SIZE]
+    async def embed_documents(
+        self, texts: List[str], rate_limiter: Optional[AdaptiveRateLimiter] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed many document texts with multi-content requests.
 
-            # Fetch products
-            result = await db.execute(select(Product).where(Product.id.in_(batch_ids)))
-            products = result.scalars().all()
+        Texts are split into requests of MAX_TEXTS_PER_REQUEST; requests run
+        concurrently under ``rate_limiter`` (a fresh limiter of
+        MAX_CONCURRENT_REQUESTS if not given).
 
-            for product in products:
+        Returns:
+            One embedding (or None) per input text, in order
+        """
+        rate_limiter = rate_limiter or AdaptiveRateLimiter(self.MAX_CONCURRENT_REQUESTS)
+        chunks = [texts[i : i + self.MAX_TEXTS_PER_REQUEST] for i in range(0, len(texts), self.MAX_TEXTS_PER_REQUEST)]
+        results = await asyncio.gather(*(self._embed_document_chunk(chunk, rate_limiter) for chunk in chunks))
+        return [embedding for chunk_result in results for embedding in chunk_result]
+
+    async def _embed_document_chunk(self, texts: List[str], rate_limiter: AdaptiveRateLimiter) -> List[Optional[List[float]]]:
+        for attempt in range(1, self.MAX_EMBED_ATTEMPTS + 1):
+            async with rate_limiter.slot():
                 try:
-                    result = await self.generate_product_embedding(product, db)
+                    embeddings = await asyncio.to_thread(self._embed_texts_sync, texts, "RETRIEVAL_DOCUMENT")
+                    rate_limiter.on_success()
+                    return embeddings
+                except Exception as e:
+                    if not is_rate_limit_error(e):
+                        logger.error(f"Error generating embeddings for batch of {len(texts)}: {e}")
+                        return [None] * len(texts)
+                    rate_limiter.on_throttle()
+                    logger.debug(f"Embedding request throttled (attempt {attempt}/{self.MAX_EMBED_ATTEMPTS})")
 
-                    if result:
-                        embedding, embedding_text = result
+        logger.error(f"Giving up on batch of {len(texts)} after {self.MAX_EMBED_ATTEMPTS} throttled attempts")
+        return [None] * len(texts)
 
-                        # Update product with embedding
-                        product.embedding = json.dumps(embedding)
-                        product.embedding_text = embedding_text
-                        product.embedding_updated_at = datetime.utcnow()
+    async def write_embeddings(self, rows: List[Tuple[int, List[float], str]], db: AsyncSession) -> None:
+        """
+        Store embeddings for many products with one executemany UPDATE.
 
-                        stats["success"] += 1
-                    else:
-                        stats["failed"] += 1
+        Args:
+            rows: List of (product_id, embedding, embedding_text)
+            db: Database session (not committed here)
+        """
+        if not rows:
+            return
 
-                except Exception as e:
-                    logger.error(f"Error processing product {product.id}: {e}")
-                    stats["failed"] += 1
+        table = Product.__table__
+        values = {
+            "embedding_vector": bindparam("b_vector"),
+            "embedding_text": bindparam("b_text"),
+            "embedding_hash": bindparam("b_hash"),
+            "embedding_updated_at": bindparam("b_updated_at"),
+        }
+        if self.WRITE_JSON_EMBEDDING:
+            values["embedding"] = bindparam("b_json")
+
+        now = datetime.utcnow()
+        params = []
+        for product_id, embedding, embedding_text in rows:
+            param = {
+                "b_id": product_id,
+                "b_vector": encode_embedding(embedding),
+                "b_text": embedding_text,
+                "b_hash": self.embedding_content_hash(embedding_text),
+                "b_updated_at": now,
+            }
+            if self.WRITE_JSON_EMBEDDING:
+                param["b_json"] = json.dumps([float(v) for v in embedding])
+            params.append(param)
+
+        await db.execute(update(table).where(table.c.id == bindparam("b_id")).values(**values), params)
+
+    async def write_embedding_hashes(self, rows: List[Tuple[int, str]], db: AsyncSession) -> None:
+        """Stamp content hashes on products whose stored embedding already matches (no API call)."""
+        if not rows:
+            return
 
-                stats["processed"] += 1
+        table = Product.__table__
+        await db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(embedding_hash=bindparam("b_hash")),
+            [{"b_id": product_id, "b_hash": content_hash} for product_id, content_hash in rows],
+        )
+
+    async def batch_generate_embeddings(
+        self,
+        product_ids: List[int],
+        db: AsyncSession,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        force: bool = False,
+        dry_run: bool = False,
+        adopt_unhashed: bool = False,
+    ) -> Dict[str, float]:
+        """
+        Generate embeddings for multiple products, one page at a time.
 
-                if progress_callback:
-                    progress_callback(stats["processed"], total)
+        Each page costs three reads (products, categories, attributes),
+        ceil(page / MAX_TEXTS_PER_REQUEST) concurrent embed_content calls and
+        one bulk UPDATE, and is committed before the next page starts.
 
-            # Commit batch
-            await db.commit()
+        Products whose stored embedding_hash matches the hash of the freshly
+        built text are skipped without an API call.
 
-            # Rate limiting
-            if i + self.BATCH_SIZE < total:
-                await asyncio.sleep(self.RATE_LIMIT_DELAY)
+        Args:
+            product_ids: List of product IDs to process
+            db: Database session
+            progress_callback: Optional callback(processed, total) for progress updates
+            rate_limiter: Optional limiter shared across calls (e.g. by a backfill run)
+            force: Re-embed even when the content hash is unchanged
+            dry_run: Only count what would be re-embedded (no API calls, no writes)
+            adopt_unhashed: For rows without a hash whose stored embedding_text equals
+                the new text, record the hash instead of re-embedding (assumes the
+                stored vector came from the current model)
+
+        Returns:
+            Dict with stats: processed, success, failed, skipped, adopted, would_embed,
+            api_requests, throttled, elapsed_seconds and products_per_minute
+        """
+        stats = {"processed": 0, "success": 0, "failed": 0, "skipped": 0, "adopted": 0, "would_embed": 0}
+        total = len(product_ids)
+        rate_limiter = rate_limiter or AdaptiveRateLimiter(self.MAX_CONCURRENT_REQUESTS)
+        limiter_before = rate_limiter.stats()
+        start_time = time.time()
+
+        for i in range(0, total, self.DOCUMENT_PAGE_SIZE):
+            page_ids = product_ids[i : i + self.DOCUMENT_PAGE_SIZE]
+
+            try:
+                entries = await self.build_page_embedding_texts(page_ids, db)
+                pending, adopted, skipped = [], [], 0
+                for entry in entries:
+                    content_hash = self.embedding_content_hash(entry.text)
+                    if force:
+                        pending.append(entry)
+                    elif entry.stored_hash == content_hash:
+                        skipped += 1
+                    elif (
+                        adopt_unhashed
+                        and entry.stored_hash is None
+                        and entry.has_embedding
+                        and entry.stored_text == entry.text
+                    ):
+                        adopted.append((entry.product_id, content_hash))
+                    else:
+                        pending.append(entry)
+
+                if dry_run:
+                    stats["would_embed"] += len(pending)
+                else:
+                    embeddings = await self.embed_documents([entry.text for entry in pending], rate_limiter)
+                    rows = [
+                        (entry.product_id, embedding, entry.text)
+                        for entry, embedding in zip(pending, embeddings)
+                        if embedding is not None
+                    ]
+                    await self.write_embeddings(rows, db)
+                    await self.write_embedding_hashes(adopted, db)
+                    await db.commit()
+                    stats["success"] += len(rows)
+                    stats["failed"] += len(pending) - len(rows)
+
+                stats["processed"] += len(entries)
+                stats["skipped"] += skipped
+                stats["adopted"] += len(adopted)
+            except Exception as e:
+                logger.error(f"Error processing embedding page of {len(page_ids)} products: {e}")
+                await db.rollback()
+                stats["failed"] += len(page_ids)
+                stats["processed"] += len(page_ids)
+
+            if progress_callback:
+                progress_callback(stats["processed"], total)
+
+        limiter_after = rate_limiter.stats()
+        elapsed = time.time() - start_time
+        stats["api_requests"] = limiter_after["requests"] - limiter_before["requests"]
+        stats["throttled"] = limiter_after["throttled"] - limiter_before["throttled"]
+        stats["elapsed_seconds"] = round(elapsed, 2)
+        stats["products_per_minute"] = round(stats["success"] / elapsed * 60, 1) if elapsed > 0 else 0.0
 
         logger.info(f"Batch embedding complete: {stats}")
         return stats
 
-    async def update_product_embedding(self, product_id: int, db: AsyncSession) -> bool:
+    async def update_product_embedding(self, product_id: int, db: AsyncSession, force: bool = False) -> bool:
         """
         Update embedding for a single product (e.g., after attribute change).
 
+        Skips the API call when the embedding text (and model) is unchanged.
+
         Args:
             product_id: The product ID to update
             db: Database session
+            force: Re-embed even when the content hash is unchanged
 
         Returns:
-            True if successful, False otherwise
+            True if successful (or already up to date), False otherwise
         """
         try:
             result = await db.execute(select(Product).where(Product.id == product_id))
@@ -330,13 +671,15 @@ class EmbeddingService:
                 logger.warning(f"Product {product_id} not found")
                 return False
 
-            result = await self.generate_product_embedding(product, db)
+            embedding_text = await self.product_embedding_text(product, db)
+            if not force and product.embedding_hash == self.embedding_content_hash(embedding_text):
+                logger.debug(f"Embedding for product {product_id} is up to date")
+                return True
 
-            if result:
-                embedding, embedding_text = result
-                product.embedding = json.dumps(embedding)
-                product.embedding_text = embedding_text
-                product.embedding_updated_at = datetime.utcnow()
+            embedding = await self.generate_embedding(embedding_text, task_type="RETRIEVAL_DOCUMENT")
+
+            if embedding:
+                self.apply_embedding(product, embedding, embedding_text)
                 await db.commit()
                 logger.info(f"Updated embedding for product {product_id}")
                 return True
@@ -372,16 +715,20 @@ class EmbeddingService:
 
     async def warm_cache(self, common_queries: List[str]):
         """
-        Pre-warm the query cache with common queries.
+        Pre-warm the query cache.
+
+        Bulk-loads the most recently used durable-tier entries first, then
+        embeds only the common queries that are still missing.
 
         Args:
             common_queries: List of queries to pre-cache
         """
-        logger.info(f"Warming query cache with {len(common_queries)} queries")
+        loaded = await self._query_cache.load_recent(self.WARM_CACHE_SIZE)
+        missing = [q for q in common_queries if self._query_cache.key(q.lower().strip()) not in self._query_cache]
+        logger.info(f"Warming query cache: {loaded} loaded from durable tier, {len(missing)} to embed")
 
-        for query in common_queries:
-            await self.get_query_embedding(query)
-            await asyncio.sleep(0.1)  # Small delay to avoid rate limiting
+        # Concurrent requests are micro-batched into a few embed_content calls
+        await asyncio.gather(*(self.get_query_embedding(query) for query in missing))
 
         logger.info("Query cache warming complete")
 
@@ -413,7 +760,26 @@ def get_embedding_service() -> EmbeddingService:
     return _embedding_service
 
 
-async def initialize_embedding_service():
+async def initialize_embedding_service(db_session_factory=None):
     """Initialize embedding service and warm cache on startup."""
     service = get_embedding_service()
+    if db_session_factory is not None and settings.query_embedding_cache_durable:
+        service.attach_durable_query_cache(db_session_factory)
+    if settings.local_embedder_path:
+        await _attach_local_embedder(service, settings.local_embedder_path)
     await service.warm_cache(COMMON_QUERIES)
+
+
+async def _attach_local_embedder(service: EmbeddingService, path: str) -> None:
+    """Use the trained local embedder at ``path`` as the over-budget / degraded-mode fallback."""
+    try:
+        embedder = await asyncio.to_thread(LocalEmbedder.load, path)
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Ignoring local embedder at {path}: {e}")
+        return
+    expected_model = f"{service.MODEL_NAME}:{service.EMBEDDING_DIMENSION}"
+    if embedder.model != expected_model:
+        logger.warning(f"Ignoring local embedder at {path}: trained for {embedder.model!r}, not {expected_model!r}")
+        return
+    service.use_fallback_provider(LocalEmbeddingProvider(embedder))
+    logger.info(f"Local query embedder loaded from {path} ({embedder.trained_rows} training texts)")
@@ -0,0 +1,207 @@
+"""
+Shared, memory-mapped snapshots of the embedding index for multi-worker deployments.
+
+With several uvicorn workers, a private EmbeddingIndex per worker multiplies
+the vector memory. Instead one worker (the builder, elected with an
+exclusive ``flock``) keeps the mutable index, loads/refreshes it from
+Postgres and writes an immutable snapshot once enough changes have piled up
+(``embedding_snapshot_max_changes``) or the oldest unpublished change is
+``embedding_snapshot_max_age`` seconds old:
+
+    <root>/manifest.json          {"version": ..., "path": "v<version>", ...}
+    <root>/v<version>/*.npy       product_ids, vectors, filter columns, IVF/int8 state
+
+Every other worker (a follower) ``np.load(..., mmap_mode="c")``s the arrays
+of the current version, so all workers share one page-cache copy of the
+vectors. Between snapshots followers apply the small deltas from their own
+incremental DB refresh: the row arrays are written with spare rows at the
+end, and copy-on-write mapping means an update or insert only privatizes the
+pages it touches. Followers poll the manifest and swap to a new version when
+it changes; the manifest is replaced atomically (``os.replace``) after the
+version directory is fully written, so a follower never sees a partial
+snapshot. If the builder exits its lock is released and the next follower to
+poll takes over.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+from services.ann_index import IVFIndex
+from services.embedding_quantization import Int8Quantizer, create_quantizer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".builder.lock"
+
+# Index attributes persisted as one .npy file each
+ARRAY_FIELDS = ("product_ids", "vectors", "category_ids", "store_codes", "prices", "is_available")
+
+# Snapshot format version (bump when files/manifest change incompatibly)
+FORMAT_VERSION = 2
+
+
+class EmbeddingSnapshotStore:
+    """Writes and maps versioned index snapshots under a shared directory."""
+
+    # Version directories kept on disk (current + previous)
+    KEEP_VERSIONS = 2
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_file = None
+        self.pending_changes = 0
+        self.pending_since: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Builder election
+    # ------------------------------------------------------------------
+    @property
+    def is_builder(self) -> bool:
+        return self._lock_file is not None
+
+    def try_become_builder(self) -> bool:
+        """Take the builder lock if no other process holds it (non-blocking)."""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.root / LOCK_NAME, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"[EMBEDDING SNAPSHOT] Process {os.getpid()} is the snapshot builder for {self.root}")
+        return True
+
+    def release_builder(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+    def record_changes(self, counts: Dict[str, int]):
+        """Count rows changed by a builder refresh towards the next snapshot."""
+        changed = sum(counts.values())
+        if changed and self.pending_since is None:
+            self.pending_since = time.time()
+        self.pending_changes += changed
+
+    def snapshot_due(self, max_changes: int, max_age: float) -> bool:
+        """True once the unpublished changes are too many or too old for followers to patch in."""
+        if self.pending_changes == 0:
+            return False
+        return self.pending_changes >= max_changes or time.time() - self.pending_since >= max_age
+
+    def write(self, index, headroom: int = 0) -> str:
+        """Write ``index`` as a new snapshot version and publish it. Returns the version.
+
+        Row arrays get ``headroom`` spare rows so followers can append inserted
+        rows in place until the next snapshot.
+        """
+        start_time = time.time()
+        version = int(time.time() * 1000)
+        while (self.root / f"v{version}").exists():
+            version += 1
+        version = str(version)
+        tmp_dir = self.root / f".tmp-v{version}"
+        final_dir = self.root / f"v{version}"
+        tmp_dir.mkdir()
+
+        rows = len(index)
+        for field in ARRAY_FIELDS:
+            array = getattr(index, field)
+            padded = np.lib.format.open_memmap(
+                tmp_dir / f"{field}.npy", mode="w+", dtype=array.dtype, shape=(rows + headroom,) + array.shape[1:]
+            )
+            padded[:rows] = array
+            padded.flush()
+            del padded
+        if isinstance(index.quantizer, Int8Quantizer):
+            np.save(tmp_dir / "quant_offset.npy", index.quantizer.offset)
+            np.save(tmp_dir / "quant_scale.npy", index.quantizer.scale)
+        if index.ann is not None:
+            np.save(tmp_dir / "ann_centroids.npy", index.ann.centroids)
+            np.save(tmp_dir / "ann_lists.npy", index.ann_lists)
+        os.rename(tmp_dir, final_dir)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version,
+            "path": final_dir.name,
+            "rows": rows,
+            "capacity": rows + headroom,
+            "dimension": index.dimension,
+            "quantization": index.quantization,
+            "stores": list(index._store_names),
+            "has_ann": index.ann is not None,
+            "ann_trained_rows": index.ann.trained_rows if index.ann is not None else 0,
+            "watermark": index.watermark.isoformat() if index.watermark else None,
+            "created_at": time.time(),
+        }
+        tmp_manifest = self.root / f".{MANIFEST_NAME}.tmp"
+        with open(tmp_manifest, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.root / MANIFEST_NAME)
+
+        self._cleanup(keep=final_dir.name)
+        self.pending_changes = 0
+        self.pending_since = None
+        logger.info(f"[EMBEDDING SNAPSHOT] Wrote version {version} ({len(index)} rows) in {time.time() - start_time:.2f}s")
+        return version
+
+    def _cleanup(self, keep: str):
+        """Remove old version directories; mapped files stay valid for readers until they swap."""
+        versions = sorted((p for p in self.root.glob("v*") if p.is_dir()), key=lambda p: p.name)
+        stale = [p for p in versions[: -self.KEEP_VERSIONS] if p.name != keep]
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+        for path in self.root.glob(".tmp-v*"):
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+    def read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.root / MANIFEST_NAME) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format_version") != FORMAT_VERSION:
+            logger.warning(f"[EMBEDDING SNAPSHOT] Ignoring manifest with format {manifest.get('format_version')}")
+            return None
+        return manifest
+
+    def map_into(self, index, manifest: Dict):
+        """Point ``index`` at copy-on-write memory maps of ``manifest``'s version.
+
+        Writes by the follower stay private to its process; the files are never modified.
+        """
+        version_dir = self.root / manifest["path"]
+        arrays = {field: np.load(version_dir / f"{field}.npy", mmap_mode="c") for field in ARRAY_FIELDS}
+
+        quantizer = None
+        if manifest["quantization"] == "int8":
+            quantizer = Int8Quantizer(np.load(version_dir / "quant_offset.npy"), np.load(version_dir / "quant_scale.npy"))
+        elif manifest["quantization"] != "none":
+            quantizer = create_quantizer(manifest["quantization"], arrays["vectors"][:0])
+
+        ann, ann_lists = None, None
+        if manifest.get("has_ann"):
+            ann = IVFIndex(np.load(version_dir / "ann_centroids.npy"), trained_rows=manifest["ann_trained_rows"])
+            ann_lists = np.load(version_dir / "ann_lists.npy", mmap_mode="c")
+
+        # Swap everything in one synchronous step: searches run on the same
+        # event loop, so none can observe a half-swapped index.
+        index.attach_snapshot(manifest, arrays, quantizer, ann, ann_lists)
@@ -0,0 +1,350 @@
+"""
+Process-resident facet columns for counting search results and the catalog.
+
+Search result panels want per-category, per-store, per-style and price-range
+counts of the current result set; each used to be a GROUP BY / COUNT round
+trip (or was skipped). The facet index keeps one compact column per facet for
+every product (category_id, store code, style code, price, is_available),
+sorted by product id, and counts a result id set in one pass: the ids are
+located with one ``searchsorted`` and every facet is a ``bincount`` (price
+ranges a ``searchsorted`` over the bucket edges).
+
+Like the embedding index it is loaded at startup in id-keyset chunks and
+refreshed from ``last_updated``; unlike it, it covers every product, with or
+without an embedding. ~25 bytes per product. Deleted products keep their
+row until the next full load; they never appear in a result id set.
+
+Used by: products.py (/products/search facets),
+admin_curated.py (search_products_for_look), chat.py (get_paginated_products)
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database.models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+# (product_id, category_id, source_website, price, primary_style, is_available)
+FacetRow = Tuple[int, Optional[int], Optional[str], Optional[float], Optional[str], Optional[bool]]
+
+# Lower edges of the search price ranges (the last range is open-ended)
+DEFAULT_PRICE_EDGES = (0, 5000, 10000, 25000, 50000, 100000)
+
+
+class _Codes:
+    """Dense integer codes for string facet values (-1 = no value)."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._lookup: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.names)
+            self.names.append(value)
+            self._lookup[value] = code
+        return code
+
+
+class FacetIndex:
+    """Facet columns of every product, sorted by product id."""
+
+    # Rows fetched per round trip during a full load
+    LOAD_CHUNK_SIZE = 20000
+
+    # Column buffers grow by this factor when an insert does not fit
+    GROWTH_FACTOR = 1.5
+
+    COLUMNS = ("product_ids", "category_ids", "store_codes", "style_codes", "prices", "is_available")
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.category_ids = np.empty(0, dtype=np.int32)
+        self.store_codes = np.empty(0, dtype=np.int32)
+        self.style_codes = np.empty(0, dtype=np.int32)
+        self.prices = np.empty(0, dtype=np.float32)
+        self.is_available = np.empty(0, dtype=bool)
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.category_names: Dict[int, str] = {}
+        self._stores = _Codes()
+        self._styles = _Codes()
+        self.watermark: Optional[datetime] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return int(self.product_ids.shape[0])
+
+    def stats(self) -> Dict[str, object]:
+        """Return size and freshness information for logging/debug endpoints."""
+        columns = [getattr(self, name) for name in self.COLUMNS]
+        return {
+            "loaded": self.is_loaded,
+            "rows": len(self),
+            "stores": len(self._stores.names),
+            "styles": len(self._styles.names),
+            "categories": len(self.category_names),
+            "memory_mb": round(sum(column.nbytes for column in columns) / (1024 * 1024), 1),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    @property
+    def capacity(self) -> int:
+        """Rows the column buffers hold before the next reallocation."""
+        buffer = self._buffers.get("product_ids")
+        return len(self) if buffer is None else int(buffer.shape[0])
+
+    def reserve(self, rows: int):
+        """Make room for ``rows`` rows in total; the columns are views of the buffers' first len(self) rows."""
+        if rows <= self.capacity and self._buffers:
+            return
+        size = len(self)
+        for name in self.COLUMNS:
+            current = getattr(self, name)
+            buffer = np.empty(max(rows, size), dtype=current.dtype)
+            buffer[:size] = current
+            self._buffers[name] = buffer
+            setattr(self, name, buffer[:size])
+
+    def _append_columns(self, columns: Dict[str, np.ndarray]):
+        """Append rows to every column, growing the buffers geometrically."""
+        size = len(self)
+        new_size = size + len(columns["product_ids"])
+        if not self._buffers or new_size > self.capacity:
+            self.reserve(max(new_size, int(self.capacity * self.GROWTH_FACTOR)))
+        for name, values in columns.items():
+            buffer = self._buffers[name]
+            buffer[size:new_size] = values
+            setattr(self, name, buffer[:new_size])
+
+    def upsert_rows(self, rows: Iterable[FacetRow]) -> Dict[str, int]:
+        """Insert or update rows (a product id seen again replaces its row)."""
+        rows = list(rows)
+        if not rows:
+            return {"inserted": 0, "updated": 0}
+        # Last occurrence wins within a batch
+        latest = {row[0]: row for row in rows}
+        ids = np.fromiter(latest, dtype=np.int64, count=len(latest))
+        values = latest.values()
+        category_ids = np.array([-1 if row[1] is None else row[1] for row in values], dtype=np.int32)
+        store_codes = np.array([self._stores.code(row[2]) for row in values], dtype=np.int32)
+        prices = np.array([np.nan if row[3] is None else row[3] for row in values], dtype=np.float32)
+        style_codes = np.array([self._styles.code((row[4] or "").lower()) for row in values], dtype=np.int32)
+        is_available = np.array([bool(row[5]) for row in values], dtype=bool)
+
+        positions = np.searchsorted(self.product_ids, ids)
+        existing = positions < len(self)
+        existing[existing] = self.product_ids[positions[existing]] == ids[existing]
+        target = positions[existing]
+        self.category_ids[target] = category_ids[existing]
+        self.store_codes[target] = store_codes[existing]
+        self.style_codes[target] = style_codes[existing]
+        self.prices[target] = prices[existing]
+        self.is_available[target] = is_available[existing]
+
+        new = ~existing
+        if new.any():
+            self._append_columns(
+                {
+                    "product_ids": ids[new],
+                    "category_ids": category_ids[new],
+                    "store_codes": store_codes[new],
+                    "style_codes": style_codes[new],
+                    "prices": prices[new],
+                    "is_available": is_available[new],
+                }
+            )
+            if not np.all(self.product_ids[1:] > self.product_ids[:-1]):
+                order = np.argsort(self.product_ids, kind="stable")
+                for name in self.COLUMNS:
+                    column = getattr(self, name)
+                    column[:] = column[order]
+        return {"inserted": int(new.sum()), "updated": int(existing.sum())}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _columns():
+        return (
+            Product.id,
+            Product.category_id,
+            Product.source_website,
+            Product.price,
+            Product.primary_style,
+            Product.is_available,
+            Product.last_updated,
+        )
+
+    def _apply_db_rows(self, db_rows) -> Dict[str, int]:
+        counts = self.upsert_rows(row[:6] for row in db_rows)
+        for row in db_rows:
+            if row[6] is not None and (self.watermark is None or row[6] > self.watermark):
+                self.watermark = row[6]
+        return counts
+
+    async def _load_category_names(self, db: AsyncSession):
+        result = await db.execute(select(Category.id, Category.name))
+        self.category_names = dict(result.fetchall())
+
+    async def load(self, db: AsyncSession) -> Dict[str, int]:
+        """Full (re)load of every product's facet columns, in id-keyset chunks.
+
+        The buffers are sized from a row count up front, so chunks are written in place.
+        """
+        start_time = time.time()
+        self._reset()
+        self.reserve(int(await db.scalar(select(func.count()).select_from(Product)) or 0))
+
+        inserted = 0
+        last_id = 0
+        while True:
+            query = select(*self._columns()).where(Product.id > last_id).order_by(Product.id).limit(self.LOAD_CHUNK_SIZE)
+            rows = (await db.execute(query)).fetchall()
+            if not rows:
+                break
+            inserted += self._apply_db_rows(rows)["inserted"]
+            last_id = rows[-1][0]
+        await self._load_category_names(db)
+
+        self.loaded_at = self.refreshed_at = time.time()
+        logger.info(f"[FACET INDEX] Loaded {len(self)} products in {self.loaded_at - start_time:.2f}s")
+        return {"inserted": inserted, "updated": 0}
+
+    async def refresh(self, db: AsyncSession) -> Dict[str, int]:
+        """Apply products changed since the last load/refresh (``>=`` on the watermark, upserts are idempotent)."""
+        if not self.is_loaded or self.watermark is None:
+            return await self.load(db)
+
+        result = await db.execute(select(*self._columns()).where(Product.last_updated >= self.watermark))
+        counts = self._apply_db_rows(result.fetchall())
+        await self._load_category_names(db)
+        self.refreshed_at = time.time()
+        logger.debug(f"[FACET INDEX] Refresh applied {counts} (rows={len(self)})")
+        return counts
+
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+    def rows_of(self, product_ids: Sequence[int]) -> np.ndarray:
+        """Rows of the ``product_ids`` present in the index, ascending (unknown ids are skipped)."""
+        # Sorted keys let searchsorted walk the column in order (several times faster for large sets)
+        ids = np.sort(np.asarray(product_ids, dtype=np.int64))
+        positions = np.searchsorted(self.product_ids, ids)
+        found = positions < len(self)
+        found[found] = self.product_ids[positions[found]] == ids[found]
+        return positions[found]
+
+    @staticmethod
+    def _value_counts(codes: np.ndarray, names: Sequence[str]) -> List[Dict[str, Any]]:
+        counts = np.bincount(codes[codes >= 0], minlength=len(names))
+        present = np.flatnonzero(counts)
+        order = present[np.lexsort((present, -counts[present]))]
+        return [{"value": names[code], "count": int(counts[code])} for code in order]
+
+    def facet_counts(
+        self,
+        product_ids: Optional[Sequence[int]] = None,
+        price_edges: Sequence[float] = DEFAULT_PRICE_EDGES,
+        available_only: bool = False,
+    ) -> Dict[str, Any]:
+        """Category, store, style and price-range counts of ``product_ids`` (all products if None).
+
+        Values are ordered by count, largest first. Products without a value
+        for a facet are left out of that facet; products not in the index
+        are left out of every facet and of ``total``.
+        """
+        rows = np.arange(len(self)) if product_ids is None else self.rows_of(product_ids)
+        if available_only:
+            rows = rows[self.is_available[rows]]
+
+        category_ids = self.category_ids[rows]
+        known = category_ids[category_ids >= 0]
+        category_counts = np.bincount(known) if known.size else np.empty(0, dtype=np.int64)
+        present = np.flatnonzero(category_counts)
+        categories = [
+            {
+                "id": int(category_id),
+                "name": self.category_names.get(int(category_id)),
+                "count": int(category_counts[category_id]),
+            }
+            for category_id in present[np.lexsort((present, -category_counts[present]))]
+        ]
+
+        prices = self.prices[rows]
+        prices = prices[~np.isnan(prices)]
+        edges = np.asarray(price_edges, dtype=np.float64)
+        # Bucket i + 1 holds [edges[i], edges[i + 1]); bucket 0 (below the first edge) is not reported
+        price_counts = np.bincount(np.searchsorted(edges, prices, side="right"), minlength=len(edges) + 1)
+        price_ranges = [
+            {
+                "min": float(low),
+                "max": float(edges[i + 1]) if i + 1 < len(edges) else None,
+                "count": int(price_counts[i + 1]),
+            }
+            for i, low in enumerate(edges)
+        ]
+
+        return {
+            "total": int(rows.size),
+            "available": int(self.is_available[rows].sum()),
+            "categories": categories,
+            "stores": self._value_counts(self.store_codes[rows], self._stores.names),
+            "styles": self._value_counts(self.style_codes[rows], self._styles.names),
+            "price_ranges": price_ranges,
+        }
+
+
+# Singleton instance
+_facet_index: Optional[FacetIndex] = None
+
+
+def get_facet_index() -> FacetIndex:
+    """Get or create the facet index singleton."""
+    global _facet_index
+    if _facet_index is None:
+        _facet_index = FacetIndex()
+    return _facet_index
+
+
+def result_facets(product_ids: Sequence[int]) -> Optional[Dict[str, Any]]:
+    """Facet counts of a search result id set, or None while the facet index is not loaded."""
+    index = get_facet_index()
+    if not index.is_loaded:
+        return None
+    return index.facet_counts(product_ids)
+
+
+async def initialize_facet_index(db_session_factory) -> None:
+    """Load the facet index on startup."""
+    async with db_session_factory() as db:
+        await get_facet_index().load(db)
+
+
+async def refresh_facet_index(db_session_factory) -> Dict[str, int]:
+    """Incrementally refresh the facet index (loads it if not yet loaded)."""
+    async with db_session_factory() as db:
+        return await get_facet_index().refresh(db)
@@ -0,0 +1,289 @@
+"""
+Two-phase hybrid retrieval with reciprocal rank fusion (RRF).
+
+Phase one works on ids and scores only:
+- semantic: ``semantic_search_hits`` (top-k over embeddings, as a ranked list);
+- keyword: ``build_keyword_conditions`` over (id, name, match tier) rows;
+- the two rankings are fused with RRF, ``score(d) = sum 1 / (RRF_K + rank(d))``,
+  and exclusion terms are applied on names.
+
+Phase two (``hydrate_products``) loads the requested page only, in a single
+query with the category and images joined.
+
+Membership: every keyword hit, plus semantic hits at or above
+SEMANTIC_ONLY_THRESHOLD. The color/style/material filters apply to both;
+the previous merge let semantic-only hits bypass them. Products found by
+both retrievers rank above products found by one.
+
+Used by: products.py (/products/search), scripts/evaluate_search_quality.py
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.search_service import (
+    BRAND_WEIGHT,
+    analyze_query,
+    build_keyword_conditions,
+    name_matches_any,
+    semantic_search_hits,
+    text_search_condition,
+    tsquery_phrase,
+)
+from sqlalchemy import case, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from database.models import Product, ProductAttribute
+
+logger = logging.getLogger(__name__)
+
+# Standard RRF damping constant (Cormack et al.): flattens the gap between the top ranks
+RRF_K = 60
+SIMILARITY_THRESHOLD = 0.3
+SEMANTIC_ONLY_THRESHOLD = 0.5  # Semantic hits without a keyword match need this similarity
+CANDIDATE_LIMIT = 10000
+
+FUSION_RRF = "rrf"
+FUSION_CONCAT = "concat"  # Previous order: semantic hits first, then keyword-only hits
+
+
+# ---------------------------------------------------------------------------
+# Fusion
+# ---------------------------------------------------------------------------
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    k: int = RRF_K,
+    weights: Optional[Sequence[float]] = None,
+) -> Dict[int, float]:
+    """Fuse ranked id lists (best first) into id -> RRF score, ordered best first.
+
+    Ranks are 1-based positions in each list. Equal fused scores keep the order
+    in which ids were first seen (earlier lists first).
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, product_id in enumerate(ranking, 1):
+            fused[product_id] = fused.get(product_id, 0.0) + weight / (k + rank)
+    return dict(sorted(fused.items(), key=lambda item: item[1], reverse=True))
+
+
+def _normalize_name(text: str) -> Tuple[str, str]:
+    text = text.lower()
+    return re.sub(r"\s*-\s*", "-", text), re.sub(r"-", " ", text)
+
+
+def matched_group_count(product_name: str, groups: List[List[str]]) -> int:
+    """Number of search groups with at least one term in the product name (hyphen/space insensitive)."""
+    name_lower = product_name.lower()
+    name_normalized, name_spaced = _normalize_name(product_name)
+
+    matched = 0
+    for group in groups:
+        for term in group:
+            term_normalized, term_spaced = _normalize_name(term)
+            if term_normalized in name_normalized or term_normalized in name_spaced:
+                matched += 1
+                break
+            if term_spaced in name_lower or term_spaced in name_spaced:
+                matched += 1
+                break
+    return matched
+
+
+# ---------------------------------------------------------------------------
+# Phase one: candidate ids and scores
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class HybridCandidates:
+    """Fused candidate list for one search (ids, scores and names only)."""
+
+    ordered_ids: List[int] = field(default_factory=list)
+    semantic_scores: Dict[int, float] = field(default_factory=dict)
+    fused_scores: Dict[int, float] = field(default_factory=dict)
+    names: Dict[int, str] = field(default_factory=dict)
+    search_groups: List[List[str]] = field(default_factory=list)
+    rows_fetched: int = 0
+    bytes_fetched: int = 0
+
+    def __len__(self) -> int:
+        return len(self.ordered_ids)
+
+    def is_primary_match(self, product_id: int) -> bool:
+        """Name matches every search group (always True without groups)."""
+        if not self.search_groups:
+            return True
+        return matched_group_count(self.names.get(product_id, ""), self.search_groups) == len(self.search_groups)
+
+
+def _estimate_bytes(rows: Sequence[Tuple]) -> int:
+    """Approximate wire size of (id, name, ...) rows: 8 bytes per number, UTF-8 length per string."""
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, str):
+                total += len(value.encode("utf-8"))
+            elif value is not None:
+                total += 8
+    return total
+
+
+def search_filter_conditions(
+    colors: Optional[List[str]] = None,
+    styles: Optional[List[str]] = None,
+    materials: Optional[List[str]] = None,
+) -> List[Any]:
+    """WHERE conditions for the color / style / material filters (lower-cased values)."""
+    conditions = []
+    if colors:
+        conditions.append(
+            or_(*[or_(Product.name.ilike(f"%{color}%"), Product.description.ilike(f"%{color}%")) for color in colors])
+        )
+    if styles:
+        conditions.append(func.lower(Product.primary_style).in_(styles))
+    if materials:
+        material_subquery = (
+            select(ProductAttribute.product_id)
+            .where(ProductAttribute.attribute_name.in_(["material", "material_primary"]))
+            .where(func.lower(ProductAttribute.attribute_value).in_(materials))
+        )
+        conditions.append(Product.id.in_(material_subquery))
+    return conditions
+
+
+async def hybrid_candidates(
+    query: Optional[str],
+    db: AsyncSession,
+    category_id: Optional[int] = None,
+    source_websites: Optional[List[str]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    colors: Optional[List[str]] = None,
+    styles: Optional[List[str]] = None,
+    materials: Optional[List[str]] = None,
+    fusion: str = FUSION_RRF,
+    limit: int = CANDIDATE_LIMIT,
+) -> HybridCandidates:
+    """Phase one: fused, exclusion-filtered candidate ids for a search (no product rows are loaded)."""
+    start_time = time.time()
+    candidates = HybridCandidates()
+    attribute_filters = search_filter_conditions(colors, styles, materials)
+
+    # ---- Semantic ranking (ids and similarities, best first) ----
+    semantic_hits: List[Tuple[int, float]] = []
+    if query:
+        try:
+            semantic_hits = await semantic_search_hits(
+                query_text=query,
+                db=db,
+                category_ids=[category_id] if category_id else None,
+                source_websites=source_websites,
+                min_price=min_price,
+                max_price=max_price,
+                limit=limit,
+                min_score=SIMILARITY_THRESHOLD,
+            )
+        except Exception as e:
+            logger.warning(f"[HYBRID SEARCH] Semantic search failed, using keyword only: {e}")
+
+    # ---- Keyword ranking (ids, names and match tier: name > brand > description) ----
+    keyword_query = select(Product.id, Product.name).where(Product.is_available.is_(True))
+    if query:
+        where_clause, candidates.search_groups = build_keyword_conditions(query)
+        all_search_terms = [term for group in candidates.search_groups for term in group]
+        match_tier = case(
+            (name_matches_any(all_search_terms), 0),
+            (text_search_condition(tsquery_phrase(query, BRAND_WEIGHT)), 1),
+            else_=2,
+        )
+        keyword_query = keyword_query.add_columns(match_tier.label("match_tier")).where(where_clause).order_by("match_tier")
+    if category_id:
+        keyword_query = keyword_query.where(Product.category_id == category_id)
+    if source_websites:
+        keyword_query = keyword_query.where(Product.source_website.in_(source_websites))
+    if min_price is not None:
+        keyword_query = keyword_query.where(Product.price >= min_price)
+    if max_price is not None:
+        keyword_query = keyword_query.where(Product.price <= max_price)
+    for condition in attribute_filters:
+        keyword_query = keyword_query.where(condition)
+    keyword_query = keyword_query.order_by(Product.price.desc().nullslast(), Product.id).limit(limit)
+
+    keyword_rows = (await db.execute(keyword_query)).fetchall()
+    candidates.rows_fetched += len(keyword_rows) + len(semantic_hits)
+    candidates.bytes_fetched += _estimate_bytes(keyword_rows) + 16 * len(semantic_hits)
+    candidates.names.update((row[0], row[1]) for row in keyword_rows)
+    keyword_ids = set(candidates.names)
+
+    analysis = analyze_query(query) if query else None
+    exclusion_terms = list(analysis.exclusions) if analysis else []
+    if exclusion_terms:
+        logger.info(f"[HYBRID SEARCH] Exclusion terms for '{query}': {exclusion_terms}")
+
+    # ---- Semantic-only candidates: names for exclusions / primary counts, and the attribute filters ----
+    semantic_only_ids = [pid for pid, score in semantic_hits if pid not in keyword_ids and score >= SEMANTIC_ONLY_THRESHOLD]
+    if semantic_only_ids and (exclusion_terms or candidates.search_groups or attribute_filters):
+        names_query = select(Product.id, Product.name).where(Product.id.in_(semantic_only_ids), *attribute_filters)
+        name_rows = (await db.execute(names_query)).fetchall()
+        candidates.rows_fetched += len(name_rows)
+        candidates.bytes_fetched += _estimate_bytes(name_rows)
+        candidates.names.update((row[0], row[1]) for row in name_rows)
+        if attribute_filters:
+            semantic_only_ids = [pid for pid in semantic_only_ids if pid in candidates.names]
+    allowed_semantic = keyword_ids.union(semantic_only_ids)
+
+    semantic_ranking = [pid for pid, _ in semantic_hits if pid in allowed_semantic]
+
+    if query and candidates.search_groups:
+        # Products matching more search groups by name first; the SQL order breaks ties
+        keyword_ranking = [
+            row[0]
+            for row in sorted(
+                keyword_rows, key=lambda row: (-matched_group_count(row[1], candidates.search_groups), row.match_tier)
+            )
+        ]
+    else:
+        keyword_ranking = [row[0] for row in keyword_rows]
+
+    # ---- Fuse and apply exclusions ----
+    if fusion == FUSION_RRF:
+        fused = reciprocal_rank_fusion([semantic_ranking, keyword_ranking])
+    else:
+        fused = dict.fromkeys(semantic_ranking + keyword_ranking, 0.0)
+
+    for product_id, score in fused.items():
+        if exclusion_terms and analysis.excludes(candidates.names.get(product_id, "")):
+            continue
+        candidates.ordered_ids.append(product_id)
+        candidates.fused_scores[product_id] = score
+    candidates.semantic_scores = {pid: score for pid, score in semantic_hits if pid in candidates.fused_scores}
+
+    logger.info(
+        f"[HYBRID SEARCH] {len(candidates)} candidates (semantic={len(semantic_ranking)}, keyword={len(keyword_ranking)}, "
+        f"fusion={fusion}, ~{candidates.bytes_fetched / 1024:.0f} KB fetched) in {time.time() - start_time:.2f}s"
+    )
+    return candidates
+
+
+# ---------------------------------------------------------------------------
+# Phase two: hydrate one page
+# ---------------------------------------------------------------------------
+
+
+async def hydrate_products(product_ids: List[int], db: AsyncSession) -> List[Product]:
+    """Products for ``product_ids`` in that order, with category and images, in one query."""
+    if not product_ids:
+        return []
+    result = await db.execute(
+        select(Product).options(joinedload(Product.category), joinedload(Product.images)).where(Product.id.in_(product_ids))
+    )
+    products_map = {product.id: product for product in result.scalars().unique().all()}
+    return [products_map[product_id] for product_id in product_ids if product_id in products_map]
@@ -0,0 +1,204 @@
+"""
+CPU-only query embedder mapped into the remote (Gemini) embedding space.
+
+Text is encoded as a hashed bag of word unigrams, word bigrams and character
+3/4-grams (signed feature hashing into ``n_features`` buckets, sublinear TF,
+IDF weights and L2 norm). A ridge-regression linear map, trained offline
+from (text, remote vector) pairs, projects that sparse vector into the
+768-dim product embedding space, so local query vectors can be scored
+against the resident product embeddings directly.
+
+Embedding a query gathers only the projection rows of its non-zero features
+(a few dozen), so it takes well under a millisecond and never leaves the
+process. Quality is below the remote model; scripts/train_local_embedder.py
+reports how many of the remote query's top-k products the local vector
+retrieves on the golden queries.
+
+Used by: services.embedding_providers.LocalEmbeddingProvider (degraded-mode
+fallback of EmbeddingService.get_query_embedding), scripts/train_local_embedder.py
+"""
+import logging
+import os
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURES = 4096
+
+_WORD = re.compile(r"[^\W_]+")
+
+# Sparse encoding of one text: (feature indices, values), indices unique
+SparseRow = Tuple[np.ndarray, np.ndarray]
+
+
+class HashedNgramEncoder:
+    """Signed feature hashing of words, word bigrams and character n-grams."""
+
+    CHAR_NGRAMS = (3, 4)
+
+    def __init__(self, n_features: int = DEFAULT_FEATURES):
+        if n_features <= 0 or n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.n_features = n_features
+
+    def features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        features = [f"w:{word}" for word in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.CHAR_NGRAMS:
+                features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def encode(self, text: str) -> SparseRow:
+        """Sublinear term frequencies of the hashed features (no IDF, not normalized)."""
+        counts: Dict[int, float] = {}
+        mask = self.n_features - 1
+        for feature in self.features(text):
+            hashed = zlib.crc32(feature.encode())
+            index = hashed & mask
+            counts[index] = counts.get(index, 0.0) + (1.0 if hashed & 0x80000000 else -1.0)
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        keep = values != 0
+        indices, values = indices[keep], values[keep]
+        return indices, np.sign(values) * (1.0 + np.log(np.abs(values)))
+
+    def matrix(self, rows: Sequence[SparseRow], idf: np.ndarray) -> np.ndarray:
+        """Dense (len(rows), n_features) TF-IDF matrix, rows L2-normalized."""
+        matrix = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for i, (indices, values) in enumerate(rows):
+            matrix[i, indices] = values * idf[indices]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class LocalEmbedder:
+    """Hashed n-gram TF-IDF vector times a learned (n_features x dimension) projection."""
+
+    # Format version of the saved .npz file
+    FORMAT_VERSION = 1
+
+    # Rows per X^T X accumulation step during training (bounds the dense chunk)
+    FIT_CHUNK_SIZE = 2048
+
+    def __init__(self, projection: np.ndarray, idf: np.ndarray, model: str = "", trained_rows: int = 0):
+        self.projection = np.ascontiguousarray(projection, dtype=np.float32)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.encoder = HashedNgramEncoder(self.projection.shape[0])
+        self.model = model
+        self.trained_rows = trained_rows
+
+    @property
+    def dimension(self) -> int:
+        return int(self.projection.shape[1])
+
+    @property
+    def n_features(self) -> int:
+        return int(self.projection.shape[0])
+
+    # ------------------------------------------------------------------
+    # Train / persist
+    # ------------------------------------------------------------------
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        targets: np.ndarray,
+        weights: Optional[Sequence[float]] = None,
+        n_features: int = DEFAULT_FEATURES,
+        ridge: float = 1.0,
+        model: str = "",
+    ) -> "LocalEmbedder":
+        """Least-squares projection from TF-IDF features onto the (normalized) target vectors.
+
+        ``weights`` scales each pair's contribution (e.g. up-weight real queries
+        over product texts). Solved in closed form: (X^T W X + ridge I)^-1 X^T W Y.
+        """
+        start_time = time.time()
+        if len(texts) == 0:
+            raise ValueError("Cannot train a local embedder on zero texts")
+        targets = np.asarray(targets, dtype=np.float32)
+        norms = np.linalg.norm(targets, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        targets = targets / norms
+        weights = np.ones(len(texts)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        encoder = HashedNgramEncoder(n_features)
+        rows = [encoder.encode(text) for text in texts]
+        document_frequency = np.bincount(np.concatenate([indices for indices, _ in rows]), minlength=n_features)
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+
+        gram = np.zeros((n_features, n_features), dtype=np.float64)
+        cross = np.zeros((n_features, targets.shape[1]), dtype=np.float64)
+        for start in range(0, len(rows), cls.FIT_CHUNK_SIZE):
+            end = start + cls.FIT_CHUNK_SIZE
+            scale = np.sqrt(weights[start:end])[:, None].astype(np.float32)
+            x = encoder.matrix(rows[start:end], idf) * scale
+            gram += x.T @ x
+            cross += x.T @ (targets[start:end] * scale)
+        gram[np.diag_indices_from(gram)] += ridge
+
+        projection = np.linalg.solve(gram, cross)
+        logger.info(
+            f"[LOCAL EMBEDDER] Trained {n_features}x{targets.shape[1]} projection on {len(rows)} texts "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return cls(projection, idf, model=model, trained_rows=len(rows))
+
+    def save(self, path: Union[str, Path]):
+        """Write the model to ``path`` (.npz) atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                projection=self.projection,
+                idf=self.idf,
+                model=np.str_(self.model),
+                trained_rows=np.int64(self.trained_rows),
+                format_version=np.int64(self.FORMAT_VERSION),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LocalEmbedder":
+        """Load a model saved by :meth:`save`."""
+        with np.load(path) as data:
+            if int(data["format_version"]) != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported local embedder format in {path}")
+            return cls(data["projection"], data["idf"], model=str(data["model"]), trained_rows=int(data["trained_rows"]))
+
+    # ------------------------------------------------------------------
+    # Embed
+    # ------------------------------------------------------------------
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Unit-norm embedding of ``text``, or None if it has no usable features."""
+        indices, values = self.encoder.encode(text)
+        if indices.size == 0:
+            return None
+        weighted = values * self.idf[indices]
+        vector = weighted @ self.projection[indices]
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            return None
+        return vector / norm
+
+
+def neighbour_recall(reference: np.ndarray, candidate: np.ndarray, corpus: np.ndarray, k: int = 50) -> np.ndarray:
+    """Per query: share of the reference vector's top-k corpus rows that the candidate vector also ranks top-k."""
+    k = min(k, corpus.shape[0])
+    if k == 0:
+        return np.zeros(reference.shape[0])
+    reference_top = np.argpartition(-(reference @ corpus.T), k - 1, axis=1)[:, :k]
+    candidate_top = np.argpartition(-(candidate @ corpus.T), k - 1, axis=1)[:, :k]
+    return np.array([len(np.intersect1d(a, b)) / k for a, b in zip(reference_top, candidate_top)])
@@ -0,0 +1,294 @@
+"""
+Near-duplicate product detection with MinHash signatures and LSH banding.
+
+The same item is often listed by several stores under slightly different
+names ("Aria Sheesham Wood Coffee Table - Walnut" vs "Aria Coffee Table in
+Sheesham Wood, Walnut"). Comparing every pair of products is quadratic;
+this engine runs in near-linear time:
+
+1. Shingle: the set of words of the normalized name (stop words dropped,
+   so "Table - Walnut" and "Table in Walnut" agree, and word order does not
+   matter) plus one token for the brand, hashed (crc32) to integers.
+   A listing that omits the brand therefore loses one token. Character
+   n-grams were tried and rejected: they score a colour variant ("... -
+   Honey") above a reworded listing of the same item.
+2. MinHash: ``num_perm`` universal hash permutations; the signature of a
+   product is the minimum of each permutation over its shingles, and the
+   share of equal signature entries estimates the Jaccard similarity of two
+   shingle sets. Computed with NumPy over all products at once.
+3. LSH: the signature is cut into ``bands`` bands of ``num_perm / bands``
+   rows; products whose band is identical share a bucket. Only products
+   sharing a bucket in some band become candidate pairs (bucket members are
+   paired within a sliding window, so one huge bucket stays linear).
+4. Verify: candidate pairs are kept when the exact Jaccard of their shingle
+   sets (vectorized over all pairs) reaches ``threshold`` and, when
+   embeddings are given for both products, their cosine reaches
+   ``cosine_threshold``. The MinHash estimate only drives candidate
+   generation: at 100 permutations its error (~0.04) is the size of the
+   gap between a duplicate and a colour variant.
+5. Cluster: connected components of the confirmed pairs.
+
+Pure NumPy and standard library, so it is importable from the root
+``utils`` package as well as from the API.
+
+Used by: services/duplicate_clusters.py, scripts/find_near_duplicates.py,
+scripts/benchmark_near_duplicates.py, utils/data_quality.DuplicateDetector
+"""
+import re
+import zlib
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_NUM_PERM = 100
+# 20 bands of 5 rows: a pair at Jaccard 0.8 shares a bucket with probability > 0.999, at 0.5 with ~0.47
+DEFAULT_BANDS = 20
+# Jaccard of the shingle sets for a confirmed pair: n - 1 of n tokens shared for names of 5+ tokens
+DEFAULT_THRESHOLD = 0.8
+# Embedding cosine for a confirmed pair (only checked when both products have an embedding)
+DEFAULT_COSINE_THRESHOLD = 0.9
+# Bucket members paired with up to this many following members (in signature order)
+DEFAULT_WINDOW = 8
+
+# Mersenne prime modulus of the permutation hashes (a * x fits in uint64 for x < 2^32)
+_PRIME = np.uint64((1 << 31) - 1)
+# Shingle hashes processed per (permutations x shingles) block
+_BLOCK_SHINGLES = 1 << 20
+_PERM_CHUNK = 16
+# Pairs compared per vectorized verification step
+_PAIR_CHUNK = 1 << 18
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+STOP_WORDS = frozenset({"a", "an", "and", "by", "for", "in", "of", "on", "the", "with", "x"})
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lower-case words separated by single spaces (punctuation dropped)."""
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def shingle_hashes(name: Optional[str], brand: Optional[str] = None) -> np.ndarray:
+    """Sorted unique crc32 hashes of the name's words (stop words dropped) and the brand."""
+    shingles = {word for word in normalize_text(name).split() if word not in STOP_WORDS}
+    if normalize_text(brand):
+        shingles.add(f"brand:{normalize_text(brand)}")
+    return np.array(sorted({zlib.crc32(shingle.encode()) for shingle in shingles}), dtype=np.uint64)
+
+
+class MinHasher:
+    """``num_perm`` universal hash permutations (a * x + b) mod p, shared by all signatures."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets: Sequence[np.ndarray]) -> np.ndarray:
+        """(n, num_perm) uint32 signatures; an empty set gets the all-max signature."""
+        n = len(shingle_sets)
+        signatures = np.full((n, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=n)
+        rows = np.flatnonzero(lengths)
+        start = 0
+        while start < rows.size:
+            # Products whose shingles fit in one block (at least one product per block)
+            cumulative = np.cumsum(lengths[rows[start:]])
+            end = start + max(1, int(np.searchsorted(cumulative, _BLOCK_SHINGLES, side="right")))
+            block = rows[start:end]
+            values = np.concatenate([shingle_sets[row] for row in block]).astype(np.uint64) % _PRIME
+            offsets = np.concatenate(([0], np.cumsum(lengths[block])[:-1]))
+            for perm in range(0, self.num_perm, _PERM_CHUNK):
+                a = self.a[perm : perm + _PERM_CHUNK, None]
+                b = self.b[perm : perm + _PERM_CHUNK, None]
+                hashed = (a * values[None, :] + b) % _PRIME
+                signatures[block, perm : perm + _PERM_CHUNK] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            start = end
+        return signatures
+
+
+def _band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """(bands, n) uint64 key of each band (FNV-style mix of its rows)."""
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    keys = np.empty((bands, n), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for band in range(bands):
+            key = np.full(n, 0xCBF29CE484222325, dtype=np.uint64)
+            for column in range(band * rows_per_band, (band + 1) * rows_per_band):
+                key = (key ^ signatures[:, column].astype(np.uint64)) * np.uint64(0x100000001B3)
+            keys[band] = key
+    return keys
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # Sort-based: np.unique on integers hashes in NumPy 2, which is several times slower here
+    values.sort()
+    keep = np.empty(values.size, dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def candidate_pairs(
+    signatures: np.ndarray, bands: int = DEFAULT_BANDS, window: int = DEFAULT_WINDOW, valid: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """(m, 2) unique row pairs (i < j) sharing an LSH bucket in at least one band.
+
+    Members of a bucket are sorted by their next band's key (so likelier
+    matches sit together) and each is paired with the following ``window``
+    members; every pair of a bucket with at most window + 1 members is
+    produced. Rows where ``valid`` is False are never paired.
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError("num_perm must be a multiple of bands")
+    rows = np.arange(n) if valid is None else np.flatnonzero(valid)
+    if rows.size < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    keys = _band_keys(signatures[rows], bands)
+    codes = np.empty(0, dtype=np.int64)
+    for band in range(bands):
+        order = np.lexsort((keys[(band + 1) % bands], keys[band]))
+        sorted_keys = keys[band][order]
+        found = [codes]
+        for distance in range(1, window + 1):
+            same = sorted_keys[:-distance] == sorted_keys[distance:]
+            if not same.any():
+                break
+            first, second = rows[order[:-distance][same]], rows[order[distance:][same]]
+            found.append(np.minimum(first, second) * n + np.maximum(first, second))
+        # Merged per band: most pairs recur in several bands, so the union stays far smaller than the raw list
+        if len(found) > 1:
+            codes = _sorted_unique(np.concatenate(found))
+    return np.stack((codes // n, codes % n), axis=1)
+
+
+def estimated_jaccard(signatures: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Share of equal signature entries per pair (MinHash estimate of the Jaccard similarity)."""
+    similarity = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), _PAIR_CHUNK):
+        chunk = pairs[start : start + _PAIR_CHUNK]
+        similarity[start : start + _PAIR_CHUNK] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return similarity
+
+
+def _gather(values: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, rows: np.ndarray):
+    """Concatenated shingles of ``rows`` and the position in ``rows`` each one belongs to."""
+    counts = lengths[rows]
+    owner = np.repeat(np.arange(rows.size), counts)
+    starts = np.repeat(offsets[rows] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return values[starts + np.arange(owner.size)], owner
+
+
+def pair_jaccard(shingle_sets: Sequence[np.ndarray], pairs: np.ndarray) -> np.ndarray:
+    """Exact Jaccard similarity of the shingle sets of each pair.
+
+    Both sides of a chunk of pairs are gathered into one array of
+    (pair, shingle) codes; after sorting, a code that appears twice is a
+    shingle the pair shares.
+    """
+    lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    values = np.concatenate(list(shingle_sets)) if len(shingle_sets) else np.empty(0, dtype=np.uint64)
+    similarity = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), _PAIR_CHUNK):
+        chunk = pairs[start : start + _PAIR_CHUNK]
+        left, left_owner = _gather(values, offsets, lengths, chunk[:, 0])
+        right, right_owner = _gather(values, offsets, lengths, chunk[:, 1])
+        codes = np.sort(
+            np.concatenate(
+                (left_owner.astype(np.uint64) << np.uint64(32) | left, right_owner.astype(np.uint64) << np.uint64(32) | right)
+            )
+        )
+        shared = codes[1:][codes[1:] == codes[:-1]] >> np.uint64(32)
+        intersection = np.bincount(shared.astype(np.int64), minlength=len(chunk))
+        union = lengths[chunk[:, 0]] + lengths[chunk[:, 1]] - intersection
+        similarity[start : start + _PAIR_CHUNK] = intersection / np.maximum(union, 1)
+    return similarity
+
+
+def pair_cosine(vectors: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Dot product of the (normalized) vectors of each pair."""
+    cosine = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), _PAIR_CHUNK):
+        chunk = pairs[start : start + _PAIR_CHUNK]
+        cosine[start : start + _PAIR_CHUNK] = np.einsum("ij,ij->i", vectors[chunk[:, 0]], vectors[chunk[:, 1]])
+    return cosine
+
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Component label (lowest member row) of each of ``n`` rows linked by ``pairs``."""
+    parent = np.arange(n)
+    if len(pairs) == 0:
+        return parent
+    first, second = pairs[:, 0], pairs[:, 1]
+    while True:
+        # Hook both roots onto the lower one, then jump pointers until every row points at a root
+        low = np.minimum(parent[first], parent[second])
+        np.minimum.at(parent, parent[first], low)
+        np.minimum.at(parent, parent[second], low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        if np.array_equal(parent[first], parent[second]):
+            return parent
+
+
+class NearDuplicates(NamedTuple):
+    pairs: np.ndarray  # (m, 2) confirmed row pairs, i < j
+    similarity: np.ndarray  # Jaccard of the shingle sets per confirmed pair
+    labels: np.ndarray  # Component label (lowest member row) per row
+    candidates: int  # Candidate pairs produced by LSH before verification
+
+    def clusters(self) -> List[np.ndarray]:
+        """Rows of every component with two or more members, lowest row first."""
+        order = np.argsort(self.labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(self.labels[order])) + 1
+        return [group for group in np.split(order, boundaries) if len(group) > 1]
+
+
+def find_near_duplicates(
+    names: Sequence[Optional[str]],
+    brands: Optional[Sequence[Optional[str]]] = None,
+    vectors: Optional[np.ndarray] = None,
+    has_vector: Optional[np.ndarray] = None,
+    threshold: float = DEFAULT_THRESHOLD,
+    cosine_threshold: float = DEFAULT_COSINE_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    bands: int = DEFAULT_BANDS,
+    window: int = DEFAULT_WINDOW,
+    seed: int = 1,
+) -> NearDuplicates:
+    """Confirmed near-duplicate pairs and clusters among products given by row.
+
+    ``vectors`` (normalized, one row per product; any object indexable by
+    an array of rows, so a caller can decode them lazily) and the ``has_vector``
+    mask enable the embedding confirmation; pairs where either product has
+    no vector are judged on the shingles alone.
+    """
+    brands = brands if brands is not None else [None] * len(names)
+    shingle_sets = [shingle_hashes(name, brand) for name, brand in zip(names, brands)]
+    signatures = MinHasher(num_perm, seed).signatures(shingle_sets)
+    valid = np.fromiter((len(s) > 0 for s in shingle_sets), dtype=bool, count=len(shingle_sets))
+
+    pairs = candidate_pairs(signatures, bands, window, valid)
+    similarity = pair_jaccard(shingle_sets, pairs)
+    confirmed = similarity >= threshold
+    if vectors is not None and len(pairs):
+        checked = confirmed.copy()
+        if has_vector is not None:
+            checked &= has_vector[pairs[:, 0]] & has_vector[pairs[:, 1]]
+        rows = np.flatnonzero(checked)
+        confirmed[rows] = pair_cosine(vectors, pairs[rows]) >= cosine_threshold
+
+    return NearDuplicates(
+        pairs=pairs[confirmed],
+        similarity=similarity[confirmed],
+        labels=connected_components(len(names), pairs[confirmed]),
+        candidates=len(pairs),
+    )
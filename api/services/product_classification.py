@@ -0,0 +1,228 @@
+"""
+Deterministic product-type / accessory classification of product names.
+
+Recommendation candidate queries used to exclude accessories (swatches,
+covers, replacement parts, ...) with a full-text condition over ~30 words on
+every call. The classification is a pure function of the product name, so it
+is computed once, at ingest and by ``scripts/reclassify_products.py``, and
+stored on the product:
+
+- ``product_type``: the KEYWORD_CATEGORIES category of the most specific
+  phrase in the name ("Oak Coffee Table" -> "center_tables");
+- ``is_accessory``: the name contains one of ACCESSORY_TERMS as whole words;
+- ``classification_version``: CLASSIFICATION_VERSION at the time.
+
+Words are split the way the tsquery builder splits them, so ``is_accessory``
+agrees with the ``name_matches_any(ACCESSORY_TERMS)`` condition it replaces.
+Bump CLASSIFICATION_VERSION whenever the rules change; every product then
+reports unclassified and ``scripts/reclassify_products.py --stale``
+reclassifies it.
+
+Used by: services/recommendation_engine.py (candidate filtering), scrapers/pipelines.py,
+scripts/reclassify_products.py
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.future import select
+
+from database.models import Product
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_VERSION = 1
+
+# Terms that mark a product as NOT actual furniture (e.g. "Sofa Swatches" is not a sofa)
+ACCESSORY_TERMS = [
+    "swatch",
+    "swatches",
+    "sample",
+    "samples",  # Fabric samples
+    "fabric",
+    "material",
+    "textile",  # Materials only
+    "cushion",
+    "pillow",
+    "throw pillow",  # Soft accessories
+    "cover",
+    "slipcover",
+    "protector",  # Covers
+    "accessory",
+    "accessories",  # Generic accessories
+    "part",
+    "parts",
+    "component",  # Replacement parts
+    "hardware",
+    "screw",
+    "nail",
+    "bolt",  # Hardware
+    "tool",
+    "tools",
+    "kit",  # Tools
+    "cleaner",
+    "polish",
+    "wax",  # Maintenance products
+    "manual",
+    "guide",
+    "instruction",  # Documentation
+]
+
+# Mutually exclusive product categories (also the keyword categories of search_service's query analyzer)
+KEYWORD_CATEGORIES: Dict[str, List[str]] = {
+    "ceiling_lighting": ["ceiling lamp", "ceiling light", "chandelier", "pendant", "overhead light", "pendant light"],
+    "portable_lighting": ["table lamp", "desk lamp", "floor lamp"],
+    "wall_lighting": ["wall lamp", "sconce", "wall light"],
+    "sofas": ["sofa", "couch", "sectional", "loveseat"],  # Sofas - replaceable items
+    "chairs": [
+        "chair",
+        "armchair",
+        "accent chair",
+        "side chair",
+        "sofa chair",
+        "recliner",
+        "dining chair",
+    ],  # Chairs - additive items only
+    "other_seating": ["bench", "stool", "ottoman"],  # Other seating - additive items
+    "center_tables": ["coffee table", "center table", "centre table"],  # Placed in front of sofa
+    "bedside_tables": [
+        "bedside table",
+        "bedside tables",
+        "nightstand",
+        "nightstands",
+        "night stand",
+    ],  # Bedroom tables
+    "side_tables": ["side table", "end table"],  # Placed beside furniture (NOT bedside)
+    "dining_tables": ["dining table"],  # Separate category for dining tables
+    "other_tables": ["console table", "desk", "table"],  # Generic tables
+    "storage_furniture": ["dresser", "chest", "cabinet", "bookshelf", "shelving", "shelf", "wardrobe"],
+    "bedroom_furniture": ["bed", "mattress", "headboard"],
+    "wall_decor": ["wall art", "wall decor", "wall hanging", "tapestry"],  # Wall decoration items
+    "table_mats": [
+        "table mat",
+        "table mats",
+        "placemat",
+        "placemats",
+        "table runner",
+        "table runners",
+        "runner",
+        "runners",
+    ],
+    # Rugs & Carpets - separate category for strict filtering (DB category ID 36)
+    "rugs": [
+        "rug",
+        "carpet",
+        "floor rug",
+        "area rug",
+        "wall rug",
+    ],
+    "decor": [
+        "mirror",
+        "planter",
+        "pot",
+        "vase",
+        "sculpture",
+        "figurine",
+        "statue",
+        "art piece",
+    ],
+    "general_lighting": ["lamp", "lighting"],  # Catch-all for generic lighting terms
+}
+
+# Same word pattern as search_service.tsquery_phrase
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _words(text: Optional[str]) -> Tuple[str, ...]:
+    return tuple(_WORD.findall((text or "").lower()))
+
+
+class PhraseClassifier:
+    """Whole-word phrase lookup over a name (longest phrase wins, then the one ending last)."""
+
+    def __init__(self, phrases: Dict[str, str]):
+        self._phrases = {_words(phrase): label for phrase, label in phrases.items() if _words(phrase)}
+        self._max_words = max((len(words) for words in self._phrases), default=0)
+
+    def matches(self, words: Sequence[str]) -> List[Tuple[int, int, str]]:
+        """(length, end, label) of every phrase occurring in ``words``."""
+        found = []
+        for start in range(len(words)):
+            for length in range(1, min(self._max_words, len(words) - start) + 1):
+                label = self._phrases.get(tuple(words[start : start + length]))
+                if label is not None:
+                    found.append((length, start + length, label))
+        return found
+
+    def classify(self, words: Sequence[str]) -> Optional[str]:
+        found = self.matches(words)
+        return max(found)[2] if found else None
+
+
+_type_classifier = PhraseClassifier(
+    {phrase: category for category, phrases in KEYWORD_CATEGORIES.items() for phrase in phrases}
+)
+_accessory_classifier = PhraseClassifier({term: "accessory" for term in ACCESSORY_TERMS})
+
+
+def classify_product(name: Optional[str]) -> Dict[str, Any]:
+    """Classification columns (product_type, is_accessory, classification_version) for a product name."""
+    words = _words(name)
+    return {
+        "product_type": _type_classifier.classify(words),
+        "is_accessory": bool(_accessory_classifier.matches(words)),
+        "classification_version": CLASSIFICATION_VERSION,
+    }
+
+
+def unclassified_product_ids_query(limit: Optional[int] = None):
+    """SELECT of product ids never classified or classified by an older CLASSIFICATION_VERSION."""
+    query = (
+        select(Product.id)
+        .where(or_(Product.classification_version.is_(None), Product.classification_version != CLASSIFICATION_VERSION))
+        .order_by(Product.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def reclassify_products(product_ids: List[int], db, commit: bool = True) -> Dict[str, int]:
+    """Classify ``product_ids`` and store the result (one read, one executemany update).
+
+    ``last_updated`` is left unchanged: classification is derived data and must
+    not make the product look edited to the index refreshes.
+    """
+    counts = {"classified": 0, "accessories": 0, "changed": 0}
+    if not product_ids:
+        return counts
+
+    result = await db.execute(
+        select(Product.id, Product.name, Product.product_type, Product.is_accessory).where(Product.id.in_(product_ids))
+    )
+    rows = []
+    for product_id, name, product_type, is_accessory in result.fetchall():
+        classification = classify_product(name)
+        counts["accessories"] += classification["is_accessory"]
+        counts["changed"] += (classification["product_type"], classification["is_accessory"]) != (product_type, is_accessory)
+        rows.append({"row_id": product_id, **{f"new_{key}": value for key, value in classification.items()}})
+    if not rows:
+        return counts
+
+    products = Product.__table__
+    statement = (
+        update(products)
+        .where(products.c.id == bindparam("row_id"))
+        .values(
+            product_type=bindparam("new_product_type"),
+            is_accessory=bindparam("new_is_accessory"),
+            classification_version=bindparam("new_classification_version"),
+            last_updated=products.c.last_updated,
+        )
+    )
+    await db.execute(statement, rows)
+    if commit:
+        await db.commit()
+    counts["classified"] = len(rows)
+    return counts
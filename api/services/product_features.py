@@ -0,0 +1,325 @@
+"""
+Precomputed per-product ranking features (``product_features`` table).
+
+RankingService and the recommendation paths used to re-derive the same
+facts for every request: seating capacity and size tokens from the name,
+material/color from ``product_attributes`` rows, and the material/color
+family lookups. This module derives them once per product:
+
+- ``derive_product_features``: pure function of a product and its
+  attribute name -> value map;
+- ``build_product_features_row``: the full row (features plus the
+  ``source_hash`` of its inputs) from a product and its attribute rows;
+- ``rebuild_product_features``: set-based recompute for a list of product
+  ids (two reads, one upsert);
+- ``find_stale_product_ids``: products with no row, an older
+  FEATURES_VERSION, or a name/style/attribute hash that no longer matches;
+- ``load_product_features``: product_id -> row map passed to
+  ``RankingService.rank_products(features=...)``.
+
+Bump FEATURES_VERSION whenever the derivation changes; every row then
+reports stale and ``scripts/rebuild_product_features.py --stale`` rebuilds it.
+
+Rows are computed at ingest: the scraper pipeline (sync session) and
+AttributeExtractionService rebuild a product's row right after saving its
+attributes. Re-crawls that only bump last_updated keep the same hash, so
+the --stale rebuild only picks up products whose inputs really changed.
+
+Used by: routers/chat.py (category recommendations),
+scripts/rebuild_product_features.py, scrapers/pipelines.py,
+services/attribute_extraction_service.py
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.ranking_service import RankingService
+from sqlalchemy import func, literal, or_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.future import select
+
+from config.style_definitions import PREDEFINED_STYLES
+from database.models import Product, ProductAttribute, ProductFeatures
+
+logger = logging.getLogger(__name__)
+
+FEATURES_VERSION = 1
+
+# Attribute names checked in order; the first non-empty value wins
+MATERIAL_ATTRIBUTES = ("material_primary", "material")
+COLOR_ATTRIBUTES = ("color_primary", "color")
+CAPACITY_ATTRIBUTES = ("seating_capacity", "capacity")
+# Attributes whose values may carry size tokens ("3 seater", "queen", "l-shaped")
+TYPE_ATTRIBUTES = ("furniture_type", "product_type", "type", "size")
+
+# Bit i of style_mask = PREDEFINED_STYLES[i]
+STYLE_BITS = {style: 1 << bit for bit, style in enumerate(PREDEFINED_STYLES)}
+
+_NUMBER_WORDS = {"one": 1, "single": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8}
+_SEATER_PATTERN = re.compile(r"\b(\d{1,2}|one|single|two|three|four|five|six|seven|eight)[\s-]*seat(?:er|s)?\b")
+_L_SHAPED_PATTERN = re.compile(r"\bl[\s-]*shape(?:d)?\b|\bcorner sofa\b")
+_BED_SIZE_PATTERN = re.compile(r"\b(california king|super king|king|queen|double|single|twin)\b")
+_TABLE_SHAPE_PATTERN = re.compile(r"\b(round|circular|oval|rectangular|square)\b")
+
+# Separators of the source_hash input; control characters never appear in names or attribute values
+_HASH_FIELD_SEPARATOR = "\x1f"
+_HASH_ATTRIBUTE_SEPARATOR = "\x1e"
+_HASH_VALUE_SEPARATOR = "\x1d"
+
+# Same field lengths as the model
+_MAX_MATERIAL_LENGTH = 100
+_MAX_TEXT_LENGTH = 50
+
+
+def _clean(value: Optional[str], max_length: int = _MAX_TEXT_LENGTH) -> Optional[str]:
+    value = (value or "").strip().lower()
+    return value[:max_length] or None
+
+
+def _first_attribute(attributes: Dict[str, str], names: Sequence[str]) -> Optional[str]:
+    for name in names:
+        if attributes.get(name):
+            return attributes[name]
+    return None
+
+
+def parse_capacity(text: Optional[str]) -> Optional[int]:
+    """Seating capacity from "3 seater", "three-seater", "6 seats" (None if absent)."""
+    if not text:
+        return None
+    match = _SEATER_PATTERN.search(text.lower())
+    if not match:
+        return None
+    token = match.group(1)
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def normalize_product_type(text: Optional[str]) -> Optional[str]:
+    """
+    Normalize size/shape tokens to RankingService.ADJACENT_TYPES vocabulary:
+    "three seater sofa" -> "3-seater", "L shape sofa" -> "l-shaped",
+    "queen size bed" -> "queen", "round dining table" -> "round".
+    """
+    if not text:
+        return None
+    text = text.lower()
+
+    if _L_SHAPED_PATTERN.search(text):
+        return "l-shaped"
+    if "sectional" in text:
+        return "sectional"
+    capacity = parse_capacity(text)
+    if capacity:
+        return f"{capacity}-seater"
+    if "bed" in text or "mattress" in text:
+        match = _BED_SIZE_PATTERN.search(text)
+        if match:
+            return match.group(1)
+    if "table" in text:
+        match = _TABLE_SHAPE_PATTERN.search(text)
+        if match:
+            return "round" if match.group(1) == "circular" else match.group(1)
+    return None
+
+
+def style_mask(*styles: Optional[str]) -> int:
+    """Bitmask over PREDEFINED_STYLES for the given styles (unknown styles are ignored)."""
+    mask = 0
+    for style in styles:
+        if style:
+            mask |= STYLE_BITS.get(style.strip().lower(), 0)
+    return mask
+
+
+def derive_product_features(product: Any, attributes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Feature values for one product.
+
+    ``product`` needs name, primary_style and secondary_style; ``attributes``
+    maps attribute_name -> attribute_value. Returns the ProductFeatures
+    columns except the staleness bookkeeping.
+    """
+    type_text = " ".join([product.name or ""] + [attributes[name] for name in TYPE_ATTRIBUTES if attributes.get(name)])
+
+    capacity = None
+    capacity_value = _first_attribute(attributes, CAPACITY_ATTRIBUTES)
+    if capacity_value:
+        try:
+            capacity = int(float(capacity_value))
+        except ValueError:
+            capacity = parse_capacity(capacity_value)
+    if capacity is None:
+        capacity = parse_capacity(type_text)
+
+    material = _clean(_first_attribute(attributes, MATERIAL_ATTRIBUTES), _MAX_MATERIAL_LENGTH)
+    color = _clean(_first_attribute(attributes, COLOR_ATTRIBUTES))
+    primary_style = _clean(product.primary_style or attributes.get("style"))
+    secondary_style = _clean(product.secondary_style)
+
+    return {
+        "features_version": FEATURES_VERSION,
+        "product_type": normalize_product_type(type_text),
+        "capacity": capacity if capacity and 0 < capacity < 100 else None,
+        "material": material,
+        "material_family_mask": RankingService.material_family_mask(material),
+        "color": color,
+        "color_family_mask": RankingService.color_family_mask(color),
+        "primary_style": primary_style,
+        "secondary_style": secondary_style,
+        "style_mask": style_mask(primary_style, secondary_style),
+    }
+
+
+def source_hash(
+    name: Optional[str],
+    primary_style: Optional[str],
+    secondary_style: Optional[str],
+    attribute_rows: Iterable[Tuple[str, Optional[str]]],
+) -> str:
+    """
+    md5 over a product's feature inputs: name, styles and every
+    (attribute_name, attribute_value) row sorted by code point.
+
+    Matches the SQL expression in stale_product_ids_query, so a row built
+    here is fresh until one of the inputs changes.
+    """
+    attributes = _HASH_ATTRIBUTE_SEPARATOR.join(
+        f"{attribute_name}{_HASH_VALUE_SEPARATOR}{value}"
+        for attribute_name, value in sorted((attribute_name, value or "") for attribute_name, value in attribute_rows)
+    )
+    text = _HASH_FIELD_SEPARATOR.join([name or "", primary_style or "", secondary_style or "", attributes])
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def build_product_features_row(product: Any, attribute_rows: Sequence[Tuple[str, Optional[str]]]) -> Dict[str, Any]:
+    """
+    ProductFeatures column values for ``product`` (needs id, name,
+    primary_style, secondary_style) and its (attribute_name, attribute_value)
+    rows.
+    """
+    attributes: Dict[str, str] = {}
+    for attribute_name, value in attribute_rows:
+        # First row per name wins, like the per-product .first() lookups elsewhere
+        attributes.setdefault(attribute_name, value)
+
+    row = derive_product_features(product, attributes)
+    row.update(
+        product_id=product.id,
+        source_hash=source_hash(product.name, product.primary_style, product.secondary_style, attribute_rows),
+        computed_at=datetime.utcnow(),
+    )
+    return row
+
+
+async def compute_product_features(product_ids: List[int], db) -> List[Dict[str, Any]]:
+    """Feature rows (with source_hash) for ``product_ids``: one product read, one attribute read."""
+    if not product_ids:
+        return []
+
+    product_result = await db.execute(
+        select(Product.id, Product.name, Product.primary_style, Product.secondary_style).where(Product.id.in_(product_ids))
+    )
+    products = product_result.fetchall()
+
+    attribute_result = await db.execute(
+        select(ProductAttribute.product_id, ProductAttribute.attribute_name, ProductAttribute.attribute_value).where(
+            ProductAttribute.product_id.in_(product_ids)
+        )
+    )
+    attribute_rows: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+    for product_id, attribute_name, value in attribute_result.fetchall():
+        attribute_rows.setdefault(product_id, []).append((attribute_name, value))
+
+    return [build_product_features_row(product, attribute_rows.get(product.id, [])) for product in products]
+
+
+async def rebuild_product_features(product_ids: List[int], db, commit: bool = True) -> int:
+    """Recompute and upsert feature rows for ``product_ids``; returns the number of rows written."""
+    rows = await compute_product_features(product_ids, db)
+    if not rows:
+        return 0
+
+    statement = insert(ProductFeatures).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["product_id"],
+        set_={column: statement.excluded[column] for column in rows[0] if column != "product_id"},
+    )
+    await db.execute(statement)
+    if commit:
+        await db.commit()
+    return len(rows)
+
+
+def stale_product_ids_query(limit: Optional[int] = None):
+    """SELECT of product ids whose feature row is missing, outdated or built from different inputs."""
+    attribute_value = func.coalesce(ProductAttribute.attribute_value, "")
+    attribute_text = (
+        select(
+            ProductAttribute.product_id.label("product_id"),
+            func.string_agg(
+                ProductAttribute.attribute_name + literal(_HASH_VALUE_SEPARATOR) + attribute_value,
+                aggregate_order_by(
+                    literal(_HASH_ATTRIBUTE_SEPARATOR),
+                    ProductAttribute.attribute_name.collate("C"),
+                    attribute_value.collate("C"),
+                ),
+            ).label("attributes"),
+        )
+        .group_by(ProductAttribute.product_id)
+        .subquery()
+    )
+    # SQL twin of source_hash(); "C" collation sorts by code point like Python's sorted()
+    current_hash = func.md5(
+        func.concat_ws(
+            literal(_HASH_FIELD_SEPARATOR),
+            func.coalesce(Product.name, ""),
+            func.coalesce(Product.primary_style, ""),
+            func.coalesce(Product.secondary_style, ""),
+            func.coalesce(attribute_text.c.attributes, ""),
+        )
+    )
+
+    query = (
+        select(Product.id)
+        .outerjoin(ProductFeatures, ProductFeatures.product_id == Product.id)
+        .outerjoin(attribute_text, attribute_text.c.product_id == Product.id)
+        .where(
+            or_(
+                ProductFeatures.product_id.is_(None),
+                ProductFeatures.features_version != FEATURES_VERSION,
+                ProductFeatures.source_hash.is_distinct_from(current_hash),
+            )
+        )
+        .order_by(Product.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def find_stale_product_ids(db, limit: Optional[int] = None) -> List[int]:
+    """Product ids whose features need a rebuild (see stale_product_ids_query)."""
+    result = await db.execute(stale_product_ids_query(limit))
+    return list(result.scalars().all())
+
+
+async def load_product_features(product_ids: Sequence[int], db) -> Dict[int, ProductFeatures]:
+    """product_id -> current-version ProductFeatures row (missing/outdated rows are left out)."""
+    if not product_ids:
+        return {}
+    result = await db.execute(
+        select(ProductFeatures).where(
+            ProductFeatures.product_id.in_(list(product_ids)),
+            ProductFeatures.features_version == FEATURES_VERSION,
+        )
+    )
+    return {row.product_id: row for row in result.scalars().all()}
+
+
+def user_type_and_capacity(size_keyword: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """Normalize a user's size keyword ("three seater") to the product_type vocabulary and a capacity."""
+    if not size_keyword:
+        return None, None
+    return normalize_product_type(size_keyword) or size_keyword.lower(), parse_capacity(size_keyword)
@@ -0,0 +1,292 @@
+"""
+Precomputed product-to-product nearest neighbours (``product_neighbours`` table).
+
+Finding alternatives to a product used to mean building a text query and
+running a full semantic search. This module computes, offline, the top-N
+neighbours of every product's embedding among the available products of
+the same category, so "similar items" is one primary-key lookup:
+
+- ``compute_neighbours``: pure NumPy over the resident EmbeddingIndex
+  matrix; query rows are scored against their category in blocks of
+  BLOCK_ROWS (one matrix product per block). Neighbours within the
+  product's price band (price / PRICE_BAND .. price * PRICE_BAND) rank
+  first; the list is filled from outside the band only when the band runs
+  short;
+- ``rebuild_product_neighbours``: recompute and upsert the lists of given
+  products (rows of products without an embedding are deleted);
+- ``affected_product_ids``: incremental refresh set for added or
+  re-embedded products: the products themselves, every list that already
+  contains one of them, and every list one of them would now enter;
+- ``stale_product_ids_query``: products with no list, an older
+  NEIGHBOURS_VERSION, an embedding newer than the list, or a category move;
+- ``load_neighbours``: the stored list of one product.
+
+Availability and price changes are not tracked incrementally: unavailable
+neighbours are dropped when read, and a periodic full rebuild picks up
+newly available products and price moves.
+
+Bump NEIGHBOURS_VERSION whenever the computation changes; every row then
+reports stale and ``scripts/rebuild_product_neighbours.py --stale``
+rebuilds it.
+
+Used by: routers/products.py (/products/{id}/similar), scripts/rebuild_product_neighbours.py
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from services.embedding_index import EmbeddingIndex
+from services.topk import iter_chunks
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from database.models import Product, ProductNeighbours
+
+logger = logging.getLogger(__name__)
+
+NEIGHBOURS_VERSION = 1
+
+# Neighbours stored per product
+DEFAULT_NEIGHBOURS = 24
+
+# Neighbours priced within [price / PRICE_BAND, price * PRICE_BAND] rank ahead of the rest
+PRICE_BAND = 2.0
+
+# Query rows scored against their category per matrix product (bounds the score block)
+BLOCK_ROWS = 256
+
+# Cosine scores lie in [-1, 1]; this offset sorts every out-of-band candidate after every in-band one
+_OUT_OF_BAND_OFFSET = 2.0
+
+
+class Neighbours(NamedTuple):
+    product_ids: List[int]  # Best first
+    scores: List[float]
+    in_band_count: int  # Leading entries within the price band
+
+
+def price_band_mask(query_prices: np.ndarray, candidate_prices: np.ndarray, price_band: float = PRICE_BAND) -> np.ndarray:
+    """(candidates, queries) mask of candidates within each query's price band.
+
+    A query without a price accepts every candidate; a candidate without a
+    price is outside every band.
+    """
+    query_prices = np.asarray(query_prices, dtype=np.float32)[None, :]
+    candidate_prices = np.asarray(candidate_prices, dtype=np.float32)[:, None]
+    with np.errstate(invalid="ignore"):
+        in_band = (candidate_prices >= query_prices / price_band) & (candidate_prices <= query_prices * price_band)
+    return in_band | np.isnan(query_prices)
+
+
+def _index_rows(index: EmbeddingIndex, product_ids: Iterable[int]) -> np.ndarray:
+    return np.flatnonzero(np.isin(index.product_ids, np.fromiter(product_ids, dtype=np.int64)))
+
+
+def compute_neighbours(
+    index: EmbeddingIndex,
+    product_ids: Iterable[int],
+    limit: int = DEFAULT_NEIGHBOURS,
+    price_band: float = PRICE_BAND,
+) -> Dict[int, Neighbours]:
+    """Neighbour lists for the ``product_ids`` present in the index.
+
+    Candidates are the available products of the same category, excluding
+    the product itself. Products without a category get an empty list.
+    """
+    rows = _index_rows(index, product_ids)
+    results: Dict[int, Neighbours] = {}
+    for category_id in np.unique(index.category_ids[rows]):
+        query_rows = rows[index.category_ids[rows] == category_id]
+        candidates = np.flatnonzero((index.category_ids == category_id) & index.is_available)
+        if category_id < 0 or candidates.size == 0:
+            results.update((int(pid), Neighbours([], [], 0)) for pid in index.product_ids[query_rows])
+            continue
+
+        candidate_ids = index.product_ids[candidates]
+        candidate_vectors = index.decoded_vectors(candidates)
+        candidate_prices = index.prices[candidates]
+        k = min(limit, candidates.size)
+        for block in iter_chunks(query_rows, BLOCK_ROWS):
+            scores = candidate_vectors @ index.decoded_vectors(block).T
+            in_band = price_band_mask(index.prices[block], candidate_prices, price_band)
+            ranked = np.where(in_band, scores, scores - _OUT_OF_BAND_OFFSET)
+            ranked[candidates[:, None] == block[None, :]] = -np.inf
+            top = np.argpartition(-ranked, k - 1, axis=0)[:k]
+            for column, row in enumerate(block):
+                order = top[:, column][np.argsort(-ranked[top[:, column], column], kind="stable")]
+                order = order[np.isfinite(ranked[order, column])]
+                results[int(index.product_ids[row])] = Neighbours(
+                    candidate_ids[order].tolist(),
+                    scores[order, column].tolist(),
+                    int(in_band[order, column].sum()),
+                )
+    return results
+
+
+async def rebuild_product_neighbours(
+    index: EmbeddingIndex,
+    product_ids: List[int],
+    db,
+    computed_at: datetime,
+    limit: int = DEFAULT_NEIGHBOURS,
+    price_band: float = PRICE_BAND,
+    commit: bool = True,
+) -> int:
+    """Recompute and upsert the lists of ``product_ids``; returns the number of rows written.
+
+    ``computed_at`` is the time the index was loaded: a product re-embedded
+    after it stays stale. Rows of products no longer in the index (embedding
+    cleared) are deleted.
+    """
+    neighbours = compute_neighbours(index, product_ids, limit, price_band)
+    rows = _index_rows(index, neighbours)
+    category_by_id = dict(zip(index.product_ids[rows].tolist(), index.category_ids[rows].tolist()))
+
+    missing = [product_id for product_id in product_ids if product_id not in neighbours]
+    if missing:
+        await db.execute(delete(ProductNeighbours).where(ProductNeighbours.product_id.in_(missing)))
+
+    values = [
+        {
+            "product_id": product_id,
+            "neighbours_version": NEIGHBOURS_VERSION,
+            "category_id": category_by_id[product_id] if category_by_id[product_id] >= 0 else None,
+            "neighbour_ids": entry.product_ids,
+            "scores": entry.scores,
+            "in_band_count": entry.in_band_count,
+            "computed_at": computed_at,
+        }
+        for product_id, entry in neighbours.items()
+    ]
+    if values:
+        statement = insert(ProductNeighbours).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={column: statement.excluded[column] for column in values[0] if column != "product_id"},
+        )
+        await db.execute(statement)
+    if commit:
+        await db.commit()
+    return len(values)
+
+
+def lists_entered(
+    index: EmbeddingIndex,
+    changed_ids: Iterable[int],
+    stored: Dict[int, Tuple[List[float], int]],
+    limit: int = DEFAULT_NEIGHBOURS,
+    price_band: float = PRICE_BAND,
+) -> List[int]:
+    """Products whose stored list a changed product would now enter.
+
+    ``stored`` maps product_id -> (scores, in_band_count) of the current
+    lists in the changed products' categories. A changed product enters a
+    list that is short, or beats its weakest entry of the same kind (in-band
+    against in-band, out-of-band against the fill), or is in band while the
+    list still holds fill entries.
+    """
+    changed_rows = np.flatnonzero(index.product_mask(changed_ids))
+    owner_rows = _index_rows(index, stored)
+    if changed_rows.size == 0 or owner_rows.size == 0:
+        return []
+
+    entered = []
+    for block in iter_chunks(owner_rows, BLOCK_ROWS):
+        scores = index.decoded_vectors(changed_rows) @ index.decoded_vectors(block).T
+        in_band = price_band_mask(index.prices[block], index.prices[changed_rows], price_band)
+        eligible = (index.category_ids[changed_rows][:, None] == index.category_ids[block][None, :]) & (
+            changed_rows[:, None] != block[None, :]
+        )
+        for column, row in enumerate(block):
+            product_id = int(index.product_ids[row])
+            list_scores, in_band_count = stored[product_id]
+            candidates = eligible[:, column]
+            if not candidates.any():
+                continue
+            band = in_band[candidates, column]
+            best_in_band = scores[candidates, column][band].max(initial=-np.inf)
+            best_outside = scores[candidates, column][~band].max(initial=-np.inf)
+            has_fill = in_band_count < len(list_scores)
+            if (
+                len(list_scores) < limit
+                or (band.any() and (has_fill or best_in_band >= list_scores[in_band_count - 1]))
+                or (has_fill and best_outside >= list_scores[-1])
+            ):
+                entered.append(product_id)
+    return entered
+
+
+async def affected_product_ids(
+    index: EmbeddingIndex,
+    changed_ids: List[int],
+    db,
+    limit: int = DEFAULT_NEIGHBOURS,
+    price_band: float = PRICE_BAND,
+) -> List[int]:
+    """Products whose list must be recomputed after ``changed_ids`` were added, re-embedded or moved."""
+    if not changed_ids:
+        return []
+    affected = set(changed_ids)
+
+    # Lists that contain a changed product (its score or category may have changed, or it lost its embedding)
+    result = await db.execute(
+        select(ProductNeighbours.product_id).where(ProductNeighbours.neighbour_ids.overlap(list(changed_ids)))
+    )
+    affected.update(result.scalars().all())
+
+    # Lists in the changed products' categories that a changed product would now enter
+    categories = {int(c) for c in index.category_ids[_index_rows(index, changed_ids)] if c >= 0}
+    if categories:
+        result = await db.execute(
+            select(ProductNeighbours.product_id, ProductNeighbours.scores, ProductNeighbours.in_band_count).where(
+                ProductNeighbours.category_id.in_(categories),
+                ProductNeighbours.neighbours_version == NEIGHBOURS_VERSION,
+            )
+        )
+        stored = {product_id: (scores, in_band_count) for product_id, scores, in_band_count in result.fetchall()}
+        affected.update(lists_entered(index, changed_ids, stored, limit, price_band))
+
+    return sorted(affected)
+
+
+def stale_product_ids_query(limit: Optional[int] = None):
+    """SELECT of product ids whose list is missing, outdated, older than the embedding, or gone with it."""
+    has_embedding = or_(Product.embedding_vector.isnot(None), Product.embedding.isnot(None))
+    query = (
+        select(Product.id)
+        .outerjoin(ProductNeighbours, ProductNeighbours.product_id == Product.id)
+        .where(
+            or_(
+                and_(
+                    has_embedding,
+                    or_(
+                        ProductNeighbours.product_id.is_(None),
+                        ProductNeighbours.neighbours_version != NEIGHBOURS_VERSION,
+                        Product.embedding_updated_at > ProductNeighbours.computed_at,
+                        Product.category_id.is_distinct_from(ProductNeighbours.category_id),
+                    ),
+                ),
+                and_(~has_embedding, ProductNeighbours.product_id.isnot(None)),
+            )
+        )
+        .order_by(Product.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def load_neighbours(product_id: int, db) -> Optional[List[Tuple[int, float]]]:
+    """(neighbour_id, score) pairs of a current-version list, best first; None if the product has none."""
+    result = await db.execute(
+        select(ProductNeighbours.neighbour_ids, ProductNeighbours.scores).where(
+            ProductNeighbours.product_id == product_id,
+            ProductNeighbours.neighbours_version == NEIGHBOURS_VERSION,
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return list(zip(row[0], row[1]))
@@ -0,0 +1,203 @@
+"""
+Compiled query analyzer: synonym groups, exclusion terms and keyword category of a search query.
+
+The search vocabularies (SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES in
+search_service.py) are compiled once:
+- single-word synonym keys are dict lookups (the query word, then its singular / plural
+  forms, memoized per word) instead of a scan of every key;
+- multi-word synonym keys ("wall art", "chest of drawers") and category keywords are matched
+  as whole words by a word-level trie, one walk per query;
+- exclusion keys stay plain substring tests of the query (the first key in dictionary order
+  wins, as before), evaluated once per distinct query.
+
+Fully analyzed queries are kept in an LRU, so a repeated query costs one dict lookup.
+Exclusion terms are pre-lowered per query: checking a product name is one ``lower()`` and a
+few ``in`` tests. At this vocabulary size a character-level (Aho–Corasick) automaton walked
+in Python is slower than those C-level substring tests, for queries and product names alike.
+
+Used by: search_service (expand_search_query_grouped, get_exclusion_terms, analyze_query),
+hybrid_search.py, admin_curated.py, recommendation_engine.py (_categorize_keywords)
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+class PhraseTrie:
+    """Word-level trie of phrases: finds every phrase that occurs as whole words in a word list."""
+
+    _END = ""  # Child key marking the end of a phrase (never a word)
+
+    def __init__(self, phrases: Iterable[str]):
+        self._root: Dict[str, dict] = {}
+        for phrase in phrases:
+            node = self._root
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            node[self._END] = phrase
+
+    def matches(self, words: Sequence[str]) -> Iterator[Tuple[int, str]]:
+        """(start word index, phrase) for every occurrence, shortest first at each start."""
+        for start in range(len(words)):
+            node = self._root
+            for word in words[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                phrase = node.get(self._END)
+                if phrase is not None:
+                    yield start, phrase
+
+
+@dataclass(frozen=True)
+class AnalyzedQuery:
+    """Everything the keyword search needs to know about one query (lower-cased, stripped)."""
+
+    text: str
+    groups: Tuple[Tuple[str, ...], ...]
+    exclusions: Tuple[str, ...]
+    category: Optional[str]
+
+    @property
+    def is_multi_word(self) -> bool:
+        return len(self.text.split()) > 1
+
+    def excludes(self, product_name: str) -> bool:
+        """Product name contains one of the exclusion terms (case-insensitive substring)."""
+        if not self.exclusions:
+            return False
+        name_lower = product_name.lower()
+        for term in self.exclusions:
+            if term in name_lower:
+                return True
+        return False
+
+
+class QueryAnalyzer:
+    """Compiles the search vocabularies once and analyzes queries through an LRU."""
+
+    def __init__(
+        self,
+        synonyms: Mapping[str, Sequence[str]],
+        exclusions: Mapping[str, Sequence[str]],
+        categories: Mapping[str, Sequence[str]],
+        word_forms: Callable[[str], List[str]],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self._synonyms = {key: tuple(terms) for key, terms in synonyms.items()}
+        self._phrases = PhraseTrie(key for key in self._synonyms if " " in key)
+
+        # Exclusions keep the plain substring semantics; dictionary order breaks ties
+        self._exclusions = {key: tuple(term.lower() for term in terms) for key, terms in exclusions.items()}
+
+        # Keyword -> category (first category listing a keyword wins)
+        self._keyword_categories: Dict[str, str] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword.lower(), category)
+        self._category_keywords = PhraseTrie(self._keyword_categories)
+
+        # Singular / plural forms of a word, shared by every query containing it
+        self._word_forms = lru_cache(maxsize=cache_size)(lambda word: tuple(word_forms(word)))
+        self._analyze_cached = lru_cache(maxsize=cache_size)(self._analyze)
+
+    # ---- Public API ----
+
+    def analyze(self, query: str) -> AnalyzedQuery:
+        """Synonym groups, exclusion terms and category of ``query`` (memoized)."""
+        return self._analyze_cached(query.lower().strip())
+
+    def keyword_category(self, keyword: str) -> Optional[str]:
+        """Category a single keyword belongs to (exact, case-insensitive), None if unknown."""
+        return self._keyword_categories.get(keyword.lower().strip())
+
+    def cache_clear(self):
+        self._analyze_cached.cache_clear()
+        self._word_forms.cache_clear()
+
+    def stats(self) -> Dict[str, float]:
+        """LRU counters and size."""
+        info = self._analyze_cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_ratio": round(info.hits / lookups, 3) if lookups else 0.0,
+            "entries": info.currsize,
+            "max_entries": info.maxsize,
+        }
+
+    # ---- Analysis (cache misses only) ----
+
+    def _analyze(self, text: str) -> AnalyzedQuery:
+        words = text.split()
+        return AnalyzedQuery(
+            text=text,
+            groups=self._groups(text, words),
+            exclusions=self._exclusion_terms(text),
+            category=self._category(words),
+        )
+
+    def _groups(self, text: str, words: List[str]) -> Tuple[Tuple[str, ...], ...]:
+        if not words:
+            return ()
+
+        if len(words) == 1:
+            group = self._synonyms.get(text)
+            if group is not None:
+                return (group,)
+            forms = self._word_forms(text)
+            for form in forms:
+                group = self._synonyms.get(form)
+                if group is not None:
+                    return (group,)
+            return (forms,)
+
+        # Multi-word: one group per multi-word synonym key (leftmost-longest), else one per word
+        phrase_at = self._phrase_spans(words)
+        groups = []
+        position = 0
+        while position < len(words):
+            phrase = phrase_at.get(position)
+            if phrase is not None:
+                groups.append(self._synonyms[phrase])
+                position += len(phrase.split())
+                continue
+            word = words[position]
+            group = self._synonyms.get(word)
+            groups.append(group if group is not None else self._word_forms(word))
+            position += 1
+        return tuple(groups)
+
+    def _phrase_spans(self, words: List[str]) -> Dict[int, str]:
+        """Start word index -> longest multi-word synonym key there, without overlaps (leftmost first)."""
+        longest: Dict[int, str] = {}
+        for start, phrase in self._phrases.matches(words):
+            longest[start] = phrase  # Longer phrases come later at the same start
+
+        spans = {}
+        covered_until = 0
+        for start in sorted(longest):
+            if start >= covered_until:
+                spans[start] = longest[start]
+                covered_until = start + len(longest[start].split())
+        return spans
+
+    def _exclusion_terms(self, text: str) -> Tuple[str, ...]:
+        if text in self._exclusions:
+            return self._exclusions[text]
+        for key, terms in self._exclusions.items():
+            if key in text:
+                return terms
+        return ()
+
+    def _category(self, words: List[str]) -> Optional[str]:
+        """Category of the longest category keyword in the query (the rightmost among equals)."""
+        best_length, best_keyword = 0, None
+        for _, keyword in self._category_keywords.matches(words):
+            length = len(keyword.split())
+            if length >= best_length:
+                best_length, best_keyword = length, keyword
+        return self._keyword_categories[best_keyword] if best_keyword else None
@@ -0,0 +1,202 @@
+"""
+Two-tier cache for query embeddings.
+
+- Hot tier: per-process ``OrderedDict`` LRU; get/put/evict are O(1).
+- Durable tier: the ``query_embeddings`` table, keyed by
+  sha256(model : dimension : normalized query). It is shared by every
+  worker and survives deploys, so a restart does not pay Gemini latency
+  for queries seen before. A model or dimension change gets new keys, so
+  entries never go stale and need no TTL.
+
+Durable writes (and hit bookkeeping) happen in background tasks so they
+never add latency to a search; durable-tier errors are logged and treated
+as misses.
+
+Used by: EmbeddingService.get_query_embedding / warm_cache
+"""
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from services.embedding_codec import decode_embedding, encode_embedding
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from database.models import QueryEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """Hot in-process LRU in front of the durable ``query_embeddings`` table."""
+
+    def __init__(self, model: str, dimension: int, max_size: int = 1000):
+        self.model = model
+        self.dimension = dimension
+        self.max_size = max_size
+        self._hot: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._session_factory = None
+        self._background: Set[asyncio.Task] = set()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._stats = {"hot_hits": 0, "durable_hits": 0, "misses": 0, "durable_writes": 0, "durable_errors": 0}
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and ratios for both tiers."""
+        stats = dict(self._stats)
+        lookups = stats["hot_hits"] + stats["durable_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hot_hit_ratio"] = round(stats["hot_hits"] / lookups, 3) if lookups else 0.0
+        stats["durable_hit_ratio"] = round(stats["durable_hits"] / lookups, 3) if lookups else 0.0
+        stats["miss_ratio"] = round(stats["misses"] / lookups, 3) if lookups else 0.0
+        stats["hot_size"] = len(self._hot)
+        stats["durable_enabled"] = self.durable_enabled
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._hot
+
+    def key(self, normalized_query: str) -> str:
+        return hashlib.sha256(f"{self.model}:{self.dimension}:{normalized_query}".encode()).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Hot tier
+    # ------------------------------------------------------------------
+    def get_hot(self, key: str) -> Optional[List[float]]:
+        embedding = self._hot.get(key)
+        if embedding is not None:
+            self._hot.move_to_end(key)
+        return embedding
+
+    def put_hot(self, key: str, embedding: List[float]):
+        self._hot[key] = embedding
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.max_size:
+            self._hot.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Durable tier
+    # ------------------------------------------------------------------
+    @property
+    def durable_enabled(self) -> bool:
+        return self._session_factory is not None
+
+    def attach_durable_tier(self, session_factory):
+        """Back the hot tier with the query_embeddings table (AsyncSession factory)."""
+        self._session_factory = session_factory
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _get_durable(self, key: str) -> Optional[List[float]]:
+        try:
+            async with self._session_factory() as db:
+                result = await db.execute(select(QueryEmbedding.embedding).where(QueryEmbedding.cache_key == key))
+                row = result.first()
+        except Exception as e:
+            self._stats["durable_errors"] += 1
+            logger.warning(f"[QUERY CACHE] Durable lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        vector = decode_embedding(row[0])
+        if vector is None or vector.shape != (self.dimension,):
+            return None
+        self._spawn(self._touch_durable(key))
+        return vector.tolist()
+
+    async def _touch_durable(self, key: str):
+        try:
+            async with self._session_factory() as db:
+                await db.execute(
+                    update(QueryEmbedding)
+                    .where(QueryEmbedding.cache_key == key)
+                    .values(hit_count=QueryEmbedding.hit_count + 1, last_used_at=datetime.utcnow())
+                )
+                await db.commit()
+        except Exception as e:
+            self._stats["durable_errors"] += 1
+            logger.debug(f"[QUERY CACHE] Durable hit update failed: {e}")
+
+    async def _put_durable(self, key: str, normalized_query: str, embedding: List[float]):
+        try:
+            async with self._session_factory() as db:
+                await db.execute(
+                    insert(QueryEmbedding)
+                    .values(
+                        cache_key=key,
+                        model=self.model,
+                        dimension=self.dimension,
+                        query_text=normalized_query,
+                        embedding=encode_embedding(embedding),
+                    )
+                    .on_conflict_do_nothing(index_elements=["cache_key"])
+                )
+                await db.commit()
+            self._stats["durable_writes"] += 1
+        except Exception as e:
+            self._stats["durable_errors"] += 1
+            logger.warning(f"[QUERY CACHE] Durable write failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Two-tier API
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[List[float]]:
+        """Hot tier, then durable tier (promoting hits into the hot tier)."""
+        embedding = self.get_hot(key)
+        if embedding is not None:
+            self._stats["hot_hits"] += 1
+            return embedding
+
+        if self.durable_enabled:
+            embedding = await self._get_durable(key)
+            if embedding is not None:
+                self._stats["durable_hits"] += 1
+                self.put_hot(key, embedding)
+                return embedding
+
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, normalized_query: str, embedding: List[float]):
+        """Store in the hot tier now and in the durable tier in the background."""
+        self.put_hot(key, embedding)
+        if self.durable_enabled:
+            self._spawn(self._put_durable(key, normalized_query, embedding))
+
+    async def load_recent(self, limit: int) -> int:
+        """Bulk-load the most recently used durable entries for this model into the hot tier."""
+        if not self.durable_enabled or limit <= 0:
+            return 0
+        try:
+            async with self._session_factory() as db:
+                result = await db.execute(
+                    select(QueryEmbedding.cache_key, QueryEmbedding.embedding)
+                    .where(QueryEmbedding.model == self.model, QueryEmbedding.dimension == self.dimension)
+                    .order_by(QueryEmbedding.last_used_at.desc())
+                    .limit(min(limit, self.max_size))
+                )
+                rows = result.fetchall()
+        except Exception as e:
+            self._stats["durable_errors"] += 1
+            logger.warning(f"[QUERY CACHE] Durable bulk load failed: {e}")
+            return 0
+
+        loaded = 0
+        # Oldest first so the most recently used entries end up hottest in the LRU
+        for key, data in reversed(rows):
+            vector = decode_embedding(data)
+            if vector is not None and vector.shape == (self.dimension,):
+                self.put_hot(key, vector.tolist())
+                loaded += 1
+        return loaded
@@ -20,11 +20,28 @@ Budget Scoring:
     - Products up to 50% over budget get score 0.4
     - Products over 50% above budget get score 0.2
     - If no budget specified, all products get neutral score 0.5
+
+Implementation:
+    rank_products is columnar: candidate features are packed once into
+    dictionary-encoded columns (each distinct style/material/color/type is
+    scored once, then gathered per product) and numeric arrays, every
+    WEIGHTS component is an array operation, and text intent is one matrix
+    product of pre-normalized product vectors with the normalized query.
+    _rank_products_rowwise is the original per-product implementation,
+    kept as the parity reference (tests, scripts/benchmark_ranking.py).
+
+    Material and color family matching works on integer family bitmasks
+    (bit i = i-th entry of MATERIAL_FAMILIES / COLOR_FAMILIES). When the
+    caller passes precomputed product_features rows, type, capacity,
+    material, color, styles and the masks are read from them instead of
+    from attributes on the product objects.
 """
-import json
 import logging
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from services.embedding_codec import read_product_embedding
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +54,52 @@ class RankedProduct:
     breakdown: Dict[str, float]
 
 
+# Dictionary-encoded column: per-product codes into a list of distinct values
+EncodedColumn = Tuple[np.ndarray, List[Hashable]]
+
+
+def _encode_column(values: List[Hashable]) -> EncodedColumn:
+    """Dictionary-encode a column (None is a regular value)."""
+    positions: Dict[Hashable, int] = {}
+    codes = np.array([positions.setdefault(value, len(positions)) for value in values], dtype=np.int64)
+    return codes, list(positions)
+
+
+def _round_column(values: np.ndarray, ndigits: int = 4) -> List[float]:
+    """Python round() of every value, computed once per distinct value (components are mostly categorical)."""
+    distinct, inverse = np.unique(values, return_inverse=True)
+    if len(distinct) == len(values):
+        return [round(value, ndigits) for value in values.tolist()]
+    rounded = [round(value, ndigits) for value in distinct.tolist()]
+    return [rounded[i] for i in inverse.tolist()]
+
+
+def _lower_or_none(value) -> Optional[str]:
+    return value.lower() if value else None
+
+
+def _family_column(column: EncodedColumn) -> EncodedColumn:
+    """Distinct raw values -> (lower-cased value, None); precomputed (value, family mask) pairs are kept."""
+    codes, values = column
+    return codes, [value if isinstance(value, tuple) else (_lower_or_none(value), None) for value in values]
+
+
+@dataclass
+class CandidateFeatures:
+    """Candidate products packed into columns for vectorized scoring."""
+    size: int
+    category: EncodedColumn         # str(category_id)
+    product_type: EncodedColumn     # lower-cased size/shape type (ADJACENT_TYPES vocabulary), None if missing
+    capacity: EncodedColumn         # raw capacity / seating_capacity
+    primary_style: EncodedColumn    # lower-cased
+    secondary_style: EncodedColumn  # lower-cased
+    material: EncodedColumn         # (lower-cased material_primary, family mask or None)
+    color: EncodedColumn            # (lower-cased color_primary, family mask or None)
+    price: np.ndarray               # float64, NaN when missing/zero/invalid
+    embedding_rows: Optional[np.ndarray] = None  # positions of products with a decodable embedding
+    embeddings: Optional[List[np.ndarray]] = None
+
+
 class RankingService:
     """Deterministic, explainable product ranking."""
 
@@ -111,6 +174,9 @@ class RankingService:
         ],
     }
 
+    # Family name -> its bit in material_family_mask
+    _MATERIAL_FAMILY_BITS = {family: 1 << bit for bit, family in enumerate(MATERIAL_FAMILIES)}
+
     # Adjacent/similar types for partial matching
     ADJACENT_TYPES = {
         "2-seater": ["3-seater", "loveseat", "2 seater"],
@@ -141,6 +207,7 @@ class RankingService:
         user_materials: Optional[List[str]] = None,
         user_color: Optional[str] = None,
         user_budget_max: Optional[float] = None,
+        features: Optional[Dict[int, Any]] = None,
     ) -> List[RankedProduct]:
         """
         Rank products using weighted scoring.
@@ -157,10 +224,60 @@ class RankingService:
             user_materials: List of preferred materials
             user_color: Preferred color
             user_budget_max: Maximum budget for this category (products over budget get lower scores)
+            features: Optional product_id -> ProductFeatures rows (services/product_features.py);
+                products with a row are scored on its precomputed values
 
         Returns:
             List of RankedProduct sorted by final_score (descending)
         """
+        if not products:
+            return []
+
+        packed = self._pack_features(products, with_embeddings=bool(query_embedding), product_features=features)
+        components = {
+            "vector_similarity": np.array([vector_scores.get(product.id, 0.0) for product in products], dtype=np.float64),
+            "attribute_match": self._attribute_scores(packed, user_category, user_type, user_capacity),
+            "style": self._style_scores(packed, user_primary_style, user_secondary_style),
+            "material_color": self._material_color_scores(packed, user_materials, user_color),
+            "budget": self._budget_scores(packed, user_budget_max),
+            "text_intent": self._text_intent_scores(packed, query_embedding),
+        }
+
+        # Accumulate in WEIGHTS order so every float matches the row-wise sum()
+        final_scores = np.zeros(packed.size)
+        for key, weight in self.WEIGHTS.items():
+            final_scores = final_scores + weight * components[key]
+
+        columns = {key: _round_column(values) for key, values in components.items()}
+        ranked = [
+            RankedProduct(
+                product=product,
+                final_score=final_score,
+                breakdown={key: column[i] for key, column in columns.items()}
+            )
+            for i, (product, final_score) in enumerate(zip(products, _round_column(final_scores)))
+        ]
+
+        # Sort by final_score descending
+        ranked.sort(key=lambda x: x.final_score, reverse=True)
+
+        return ranked
+
+    def _rank_products_rowwise(
+        self,
+        products: list,
+        vector_scores: Dict[int, float],
+        query_embedding: Optional[List[float]] = None,
+        user_category: Optional[str] = None,
+        user_type: Optional[str] = None,
+        user_capacity: Optional[int] = None,
+        user_primary_style: Optional[str] = None,
+        user_secondary_style: Optional[str] = None,
+        user_materials: Optional[List[str]] = None,
+        user_color: Optional[str] = None,
+        user_budget_max: Optional[float] = None,
+    ) -> List[RankedProduct]:
+        """Per-product reference implementation of rank_products (same arguments and result)."""
         ranked = []
 
         for product in products:
@@ -201,6 +318,306 @@ class RankingService:
 
         return ranked
 
+    # =========================================================================
+    # Columnar scoring
+    # =========================================================================
+
+    def _pack_features(
+        self,
+        products: list,
+        with_embeddings: bool = False,
+        product_features: Optional[Dict[int, Any]] = None
+    ) -> CandidateFeatures:
+        """Pack the attributes used for scoring into columns, one pass over the products."""
+        prices = np.full(len(products), np.nan)
+        for i, product in enumerate(products):
+            product_price = getattr(product, 'price', None)
+            if product_price:
+                try:
+                    prices[i] = float(product_price)
+                except (ValueError, TypeError):
+                    pass
+
+        # Precomputed product_features rows are already normalized and lower-cased, masks included
+        rows = [product_features.get(product.id) for product in products] if product_features else [None] * len(products)
+        pairs = list(zip(products, rows))
+
+        features = CandidateFeatures(
+            size=len(products),
+            category=_encode_column([str(product.category_id) for product in products]),
+            product_type=_encode_column([
+                # Not Product.product_type: that holds the category keyword ("sofas"), not a size/shape type
+                row.product_type if row is not None else _lower_or_none(getattr(product, 'type', None))
+                for product, row in pairs
+            ]),
+            capacity=_encode_column([
+                row.capacity if row is not None
+                else getattr(product, 'capacity', None) or getattr(product, 'seating_capacity', None)
+                for product, row in pairs
+            ]),
+            primary_style=_encode_column([
+                row.primary_style if row is not None else _lower_or_none(getattr(product, 'primary_style', None))
+                for product, row in pairs
+            ]),
+            secondary_style=_encode_column([
+                row.secondary_style if row is not None else _lower_or_none(getattr(product, 'secondary_style', None))
+                for product, row in pairs
+            ]),
+            material=_family_column(_encode_column([
+                (row.material, row.material_family_mask) if row is not None else getattr(product, 'material_primary', None)
+                for product, row in pairs
+            ])),
+            color=_family_column(_encode_column([
+                (row.color, row.color_family_mask) if row is not None else getattr(product, 'color_primary', None)
+                for product, row in pairs
+            ])),
+            price=prices,
+        )
+
+        if with_embeddings:
+            # Dual-read: binary embedding_vector first, legacy JSON text as fallback
+            rows, embeddings = [], []
+            for i, product in enumerate(products):
+                vector = read_product_embedding(product)
+                if vector is not None:
+                    rows.append(i)
+                    embeddings.append(vector)
+            features.embedding_rows = np.asarray(rows, dtype=np.int64)
+            features.embeddings = embeddings
+
+        return features
+
+    @staticmethod
+    def _gather(column: EncodedColumn, score_value: Callable[[Any], float]) -> np.ndarray:
+        """Score each distinct value of ``column`` once and expand to one score per product."""
+        codes, values = column
+        return np.array([score_value(value) for value in values], dtype=np.float64)[codes]
+
+    def _attribute_scores(
+        self,
+        features: CandidateFeatures,
+        user_category: Optional[str],
+        user_type: Optional[str],
+        user_capacity: Optional[int]
+    ) -> np.ndarray:
+        """Columnar _compute_attribute_score."""
+        parts = []
+
+        if user_category is not None:
+            user_category_str = str(user_category)
+            parts.append(self._gather(features.category, lambda category: 1.0 if category == user_category_str else 0.5))
+
+        if user_type:
+            user_type_lower = user_type.lower()
+
+            def type_score(product_type):
+                if not product_type:
+                    return 0.5
+                if product_type == user_type_lower:
+                    return 1.0
+                return 0.75 if self._is_adjacent_type(product_type, user_type_lower) else 0.5
+
+            parts.append(self._gather(features.product_type, type_score))
+
+        if user_capacity is not None:
+            def capacity_score(product_capacity):
+                if product_capacity is None:
+                    return 0.5
+                try:
+                    diff = abs(int(product_capacity) - int(user_capacity))
+                except (ValueError, TypeError):
+                    return 0.5
+                return {0: 1.0, 1: 0.75, 2: 0.6}.get(diff, 0.5)
+
+            parts.append(self._gather(features.capacity, capacity_score))
+
+        if not parts:
+            return np.full(features.size, 0.5)
+
+        total = parts[0]
+        for part in parts[1:]:
+            total = total + part
+        return total / len(parts)
+
+    def _style_scores(
+        self,
+        features: CandidateFeatures,
+        user_primary_style: Optional[str],
+        user_secondary_style: Optional[str]
+    ) -> np.ndarray:
+        """Columnar _compute_style_score."""
+        if not user_primary_style:
+            return np.full(features.size, 0.5)
+
+        def match(target: str) -> np.ndarray:
+            on_primary = self._gather(features.primary_style, lambda style: style == target) > 0
+            on_secondary = self._gather(features.secondary_style, lambda style: style == target) > 0
+            return np.where(on_primary, 1.0, np.where(on_secondary, 0.75, 0.5))
+
+        primary_match = match(user_primary_style.lower())
+        if user_secondary_style:
+            secondary_match = match(user_secondary_style.lower())
+        else:
+            secondary_match = np.full(features.size, 0.5)
+
+        return 0.7 * primary_match + 0.3 * secondary_match
+
+    def _material_color_scores(
+        self,
+        features: CandidateFeatures,
+        user_materials: Optional[List[str]],
+        user_color: Optional[str]
+    ) -> np.ndarray:
+        """Columnar _compute_material_color_score: family bitmask tests, once per distinct value."""
+        material_scores = np.full(features.size, 0.5)
+        color_scores = np.full(features.size, 0.5)
+
+        if user_materials:
+            preferences = [
+                (pref.lower(), self._MATERIAL_FAMILY_BITS.get(pref.lower(), 0), self.material_family_mask(pref))
+                for pref in user_materials
+            ]
+            material_scores = self._gather(
+                features.material, lambda value: self._material_mask_match(value[0], value[1], preferences)
+            )
+
+        if user_color:
+            user_color_lower = user_color.lower()
+            user_family = self.color_family_mask(user_color_lower).bit_length()
+            color_scores = self._gather(
+                features.color, lambda value: self._color_mask_match(value[0], value[1], user_color_lower, user_family)
+            )
+
+        return 0.6 * material_scores + 0.4 * color_scores
+
+    # -------------------------------------------------------------------------
+    # Family bitmasks
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _family_mask(families: Dict[str, List[str]], value: Optional[str]) -> int:
+        """Bit i set when ``value`` is a member of the i-th family."""
+        if not value:
+            return 0
+        value = value.lower()
+        mask = 0
+        for bit, members in enumerate(families.values()):
+            if value in members:
+                mask |= 1 << bit
+        return mask
+
+    @classmethod
+    def material_family_mask(cls, material: Optional[str]) -> int:
+        """Bitmask of the MATERIAL_FAMILIES containing ``material`` (e.g. bamboo: wood | rattan)."""
+        return cls._family_mask(cls.MATERIAL_FAMILIES, material)
+
+    @classmethod
+    def color_family_mask(cls, color: Optional[str]) -> int:
+        """Bitmask of the COLOR_FAMILIES containing ``color``."""
+        return cls._family_mask(cls.COLOR_FAMILIES, color)
+
+    def _material_mask_match(
+        self,
+        material: Optional[str],
+        family_mask: Optional[int],
+        preferences: List[Tuple[str, int, int]]
+    ) -> float:
+        """
+        _compute_material_match on bitmasks. ``material`` is lower-cased,
+        ``preferences`` holds (preference, its family bit if it names a family,
+        bitmask of the families it belongs to).
+        """
+        if not material:
+            return 0.5
+        if family_mask is None:
+            family_mask = self.material_family_mask(material)
+        material_family_bit = self._MATERIAL_FAMILY_BITS.get(material, 0)
+
+        for pref, pref_family_bit, pref_mask in preferences:
+            if material == pref:
+                return 1.0
+            if family_mask & pref_family_bit:
+                return 0.9  # User wants "wood", product has "oak"
+            if material_family_bit & pref_mask:
+                return 0.8  # User wants "oak", product has "wood"
+            if family_mask & pref_mask:
+                return 0.85  # Both in the same family
+
+        return 0.5
+
+    def _color_mask_match(
+        self,
+        color: Optional[str],
+        family_mask: Optional[int],
+        user_color: str,
+        user_family: int
+    ) -> float:
+        """
+        _compute_color_match on bitmasks. A color's family is its last
+        COLOR_FAMILIES entry, i.e. the highest set bit (``bit_length``).
+        """
+        if not color:
+            return 0.5
+        if color == user_color:
+            return 1.0
+        if family_mask is None:
+            family_mask = self.color_family_mask(color)
+        if user_family and family_mask.bit_length() == user_family:
+            return 0.85
+        return 0.5
+
+    def _budget_scores(self, features: CandidateFeatures, user_budget_max: Optional[float]) -> np.ndarray:
+        """Columnar _compute_budget_score."""
+        neutral = np.full(features.size, 0.5)
+        if not user_budget_max:
+            return neutral
+
+        try:
+            budget = float(user_budget_max)
+        except (ValueError, TypeError):
+            return neutral
+
+        prices = features.price
+        with np.errstate(invalid='ignore'):
+            over_ratio = (prices - budget) / budget
+            scores = np.where(
+                prices <= budget, 1.0,
+                np.where(over_ratio <= 0.20, 0.7, np.where(over_ratio <= 0.50, 0.4, 0.2))
+            )
+        return np.where(np.isnan(prices), neutral, scores)
+
+    def _text_intent_scores(
+        self,
+        features: CandidateFeatures,
+        query_embedding: Optional[List[float]]
+    ) -> np.ndarray:
+        """
+        Columnar _compute_text_intent_score: one matrix product of the
+        product vectors with the normalized query, scaled by inverse row norms.
+        """
+        scores = np.full(features.size, 0.5)
+        if not query_embedding or not features.embeddings:
+            return scores
+
+        query = np.asarray(query_embedding, dtype=np.float64)
+        rows = features.embedding_rows
+        # Products with an embedding score 0.0 unless it is a non-zero vector of the query's dimension
+        scores[rows] = 0.0
+
+        same_dim = np.array([len(vector) == len(query) for vector in features.embeddings], dtype=bool)
+        query_norm = float(np.linalg.norm(query))
+        if len(query) == 0 or query_norm == 0 or not same_dim.any():
+            return scores
+
+        matrix = np.stack([vector for vector, ok in zip(features.embeddings, same_dim) if ok], dtype=np.float64)
+        norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+        nonzero = norms > 0
+        if not nonzero.all():
+            matrix, norms = matrix[nonzero], norms[nonzero]
+
+        scores[rows[same_dim][nonzero]] = (matrix @ (query / query_norm)) / norms
+        return scores
+
     def _compute_attribute_score(
         self,
         product,
@@ -226,7 +643,7 @@ class RankingService:
 
         # Type match (optional)
         if user_type:
-            product_type = getattr(product, 'type', None) or getattr(product, 'product_type', None)
+            product_type = getattr(product, 'type', None)
             if product_type:
                 user_type_lower = user_type.lower()
                 product_type_lower = product_type.lower()
@@ -485,29 +902,27 @@ class RankingService:
         if not query_embedding:
             return 0.5
 
-        product_embedding_str = getattr(product, 'embedding', None)
-        if not product_embedding_str:
+        # Dual-read: binary embedding_vector first, legacy JSON text as fallback
+        product_embedding = read_product_embedding(product)
+        if product_embedding is None:
             return 0.5
 
-        try:
-            product_embedding = json.loads(product_embedding_str)
-            return self._cosine_similarity(query_embedding, product_embedding)
-        except (json.JSONDecodeError, TypeError):
-            return 0.5
+        return self._cosine_similarity(query_embedding, product_embedding)
 
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
+    def _cosine_similarity(self, vec1, vec2) -> float:
         """Compute cosine similarity between two vectors."""
-        if not vec1 or not vec2 or len(vec1) != len(vec2):
+        if vec1 is None or vec2 is None or len(vec1) == 0 or len(vec1) != len(vec2):
             return 0.0
 
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = sum(a * a for a in vec1) ** 0.5
-        norm2 = sum(b * b for b in vec2) ** 0.5
+        a = np.asarray(vec1, dtype=np.float64)
+        b = np.asarray(vec2, dtype=np.float64)
+        norm1 = float(np.linalg.norm(a))
+        norm2 = float(np.linalg.norm(b))
 
         if norm1 == 0 or norm2 == 0:
             return 0.0
 
-        return dot_product / (norm1 * norm2)
+        return float(a @ b) / (norm1 * norm2)
 
 
 # Singleton instance
@@ -6,8 +6,12 @@ import re
 from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
+from services.attribute_index import AttributeIndex, get_attribute_index, normalize_value
+from services.product_classification import ACCESSORY_TERMS
+from services.search_service import get_query_analyzer, name_matches_any
 from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,6 +19,14 @@ from database.models import Product, ProductAttribute
 
 logger = logging.getLogger(__name__)
 
+# ProductAttribute names read by the content-based matchers
+COLOR_ATTRIBUTES = ("color_primary", "color_secondary", "color_accent")
+MATERIAL_ATTRIBUTES = ("material_primary", "material_secondary")
+DIMENSION_ATTRIBUTES = ("width", "depth", "height")
+
+# Strict attribute matches pushed into the candidate query as an id list when there are at most this many
+STRICT_PREFILTER_MAX_IDS = 5000
+
 
 @dataclass
 class RecommendationRequest:
@@ -258,12 +270,15 @@ class AdvancedRecommendationEngine:
         start_time = datetime.now()
 
         try:
+            # Strict attribute matches from the resident attribute index (None = index unavailable)
+            attribute_bitmap = self._strict_attribute_bitmap(request) if request.strict_attribute_match else None
+
             # Get candidate products
-            candidates = await self._get_candidate_products(request, db)
+            candidates = await self._get_candidate_products(request, db, attribute_bitmap)
 
             # Apply strict attribute filtering if enabled (ZERO false positives)
             if request.strict_attribute_match:
-                candidates = await self._apply_strict_attribute_filtering(candidates, request, db)
+                candidates = await self._apply_strict_attribute_filtering(candidates, request, db, attribute_bitmap)
                 logger.info(f"Strict filtering: {len(candidates)} products match attribute criteria")
 
                 # If no products match, return empty results
@@ -330,8 +345,67 @@ class AdvancedRecommendationEngine:
                 diversity_score=0.0,
             )
 
+    def _strict_attribute_bitmap(self, request: RecommendationRequest) -> Optional[np.ndarray]:
+        """
+        Product-id bitmap of the products passing strict attribute filtering, from the attribute index
+
+        Same rules as _apply_strict_attribute_filtering: colors match exactly or by
+        color family, materials by substring either way, texture/pattern/style by
+        containing a requested term. Returns None when the index is not loaded or
+        no attribute is specified.
+        """
+        index = get_attribute_index()
+        user_colors = [normalize_value(color) for color in request.user_colors or []]
+        user_materials = [normalize_value(material) for material in request.user_materials or []]
+        user_textures = [normalize_value(texture) for texture in request.user_textures or []]
+        user_patterns = [normalize_value(pattern) for pattern in request.user_patterns or []]
+        user_styles = [normalize_value(style) for style in request.user_styles or []]
+        if not index.is_loaded or not any([user_colors, user_materials, user_textures, user_patterns, user_styles]):
+            return None
+
+        def combine(bitmaps: List[np.ndarray], match_mode: str) -> np.ndarray:
+            combined = bitmaps[0].copy()
+            for bitmap in bitmaps[1:]:
+                if match_mode == "and":
+                    combined &= bitmap
+                else:
+                    combined |= bitmap
+            return combined
+
+        def containing(terms: List[str]) -> Callable[[str], bool]:
+            return lambda value: any(term in value for term in terms)
+
+        bitmaps = []
+        if user_colors:
+            color_families = self._get_color_families()
+            bitmaps.append(
+                combine(
+                    [index.bitmap(COLOR_ATTRIBUTES, [color, *color_families.get(color, [])]) for color in user_colors],
+                    request.color_match_mode,
+                )
+            )
+        if user_materials:
+            bitmaps.append(
+                combine(
+                    [
+                        index.matching(MATERIAL_ATTRIBUTES, lambda value, term=term: term in value or value in term)
+                        for term in user_materials
+                    ],
+                    request.material_match_mode,
+                )
+            )
+        for attribute_name, terms in (("texture", user_textures), ("pattern", user_patterns), ("style", user_styles)):
+            if terms:
+                bitmaps.append(index.matching((attribute_name,), containing(terms)))
+
+        return combine(bitmaps, "and")
+
     async def _apply_strict_attribute_filtering(
-        self, candidates: List[Product], request: RecommendationRequest, db: AsyncSession
+        self,
+        candidates: List[Product],
+        request: RecommendationRequest,
+        db: AsyncSession,
+        attribute_bitmap: Optional[np.ndarray] = None,
     ) -> List[Product]:
         """
         Apply strict attribute filtering to ensure ZERO false positives
@@ -364,7 +438,20 @@ class AdvancedRecommendationEngine:
             logger.info("No attributes specified, returning all candidates")
             return candidates
 
-        for product in candidates:
+        # Products covered by the attribute index are decided from the bitmap without any query
+        unchecked = candidates
+        if attribute_bitmap is not None:
+            index = get_attribute_index()
+            covered = [product for product in candidates if index.covers(product.id)]
+            members = index.contains(attribute_bitmap, [product.id for product in covered])
+            passed = {product.id for product, member in zip(covered, members) if member}
+            unchecked = [product for product in candidates if not index.covers(product.id)]
+            logger.info(
+                f"STRICT FILTERING: attribute index passed {len(passed)}/{len(covered)} covered candidates, "
+                f"{len(unchecked)} not covered"
+            )
+
+        for product in unchecked:
             # Check each specified attribute
             passes_filter = True
 
@@ -491,6 +578,10 @@ class AdvancedRecommendationEngine:
             if passes_filter:
                 filtered_candidates.append(product)
 
+        if attribute_bitmap is not None:
+            checked = {product.id for product in filtered_candidates}
+            filtered_candidates = [product for product in candidates if product.id in passed or product.id in checked]
+
         logger.info(
             f"Strict attribute filtering: {len(candidates)} → {len(filtered_candidates)} products "
             f"(colors={user_colors}, materials={user_materials}, styles={user_styles})"
@@ -499,79 +590,17 @@ class AdvancedRecommendationEngine:
         return filtered_candidates
 
     def _categorize_keywords(self, keywords: List[str]) -> Dict[str, List[str]]:
-        """Categorize keywords into product categories to enable strict filtering"""
-
-        # Define mutually exclusive product categories
-        categories = {
-            "ceiling_lighting": ["ceiling lamp", "ceiling light", "chandelier", "pendant", "overhead light", "pendant light"],
-            "portable_lighting": ["table lamp", "desk lamp", "floor lamp"],
-            "wall_lighting": ["wall lamp", "sconce", "wall light"],
-            "sofas": ["sofa", "couch", "sectional", "loveseat"],  # Sofas - replaceable items
-            "chairs": [
-                "chair",
-                "armchair",
-                "accent chair",
-                "side chair",
-                "sofa chair",
-                "recliner",
-                "dining chair",
-            ],  # Chairs - additive items only
-            "other_seating": ["bench", "stool", "ottoman"],  # Other seating - additive items
-            "center_tables": ["coffee table", "center table", "centre table"],  # Placed in front of sofa
-            "bedside_tables": [
-                "bedside table",
-                "bedside tables",
-                "nightstand",
-                "nightstands",
-                "night stand",
-            ],  # Bedroom tables
-            "side_tables": ["side table", "end table"],  # Placed beside furniture (NOT bedside)
-            "dining_tables": ["dining table"],  # Separate category for dining tables
-            "other_tables": ["console table", "desk", "table"],  # Generic tables
-            "storage_furniture": ["dresser", "chest", "cabinet", "bookshelf", "shelving", "shelf", "wardrobe"],
-            "bedroom_furniture": ["bed", "mattress", "headboard"],
-            "wall_decor": ["wall art", "wall decor", "wall hanging", "tapestry"],  # Wall decoration items
-            "table_mats": [
-                "table mat",
-                "table mats",
-                "placemat",
-                "placemats",
-                "table runner",
-                "table runners",
-                "runner",
-                "runners",
-            ],
-            # Rugs & Carpets - separate category for strict filtering (DB category ID 36)
-            "rugs": [
-                "rug",
-                "carpet",
-                "floor rug",
-                "area rug",
-                "wall rug",
-            ],
-            "decor": [
-                "mirror",
-                "planter",
-                "pot",
-                "vase",
-                "sculpture",
-                "figurine",
-                "statue",
-                "art piece",
-            ],
-            "general_lighting": ["lamp", "lighting"],  # Catch-all for generic lighting terms
-        }
+        """Categorize keywords into product categories to enable strict filtering
 
-        # Map keywords to their categories
-        keyword_to_category = {}
-        for category, terms in categories.items():
-            for term in terms:
-                keyword_to_category[term] = category
+        Categories are mutually exclusive (search_service.KEYWORD_CATEGORIES), looked up in the
+        shared query analyzer.
+        """
+        analyzer = get_query_analyzer()
 
         # Group keywords by category
         categorized = defaultdict(list)
         for keyword in keywords:
-            category = keyword_to_category.get(keyword.lower())
+            category = analyzer.keyword_category(keyword)
             if category:
                 categorized[category].append(keyword)
             else:
@@ -772,12 +801,24 @@ class AdvancedRecommendationEngine:
         # Otherwise use the general category mapping
         return category_mapping.get(keyword_category, [])
 
-    async def _get_candidate_products(self, request: RecommendationRequest, db: AsyncSession) -> List[Product]:
+    async def _get_candidate_products(
+        self, request: RecommendationRequest, db: AsyncSession, attribute_bitmap: Optional[np.ndarray] = None
+    ) -> List[Product]:
         """Get candidate products based on basic criteria with strict category filtering"""
         from sqlalchemy.orm import selectinload
 
         query = select(Product).where(Product.is_available)
 
+        # Strict attribute matches known from the attribute index: spend the candidate limit on them
+        # (products newer than the index are kept for the database check in strict filtering)
+        if attribute_bitmap is not None:
+            matching_ids = AttributeIndex.product_ids(attribute_bitmap)
+            if len(matching_ids) <= STRICT_PREFILTER_MAX_IDS:
+                logger.info(f"Prefiltering candidates to {len(matching_ids)} strict attribute matches")
+                query = query.where(
+                    or_(Product.id.in_(matching_ids.tolist()), Product.id > get_attribute_index().max_product_id)
+                )
+
         # Apply store filtering if specified
         if request.selected_stores and len(request.selected_stores) > 0:
             logger.info(f"Filtering products by selected stores: {request.selected_stores}")
@@ -801,19 +842,11 @@ class AdvancedRecommendationEngine:
             category_conditions = []
 
             for keyword_category, keywords in categorized_keywords.items():
-                # Build OR condition within this category for name matching
-                keyword_conditions = []
-                for keyword in keywords:
-                    # Use PostgreSQL regex with word boundaries (\y)
-                    # ~* is case-insensitive regex operator
+                if keywords:
+                    # Whole-word match of ANY keyword (OR) via the products.search_vector full-text index
                     # IMPORTANT: Only match against product NAME, not description
                     # Description matching causes false positives (e.g., "place next to a sofa" in table descriptions)
-                    escaped_keyword = re.escape(keyword)
-                    keyword_conditions.append(Product.name.op("~*")(rf"\y{escaped_keyword}\y"))
-
-                if keyword_conditions:
-                    # Combine keywords within category with OR
-                    name_condition = or_(*keyword_conditions)
+                    name_condition = name_matches_any(keywords)
 
                     # Check if we have strict category IDs for this keyword
                     # If so, use category_id filtering INSTEAD of name matching
@@ -844,52 +877,16 @@ class AdvancedRecommendationEngine:
         else:
             logger.warning("No product keywords provided - returning all products")
 
-        # CRITICAL: Exclude accessories and non-furniture items
-        # These terms indicate the product is NOT actual furniture (e.g., "Sofa Swatches" is not a sofa)
-        accessory_exclusions = [
-            "swatch",
-            "swatches",
-            "sample",
-            "samples",  # Fabric samples
-            "fabric",
-            "material",
-            "textile",  # Materials only
-            "cushion",
-            "pillow",
-            "throw pillow",  # Soft accessories
-            "cover",
-            "slipcover",
-            "protector",  # Covers
-            "accessory",
-            "accessories",  # Generic accessories
-            "part",
-            "parts",
-            "component",  # Replacement parts
-            "hardware",
-            "screw",
-            "nail",
-            "bolt",  # Hardware
-            "tool",
-            "tools",
-            "kit",  # Tools
-            "cleaner",
-            "polish",
-            "wax",  # Maintenance products
-            "manual",
-            "guide",
-            "instruction",  # Documentation
-        ]
-
-        # Build exclusion conditions
-        exclusion_conditions = []
-        for exclusion in accessory_exclusions:
-            escaped = re.escape(exclusion)
-            # Exclude if word appears in product name
-            exclusion_conditions.append(~Product.name.op("~*")(rf"\y{escaped}\y"))
-
-        if exclusion_conditions:
-            query = query.where(and_(*exclusion_conditions))
-            logger.info(f"Applied {len(accessory_exclusions)} accessory exclusions")
+        # CRITICAL: Exclude accessories and non-furniture items (e.g., "Sofa Swatches" is not a sofa)
+        # Classified products are filtered on the indexed is_accessory column; products not yet
+        # classified (see scripts/reclassify_products.py) still get the name check
+        query = query.where(
+            or_(
+                Product.is_accessory.is_(False),
+                and_(Product.is_accessory.is_(None), ~name_matches_any(ACCESSORY_TERMS)),
+            )
+        )
+        logger.info(f"Applied accessory exclusion ({len(ACCESSORY_TERMS)} terms)")
 
         # NOTE: Rug-specific exclusions removed - now using category_id filtering (category 36)
         # This ensures only actual rugs from the "Rug" category are returned, avoiding
@@ -1059,8 +1056,19 @@ class AdvancedRecommendationEngine:
             combined_keywords.extend(styling_keywords)
             logger.info(f"Added {len(styling_keywords)} styling tip keywords to product matching")
 
+        # Every attribute the matchers below need, for all candidates in one query
+        attribute_names = [
+            *(COLOR_ATTRIBUTES if combined_colors else ()),
+            *(MATERIAL_ATTRIBUTES if user_materials else ()),
+            *(DIMENSION_ATTRIBUTES if user_dimensions else ()),
+            *(("texture",) if user_textures else ()),
+            *(("pattern",) if user_patterns else ()),
+        ]
+        attribute_matrix = await self._load_attribute_matrix(candidates, attribute_names, db)
+
         for product in candidates:
             score = 0.0
+            attributes = attribute_matrix.get(product.id, {}) if attribute_matrix is not None else None
 
             # Keyword relevance matching (30% - now includes styling_tips keywords)
             if combined_keywords:
@@ -1070,13 +1078,13 @@ class AdvancedRecommendationEngine:
 
             # Color matching (15% - now includes AI designer's color_palette)
             if combined_colors:
-                color_match = await self._calculate_color_match(product, combined_colors, db)
+                color_match = self._calculate_color_match(product, combined_colors, attributes)
                 score += color_match * 0.15
                 logger.debug(f"Product {product.id}: color_match={color_match:.2f} (colors: {combined_colors})")
 
             # Material matching (15% - was placeholder, now real)
             if user_materials:
-                material_match = await self._calculate_material_match(product, user_materials, db)
+                material_match = self._calculate_material_match(product, user_materials, attributes)
                 score += material_match * 0.15
                 logger.debug(f"Product {product.id}: material_match={material_match:.2f}")
 
@@ -1090,17 +1098,17 @@ class AdvancedRecommendationEngine:
 
             # Size matching (10% - NEW)
             if user_dimensions:
-                size_match = await self._calculate_size_match(product, user_dimensions, db)
+                size_match = self._calculate_size_match(product, user_dimensions, attributes)
                 score += size_match * 0.10
 
             # Texture matching (5% - NEW)
             if user_textures:
-                texture_match = await self._calculate_texture_match(product, user_textures, db)
+                texture_match = self._calculate_texture_match(product, user_textures, attributes)
                 score += texture_match * 0.05
 
             # Pattern matching (5% - NEW)
             if user_patterns:
-                pattern_match = await self._calculate_pattern_match(product, user_patterns, db)
+                pattern_match = self._calculate_pattern_match(product, user_patterns, attributes)
                 score += pattern_match * 0.05
 
             # Description similarity (5% - reduced from 20%)
@@ -1554,9 +1562,45 @@ class AdvancedRecommendationEngine:
         """Calculate similarity between two styles"""
         return self.style_compatibility_matrix.get(style1, {}).get(style2, 0.0)
 
-    async def _calculate_color_match(self, product: Product, preferred_colors: List[str], db: AsyncSession) -> float:
+    async def _load_attribute_matrix(
+        self, candidates: List[Product], attribute_names: List[str], db: AsyncSession
+    ) -> Optional[Dict[int, Dict[str, List[str]]]]:
+        """
+        Fetch the ``attribute_names`` of every candidate in one query
+
+        Returns product_id -> attribute_name -> values (products without any of
+        the attributes are absent), or None if the query failed.
+        """
+        if not candidates or not attribute_names:
+            return {}
+
+        try:
+            result = await db.execute(
+                select(ProductAttribute.product_id, ProductAttribute.attribute_name, ProductAttribute.attribute_value).where(
+                    ProductAttribute.product_id.in_([product.id for product in candidates]),
+                    ProductAttribute.attribute_name.in_(attribute_names),
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error loading attributes for {len(candidates)} candidates: {e}")
+            return None
+
+        matrix: Dict[int, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
+        for product_id, attribute_name, attribute_value in result.all():
+            if attribute_value:
+                matrix[product_id][attribute_name].append(attribute_value)
+        return matrix
+
+    @staticmethod
+    def _attribute_values(attributes: Dict[str, List[str]], names: Tuple[str, ...]) -> List[str]:
+        """Lowercased values of the attributes ``names``, in that order"""
+        return [value.lower() for name in names for value in attributes.get(name, ())]
+
+    def _calculate_color_match(
+        self, product: Product, preferred_colors: List[str], attributes: Optional[Dict[str, List[str]]]
+    ) -> float:
         """
-        Calculate color match score using ProductAttribute table
+        Calculate color match score from the product's prefetched attributes
 
         Returns:
             1.0 = Exact match (primary color matches)
@@ -1567,41 +1611,34 @@ class AdvancedRecommendationEngine:
         if not preferred_colors:
             return 1.0  # No preference = all colors acceptable
 
-        try:
-            # Query product colors from ProductAttribute
-            result = await db.execute(
-                select(ProductAttribute.attribute_value).where(
-                    ProductAttribute.product_id == product.id,
-                    ProductAttribute.attribute_name.in_(["color_primary", "color_secondary", "color_accent"]),
-                )
-            )
-            product_colors = [color.lower() for color in result.scalars().all() if color]
+        if attributes is None:
+            return 0.5  # Attributes could not be loaded, neutral score
 
-            if not product_colors:
-                return 0.0  # No color data = exclude if user specified color
+        product_colors = self._attribute_values(attributes, COLOR_ATTRIBUTES)
 
-            # Exact match
-            for user_color in preferred_colors:
-                if user_color.lower() in product_colors:
-                    return 1.0
+        if not product_colors:
+            return 0.0  # No color data = exclude if user specified color
 
-            # Color family match
-            color_families = self._get_color_families()
-            for user_color in preferred_colors:
-                user_family = color_families.get(user_color.lower(), [])
-                for product_color in product_colors:
-                    if product_color in user_family:
-                        return 0.5
+        # Exact match
+        for user_color in preferred_colors:
+            if user_color.lower() in product_colors:
+                return 1.0
 
-            return 0.0
+        # Color family match
+        color_families = self._get_color_families()
+        for user_color in preferred_colors:
+            user_family = color_families.get(user_color.lower(), [])
+            for product_color in product_colors:
+                if product_color in user_family:
+                    return 0.5
 
-        except Exception as e:
-            logger.error(f"Error calculating color match for product {product.id}: {e}")
-            return 0.5  # Default to neutral score on error
+        return 0.0
 
-    async def _calculate_material_match(self, product: Product, preferred_materials: List[str], db: AsyncSession) -> float:
+    def _calculate_material_match(
+        self, product: Product, preferred_materials: List[str], attributes: Optional[Dict[str, List[str]]]
+    ) -> float:
         """
-        Calculate material match score using ProductAttribute table
+        Calculate material match score from the product's prefetched attributes
 
         Returns:
             1.0 = Exact match (primary material matches)
@@ -1611,37 +1648,30 @@ class AdvancedRecommendationEngine:
         if not preferred_materials:
             return 1.0  # No preference = all materials acceptable
 
-        try:
-            # Query product materials from ProductAttribute
-            result = await db.execute(
-                select(ProductAttribute.attribute_value).where(
-                    ProductAttribute.product_id == product.id,
-                    ProductAttribute.attribute_name.in_(["material_primary", "material_secondary"]),
-                )
-            )
-            product_materials = [mat.lower() for mat in result.scalars().all() if mat]
+        if attributes is None:
+            return 0.5  # Attributes could not be loaded, neutral score
 
-            if not product_materials:
-                return 0.0  # No material data = exclude
+        product_materials = self._attribute_values(attributes, MATERIAL_ATTRIBUTES)
 
-            # Exact match
-            for user_material in preferred_materials:
-                if user_material.lower() in product_materials:
-                    return 1.0
+        if not product_materials:
+            return 0.0  # No material data = exclude
 
-            # Compatible materials (substring match)
-            for user_material in preferred_materials:
-                for product_material in product_materials:
-                    if user_material.lower() in product_material or product_material in user_material.lower():
-                        return 0.7
+        # Exact match
+        for user_material in preferred_materials:
+            if user_material.lower() in product_materials:
+                return 1.0
 
-            return 0.0
+        # Compatible materials (substring match)
+        for user_material in preferred_materials:
+            for product_material in product_materials:
+                if user_material.lower() in product_material or product_material in user_material.lower():
+                    return 0.7
 
-        except Exception as e:
-            logger.error(f"Error calculating material match for product {product.id}: {e}")
-            return 0.5  # Default to neutral score on error
+        return 0.0
 
-    async def _calculate_size_match(self, product: Product, room_dimensions: Dict[str, float], db: AsyncSession) -> float:
+    def _calculate_size_match(
+        self, product: Product, room_dimensions: Dict[str, float], attributes: Optional[Dict[str, List[str]]]
+    ) -> float:
         """
         Calculate size match score based on room dimensions
 
@@ -1654,16 +1684,11 @@ class AdvancedRecommendationEngine:
         if not room_dimensions:
             return 1.0  # No room size specified, assume fits
 
-        try:
-            # Query product dimensions
-            result = await db.execute(
-                select(ProductAttribute.attribute_name, ProductAttribute.attribute_value).where(
-                    ProductAttribute.product_id == product.id,
-                    ProductAttribute.attribute_name.in_(["width", "depth", "height"]),
-                )
-            )
+        if attributes is None:
+            return 0.8  # Attributes could not be loaded, assume acceptable size
 
-            dimensions = {row[0]: float(row[1]) for row in result.all() if row[1]}
+        try:
+            dimensions = {name: float(attributes[name][-1]) for name in DIMENSION_ATTRIBUTES if attributes.get(name)}
 
             if not dimensions:
                 return 0.8  # No dimension data, assume average size
@@ -1688,7 +1713,9 @@ class AdvancedRecommendationEngine:
             logger.error(f"Error calculating size match for product {product.id}: {e}")
             return 0.8  # Default to acceptable size on error
 
-    async def _calculate_texture_match(self, product: Product, preferred_textures: List[str], db: AsyncSession) -> float:
+    def _calculate_texture_match(
+        self, product: Product, preferred_textures: List[str], attributes: Optional[Dict[str, List[str]]]
+    ) -> float:
         """
         Calculate texture match score
 
@@ -1699,28 +1726,23 @@ class AdvancedRecommendationEngine:
         if not preferred_textures:
             return 1.0  # No preference
 
-        try:
-            result = await db.execute(
-                select(ProductAttribute.attribute_value).where(
-                    ProductAttribute.product_id == product.id, ProductAttribute.attribute_name == "texture"
-                )
-            )
-            product_texture = result.scalar_one_or_none()
+        if attributes is None:
+            return 0.5  # Attributes could not be loaded, neutral score
 
-            if not product_texture:
-                return 0.5  # No texture data, neutral score
+        product_textures = self._attribute_values(attributes, ("texture",))
 
-            for user_texture in preferred_textures:
-                if user_texture.lower() in product_texture.lower():
-                    return 1.0
+        if not product_textures:
+            return 0.5  # No texture data, neutral score
 
-            return 0.0
+        for user_texture in preferred_textures:
+            if any(user_texture.lower() in product_texture for product_texture in product_textures):
+                return 1.0
 
-        except Exception as e:
-            logger.error(f"Error calculating texture match for product {product.id}: {e}")
-            return 0.5
+        return 0.0
 
-    async def _calculate_pattern_match(self, product: Product, preferred_patterns: List[str], db: AsyncSession) -> float:
+    def _calculate_pattern_match(
+        self, product: Product, preferred_patterns: List[str], attributes: Optional[Dict[str, List[str]]]
+    ) -> float:
         """
         Calculate pattern match score
 
@@ -1731,26 +1753,19 @@ class AdvancedRecommendationEngine:
         if not preferred_patterns:
             return 1.0  # No preference
 
-        try:
-            result = await db.execute(
-                select(ProductAttribute.attribute_value).where(
-                    ProductAttribute.product_id == product.id, ProductAttribute.attribute_name == "pattern"
-                )
-            )
-            product_pattern = result.scalar_one_or_none()
+        if attributes is None:
+            return 0.5  # Attributes could not be loaded, neutral score
 
-            if not product_pattern:
-                return 0.5  # No pattern data, neutral score
+        product_patterns = self._attribute_values(attributes, ("pattern",))
 
-            for user_pattern in preferred_patterns:
-                if user_pattern.lower() in product_pattern.lower():
-                    return 1.0
+        if not product_patterns:
+            return 0.5  # No pattern data, neutral score
 
-            return 0.0
+        for user_pattern in preferred_patterns:
+            if any(user_pattern.lower() in product_pattern for product_pattern in product_patterns):
+                return 1.0
 
-        except Exception as e:
-            logger.error(f"Error calculating pattern match for product {product.id}: {e}")
-            return 0.5
+        return 0.0
 
     def _extract_keywords_from_styling_tips(self, styling_tips: List[str]) -> List[str]:
         """
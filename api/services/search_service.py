@@ -7,15 +7,21 @@ word-boundary matching, AND-grouped logic, exclusion terms) and chat.py
 
 Used by: products.py (Design Studio), admin_curated.py (Curation), chat.py (Chat)
 """
-import json
+import asyncio
 import logging
 import re
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
+from services.embedding_codec import read_embedding
+from services.embedding_index import get_embedding_index
 from services.embedding_service import EmbeddingService
-from sqlalchemy import and_, or_
+from services.product_classification import KEYWORD_CATEGORIES
+from services.query_analyzer import AnalyzedQuery, QueryAnalyzer
+from services.topk import DEFAULT_CHUNK_SIZE, StreamingTopK
+from sqlalchemy import case, false, func, null, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -23,6 +29,9 @@ from database.models import Product
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched (and scored) per round trip on the DB-scan path
+SCAN_CHUNK_SIZE = DEFAULT_CHUNK_SIZE
+
 # ---------------------------------------------------------------------------
 # Embedding service singleton (shared across all callers)
 # ---------------------------------------------------------------------------
@@ -218,47 +227,38 @@ SEARCH_SYNONYMS: Dict[str, List[str]] = {
 
 
 # ---------------------------------------------------------------------------
-# Query expansion helpers
+# Query analysis  (compiled vocabularies + LRU, see services/query_analyzer.py)
 # ---------------------------------------------------------------------------
+_query_analyzer: Optional[QueryAnalyzer] = None
+
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """Get or create the query analyzer singleton."""
+    global _query_analyzer
+    if _query_analyzer is None:
+        _query_analyzer = QueryAnalyzer(SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES, normalize_singular_plural)
+    return _query_analyzer
+
+
+def analyze_query(query: str) -> AnalyzedQuery:
+    """Synonym groups, exclusion terms and keyword category of a query (memoized)."""
+    return get_query_analyzer().analyze(query)
+
+
 def expand_search_query_grouped(query: str) -> List[List[str]]:
     """Expand a search query and return GROUPED synonyms for AND logic.
 
     Returns list of lists: [[synonyms for word1], [synonyms for word2], ...]
     Search should match: (any of group1) AND (any of group2) AND ...
+    Multi-word synonym keys in the query form a single group.
 
     Example: "L-shaped sofa" -> [["l-shaped", "l-shape", ...], ["sofa", "couch", ...]]
+             "wall art frame" -> [["wall art", "painting", ...], ["frame", "frames"]]
     """
-    query_lower = query.lower().strip()
-    words = query_lower.split()
-
-    if len(words) == 1:
-        for key, synonyms in SEARCH_SYNONYMS.items():
-            if key == query_lower:
-                return [synonyms]
-
-        word_forms = normalize_singular_plural(query_lower)
-        for form in word_forms:
-            for key, synonyms in SEARCH_SYNONYMS.items():
-                if key == form:
-                    return [synonyms]
-
-        return [word_forms]
-
-    # Multi-word: create one group per word
-    groups = []
-    for word in words:
-        matched = False
-        for key, synonyms in SEARCH_SYNONYMS.items():
-            if key == word:
-                groups.append(list(synonyms))
-                matched = True
-                break
-
-        if not matched:
-            word_forms = normalize_singular_plural(word)
-            groups.append(word_forms)
-
-    logger.info(f"Multi-word query '{query}' grouped to: {groups}")
+    analysis = analyze_query(query)
+    groups = [list(group) for group in analysis.groups]
+    if analysis.is_multi_word:
+        logger.info(f"Multi-word query '{query}' grouped to: {groups}")
     return groups
 
 
@@ -267,20 +267,14 @@ def get_exclusion_terms(query: str) -> List[str]:
 
     Example: "center table" -> ["dining", "console", "side table", ...]
     """
-    query_lower = query.lower().strip()
-
-    if query_lower in SEARCH_EXCLUSIONS:
-        return SEARCH_EXCLUSIONS[query_lower]
-
-    for key, exclusions in SEARCH_EXCLUSIONS.items():
-        if key in query_lower:
-            return exclusions
-
-    return []
+    return list(analyze_query(query).exclusions)
 
 
 def should_exclude_product(product_name: str, exclusion_terms: List[str]) -> bool:
-    """Check if a product should be excluded based on exclusion terms."""
+    """Check if a product should be excluded based on exclusion terms.
+
+    Per-query callers should prefer ``analyze_query(query).excludes(name)`` (terms pre-lowered).
+    """
     if not exclusion_terms:
         return False
     name_lower = product_name.lower()
@@ -297,47 +291,79 @@ def should_exclude_product(product_name: str, exclusion_terms: List[str]) -> boo
 # Words that are too generic for description matching (too many false positives)
 BROAD_TERMS = {"decor", "art", "furniture", "home", "living", "style", "design"}
 
+# products.search_vector is built with the 'simple' configuration (lower-case, no stemming, no
+# stop words), so a lexeme match is a whole-word match, like the old \y...\y regexes.
+# Fields are told apart by weight: name A, brand B, description C.
+TEXT_SEARCH_CONFIG = "simple"
+NAME_WEIGHT = "A"
+BRAND_WEIGHT = "B"
+DESCRIPTION_WEIGHT = "C"
+
+_TSQUERY_WORD = re.compile(r"[^\W_]+")
+
+
+def tsquery_phrase(text: str, weight: str = "") -> str:
+    """to_tsquery phrase for ``text``: its words adjacent and in order, each restricted to ``weight``.
+
+    Punctuation is dropped ("l-shaped" -> 'l' <-> 'shaped'), which also keeps user input
+    from injecting tsquery operators. Returns "" when ``text`` has no words.
+    """
+    label = f":{weight}" if weight else ""
+    return " <-> ".join(f"'{word}'{label}" for word in _TSQUERY_WORD.findall(text.lower()))
+
+
+def tsquery_any(terms: List[str], weights: str = NAME_WEIGHT) -> str:
+    """to_tsquery matching any of ``terms`` as a phrase within any one field of ``weights``.
+
+    A phrase is built per weight so it cannot span two fields (the fields share one position
+    sequence in search_vector).
+    """
+    phrases = dict.fromkeys(phrase for term in terms for weight in weights if (phrase := tsquery_phrase(term, weight)))
+    return " | ".join(f"({phrase})" for phrase in phrases)
+
+
+def text_search_condition(tsquery: str) -> Any:
+    """``search_vector @@ to_tsquery(...)`` (served by the GIN index); false for an empty query."""
+    if not tsquery:
+        return false()
+    return Product.search_vector.op("@@")(func.to_tsquery(TEXT_SEARCH_CONFIG, tsquery))
+
+
+def name_matches_any(terms: List[str]) -> Any:
+    """Product name contains any of ``terms`` as whole words (case-insensitive)."""
+    return text_search_condition(tsquery_any(terms, NAME_WEIGHT))
+
 
 def build_keyword_conditions(query: str) -> Tuple[Any, List[List[str]]]:
     """Build SQLAlchemy WHERE conditions for a keyword search.
 
     Uses:
     - expand_search_query_grouped() for synonym expansion
-    - PostgreSQL regex \\y (word boundary) for precise matching on product name
+    - whole-word matching on product name through products.search_vector
     - AND logic between word groups, OR within each group
     - Falls back to brand/description match for the full original phrase
 
+    The whole condition is one tsquery, so Postgres answers it with a single
+    bitmap scan of idx_product_search_vector instead of regex-scanning every row.
+
     Returns:
         (where_clause, search_groups)  — ready to pass to query.where()
     """
     search_groups = expand_search_query_grouped(query)
 
     # AND conditions: product name must match >= 1 term from EACH group
-    and_conditions = []
-    for group in search_groups:
-        group_conditions = []
-        for term in group:
-            escaped_term = re.escape(term)
-            group_conditions.append(Product.name.op("~*")(rf"\y{escaped_term}\y"))
-        if group_conditions:
-            and_conditions.append(or_(*group_conditions))
+    group_queries = [tsquery_any(group, NAME_WEIGHT) for group in search_groups]
+    and_conditions = [f"({group_query})" for group_query in group_queries if group_query]
 
     # Also match original query in brand and (non-broad) description
-    escaped_query = re.escape(query)
     query_lower = query.lower().strip()
-
-    original_query_conditions = [
-        Product.brand.op("~*")(rf"\y{escaped_query}\y"),
-    ]
+    original_query_conditions = [tsquery_phrase(query, BRAND_WEIGHT)]
     if query_lower not in BROAD_TERMS:
-        original_query_conditions.append(Product.description.op("~*")(rf"\y{escaped_query}\y"))
+        original_query_conditions.append(tsquery_phrase(query, DESCRIPTION_WEIGHT))
 
-    if and_conditions:
-        grouped_condition = and_(*and_conditions)
-        all_conditions = [grouped_condition] + original_query_conditions
-        where_clause = or_(*all_conditions)
-    else:
-        where_clause = or_(*original_query_conditions)
+    all_conditions = [" & ".join(and_conditions)] if and_conditions else []
+    all_conditions += [condition for condition in original_query_conditions if condition]
+    where_clause = text_search_condition(" | ".join(f"({condition})" for condition in all_conditions))
 
     return where_clause, search_groups
 
@@ -353,12 +379,45 @@ async def semantic_search_products(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     limit: int = 500,
+    min_score: Optional[float] = None,
 ) -> Dict[int, float]:
     """Perform vector similarity search using numpy-vectorized cosine similarity.
 
-    ~100x faster than the Python-loop implementation it replaces.
+    Served from the process-resident EmbeddingIndex when it is loaded (no
+    vector transfer from Postgres); otherwise falls back to streaming the
+    embeddings from the database in chunks into a bounded top-k.
+
+    Returns dict mapping product_id -> similarity score (0.0-1.0), best first,
+    at most ``limit`` entries and none below ``min_score``.
+    """
+    return dict(
+        await semantic_search_hits(
+            query_text,
+            db,
+            category_ids=category_ids,
+            source_websites=source_websites,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit,
+            min_score=min_score,
+        )
+    )
+
+
+async def semantic_search_hits(
+    query_text: str,
+    db: AsyncSession,
+    category_ids: Optional[List[int]] = None,
+    source_websites: Optional[List[str]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 500,
+    min_score: Optional[float] = None,
+) -> List[Tuple[int, float]]:
+    """:func:`semantic_search_products` as a list of (product_id, score), best first.
 
-    Returns dict mapping product_id -> similarity score (0.0-1.0).
+    The ranking is materialized: at most ``limit`` hits, fully sorted, so
+    callers can index it and test membership without re-sorting.
     """
     start_time = time.time()
     embedding_service = _get_embedding_service()
@@ -366,13 +425,157 @@ async def semantic_search_products(
     query_embedding = await embedding_service.get_query_embedding(query_text)
     if not query_embedding:
         logger.warning(f"[SEMANTIC SEARCH] Failed to generate embedding for: {query_text[:50]}...")
-        return {}
+        return []
 
     embed_time = time.time() - start_time
     logger.info(f"[SEMANTIC SEARCH] Generated query embedding in {embed_time:.2f}s for: {query_text[:50]}...")
 
-    # Build base query
-    query = select(Product.id, Product.embedding).where(Product.is_available.is_(True)).where(Product.embedding.isnot(None))
+    index = get_embedding_index()
+    if index.is_loaded:
+        calc_start = time.time()
+        result_dict = await index.search_reranked(
+            db,
+            query_embedding,
+            category_ids=category_ids,
+            source_websites=source_websites,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit,
+            min_score=min_score,
+        )
+        calc_time = time.time() - calc_start
+        total_time = time.time() - start_time
+        if result_dict:
+            top_score = next(iter(result_dict.values()))
+            logger.info(
+                f"[SEMANTIC SEARCH] Top score: {top_score:.3f}, returning {len(result_dict)} products from index "
+                f"(embed={embed_time:.2f}s, calc={calc_time:.3f}s, total={total_time:.2f}s)"
+            )
+        return list(result_dict.items())
+
+    query_vec = np.array(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query_vec)
+    if query_norm == 0:
+        logger.warning("[SEMANTIC SEARCH] Query embedding has zero norm")
+        return []
+
+    db_start = time.time()
+    top = await _scan_database(
+        db, query_vec / query_norm, category_ids, source_websites, min_price, max_price, None, limit, min_score
+    )
+    db_time = time.time() - db_start
+
+    total_time = time.time() - start_time
+    logger.info(
+        f"[SEMANTIC SEARCH] Scanned {top.pushed} products with embeddings, returning {len(top)} "
+        f"(embed={embed_time:.2f}s, db+calc={db_time:.2f}s, total={total_time:.2f}s)"
+    )
+    return list(top)
+
+
+@dataclass
+class SemanticQuery:
+    """One query of :func:`semantic_search_many`: text plus its own filters.
+
+    ``product_ids`` restricts the query to those products (e.g. a category's
+    keyword candidates); None means no restriction.
+    """
+
+    text: str
+    category_ids: Optional[List[int]] = None
+    source_websites: Optional[List[str]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    product_ids: Optional[List[int]] = None
+
+
+async def semantic_search_many(
+    queries: Sequence[SemanticQuery],
+    db: AsyncSession,
+    limit: int = 500,
+    min_score: Optional[float] = None,
+) -> List[Dict[int, float]]:
+    """:func:`semantic_search_products` for several queries, scored in one pass over the index.
+
+    Each distinct text is embedded once; the resident EmbeddingIndex scores
+    all queries against the union of their filtered rows with one matrix
+    product per chunk (see EmbeddingIndex.search_many) instead of one full
+    scan per query. Without a loaded index each query falls back to its own
+    database scan.
+
+    Returns one dict (product_id -> similarity, best first) per query, in order.
+    """
+    if not queries:
+        return []
+    start_time = time.time()
+    embedding_service = _get_embedding_service()
+
+    texts = list(dict.fromkeys(query.text for query in queries))
+    embeddings = dict(zip(texts, await asyncio.gather(*(embedding_service.get_query_embedding(text) for text in texts))))
+    query_embeddings = [embeddings[query.text] or None for query in queries]
+    embed_time = time.time() - start_time
+
+    index = get_embedding_index()
+    if index.is_loaded:
+        calc_start = time.time()
+        masks = []
+        for query in queries:
+            mask = index.build_mask(query.category_ids, query.source_websites, query.min_price, query.max_price)
+            if query.product_ids is not None:
+                mask &= index.product_mask(query.product_ids)
+            masks.append(mask)
+        results = await index.search_many_reranked(db, query_embeddings, masks, limit=limit, min_score=min_score)
+        logger.info(
+            f"[SEMANTIC SEARCH] Scored {len(queries)} queries ({len(texts)} distinct texts) from index "
+            f"(embed={embed_time:.2f}s, calc={time.time() - calc_start:.3f}s)"
+        )
+        return results
+
+    results = []
+    for query, query_embedding in zip(queries, query_embeddings):
+        query_vec = np.array(query_embedding or [], dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0 or (query.product_ids is not None and not query.product_ids):
+            results.append({})
+            continue
+        top = await _scan_database(
+            db,
+            query_vec / query_norm,
+            query.category_ids,
+            query.source_websites,
+            query.min_price,
+            query.max_price,
+            query.product_ids,
+            limit,
+            min_score,
+        )
+        results.append(top.to_dict())
+    logger.info(f"[SEMANTIC SEARCH] Scored {len(queries)} queries from the database (total={time.time() - start_time:.2f}s)")
+    return results
+
+
+async def _scan_database(
+    db: AsyncSession,
+    query_vec_normalized: np.ndarray,
+    category_ids: Optional[List[int]],
+    source_websites: Optional[List[str]],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    product_ids: Optional[List[int]],
+    limit: int,
+    min_score: Optional[float],
+) -> StreamingTopK:
+    """Stream product embeddings matching the filters from Postgres into a bounded top-k."""
+    # Build base query (dual-read: binary embedding_vector, JSON text only for rows not yet backfilled)
+    query = (
+        select(
+            Product.id,
+            Product.embedding_vector,
+            case((Product.embedding_vector.is_(None), Product.embedding), else_=null()),
+        )
+        .where(Product.is_available.is_(True))
+        .where(or_(Product.embedding_vector.isnot(None), Product.embedding.isnot(None)))
+    )
 
     if category_ids:
         query = query.where(Product.category_id.in_(category_ids))
@@ -382,58 +585,33 @@ async def semantic_search_products(
         query = query.where(Product.price >= min_price)
     if max_price is not None:
         query = query.where(Product.price <= max_price)
+    if product_ids is not None:
+        query = query.where(Product.id.in_(product_ids))
 
-    db_start = time.time()
-    result = await db.execute(query)
-    rows = result.fetchall()
-    db_time = time.time() - db_start
-
-    logger.info(f"[SEMANTIC SEARCH] Fetched {len(rows)} products with embeddings in {db_time:.2f}s")
+    # Stream rows in chunks (server-side cursor) and keep only the running top-k,
+    # so memory stays O(limit + chunk) however many products match
+    top = StreamingTopK(limit, min_score)
+    result = await db.stream(query.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    async for rows in result.partitions(SCAN_CHUNK_SIZE):
+        _score_chunk(rows, query_vec_normalized, top)
+    return top
 
-    if not rows:
-        return {}
-
-    # Vectorised cosine similarity via numpy
-    calc_start = time.time()
-
-    query_vec = np.array(query_embedding, dtype=np.float32)
-    query_norm = np.linalg.norm(query_vec)
-    if query_norm == 0:
-        logger.warning("[SEMANTIC SEARCH] Query embedding has zero norm")
-        return {}
-    query_vec_normalized = query_vec / query_norm
 
+def _score_chunk(rows, query_vec_normalized: np.ndarray, top: StreamingTopK):
+    """Decode one chunk of (id, embedding_vector, embedding_json) rows and push its cosine scores."""
     product_ids = []
     valid_embeddings = []
-    for product_id, embedding_json in rows:
-        try:
-            product_embedding = json.loads(embedding_json)
-            product_ids.append(product_id)
-            valid_embeddings.append(product_embedding)
-        except (json.JSONDecodeError, Exception):
+    for product_id, embedding_vector, embedding_json in rows:
+        product_embedding = read_embedding(embedding_vector, embedding_json)
+        if product_embedding is None or product_embedding.shape != query_vec_normalized.shape:
             continue
+        product_ids.append(product_id)
+        valid_embeddings.append(product_embedding)
 
     if not valid_embeddings:
-        return {}
+        return
 
-    embeddings_matrix = np.array(valid_embeddings, dtype=np.float32)
-    norms = np.linalg.norm(embeddings_matrix, axis=1, keepdims=True)
+    embeddings_matrix = np.stack(valid_embeddings).astype(np.float32, copy=False)
+    norms = np.linalg.norm(embeddings_matrix, axis=1)
     norms[norms == 0] = 1
-    embeddings_normalized = embeddings_matrix / norms
-
-    similarities = np.dot(embeddings_normalized, query_vec_normalized)
-
-    calc_time = time.time() - calc_start
-
-    top_indices = np.argsort(similarities)[::-1][:limit]
-    result_dict = {product_ids[i]: float(similarities[i]) for i in top_indices}
-
-    total_time = time.time() - start_time
-    if result_dict:
-        top_score = similarities[top_indices[0]] if len(top_indices) > 0 else 0
-        logger.info(
-            f"[SEMANTIC SEARCH] Top score: {top_score:.3f}, returning {len(result_dict)} products "
-            f"(embed={embed_time:.2f}s, db={db_time:.2f}s, calc={calc_time:.2f}s, total={total_time:.2f}s)"
-        )
-
-    return result_dict
+    top.push(np.asarray(product_ids, dtype=np.int64), (embeddings_matrix @ query_vec_normalized) / norms)
@@ -0,0 +1,211 @@
+"""
+Cursor-addressed search result snapshots for deep pagination.
+
+The first page of a search runs the full retrieval and stores the ordered
+product ids, with per-id scores and primary-match flags, under an opaque
+cursor. Later pages slice the stored list and hydrate only that page, so a
+scroll costs O(page) and the order stays stable even if the catalog changes
+mid-session.
+
+Snapshots live in a per-process LRU bounded by entry count and total bytes
+and expire after a TTL. A cursor is bound to a fingerprint of the request
+parameters that produced it: a cursor replayed with another query or other
+filters, an expired cursor, or a cursor served by another worker is a miss,
+and the caller recomputes (and hands out a new cursor).
+
+Used by: products.py (/products/search), admin_curated.py (search_products_for_look),
+chat.py (get_paginated_products)
+"""
+import hashlib
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Python-side bookkeeping per snapshot (dataclass, dict entry, cursor string)
+SNAPSHOT_OVERHEAD_BYTES = 512
+
+
+@dataclass
+class SearchSnapshot:
+    """Ordered result list of one search: ids best first, NaN score = no score."""
+
+    ids: np.ndarray
+    scores: np.ndarray
+    primary: np.ndarray
+    fingerprint: str
+    expires_at: float
+    cursor: Optional[str] = None
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.scores.nbytes + self.primary.nbytes + SNAPSHOT_OVERHEAD_BYTES
+
+    def page(self, start: int, size: int) -> List[Tuple[int, Optional[float], bool]]:
+        """(product_id, score or None, is_primary) for ``size`` entries from ``start``."""
+        end = start + size
+        return [
+            (product_id, None if score != score else score, is_primary)
+            for product_id, score, is_primary in zip(
+                self.ids[start:end].tolist(), self.scores[start:end].tolist(), self.primary[start:end].tolist()
+            )
+        ]
+
+    def position(self, product_id: int) -> Optional[int]:
+        """Index of ``product_id`` in the ordered list (None if absent)."""
+        hits = np.flatnonzero(self.ids == product_id)
+        return int(hits[0]) if hits.size else None
+
+
+class SearchSnapshotStore:
+    """TTL + LRU store of SearchSnapshots, capped by entry count and total bytes."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 900,
+        max_entries: int = 2000,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._snapshots: "OrderedDict[str, SearchSnapshot]" = OrderedDict()
+        self._bytes = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._stats = {
+            "stores": 0,
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "fingerprint_mismatches": 0,
+            "evicted_lru": 0,
+            "evicted_memory": 0,
+            "rejected_too_large": 0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, hit ratio and current size."""
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["entries"] = len(self._snapshots)
+        stats["memory_mb"] = round(self._bytes / (1024 * 1024), 2)
+        stats["max_entries"] = self.max_entries
+        stats["max_mb"] = round(self.max_bytes / (1024 * 1024), 2)
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @staticmethod
+    def fingerprint(**params: Any) -> str:
+        """Stable hash of the request parameters a snapshot answers (list order is significant)."""
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def put(
+        self,
+        fingerprint: str,
+        ids: Sequence[int],
+        scores: Optional[Sequence[Optional[float]]] = None,
+        primary: Optional[Sequence[bool]] = None,
+    ) -> SearchSnapshot:
+        """Snapshot an ordered result list. ``cursor`` is None when it exceeds the memory cap and was not kept."""
+        ids_array = np.asarray(ids, dtype=np.int64)
+        if scores is None:
+            scores_array = np.full(ids_array.shape, np.nan, dtype=np.float32)
+        else:
+            scores_array = np.array([np.nan if s is None else s for s in scores], dtype=np.float32)
+        primary_array = np.ones(ids_array.shape, dtype=bool) if primary is None else np.asarray(primary, dtype=bool)
+
+        snapshot = SearchSnapshot(
+            ids=ids_array,
+            scores=scores_array,
+            primary=primary_array,
+            fingerprint=fingerprint,
+            expires_at=self._clock() + self.ttl_seconds,
+        )
+        if snapshot.nbytes > self.max_bytes:
+            self._stats["rejected_too_large"] += 1
+            logger.warning(f"[SEARCH SNAPSHOT] {len(snapshot)} results ({snapshot.nbytes} bytes) exceed the memory cap")
+            return snapshot
+
+        snapshot.cursor = secrets.token_urlsafe(16)
+        self._snapshots[snapshot.cursor] = snapshot
+        self._bytes += snapshot.nbytes
+        self._stats["stores"] += 1
+        self._evict()
+        return snapshot
+
+    def get(self, cursor: Optional[str], fingerprint: str) -> Optional[SearchSnapshot]:
+        """Live snapshot for ``cursor`` produced by the same request parameters, else None."""
+        if not cursor:
+            return None
+        snapshot = self._snapshots.get(cursor)
+        if snapshot is None:
+            self._stats["misses"] += 1
+            return None
+        if snapshot.expires_at <= self._clock():
+            self._remove(cursor)
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+        if snapshot.fingerprint != fingerprint:
+            self._stats["fingerprint_mismatches"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        self._snapshots.move_to_end(cursor)
+        self._stats["hits"] += 1
+        return snapshot
+
+    def _remove(self, cursor: str):
+        snapshot = self._snapshots.pop(cursor)
+        self._bytes -= snapshot.nbytes
+
+    def _evict(self):
+        # Expired entries first, then least recently used until both caps hold
+        now = self._clock()
+        for cursor in [c for c, s in self._snapshots.items() if s.expires_at <= now]:
+            self._remove(cursor)
+            self._stats["expired"] += 1
+        while len(self._snapshots) > self.max_entries:
+            self._remove(next(iter(self._snapshots)))
+            self._stats["evicted_lru"] += 1
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._snapshots)))
+            self._stats["evicted_memory"] += 1
+
+
+# Singleton instance
+_search_snapshot_store: Optional[SearchSnapshotStore] = None
+
+
+def get_search_snapshot_store() -> SearchSnapshotStore:
+    """Get or create the search snapshot store singleton."""
+    global _search_snapshot_store
+    if _search_snapshot_store is None:
+        _search_snapshot_store = SearchSnapshotStore(
+            ttl_seconds=settings.search_snapshot_ttl,
+            max_entries=settings.search_snapshot_max_entries,
+            max_bytes=settings.search_snapshot_max_mb * 1024 * 1024,
+        )
+    return _search_snapshot_store
@@ -0,0 +1,94 @@
+"""
+Bounded-memory streaming top-k over chunked scores.
+
+Candidates are scored chunk by chunk (DB result partitions, row blocks of
+the embedding matrix). ``StreamingTopK`` keeps only the best ``k``
+(id, score) pairs seen so far: each push drops scores below the current
+k-th best, merges the rest with the kept set and cuts it back to ``k`` with
+``np.argpartition``. Memory is O(k + chunk) whatever the catalog size; the
+work is linear in the number of candidates plus one O(k log k) final sort.
+
+The result equals a stable descending sort of the full score vector cut
+to ``k``: ties are broken by arrival order, earlier wins.
+
+Used by: search_service.semantic_search_products (DB-scan path), EmbeddingIndex.search
+"""
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Rows scored per chunk: 4096 x 768 float32 is 12 MB of temporary matrix
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def iter_chunks(values: np.ndarray, size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Consecutive slices (views) of at most ``size`` elements."""
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class StreamingTopK:
+    """Running top-k of (id, score) pairs pushed in chunks."""
+
+    def __init__(self, k: int, min_score: Optional[float] = None):
+        self.k = max(0, int(k))
+        self.min_score = min_score
+        self.pushed = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._scores = np.empty(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return int(self._ids.shape[0])
+
+    @property
+    def threshold(self) -> Optional[float]:
+        """Score a new candidate must reach to be kept (None while fewer than k are kept)."""
+        if self.k and len(self) >= self.k:
+            return float(self._scores.min())
+        return self.min_score
+
+    def push(self, ids: np.ndarray, scores: np.ndarray):
+        """Offer one chunk of candidates (same length arrays)."""
+        self.pushed += len(scores)
+        if self.k == 0 or len(scores) == 0:
+            return
+
+        ids = np.asarray(ids, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float32)
+        threshold = self.threshold
+        if threshold is not None:
+            # Equal scores cannot displace a kept entry (earlier arrival wins), but may fill up to k
+            keep = scores > threshold if len(self) >= self.k else scores >= threshold
+            if not keep.all():
+                ids, scores = ids[keep], scores[keep]
+            if len(scores) == 0:
+                return
+
+        # Kept entries first: they arrived earlier, so they win ties
+        merged_ids = np.concatenate((self._ids, ids))
+        merged_scores = np.concatenate((self._scores, scores))
+        if len(merged_scores) > self.k:
+            merged_ids, merged_scores = self._cut(merged_ids, merged_scores)
+        self._ids, self._scores = merged_ids, merged_scores
+
+    def _cut(self, ids: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k of ``scores`` (arrival order kept), earliest entries among ties at the cut."""
+        kth = np.partition(scores, len(scores) - self.k)[len(scores) - self.k]
+        keep = scores > kth
+        ties = np.flatnonzero(scores == kth)[: self.k - int(keep.sum())]
+        keep[ties] = True
+        return ids[keep], scores[keep]
+
+    def items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Kept ids and scores, best first."""
+        order = np.argsort(-self._scores, kind="stable")
+        return self._ids[order], self._scores[order]
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        """(product_id, score) pairs, best first."""
+        ids, scores = self.items()
+        return zip(ids.tolist(), scores.tolist())
+
+    def to_dict(self) -> Dict[int, float]:
+        """product_id -> score, ordered best first."""
+        return dict(iter(self))
@@ -141,11 +141,19 @@ if [ ! -f "main.py" ]; then
     exit 1
 fi
 
-log_info "Executing: uvicorn main:app --host 0.0.0.0 --port $PORT"
+# Worker count (default: single process)
+UVICORN_WORKERS=${UVICORN_WORKERS:-1}
+if [ "$UVICORN_WORKERS" -gt 1 ] && [ -z "$EMBEDDING_SNAPSHOT_DIR" ]; then
+    # Share one memory-mapped copy of the embedding index across workers
+    export EMBEDDING_SNAPSHOT_DIR=/tmp/omnishop-embedding-snapshot
+    log_info "EMBEDDING_SNAPSHOT_DIR not set, using: $EMBEDDING_SNAPSHOT_DIR"
+fi
+
+log_info "Executing: uvicorn main:app --host 0.0.0.0 --port $PORT --workers $UVICORN_WORKERS"
 log_success "Starting uvicorn..."
 
 # Start uvicorn in background temporarily to warm cache
-uvicorn main:app --host 0.0.0.0 --port $PORT &
+uvicorn main:app --host 0.0.0.0 --port $PORT --workers $UVICORN_WORKERS &
 UVICORN_PID=$!
 
 # Wait for server to be ready
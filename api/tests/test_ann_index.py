@@ -0,0 +1,93 @@
+"""
+Unit tests for the IVF backend of the embedding index.
+
+Tests recall against the exact scan, filter-aware probing, incremental
+assignment of new rows and save/load of trained centroids.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.ann_index import IVFIndex
+from services.embedding_index import EmbeddingIndex
+
+DIM = 32
+N_ROWS = 3000
+
+
+def _clustered_rows(n, seed=0, start_id=1):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(30, DIM))
+    topic_of_row = rng.integers(0, topics.shape[0], n)
+    vectors = topics[topic_of_row] + 0.5 * rng.normal(size=(n, DIM))
+    return [(start_id + i, vectors[i], int(topic_of_row[i] % 10) + 1, "storea", 100.0, True) for i in range(n)]
+
+
+def _recall(approx, exact):
+    return len(set(approx) & set(exact)) / len(exact)
+
+
+class TestIVFIndex:
+    """Test cases for IVFIndex and its use from EmbeddingIndex."""
+
+    @pytest.fixture
+    def index(self):
+        index = EmbeddingIndex(dimension=DIM, ann_nprobe=4)
+        index.upsert_rows(_clustered_rows(N_ROWS))
+        index.attach_ann(*index.train_ann(n_lists=40))
+        index.ANN_MIN_CANDIDATES = 0
+        return index
+
+    @pytest.fixture
+    def queries(self, index):
+        rng = np.random.default_rng(1)
+        rows = rng.choice(len(index), 20, replace=False)
+        return index.vectors[rows] + 0.1 * rng.normal(size=(20, DIM))
+
+    def test_centroids_are_normalized(self, index):
+        assert index.ann.n_lists == 40
+        assert np.allclose(np.linalg.norm(index.ann.centroids, axis=1), 1.0, atol=1e-5)
+
+    def test_recall_against_exact(self, index, queries):
+        recalls = [_recall(index.search(q, limit=20), index.search(q, limit=20, exact=True)) for q in queries]
+        assert np.mean(recalls) >= 0.9
+
+    def test_probing_all_lists_is_exact(self, index, queries):
+        index.ann_nprobe = index.ann.n_lists
+        for q in queries:
+            assert index.search(q, limit=20) == index.search(q, limit=20, exact=True)
+
+    def test_selective_filter_returns_full_page(self, index, queries):
+        index.ann_nprobe = 1
+        for q in queries:
+            approx = index.search(q, category_ids=[3], limit=50)
+            exact = index.search(q, category_ids=[3], limit=50, exact=True)
+            assert len(approx) == len(exact) == 50
+            assert all(index.category_ids[index._row_by_id[pid]] == 3 for pid in approx)
+
+    def test_incremental_insert_is_searchable(self, index):
+        target = np.zeros(DIM, dtype=np.float32)
+        target[0] = 1.0
+        index.upsert_rows([(N_ROWS + 1, target, 1, "storea", 100.0, True)])
+
+        assert index.ann_lists.shape == (len(index),)
+        assert index.ann_assigned == 1
+        assert list(index.search(target, limit=1).keys()) == [N_ROWS + 1]
+
+    def test_removal_keeps_assignments_aligned(self, index):
+        index.upsert_rows([(1, None, None, None, None, None), (2, None, None, None, None, None)])
+        assert index.ann_lists.shape == (len(index),)
+        assert np.array_equal(index.ann_lists, index.ann.assign(index.vectors))
+
+    def test_save_load_roundtrip(self, index, tmp_path):
+        path = tmp_path / "ivf.npz"
+        index.ann.save(path)
+        loaded = IVFIndex.load(path)
+
+        assert np.array_equal(loaded.centroids, index.ann.centroids)
+        assert loaded.trained_rows == N_ROWS
+        assert not (tmp_path / "ivf.npz.tmp").exists()
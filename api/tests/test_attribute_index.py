@@ -0,0 +1,225 @@
+"""
+Tests for the inverted attribute index (services/attribute_index.py) and its
+use by strict attribute filtering in the recommendation engine.
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.attribute_index import AttributeIndex
+from services.recommendation_engine import AdvancedRecommendationEngine, RecommendationRequest
+from sqlalchemy.dialects import postgresql
+
+from database.models import Product
+
+ROWS = [
+    (1, "color_primary", "Navy"),
+    (1, "material_primary", "Solid Oak Wood"),
+    (1, "texture", "Smooth"),
+    (2, "color_primary", "beige"),
+    (2, "color_secondary", "Red"),
+    (2, "material_primary", "Velvet"),
+    (3, "color_primary", "RED"),
+    (3, "material_primary", "wood"),
+    (3, "pattern", "Striped"),
+    (5, "style", "Mid-Century  Modern"),
+    (5, "width", "120"),
+]
+
+
+@pytest.fixture
+def index():
+    index = AttributeIndex()
+    index.replace_products((), ROWS)
+    index.loaded_at = 0.0
+    return index
+
+
+def _ids(index, bitmap):
+    return index.product_ids(bitmap).tolist()
+
+
+class TestBitmaps:
+    def test_exact_values_are_normalized(self, index):
+        assert _ids(index, index.bitmap(("color_primary", "color_secondary"), ["RED"])) == [2, 3]
+        assert _ids(index, index.bitmap(("style",), ["mid-century modern"])) == [5]
+        assert index.values("width") == []
+
+    def test_and_or_not_composition(self, index):
+        red = index.bitmap(("color_primary", "color_secondary"), ["red"])
+        wood = index.matching(("material_primary",), lambda value: "wood" in value)
+
+        assert _ids(index, red & wood) == [3]
+        assert _ids(index, red | wood) == [1, 2, 3]
+        assert _ids(index, index.negate(red)) == [1, 4, 5]
+
+    def test_contains_handles_ids_outside_bitmap(self, index):
+        bitmap = index.bitmap(("material_primary",), ["velvet"])
+
+        assert index.contains(bitmap, [2, 3, 99]).tolist() == [True, False, False]
+        assert index.covers(5) and not index.covers(6)
+
+    def test_replace_products_drops_old_postings(self, index):
+        counts = index.replace_products([2, 3], [(3, "color_primary", "Green"), (8, "texture", "matte")])
+
+        assert counts == {"removed": 6, "added": 2}
+        assert _ids(index, index.bitmap(("color_primary", "color_secondary"), ["red", "beige"])) == []
+        assert "velvet" not in index.values("material_primary")
+        assert _ids(index, index.bitmap(("color_primary",), ["green"])) == [3]
+        assert index.max_product_id == 8
+
+
+class StubSession:
+    """Answers queries in order from a list of row lists."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        rows = self.results.pop(0)
+        result = MagicMock()
+        result.fetchall.return_value = rows
+        result.scalar.return_value = rows[0][0] if rows else None
+        return result
+
+
+class TestLoad:
+    @pytest.mark.asyncio
+    async def test_load_then_refresh_reindexes_changed_products(self):
+        index = AttributeIndex()
+        index.LOAD_CHUNK_SIZE = 2
+        loaded = StubSession(
+            [
+                [(10, 1, "color_primary", "Navy", datetime(2026, 2, 1)), (11, 2, "color_primary", "Red", None)],
+                [(12, 2, "pattern", "Floral", datetime(2026, 2, 3))],
+                [],
+                [(4,)],
+            ]
+        )
+
+        await index.load(loaded)
+
+        assert index.is_loaded and index.max_product_id == 4
+        assert index.watermark == datetime(2026, 2, 3)
+        assert index.stats()["keys"] == 3
+
+        refreshed = StubSession([[(2,)], [(2, "color_primary", "Green", datetime(2026, 2, 5))], [(6,)]])
+        counts = await index.refresh(refreshed)
+
+        assert counts == {"removed": 2, "added": 1}
+        assert index.values("color_primary") == ["navy", "green"]
+        assert index.values("pattern") == []
+        assert index.watermark == datetime(2026, 2, 5) and index.max_product_id == 6
+        sql = str(refreshed.statements[0].compile(dialect=postgresql.dialect()))
+        assert "product_attributes.updated_at >=" in sql
+
+
+class AttributeSession:
+    """Answers the per-product ProductAttribute lookups of the database filtering path."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        compiled = statement.compile().params
+        product_id = compiled["product_id_1"]
+        names = compiled.get("attribute_name_1")
+        names = set(names) if isinstance(names, list) else {names}
+        values = [value for pid, name, value in self.rows if pid == product_id and name in names]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = values
+        result.scalar_one_or_none.return_value = values[0] if values else None
+        return result
+
+
+class CandidateSession:
+    """Records the candidate query and returns no products."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        return result
+
+
+def _products(ids):
+    return [Product(id=product_id, name=f"Product {product_id}") for product_id in ids]
+
+
+STRICT_REQUESTS = [
+    RecommendationRequest(user_colors=["blue"], strict_attribute_match=True),
+    RecommendationRequest(user_colors=["red", "beige"], color_match_mode="and", strict_attribute_match=True),
+    RecommendationRequest(user_colors=["red", "navy"], strict_attribute_match=True),
+    RecommendationRequest(user_materials=["oak"], strict_attribute_match=True),
+    RecommendationRequest(user_materials=["wood", "velvet"], material_match_mode="and", strict_attribute_match=True),
+    RecommendationRequest(user_colors=["red"], user_materials=["wood"], strict_attribute_match=True),
+    RecommendationRequest(user_textures=["smooth"], user_patterns=["stripe"], strict_attribute_match=True),
+    RecommendationRequest(user_styles=["modern"], strict_attribute_match=True),
+]
+
+
+class TestStrictFiltering:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("request_index", range(len(STRICT_REQUESTS)))
+    async def test_index_matches_database_path(self, monkeypatch, index, request_index):
+        request = STRICT_REQUESTS[request_index]
+        engine = AdvancedRecommendationEngine()
+        candidates = _products([1, 2, 3, 4, 5])
+
+        expected = await engine._apply_strict_attribute_filtering(candidates, request, AttributeSession(ROWS))
+        monkeypatch.setattr("services.recommendation_engine.get_attribute_index", lambda: index)
+        session = AttributeSession(ROWS)
+        bitmap = engine._strict_attribute_bitmap(request)
+        filtered = await engine._apply_strict_attribute_filtering(candidates, request, session, bitmap)
+
+        assert [product.id for product in filtered] == [product.id for product in expected]
+        assert session.queries == 0
+
+    @pytest.mark.asyncio
+    async def test_uncovered_candidates_are_checked_in_database(self, monkeypatch, index):
+        monkeypatch.setattr("services.recommendation_engine.get_attribute_index", lambda: index)
+        engine = AdvancedRecommendationEngine()
+        request = RecommendationRequest(user_colors=["red"], strict_attribute_match=True)
+        session = AttributeSession(ROWS + [(9, "color_primary", "crimson")])
+
+        filtered = await engine._apply_strict_attribute_filtering(
+            _products([9, 3, 1, 2]), request, session, engine._strict_attribute_bitmap(request)
+        )
+
+        assert [product.id for product in filtered] == [9, 3, 2]
+        assert session.queries == 1
+
+    def test_no_bitmap_without_loaded_index_or_attributes(self, monkeypatch, index):
+        engine = AdvancedRecommendationEngine()
+        monkeypatch.setattr("services.recommendation_engine.get_attribute_index", lambda: AttributeIndex())
+        assert engine._strict_attribute_bitmap(RecommendationRequest(user_colors=["red"])) is None
+
+        monkeypatch.setattr("services.recommendation_engine.get_attribute_index", lambda: index)
+        assert engine._strict_attribute_bitmap(RecommendationRequest(product_keywords=["sofa"])) is None
+
+    @pytest.mark.asyncio
+    async def test_candidate_query_is_prefiltered_by_matching_ids(self, monkeypatch, index):
+        monkeypatch.setattr("services.recommendation_engine.get_attribute_index", lambda: index)
+        engine = AdvancedRecommendationEngine()
+        request = RecommendationRequest(user_colors=["red"], strict_attribute_match=True)
+        session = CandidateSession()
+
+        await engine._get_candidate_products(request, session, engine._strict_attribute_bitmap(request))
+
+        compiled = session.statements[0].compile(dialect=postgresql.dialect())
+        assert "products.id IN" in str(compiled) and "products.id >" in str(compiled)
+        assert [2, 3] in compiled.params.values()
+        assert index.max_product_id in compiled.params.values()
@@ -0,0 +1,112 @@
+"""
+Unit tests for the single-flight, micro-batching embedding front-end.
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_service import EmbeddingService
+
+
+class RecordingEmbedder:
+    """Fake batch embed function recording each call and the calling thread."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.threads = set()
+        self.fail = fail
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        self.threads.add(threading.get_ident())
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return [[float(len(text))] for text in texts]
+
+
+class TestEmbeddingBatcher:
+    """Test cases for EmbeddingBatcher."""
+
+    @pytest.mark.asyncio
+    async def test_identical_queries_share_one_call(self):
+        embedder = RecordingEmbedder()
+        batcher = EmbeddingBatcher(embedder, max_wait_ms=5)
+
+        results = await asyncio.gather(*[batcher.embed("sofa") for _ in range(20)])
+
+        assert results == [[4.0]] * 20
+        assert embedder.calls == [["sofa"]]
+        stats = batcher.stats()
+        assert stats["coalesced"] == 19
+        assert stats["calls_saved"] == 19
+
+    @pytest.mark.asyncio
+    async def test_distinct_queries_are_micro_batched(self):
+        embedder = RecordingEmbedder()
+        batcher = EmbeddingBatcher(embedder, max_wait_ms=5)
+
+        results = await asyncio.gather(batcher.embed("sofa"), batcher.embed("dining table"), batcher.embed("rug"))
+
+        assert results == [[4.0], [12.0], [3.0]]
+        assert embedder.calls == [["sofa", "dining table", "rug"]]
+        assert batcher.stats()["avg_batch_size"] == 3
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_immediately(self):
+        embedder = RecordingEmbedder()
+        batcher = EmbeddingBatcher(embedder, max_batch_size=2, max_wait_ms=10000)
+
+        await asyncio.wait_for(asyncio.gather(*[batcher.embed(f"q{i}") for i in range(4)]), timeout=1)
+
+        assert embedder.calls == [["q0", "q1"], ["q2", "q3"]]
+
+    @pytest.mark.asyncio
+    async def test_api_call_runs_off_the_event_loop(self):
+        embedder = RecordingEmbedder()
+        batcher = EmbeddingBatcher(embedder)
+
+        await batcher.embed("lamp")
+
+        assert threading.get_ident() not in embedder.threads
+
+    @pytest.mark.asyncio
+    async def test_failure_resolves_waiters_with_none(self):
+        batcher = EmbeddingBatcher(RecordingEmbedder(fail=True))
+
+        results = await asyncio.gather(batcher.embed("a"), batcher.embed("a"), batcher.embed("b"))
+
+        assert results == [None, None, None]
+        assert batcher.stats()["failed_calls"] == 1
+        assert batcher.stats()["inflight"] == 0
+
+
+class TestEmbeddingServiceQueryBatching:
+    """get_query_embedding routes through the batcher with one multi-content request."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_use_one_multi_content_request(self):
+        with patch.object(EmbeddingService, "_initialize_client"):
+            service = EmbeddingService()
+        service.client = MagicMock()
+        service.client.models.embed_content.return_value = MagicMock(
+            embeddings=[MagicMock(values=[0.1] * 768), MagicMock(values=[0.2] * 768)]
+        )
+
+        first, second, third = await asyncio.gather(
+            service.get_query_embedding("Modern Sofa"),
+            service.get_query_embedding("modern sofa "),
+            service.get_query_embedding("wooden table"),
+        )
+
+        assert first == second == [0.1] * 768
+        assert third == [0.2] * 768
+        service.client.models.embed_content.assert_called_once()
+        assert service.client.models.embed_content.call_args.kwargs["contents"] == ["modern sofa", "wooden table"]
+        assert service.get_query_embedding_stats()["api"]["calls_saved"] == 2
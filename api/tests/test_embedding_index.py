@@ -0,0 +1,252 @@
+"""
+Unit tests for the resident embedding index.
+
+Tests incremental upserts, filter masks and parity of top-k results
+with a brute-force cosine similarity scan.
+"""
+import json
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_codec import decode_embedding, decode_embedding_json, encode_embedding, read_embedding
+from services import search_service
+from services.embedding_index import EmbeddingIndex
+from services.search_service import SemanticQuery
+
+DIM = 16
+
+
+def _random_rows(n, seed=0, start_id=1):
+    rng = np.random.default_rng(seed)
+    stores = ["storea", "storeb", "storec"]
+    rows = []
+    for i in range(n):
+        rows.append(
+            (
+                start_id + i,
+                rng.normal(size=DIM).astype(np.float32),
+                (i % 4) + 1,
+                stores[i % 3],
+                None if i % 10 == 0 else float(1000 + 100 * i),
+                i % 7 != 0,
+            )
+        )
+    return rows
+
+
+def _brute_force(rows, query, limit, category_ids=None, stores=None, min_price=None, max_price=None):
+    q = np.asarray(query, dtype=np.float64)
+    q = q / np.linalg.norm(q)
+    scored = []
+    for pid, vec, cat, store, price, available in rows:
+        if not available:
+            continue
+        if category_ids and cat not in category_ids:
+            continue
+        if stores and store not in stores:
+            continue
+        if min_price is not None and (price is None or price < min_price):
+            continue
+        if max_price is not None and (price is None or price > max_price):
+            continue
+        v = np.asarray(vec, dtype=np.float64)
+        scored.append((pid, float(v @ q / np.linalg.norm(v))))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:limit]
+
+
+class TestEmbeddingIndex:
+    """Test cases for EmbeddingIndex."""
+
+    @pytest.fixture
+    def rows(self):
+        return _random_rows(200)
+
+    @pytest.fixture
+    def index(self, rows):
+        index = EmbeddingIndex(dimension=DIM)
+        index.upsert_rows(rows)
+        return index
+
+    def test_vectors_are_normalized(self, index):
+        norms = np.linalg.norm(index.vectors, axis=1)
+        assert np.allclose(norms, 1.0, atol=1e-5)
+
+    def test_search_matches_brute_force(self, index, rows):
+        query = np.random.default_rng(1).normal(size=DIM)
+        expected = _brute_force(rows, query, 20)
+        result = index.search(query, limit=20)
+
+        assert list(result.keys()) == [pid for pid, _ in expected]
+        for pid, score in expected:
+            assert result[pid] == pytest.approx(score, abs=1e-5)
+
+    def test_search_with_filters_matches_brute_force(self, index, rows):
+        query = np.random.default_rng(2).normal(size=DIM)
+        kwargs = dict(category_ids=[1, 3], stores=["storea", "storec"], min_price=2000, max_price=15000)
+        expected = _brute_force(rows, query, 50, **kwargs)
+        result = index.search(
+            query,
+            category_ids=kwargs["category_ids"],
+            source_websites=kwargs["stores"],
+            min_price=kwargs["min_price"],
+            max_price=kwargs["max_price"],
+            limit=50,
+        )
+
+        assert list(result.keys()) == [pid for pid, _ in expected]
+
+    def test_unknown_store_returns_empty(self, index):
+        result = index.search(np.ones(DIM), source_websites=["nosuchstore"], limit=10)
+        assert result == {}
+
+    def test_upsert_updates_and_removes(self, index):
+        target = np.zeros(DIM, dtype=np.float32)
+        target[0] = 1.0
+
+        counts = index.upsert_rows(
+            [
+                (5, target * 3, 2, "storeb", 500.0, True),  # update
+                (6, None, None, None, None, None),  # embedding cleared -> removed
+                (999, -target, 1, "newstore", 10.0, True),  # insert
+            ]
+        )
+
+        assert counts == {"inserted": 1, "updated": 1, "removed": 1}
+        assert len(index) == 200
+        result = index.search(target, limit=1)
+        assert list(result.keys()) == [5]
+        assert result[5] == pytest.approx(1.0)
+        assert 6 not in index.search(target, limit=1000)
+        assert list(index.search(target, source_websites=["newstore"], limit=5).keys()) == [999]
+
+    def test_incremental_inserts_reuse_buffers(self, rows):
+        index = EmbeddingIndex(dimension=DIM)
+        index.reserve(150)
+        buffer = index._buffers["vectors"]
+        for start in range(0, 150, 25):
+            index.upsert_rows(rows[start : start + 25])
+        assert index._buffers["vectors"] is buffer
+        assert index.vectors.base is buffer
+
+        index.upsert_rows(rows[150:])
+        index.upsert_rows([(pid, None, None, None, None, None) for pid, *_ in rows[:10]])
+        assert len(index) == 190
+        assert index.capacity >= 200
+        query = np.random.default_rng(3).normal(size=DIM)
+        expected = _brute_force(rows[10:], query, 20)
+        assert list(index.search(query, limit=20).keys()) == [pid for pid, _ in expected]
+
+    def test_unavailable_products_are_excluded(self, index, rows):
+        unavailable = {pid for pid, _, _, _, _, available in rows if not available}
+        result = index.search(np.ones(DIM), limit=1000)
+        assert unavailable.isdisjoint(result.keys())
+
+    def test_zero_query_returns_empty(self, index):
+        assert index.search(np.zeros(DIM), limit=10) == {}
+
+    def test_chunked_gather_matches_brute_force(self, index, rows):
+        index.SCORE_CHUNK_ROWS = 7  # Filtered rows are gathered and scored in many chunks
+        query = np.random.default_rng(3).normal(size=DIM)
+        expected = _brute_force(rows, query, 15, category_ids=[2])
+        result = index.search(query, category_ids=[2], limit=15)
+
+        assert list(result.keys()) == [pid for pid, _ in expected]
+
+    def test_min_score_drops_weak_matches(self, index, rows):
+        query = np.random.default_rng(4).normal(size=DIM)
+        expected = [(pid, score) for pid, score in _brute_force(rows, query, 1000) if score >= 0.3]
+        result = index.search(query, limit=1000, min_score=0.3)
+
+        assert list(result.keys()) == [pid for pid, _ in expected]
+
+    def test_search_many_matches_single_query_search(self, index):
+        index.SCORE_CHUNK_ROWS = 13
+        queries = np.random.default_rng(5).normal(size=(3, DIM))
+        masks = [None, index.build_mask(category_ids=[1, 2]), index.build_mask(source_websites=["storeb"], min_price=3000)]
+
+        results = index.search_many(queries, masks, limit=25)
+
+        expected = [
+            index.search(queries[0], limit=25),
+            index.search(queries[1], category_ids=[1, 2], limit=25),
+            index.search(queries[2], source_websites=["storeb"], min_price=3000, limit=25),
+        ]
+        for result, single in zip(results, expected):
+            assert list(result.keys()) == list(single.keys())
+            assert list(result.values()) == pytest.approx(list(single.values()), abs=1e-5)
+
+    def test_search_many_product_masks_and_shared_vectors(self, index, rows):
+        query = np.random.default_rng(6).normal(size=DIM)
+        first, second = [pid for pid, *_ in rows[:40]], [pid for pid, *_ in rows[40:90]]
+
+        results = index.search_many(
+            [query, query, np.zeros(DIM), None], [index.product_mask(first), index.product_mask(second), None, None]
+        )
+
+        assert list(results[0].keys()) == [pid for pid, _ in _brute_force(rows[:40], query, 500)]
+        assert list(results[1].keys()) == [pid for pid, _ in _brute_force(rows[40:90], query, 500)]
+        assert results[2] == {} and results[3] == {}
+
+
+class TestSemanticSearchMany:
+    """Test cases for search_service.semantic_search_many over a loaded index."""
+
+    @pytest.mark.asyncio
+    async def test_each_text_embedded_once_and_product_ids_restrict(self):
+        rows = _random_rows(100)
+        index = EmbeddingIndex(dimension=DIM)
+        index.upsert_rows(rows)
+        index.loaded_at = index.refreshed_at = 1.0
+        query = np.random.default_rng(7).normal(size=DIM)
+        service = MagicMock()
+        service.get_query_embedding = AsyncMock(return_value=query.tolist())
+        candidate_ids = [pid for pid, *_ in rows[:30]]
+
+        with patch.object(search_service, "get_embedding_index", return_value=index), patch.object(
+            search_service, "_get_embedding_service", return_value=service
+        ):
+            restricted, unrestricted = await search_service.semantic_search_many(
+                [SemanticQuery("oak table", product_ids=candidate_ids), SemanticQuery("oak table", category_ids=[1])],
+                None,
+                limit=10,
+            )
+
+        service.get_query_embedding.assert_awaited_once_with("oak table")
+        assert list(restricted.keys()) == [pid for pid, _ in _brute_force(rows[:30], query, 10)]
+        assert list(unrestricted.keys()) == [pid for pid, _ in _brute_force(rows, query, 10, category_ids=[1])]
+
+
+class TestEmbeddingCodec:
+    """Test cases for the binary/JSON embedding codec."""
+
+    def test_binary_roundtrip(self):
+        vector = np.random.default_rng(3).normal(size=DIM).astype(np.float32)
+        data = encode_embedding(vector)
+
+        assert len(data) == DIM * 4
+        assert np.array_equal(decode_embedding(data), vector)
+        assert np.array_equal(decode_embedding(memoryview(data)), vector)
+
+    def test_decode_rejects_invalid_input(self):
+        assert decode_embedding(None) is None
+        assert decode_embedding(b"") is None
+        assert decode_embedding(b"abc") is None
+        assert decode_embedding("[0.5]") is None
+
+    def test_decode_embedding_json(self):
+        assert decode_embedding_json(json.dumps([0.5] * 4)).dtype == np.float32
+        assert decode_embedding_json("not json") is None
+        assert decode_embedding_json(None) is None
+
+    def test_read_embedding_prefers_binary(self):
+        binary = encode_embedding([1.0, 2.0])
+        assert read_embedding(binary, json.dumps([3.0, 4.0])).tolist() == [1.0, 2.0]
+        assert read_embedding(None, json.dumps([3.0, 4.0])).tolist() == [3.0, 4.0]
+        assert read_embedding(None, None) is None
@@ -0,0 +1,155 @@
+"""
+Unit tests for quantized embedding index storage.
+
+Tests int8/float16 encode error, memory footprint, and recall@k of the
+quantized scan with exact re-rank against the float32 index.
+"""
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_codec import encode_embedding
+from services.embedding_index import EmbeddingIndex
+from services.embedding_quantization import Int8Quantizer, create_quantizer
+
+DIM = 64
+N_ROWS = 2000
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(20, DIM))
+    vectors = topics[rng.integers(0, 20, n)] + 0.7 * rng.normal(size=(n, DIM))
+    return [(i + 1, vectors[i], (i % 5) + 1, "storea", 100.0 + i, True) for i in range(n)]
+
+
+def _build(quantization, rows):
+    index = EmbeddingIndex(dimension=DIM, quantization=quantization, rerank_depth=100)
+    index.upsert_rows(rows)
+    return index
+
+
+class TestEmbeddingQuantization:
+    """Test cases for float16/int8 index storage."""
+
+    @pytest.fixture
+    def rows(self):
+        return _rows(N_ROWS)
+
+    @pytest.fixture
+    def exact(self, rows):
+        return _build("none", rows)
+
+    @pytest.fixture
+    def queries(self):
+        return np.random.default_rng(1).normal(size=(20, DIM))
+
+    def test_int8_roundtrip_error_is_small(self, exact):
+        quantizer = Int8Quantizer.fit(exact.vectors)
+        decoded = quantizer.decode(quantizer.encode(exact.vectors))
+        assert np.abs(decoded - exact.vectors).max() < quantizer.scale.max()
+
+    def test_int8_scores_match_decoded_dot_product(self, exact, queries):
+        quantizer = Int8Quantizer.fit(exact.vectors)
+        codes = quantizer.encode(exact.vectors)
+        q = queries[0] / np.linalg.norm(queries[0])
+        assert np.allclose(quantizer.scores(codes, q), quantizer.decode(codes) @ q, atol=1e-4)
+
+    def test_int8_scores_query_matrix(self, exact, queries):
+        quantizer = Int8Quantizer.fit(exact.vectors)
+        codes = quantizer.encode(exact.vectors)
+        q = queries[:4] / np.linalg.norm(queries[:4], axis=1, keepdims=True)
+        scores = quantizer.scores(codes, q)
+
+        assert scores.shape == (N_ROWS, 4)
+        assert np.allclose(scores[:, 2], quantizer.scores(codes, q[2]), atol=1e-5)
+
+    @pytest.mark.parametrize("mode, ratio", [("float16", 2), ("int8", 4)])
+    def test_memory_reduction(self, rows, exact, mode, ratio):
+        index = _build(mode, rows)
+        assert index.vectors.nbytes * ratio == exact.vectors.nbytes
+
+    @pytest.mark.parametrize("mode", ["float16", "int8"])
+    def test_reranked_recall(self, rows, exact, queries, mode):
+        index = _build(mode, rows)
+        full = {pid: np.asarray(vec, dtype=np.float32) for pid, vec, *_ in rows}
+
+        recalls = []
+        for q in queries:
+            expected = exact.search(q, limit=20)
+            shortlist = index.search(q, limit=index.rerank_depth)
+            reranked = index.rerank(q, shortlist, full, limit=20)
+            recalls.append(len(set(reranked) & set(expected)) / 20)
+            # Re-ranked scores are exact
+            for pid in set(reranked) & set(expected):
+                assert reranked[pid] == pytest.approx(expected[pid], abs=1e-5)
+
+        assert np.mean(recalls) >= 0.98
+
+    def test_update_and_filters_with_int8(self, rows):
+        index = _build("int8", rows)
+        target = np.zeros(DIM, dtype=np.float32)
+        target[3] = 1.0
+        index.upsert_rows([(7, target, 9, "storeb", 50.0, True)])
+
+        result = index.search(target, category_ids=[9], limit=5)
+        assert list(result.keys()) == [7]
+
+    @pytest.mark.asyncio
+    async def test_search_reranked_without_quantization_skips_db(self, exact, queries):
+        result = await exact.search_reranked(None, queries[0], limit=10)
+        assert result == exact.search(queries[0], limit=10)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["float16", "int8"])
+    async def test_search_many_reranked_is_exact_per_query(self, rows, exact, queries, mode):
+        index = _build(mode, rows)
+        full = {pid: np.asarray(vec, dtype=np.float32) for pid, vec, *_ in rows}
+        masks = [index.build_mask(category_ids=[c]) for c in (1, 2, 3)]
+
+        with patch.object(EmbeddingIndex, "fetch_full_vectors", AsyncMock(side_effect=lambda db, ids: full)) as fetch:
+            results = await index.search_many_reranked(None, queries[:3], masks, limit=10)
+
+        fetch.assert_awaited_once()
+        for q, result, category in zip(queries[:3], results, (1, 2, 3)):
+            expected = exact.search(q, category_ids=[category], limit=10)
+            assert len(set(result) & set(expected)) >= 9
+            for pid in set(result) & set(expected):
+                assert result[pid] == pytest.approx(expected[pid], abs=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_load_fits_int8_on_catalog_sample(self, rows):
+        # The first id chunk only spans a narrow range; later rows must not clip
+        rng = np.random.default_rng(4)
+        narrow = [(pid, 0.05 * rng.normal(size=DIM) + 1.0, *meta) for pid, _, *meta in rows[:200]]
+        catalog = narrow + rows[200:]
+        db_rows = [
+            (pid, encode_embedding(vec), None, cat, store, price, avail, None, None)
+            for pid, vec, cat, store, price, avail in catalog
+        ]
+        sample = [(encode_embedding(vec), None) for _, vec, *_ in reversed(catalog)]
+        pages = [db_rows[start : start + 200] for start in range(0, len(db_rows), 200)]
+
+        session = MagicMock()
+        session.scalar = AsyncMock(return_value=len(db_rows))
+        session.execute = AsyncMock(
+            side_effect=[MagicMock(fetchall=MagicMock(return_value=page)) for page in [sample, *pages, []]]
+        )
+        index = EmbeddingIndex(dimension=DIM, quantization="int8")
+        index.LOAD_CHUNK_SIZE = 200
+        await index.load(session)
+
+        exact = _build("none", catalog)
+        assert len(index) == len(catalog)
+        assert np.abs(index.decoded_vectors() - exact.vectors).max() < index.quantizer.scale.max()
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError):
+            EmbeddingIndex(dimension=DIM, quantization="int4")
+        with pytest.raises(ValueError):
+            create_quantizer("int4", np.zeros((1, DIM)))
@@ -3,6 +3,7 @@ Unit tests for the embedding service.
 
 Tests embedding generation, caching, and cosine similarity computation.
 """
+import asyncio
 import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -174,27 +175,358 @@ class TestEmbeddingService:
             embedding_service.compute_cosine_similarity(vec1, vec2)
 
     def test_prune_cache(self, embedding_service):
-        """Test cache pruning removes oldest entries."""
-        import time
-
-        # Manually fill cache beyond max size
-        embedding_service.MAX_CACHE_SIZE = 10
+        """Test hot cache evicts least recently used entries."""
+        cache = embedding_service._query_cache
+        cache.max_size = 10
 
         for i in range(15):
-            embedding_service._query_cache[f"key_{i}"] = {
-                'embedding': [0.1] * 768,
-                'timestamp': time.time() - (15 - i)  # Older entries first
-            }
+            cache.put_hot(f"key_{i}", [0.1] * 768)
+            if i == 5:
+                # Touch an old entry so it survives eviction
+                assert cache.get_hot("key_0") is not None
+
+        assert len(cache) == 10
+
+        # Least recently used entries should be removed
+        assert "key_0" in cache
+        assert "key_1" not in cache
+        assert "key_5" not in cache
+        assert "key_6" in cache
+
+    @pytest.mark.asyncio
+    async def test_query_cache_hit_miss_stats(self, embedding_service):
+        """Test cache reports hit/miss ratios."""
+        mock_response = MagicMock()
+        mock_response.embeddings = [MagicMock(values=[0.1] * 768)]
+        embedding_service.client.models.embed_content.return_value = mock_response
+
+        await embedding_service.get_query_embedding("modern sofa")
+        await embedding_service.get_query_embedding("modern sofa")
+
+        stats = embedding_service.get_query_embedding_stats()["cache"]
+        assert stats["misses"] == 1
+        assert stats["hot_hits"] == 1
+        assert stats["hot_hit_ratio"] == 0.5
+        assert stats["durable_enabled"] is False
+
+
+class TestBulkDocumentEmbedding:
+    """Bulk embedding pipeline: set-based prefetch, multi-text requests, one UPDATE per page."""
+
+    @pytest.fixture
+    def embedding_service(self):
+        with patch.object(EmbeddingService, '_initialize_client'):
+            service = EmbeddingService()
+            service.client = MagicMock()
+
+        def embed_content(model, contents, config):
+            contents = contents if isinstance(contents, list) else [contents]
+            return MagicMock(embeddings=[MagicMock(values=[float(len(text))] * 768) for text in contents])
+
+        service.client.models.embed_content.side_effect = embed_content
+        return service
+
+    @pytest.fixture
+    def products(self):
+        from types import SimpleNamespace
+
+        return [
+            SimpleNamespace(id=i, name=f"Sofa {i}", description=None, category_id=1 if i % 2 else None,
+                            primary_style="modern", secondary_style=None, brand=None,
+                            embedding_hash=None, embedding_text=None, has_embedding=False)
+            for i in range(1, 251)
+        ]
+
+    @pytest.fixture
+    def session(self, products):
+        class StubSession:
+            def __init__(self):
+                self.selects = []
+                self.updates = []
+                self.commits = 0
+
+            async def execute(self, statement, params=None):
+                result = MagicMock()
+                if statement.is_dml:
+                    self.updates.append(params)
+                    return result
+                table = statement.get_final_froms()[0].name
+                self.selects.append(table)
+                result.fetchall.return_value = {
+                    "products": products,
+                    "categories": [(1, "Sofas")],
+                    "product_attributes": [(1, "color_primary", "gray")],
+                }[table]
+                return result
+
+            async def commit(self):
+                self.commits += 1
+
+            async def rollback(self):
+                pass
+
+        return StubSession()
+
+    @pytest.mark.asyncio
+    async def test_page_costs_three_reads_and_one_update(self, embedding_service, session):
+        stats = await embedding_service.batch_generate_embeddings(list(range(1, 251)), session)
+
+        assert session.selects == ["products", "categories", "product_attributes"]
+        assert len(session.updates) == 1
+        assert len(session.updates[0]) == 250
+        assert session.commits == 1
+        # 250 texts in requests of at most MAX_TEXTS_PER_REQUEST
+        assert embedding_service.client.models.embed_content.call_count == 3
+        assert stats["success"] == 250
+        assert stats["api_requests"] == 3
+        assert stats["products_per_minute"] > 0
+
+    @pytest.mark.asyncio
+    async def test_prefetched_context_is_in_embedding_text(self, embedding_service, session):
+        texts = {entry.product_id: entry.text for entry in await embedding_service.build_page_embedding_texts([1, 2], session)}
+
+        assert "Category: Sofas" in texts[1]
+        assert "Color: gray" in texts[1]
+        assert "Category" not in texts[2]
+
+    @pytest.mark.asyncio
+    async def test_written_rows_carry_content_hash(self, embedding_service, session):
+        await embedding_service.batch_generate_embeddings([1], session)
+
+        entry = (await embedding_service.build_page_embedding_texts([1], session))[0]
+        params = next(p for p in session.updates[0] if p["b_id"] == 1)
+        assert params["b_hash"] == EmbeddingService.embedding_content_hash(entry.text)
+        assert params["b_text"] == entry.text
+
+    @pytest.mark.asyncio
+    async def test_unchanged_products_are_skipped(self, embedding_service, session, products):
+        entries = await embedding_service.build_page_embedding_texts(list(range(1, 251)), session)
+        for product, entry in zip(products[:200], entries):
+            product.embedding_hash = EmbeddingService.embedding_content_hash(entry.text)
+
+        stats = await embedding_service.batch_generate_embeddings(list(range(1, 251)), session)
+
+        assert stats["skipped"] == 200
+        assert stats["success"] == 50
+        assert len(session.updates[0]) == 50
+        assert embedding_service.client.models.embed_content.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_force_ignores_content_hash(self, embedding_service, session, products):
+        entries = await embedding_service.build_page_embedding_texts(list(range(1, 251)), session)
+        for product, entry in zip(products, entries):
+            product.embedding_hash = EmbeddingService.embedding_content_hash(entry.text)
+
+        stats = await embedding_service.batch_generate_embeddings(list(range(1, 251)), session, force=True)
+
+        assert stats["skipped"] == 0
+        assert stats["success"] == 250
+
+    @pytest.mark.asyncio
+    async def test_dry_run_counts_without_api_calls_or_writes(self, embedding_service, session, products):
+        entries = await embedding_service.build_page_embedding_texts(list(range(1, 251)), session)
+        products[0].embedding_hash = EmbeddingService.embedding_content_hash(entries[0].text)
+        products[1].has_embedding, products[1].embedding_text = True, entries[1].text
+
+        stats = await embedding_service.batch_generate_embeddings(
+            list(range(1, 251)), session, dry_run=True, adopt_unhashed=True
+        )
+
+        assert stats["would_embed"] == 248
+        assert stats["skipped"] == 1
+        assert stats["adopted"] == 1
+        assert stats["success"] == 0
+        assert session.updates == []
+        assert session.commits == 0
+        embedding_service.client.models.embed_content.assert_not_called()
+
+    def test_content_hash_depends_on_model_and_dimension(self):
+        text = "Modern Gray Sofa"
+        original = EmbeddingService.embedding_content_hash(text)
+
+        with patch.object(EmbeddingService, "MODEL_NAME", "other-model"):
+            assert EmbeddingService.embedding_content_hash(text) != original
+        with patch.object(EmbeddingService, "EMBEDDING_DIMENSION", 1536):
+            assert EmbeddingService.embedding_content_hash(text) != original
+        assert EmbeddingService.embedding_content_hash(text) == original
+
+    @pytest.mark.asyncio
+    async def test_throttled_request_is_retried_with_lower_concurrency(self, embedding_service):
+        from services.embedding_rate_limiter import AdaptiveRateLimiter
+
+        calls = []
+
+        def embed_content(model, contents, config):
+            calls.append(contents)
+            if len(calls) == 1:
+                raise Exception("429 RESOURCE_EXHAUSTED")
+            return MagicMock(embeddings=[MagicMock(values=[0.1] * 768) for _ in contents])
+
+        embedding_service.client.models.embed_content.side_effect = embed_content
+        limiter = AdaptiveRateLimiter(max_concurrency=4)
+        limiter.MIN_BACKOFF = 0.01
+
+        embeddings = await embedding_service.embed_documents(["a", "b"], limiter)
+
+        assert len(calls) == 2
+        assert all(len(e) == 768 for e in embeddings)
+        assert limiter.stats()["throttled"] == 1
+        assert limiter.stats()["min_limit"] == 2
+
+    @pytest.mark.asyncio
+    async def test_non_throttle_error_fails_only_that_request(self, embedding_service):
+        embedding_service.client.models.embed_content.side_effect = Exception("invalid argument")
+
+        embeddings = await embedding_service.embed_documents(["a", "b"])
+
+        assert embeddings == [None, None]
+        assert embedding_service.client.models.embed_content.call_count == 1
+
+    def test_rate_limiter_recovers_after_successes(self):
+        from services.embedding_rate_limiter import AdaptiveRateLimiter
+
+        limiter = AdaptiveRateLimiter(max_concurrency=4)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        assert limiter.limit == 1
+        assert limiter.backoff == 2 * limiter.MIN_BACKOFF
+
+        for _ in range(10):
+            limiter.on_success()
+        assert limiter.limit == 4
+        assert limiter.backoff == 0.0
+
+
+class TestQueryEmbeddingDurableTier:
+    """Durable tier lookups through a stub AsyncSession factory."""
+
+    @pytest.fixture
+    def cache(self):
+        from services.embedding_codec import encode_embedding
+        from services.query_embedding_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache("test-model", 4, max_size=10)
+        stored = {cache.key("modern sofa"): encode_embedding([0.5, 0.5, 0.5, 0.5])}
+
+        class StubSession:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, statement):
+                key = statement.whereclause.right.value if hasattr(statement.whereclause, "right") else None
+                result = MagicMock()
+                result.first.return_value = (stored[key],) if key in stored else None
+                return result
+
+            async def commit(self):
+                pass
+
+        cache.attach_durable_tier(StubSession)
+        return cache
+
+    @pytest.mark.asyncio
+    async def test_durable_hit_is_promoted_to_hot_tier(self, cache):
+        key = cache.key("modern sofa")
+
+        assert await cache.get(key) == [0.5, 0.5, 0.5, 0.5]
+        assert key in cache
+        assert await cache.get(cache.key("unknown query")) is None
+
+        stats = cache.stats()
+        assert stats["durable_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_cache_key_includes_model_and_dimension(self, cache):
+        from services.query_embedding_cache import QueryEmbeddingCache
+
+        other_model = QueryEmbeddingCache("other-model", 4)
+        other_dimension = QueryEmbeddingCache("test-model", 8)
+        assert len({cache.key("sofa"), other_model.key("sofa"), other_dimension.key("sofa")}) == 3
+
+
+class TestQueryEmbeddingFallback:
+    """Local fallback provider when the remote query embedding is over budget, failing or unconfigured."""
+
+    class StubProvider:
+        name = "stub"
+
+        def __init__(self, vector, delay=0.0):
+            self.vector = vector
+            self.delay = delay
+            self.calls = 0
+
+        async def embed_query(self, text):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return self.vector
+
+        def stats(self):
+            return {"requests": self.calls}
+
+    @pytest.fixture
+    def embedding_service(self):
+        with patch.object(EmbeddingService, '_initialize_client'):
+            service = EmbeddingService()
+            service.client = MagicMock()
+            return service
+
+    @pytest.mark.asyncio
+    async def test_slow_remote_is_answered_locally_and_cached_when_it_lands(self, embedding_service):
+        embedding_service.query_provider = self.StubProvider([0.1] * 768, delay=0.05)
+        local = self.StubProvider([0.2] * 768)
+        embedding_service.use_fallback_provider(local, latency_budget_ms=5)
+
+        assert await embedding_service.get_query_embedding("velvet sofa") == [0.2] * 768
+        await asyncio.sleep(0.1)
+
+        # The late remote vector is cached; the local one never is
+        assert await embedding_service.get_query_embedding("velvet sofa") == [0.1] * 768
+        assert embedding_service.query_provider.calls == 1
+        stats = embedding_service.get_query_embedding_stats()["fallback"]
+        assert stats["timeouts"] == 1
+        assert stats["late_cached"] == 1
+
+    @pytest.mark.asyncio
+    async def test_remote_within_budget_is_used(self, embedding_service):
+        embedding_service.query_provider = self.StubProvider([0.1] * 768)
+        local = self.StubProvider([0.2] * 768)
+        embedding_service.use_fallback_provider(local, latency_budget_ms=1000)
+
+        assert await embedding_service.get_query_embedding("oak table") == [0.1] * 768
+        assert local.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_or_unconfigured_remote_falls_back(self, embedding_service):
+        embedding_service.query_provider = self.StubProvider(None)
+        local = self.StubProvider([0.2] * 768)
+        embedding_service.use_fallback_provider(local, latency_budget_ms=1000)
+
+        assert await embedding_service.get_query_embedding("jute rug") == [0.2] * 768
+
+        embedding_service.client = None
+        assert await embedding_service.get_query_embedding("brass lamp") == [0.2] * 768
+        stats = embedding_service.get_query_embedding_stats()["fallback"]
+        assert stats["failures"] == 1
+        assert stats["unavailable"] == 1
+
+    @pytest.mark.asyncio
+    async def test_local_embedder_model_must_match(self, embedding_service, tmp_path):
+        import numpy as np
 
-        embedding_service._prune_cache()
+        from services.embedding_service import _attach_local_embedder
+        from services.local_embedder import LocalEmbedder
 
-        # Should have pruned oldest 20% (3 entries)
-        assert len(embedding_service._query_cache) == 12
+        path = tmp_path / "local_embedder.npz"
+        LocalEmbedder(np.zeros((16, 768)), np.ones(16), model="other-model:768").save(path)
+        await _attach_local_embedder(embedding_service, str(path))
+        assert embedding_service.fallback_provider is None
 
-        # Oldest entries should be removed
-        assert "key_0" not in embedding_service._query_cache
-        assert "key_1" not in embedding_service._query_cache
-        assert "key_2" not in embedding_service._query_cache
+        LocalEmbedder(np.zeros((16, 768)), np.ones(16), model="gemini-embedding-001:768").save(path)
+        await _attach_local_embedder(embedding_service, str(path))
+        assert embedding_service.fallback_provider.name == "local"
 
 
 class TestEmbeddingIntegration:
@@ -0,0 +1,138 @@
+"""
+Unit tests for shared memory-mapped embedding index snapshots.
+
+Tests snapshot write/map parity, follower deltas over a mapped snapshot,
+publish thresholds, version swaps, builder election and cleanup of old versions.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_index import EmbeddingIndex, SnapshotHeadroomError, _map_latest_snapshot
+from services.embedding_snapshot import EmbeddingSnapshotStore
+
+DIM = 16
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    stores = ["storea", "storeb"]
+    return [(i + 1, rng.normal(size=DIM), (i % 3) + 1, stores[i % 2], 100.0 * i, i % 5 != 0) for i in range(n)]
+
+
+class TestEmbeddingSnapshot:
+    """Test cases for EmbeddingSnapshotStore."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return EmbeddingSnapshotStore(tmp_path / "snapshots")
+
+    @pytest.fixture
+    def builder(self):
+        index = EmbeddingIndex(dimension=DIM)
+        index.upsert_rows(_rows(300))
+        return index
+
+    def test_mapped_index_matches_builder(self, store, builder):
+        store.write(builder)
+        reader = EmbeddingIndex(dimension=DIM)
+        assert _map_latest_snapshot(reader, store)
+
+        assert isinstance(reader.vectors, np.memmap)
+        assert reader.is_loaded and reader.snapshot_backed
+        query = np.random.default_rng(1).normal(size=DIM)
+        for kwargs in ({}, {"category_ids": [2], "source_websites": ["storeb"], "min_price": 5000}):
+            assert reader.search(query, limit=25, **kwargs) == builder.search(query, limit=25, **kwargs)
+
+    def test_follower_applies_deltas_without_touching_the_snapshot(self, store, builder):
+        version = store.write(builder, headroom=5)
+        reader = EmbeddingIndex(dimension=DIM)
+        _map_latest_snapshot(reader, store)
+        vectors_file = store.root / f"v{version}" / "vectors.npy"
+        on_disk = np.load(vectors_file).copy()
+
+        target = np.zeros(DIM)
+        target[0] = 1.0
+        delta = [
+            (5000, target, 1, "storec", 10.0, True),  # insert
+            (2, -target, 2, "storeb", 20.0, True),  # update
+            (3, None, None, None, None, None),  # removal
+        ]
+        assert reader.upsert_rows(delta) == builder.upsert_rows(delta) == {"inserted": 1, "updated": 1, "removed": 1}
+
+        assert reader.snapshot_version == version
+        assert np.array_equal(np.load(vectors_file), on_disk)
+        query = np.random.default_rng(3).normal(size=DIM)
+        for q in (query, target, -target):
+            assert reader.search(q, limit=400) == builder.search(q, limit=400)
+
+    def test_follower_inserts_are_bounded_by_headroom(self, store, builder):
+        store.write(builder, headroom=2)
+        reader = EmbeddingIndex(dimension=DIM)
+        _map_latest_snapshot(reader, store)
+
+        new_rows = [(pid + 1000, *rest) for pid, *rest in _rows(3, seed=5)]
+        with pytest.raises(SnapshotHeadroomError):
+            reader.upsert_rows(new_rows)
+        assert len(reader) == 300
+        reader.upsert_rows(new_rows[:2])
+        assert len(reader) == 302
+
+    def test_snapshot_due_after_change_count_or_age(self, store):
+        assert not store.snapshot_due(max_changes=10, max_age=60)
+        store.record_changes({"inserted": 4, "updated": 0, "removed": 0})
+        assert not store.snapshot_due(max_changes=10, max_age=60)
+        assert store.snapshot_due(max_changes=10, max_age=0)
+        store.record_changes({"inserted": 3, "updated": 2, "removed": 1})
+        assert store.snapshot_due(max_changes=10, max_age=60)
+
+    def test_reader_swaps_to_new_version(self, store, builder):
+        store.write(builder)
+        reader = EmbeddingIndex(dimension=DIM)
+        _map_latest_snapshot(reader, store)
+        assert not _map_latest_snapshot(reader, store)
+
+        target = np.zeros(DIM)
+        target[0] = 1.0
+        builder.upsert_rows([(5000, target, 1, "storec", 10.0, True)])
+        version = store.write(builder)
+
+        assert _map_latest_snapshot(reader, store)
+        assert reader.snapshot_version == version
+        assert list(reader.search(target, source_websites=["storec"], limit=5).keys()) == [5000]
+
+    def test_int8_and_ann_state_is_shared(self, store):
+        builder = EmbeddingIndex(dimension=DIM, quantization="int8")
+        builder.upsert_rows(_rows(500))
+        builder.attach_ann(*builder.train_ann(n_lists=10))
+        builder.ANN_MIN_CANDIDATES = 0
+        store.write(builder)
+
+        reader = EmbeddingIndex(dimension=DIM)
+        reader.ANN_MIN_CANDIDATES = 0
+        _map_latest_snapshot(reader, store)
+
+        assert reader.quantization == "int8"
+        assert reader.ann.n_lists == 10
+        query = np.random.default_rng(2).normal(size=DIM)
+        assert reader.search(query, limit=10) == builder.search(query, limit=10)
+
+    def test_single_builder(self, store, tmp_path):
+        other = EmbeddingSnapshotStore(tmp_path / "snapshots")
+        assert store.try_become_builder()
+        assert not other.try_become_builder()
+        store.release_builder()
+        assert other.try_become_builder()
+        other.release_builder()
+
+    def test_old_versions_are_cleaned_up(self, store, builder):
+        for _ in range(4):
+            store.write(builder)
+        assert len([p for p in store.root.glob("v*") if p.is_dir()]) == store.KEEP_VERSIONS
+
+    def test_identical_upsert_is_not_a_change(self, builder):
+        assert builder.upsert_rows(_rows(300)) == {"inserted": 0, "updated": 0, "removed": 0}
@@ -0,0 +1,150 @@
+"""
+Tests for the resident facet index (services/facet_index.py).
+"""
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.facet_index import DEFAULT_PRICE_EDGES, FacetIndex
+
+STORES = ["ikea", "pepperfry", "westelm", None]
+STYLES = ["Modern", "boho", "japandi", None]
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        (
+            int(product_id),
+            None if i % 13 == 0 else int(rng.integers(1, 6)),
+            STORES[rng.integers(len(STORES))],
+            None if i % 7 == 0 else float(rng.choice([900, 5000, 12000, 60000, 250000])),
+            STYLES[rng.integers(len(STYLES))],
+            i % 5 != 0,
+        )
+        for i, product_id in enumerate(rng.permutation(np.arange(1, 3 * n))[:n])
+    ]
+
+
+def _brute_force(rows, product_ids, edges=DEFAULT_PRICE_EDGES):
+    selected = [row for row in rows if row[0] in set(product_ids)]
+    prices = [row[3] for row in selected if row[3] is not None]
+    return {
+        "total": len(selected),
+        "available": sum(1 for row in selected if row[5]),
+        "categories": Counter(row[1] for row in selected if row[1] is not None),
+        "stores": Counter(row[2] for row in selected if row[2]),
+        "styles": Counter(row[4].lower() for row in selected if row[4]),
+        "price_ranges": [
+            sum(1 for price in prices if low <= price and (high is None or price < high))
+            for low, high in zip(edges, list(edges[1:]) + [None])
+        ],
+    }
+
+
+class TestFacetCounts:
+    @pytest.fixture
+    def rows(self):
+        return _rows(500)
+
+    @pytest.fixture
+    def index(self, rows):
+        index = FacetIndex()
+        for start in range(0, len(rows), 64):
+            index.upsert_rows(rows[start : start + 64])
+        index.category_names = {1: "Sofas", 2: "Chairs", 3: "Tables", 4: "Lamps", 5: "Rugs"}
+        return index
+
+    def test_matches_brute_force(self, index, rows):
+        product_ids = [row[0] for row in rows[::3]] + [10**6]
+
+        facets = index.facet_counts(product_ids)
+        expected = _brute_force(rows, product_ids)
+
+        assert facets["total"] == expected["total"]
+        assert facets["available"] == expected["available"]
+        assert {entry["id"]: entry["count"] for entry in facets["categories"]} == expected["categories"]
+        assert {entry["value"]: entry["count"] for entry in facets["stores"]} == expected["stores"]
+        assert {entry["value"]: entry["count"] for entry in facets["styles"]} == expected["styles"]
+        assert [entry["count"] for entry in facets["price_ranges"]] == expected["price_ranges"]
+        assert facets["price_ranges"][-1]["max"] is None
+
+    def test_values_ordered_by_count(self, index, rows):
+        facets = index.facet_counts([row[0] for row in rows])
+
+        for facet in ("categories", "stores", "styles"):
+            counts = [entry["count"] for entry in facets[facet]]
+            assert counts == sorted(counts, reverse=True)
+        assert facets["categories"][0]["name"] == index.category_names[facets["categories"][0]["id"]]
+
+    def test_available_only_and_whole_catalog(self, index, rows):
+        assert index.facet_counts()["total"] == len(rows)
+        assert index.facet_counts(available_only=True)["total"] == sum(1 for row in rows if row[5])
+
+    def test_empty_result(self, index):
+        facets = index.facet_counts([])
+
+        assert facets["total"] == 0
+        assert facets["stores"] == [] and facets["categories"] == []
+        assert all(entry["count"] == 0 for entry in facets["price_ranges"])
+
+
+class TestUpsert:
+    def test_rows_stay_sorted_and_updates_replace(self):
+        index = FacetIndex()
+        assert index.upsert_rows([(9, 1, "ikea", 100.0, "Modern", True), (2, 2, "ikea", 6000.0, None, False)]) == {
+            "inserted": 2,
+            "updated": 0,
+        }
+
+        counts = index.upsert_rows([(2, 3, "westelm", None, "boho", True), (5, None, None, 50.0, None, True)])
+
+        assert counts == {"inserted": 1, "updated": 1}
+        assert index.product_ids.tolist() == [2, 5, 9]
+        assert index.category_ids.tolist() == [3, -1, 1]
+        assert np.isnan(index.prices[0])
+        facets = index.facet_counts([2])
+        assert facets["stores"] == [{"value": "westelm", "count": 1}]
+        assert facets["styles"] == [{"value": "boho", "count": 1}]
+
+
+class StubSession:
+    """Answers the load queries: product pages, then category names."""
+
+    def __init__(self, pages, categories):
+        self.results = [*pages, [], categories]
+
+    async def scalar(self, statement, params=None):
+        return sum(len(page) for page in self.results[:-2])
+
+    async def execute(self, statement, params=None):
+        result = MagicMock()
+        result.fetchall.return_value = self.results.pop(0)
+        return result
+
+
+class TestLoad:
+    @pytest.mark.asyncio
+    async def test_load_pages_and_watermark(self):
+        index = FacetIndex()
+        pages = [
+            [(1, 1, "ikea", 900.0, "modern", True, datetime(2026, 2, 1))],
+            [(2, 2, "pepperfry", None, None, False, datetime(2026, 2, 3)), (3, 1, "ikea", 60000.0, None, True, None)],
+        ]
+
+        await index.load(StubSession(pages, [(1, "Sofas"), (2, "Chairs")]))
+
+        assert index.is_loaded
+        assert len(index) == 3
+        assert index.capacity == 3 and index.product_ids.base is index._buffers["product_ids"]
+        assert index.watermark == datetime(2026, 2, 3)
+        assert index.category_names == {1: "Sofas", 2: "Chairs"}
+        assert index.stats()["stores"] == 2
@@ -0,0 +1,181 @@
+"""
+Tests for two-phase hybrid retrieval (services/hybrid_search.py).
+"""
+import sys
+from collections import namedtuple
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services import hybrid_search
+from services.hybrid_search import (
+    FUSION_CONCAT,
+    RRF_K,
+    hybrid_candidates,
+    hydrate_products,
+    matched_group_count,
+    reciprocal_rank_fusion,
+)
+from sqlalchemy.dialects import postgresql
+
+KeywordRow = namedtuple("KeywordRow", ["id", "name", "match_tier"])
+
+
+class TestReciprocalRankFusion:
+    def test_scores_and_order(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]])
+
+        assert fused[3] == pytest.approx(1 / (RRF_K + 3) + 1 / (RRF_K + 1))
+        assert fused[1] == pytest.approx(1 / (RRF_K + 1))
+        # Found by both retrievers first; equal scores keep first-seen order
+        assert list(fused) == [3, 1, 2, 4]
+
+    def test_weights(self):
+        fused = reciprocal_rank_fusion([[1], [2]], weights=[1.0, 2.0])
+        assert list(fused) == [2, 1]
+
+    def test_empty(self):
+        assert reciprocal_rank_fusion([[], []]) == {}
+
+
+class TestMatchedGroupCount:
+    def test_counts_groups_hyphen_insensitive(self):
+        groups = [["sofa", "couch"], ["three-seater", "3 seater"], ["velvet"]]
+        assert matched_group_count("Aria Three Seater Couch", groups) == 2
+        assert matched_group_count("three - seater velvet sofa", groups) == 3
+        assert matched_group_count("Floor Lamp", groups) == 0
+
+
+class StubSession:
+    """Answers the keyword query (has match_tier) and the semantic-only names query."""
+
+    def __init__(self, keyword_rows, name_rows):
+        self.keyword_rows = keyword_rows
+        self.name_rows = name_rows
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.statements.append(sql)
+        result = MagicMock()
+        result.fetchall.return_value = self.keyword_rows if "match_tier" in sql else self.name_rows
+        return result
+
+
+async def run_candidates(session, semantic_hits, query="sofa", **kwargs):
+    with patch.object(hybrid_search, "semantic_search_hits", AsyncMock(return_value=semantic_hits)):
+        return await hybrid_candidates(query, session, **kwargs)
+
+
+class TestHybridCandidates:
+    @pytest.fixture
+    def session(self):
+        keyword_rows = [
+            KeywordRow(10, "Oslo Sofa", 0),
+            KeywordRow(11, "Corner Sofa Bed", 0),
+            KeywordRow(12, "Sofa Cushion Cover", 0),
+            KeywordRow(13, "Brand Sofa Co Armchair", 1),
+        ]
+        return StubSession(keyword_rows, [(20, "Velvet Sofa"), (21, "Sofa Cover")])
+
+    @pytest.mark.asyncio
+    async def test_fused_order_and_membership(self):
+        session = StubSession(
+            [
+                KeywordRow(10, "Oak Coffee Table", 0),
+                KeywordRow(11, "Round Coffee Table", 0),
+                KeywordRow(12, "Coffee Table Book Stand", 0),
+                KeywordRow(13, "Coffee Table Co Lamp", 1),
+            ],
+            [(20, "Marble Coffee Table"), (21, "Console Table")],
+        )
+        semantic_hits = [(20, 0.9), (11, 0.8), (21, 0.6), (22, 0.45), (10, 0.4)]
+        candidates = await run_candidates(session, semantic_hits, query="coffee table")
+
+        # 22 is semantic-only below SEMANTIC_ONLY_THRESHOLD; 21 is excluded by name ("console")
+        assert set(candidates.ordered_ids) == {10, 11, 12, 13, 20}
+        # Found by both retrievers (11, 10) outrank single-retriever hits
+        assert candidates.ordered_ids[:2] == [11, 10]
+        assert candidates.semantic_scores == {20: 0.9, 11: 0.8, 10: 0.4}
+        assert candidates.names[20] == "Marble Coffee Table"
+
+    @pytest.mark.asyncio
+    async def test_concat_keeps_previous_order(self, session):
+        semantic_hits = [(20, 0.9), (11, 0.8), (10, 0.4)]
+        candidates = await run_candidates(session, semantic_hits, fusion=FUSION_CONCAT)
+
+        assert candidates.ordered_ids == [20, 11, 10, 12, 13]
+
+    @pytest.mark.asyncio
+    async def test_only_ids_and_names_are_fetched(self, session):
+        candidates = await run_candidates(session, [(20, 0.9)])
+
+        assert len(session.statements) == 2
+        for sql in session.statements:
+            assert sql.startswith("SELECT products.id, products.name")
+            assert "products.description," not in sql
+            assert "product_images" not in sql
+        assert candidates.rows_fetched == 4 + 1 + 2
+        assert candidates.bytes_fetched > 0
+
+    @pytest.mark.asyncio
+    async def test_attribute_filters_apply_to_semantic_only_hits(self, session):
+        session.name_rows = [(20, "Velvet Sofa")]
+        candidates = await run_candidates(session, [(20, 0.9), (23, 0.7)], styles=["modern"])
+
+        # Same filter on the keyword query and the semantic-only names query
+        assert all("lower(products.primary_style) IN" in sql for sql in session.statements)
+        assert 23 not in candidates.ordered_ids
+        assert 20 in candidates.ordered_ids
+
+    @pytest.mark.asyncio
+    async def test_without_filters_semantic_only_membership_is_the_threshold(self, session):
+        session.name_rows = [(20, "Velvet Sofa"), (21, "Linen Sofa")]
+        candidates = await run_candidates(session, [(20, 0.5), (21, 0.7), (22, 0.49)])
+
+        assert set(candidates.ordered_ids) == {10, 11, 12, 13, 20, 21}
+
+    @pytest.mark.asyncio
+    async def test_semantic_failure_falls_back_to_keyword(self, session):
+        with patch.object(hybrid_search, "semantic_search_hits", AsyncMock(side_effect=RuntimeError("down"))):
+            candidates = await hybrid_candidates("sofa", session)
+
+        assert candidates.ordered_ids == [10, 11, 12, 13]
+        assert candidates.semantic_scores == {}
+
+    @pytest.mark.asyncio
+    async def test_primary_match_uses_all_groups(self, session):
+        candidates = await run_candidates(session, [], query="sofa bed")
+
+        assert candidates.is_primary_match(11)
+        assert not candidates.is_primary_match(10)
+
+
+class TestHydrateProducts:
+    @pytest.mark.asyncio
+    async def test_single_query_in_requested_order(self):
+        products = [SimpleNamespace(id=3), SimpleNamespace(id=1)]
+        db = MagicMock()
+        result = MagicMock()
+        result.scalars.return_value.unique.return_value.all.return_value = products
+        db.execute = AsyncMock(return_value=result)
+
+        hydrated = await hydrate_products([1, 2, 3], db)
+
+        assert [p.id for p in hydrated] == [1, 3]
+        assert db.execute.await_count == 1
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "LEFT OUTER JOIN categories" in sql
+        assert "LEFT OUTER JOIN product_images" in sql
+
+    @pytest.mark.asyncio
+    async def test_empty_page_skips_query(self):
+        db = MagicMock()
+        db.execute = AsyncMock()
+        assert await hydrate_products([], db) == []
+        db.execute.assert_not_called()
@@ -0,0 +1,116 @@
+"""
+Tests for the local hashed n-gram query embedder (services/local_embedder.py).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.local_embedder import HashedNgramEncoder, LocalEmbedder, neighbour_recall
+
+WORDS = ["oak", "walnut", "velvet", "linen", "marble", "sofa", "chair", "table", "lamp", "rug", "grey", "blue"]
+
+
+def word_vectors(dimension: int = 32, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(len(WORDS), dimension)).astype(np.float32)
+    return dict(zip(WORDS, vectors / np.linalg.norm(vectors, axis=1, keepdims=True)))
+
+
+def remote_vector(text: str, vectors) -> np.ndarray:
+    vector = np.sum([vectors[word] for word in text.split()], axis=0)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture(scope="module")
+def trained():
+    """Embedder fit on two- and three-word texts whose 'remote' vector is the sum of their word vectors."""
+    vectors = word_vectors()
+    rng = np.random.default_rng(1)
+    texts = [" ".join(rng.choice(WORDS, size=rng.integers(2, 4), replace=False)) for _ in range(600)]
+    targets = np.stack([remote_vector(text, vectors) for text in texts])
+    return LocalEmbedder.fit(texts, targets, n_features=1024, ridge=0.1, model="test-model:32"), vectors
+
+
+class TestHashedNgramEncoder:
+    def test_encoding_is_deterministic_and_case_insensitive(self):
+        encoder = HashedNgramEncoder(256)
+        indices, values = encoder.encode("Grey Velvet Sofa")
+        other_indices, other_values = encoder.encode("grey  velvet SOFA!")
+
+        assert np.array_equal(indices, other_indices)
+        assert np.array_equal(values, other_values)
+        assert indices.min() >= 0 and indices.max() < 256
+        assert len(set(indices.tolist())) == indices.size
+
+    def test_features_include_words_bigrams_and_char_ngrams(self):
+        features = HashedNgramEncoder().features("oak table")
+
+        assert {"w:oak", "w:table", "b:oak table", "c:<oa", "c:ble>"} <= set(features)
+
+    def test_empty_text_has_no_features(self):
+        indices, _ = HashedNgramEncoder().encode(" -- ")
+
+        assert indices.size == 0
+
+    def test_feature_count_must_be_power_of_two(self):
+        with pytest.raises(ValueError):
+            HashedNgramEncoder(1000)
+
+
+class TestLocalEmbedder:
+    def test_learned_map_reproduces_remote_vectors(self, trained):
+        embedder, vectors = trained
+
+        for text in ("oak chair", "blue marble lamp", "linen rug"):
+            assert float(embedder.embed(text) @ remote_vector(text, vectors)) > 0.9
+
+    def test_embedding_is_unit_norm_in_target_dimension(self, trained):
+        embedder, _ = trained
+        vector = embedder.embed("grey sofa")
+
+        assert vector.shape == (32,)
+        assert np.isclose(np.linalg.norm(vector), 1.0, atol=1e-5)
+        assert embedder.embed("   ") is None
+
+    def test_neighbour_recall_against_remote(self, trained):
+        embedder, vectors = trained
+        corpus_texts = [f"{a} {b}" for a in WORDS for b in WORDS if a != b]
+        corpus = np.stack([remote_vector(text, vectors) for text in corpus_texts])
+        queries = ["velvet sofa", "oak table", "blue rug"]
+
+        recall = neighbour_recall(
+            np.stack([remote_vector(query, vectors) for query in queries]),
+            np.stack([embedder.embed(query) for query in queries]),
+            corpus,
+            k=10,
+        )
+
+        assert recall.shape == (3,)
+        assert recall.mean() >= 0.8
+        assert neighbour_recall(corpus[:3], corpus[:3], corpus, k=10).tolist() == [1.0, 1.0, 1.0]
+
+    def test_save_and_load_round_trip(self, trained, tmp_path):
+        embedder, _ = trained
+        path = tmp_path / "local_embedder.npz"
+        embedder.save(path)
+
+        loaded = LocalEmbedder.load(path)
+
+        assert loaded.model == "test-model:32"
+        assert loaded.trained_rows == 600
+        assert np.array_equal(loaded.embed("walnut table"), embedder.embed("walnut table"))
+
+    def test_load_rejects_other_format_versions(self, trained, tmp_path, monkeypatch):
+        embedder, _ = trained
+        path = tmp_path / "local_embedder.npz"
+        monkeypatch.setattr(LocalEmbedder, "FORMAT_VERSION", 99)
+        embedder.save(path)
+        monkeypatch.undo()
+
+        with pytest.raises(ValueError):
+            LocalEmbedder.load(path)
@@ -0,0 +1,183 @@
+"""
+Tests for the MinHash/LSH near-duplicate engine (services/near_duplicates.py)
+and the duplicate cluster table (services/duplicate_clusters.py).
+"""
+import sys
+from datetime import datetime
+from itertools import combinations
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.duplicate_clusters import (
+    DUPLICATES_VERSION,
+    cluster_rows,
+    collapse_duplicate_ids,
+    write_duplicate_clusters,
+)
+from services.near_duplicates import (
+    MinHasher,
+    candidate_pairs,
+    connected_components,
+    estimated_jaccard,
+    find_near_duplicates,
+    pair_jaccard,
+    shingle_hashes,
+)
+from sqlalchemy.dialects import postgresql
+
+NAMES = [
+    ("Aria Sheesham Wood Coffee Table - Walnut", "Casa"),
+    ("Aria Coffee Table in Sheesham Wood, Walnut", "Casa"),
+    ("Aria Sheesham Wood Coffee Table - Honey", "Casa"),  # Colour variant, not a duplicate
+    ("Bolt Metal Floor Lamp", "Nook"),
+    ("BOLT metal floor lamp", None),
+    ("Floor Lamp, Bolt, Metal", "Nook"),
+    ("Zed Velvet 3 Seater Sofa", "Kiln"),
+    ("", None),
+]
+
+
+def _jaccard(a, b):
+    a, b = set(a.tolist()), set(b.tolist())
+    return len(a & b) / len(a | b)
+
+
+class TestShingles:
+    def test_word_set_ignores_order_case_punctuation_and_stop_words(self):
+        assert np.array_equal(
+            shingle_hashes("Aria Sheesham Wood Coffee Table - Walnut", "Casa"),
+            shingle_hashes("aria coffee table in sheesham wood, WALNUT", "casa"),
+        )
+
+    def test_brand_is_one_shingle(self):
+        assert len(shingle_hashes("Oak Table", "Loom & Co")) == len(shingle_hashes("Oak Table")) + 1
+        assert shingle_hashes("", None).size == 0
+
+
+class TestMinHash:
+    def test_estimate_tracks_exact_jaccard(self):
+        rng = np.random.default_rng(0)
+        base = rng.choice(10**6, size=40, replace=False).astype(np.uint64)
+        sets = [np.sort(base), np.sort(np.concatenate((base[:30], rng.choice(10**6, size=10).astype(np.uint64) + 10**6)))]
+        signatures = MinHasher(num_perm=256).signatures(sets)
+        pairs = np.array([[0, 1]])
+
+        exact = _jaccard(*sets)
+        assert pair_jaccard(sets, pairs)[0] == pytest.approx(exact)
+        assert estimated_jaccard(signatures, pairs)[0] == pytest.approx(exact, abs=0.1)
+
+    def test_signatures_are_blocked_consistently(self, monkeypatch):
+        sets = [shingle_hashes(name, brand) for name, brand in NAMES]
+        whole = MinHasher().signatures(sets)
+        monkeypatch.setattr("services.near_duplicates._BLOCK_SHINGLES", 3)
+
+        assert np.array_equal(MinHasher().signatures(sets), whole)
+        assert (whole[-1] == np.iinfo(np.uint32).max).all()
+
+    def test_pair_jaccard_matches_sets(self):
+        sets = [shingle_hashes(name, brand) for name, brand in NAMES]
+        pairs = np.array(list(combinations(range(len(sets)), 2)))
+
+        similarity = pair_jaccard(sets, pairs)
+
+        for (i, j), value in zip(pairs.tolist(), similarity.tolist()):
+            expected = _jaccard(sets[i], sets[j]) if sets[i].size and sets[j].size else 0.0
+            assert value == pytest.approx(expected)
+
+
+class TestCandidates:
+    def test_identical_signatures_pair_within_window(self):
+        signatures = np.zeros((10, 8), dtype=np.uint32)
+        signatures[9] = 1
+
+        pairs = candidate_pairs(signatures, bands=4, window=3)
+
+        assert {tuple(pair) for pair in pairs.tolist()} == {(i, j) for i in range(9) for j in range(i + 1, 9) if j - i <= 3}
+
+    def test_invalid_rows_are_never_paired(self):
+        signatures = np.zeros((4, 8), dtype=np.uint32)
+
+        pairs = candidate_pairs(signatures, bands=4, valid=np.array([True, False, True, True]))
+
+        assert {tuple(pair) for pair in pairs.tolist()} == {(0, 2), (0, 3), (2, 3)}
+
+    def test_connected_components_label_lowest_member(self):
+        labels = connected_components(7, np.array([[4, 5], [1, 4], [2, 6], [5, 3]]))
+
+        assert labels.tolist() == [0, 1, 2, 1, 1, 1, 2]
+
+
+class TestFindNearDuplicates:
+    def test_reworded_listings_cluster_and_colour_variant_does_not(self):
+        names, brands = zip(*NAMES)
+
+        result = find_near_duplicates(names, brands)
+
+        assert [cluster.tolist() for cluster in result.clusters()] == [[0, 1], [3, 4, 5]]
+        assert (result.similarity >= 0.8).all()
+        assert result.candidates >= len(result.pairs)
+
+    def test_embedding_cosine_vetoes_pairs(self):
+        names, brands = zip(*NAMES)
+        vectors = np.eye(len(NAMES), dtype=np.float32)
+        vectors[1] = vectors[0]
+        has_vector = np.array([True, True, True, True, True, False, True, False])
+
+        result = find_near_duplicates(names, brands, vectors=vectors, has_vector=has_vector)
+
+        # 3-4 disagree on cosine; 3-5 and 4-5 have no vector for 5 and keep the name verdict
+        assert {tuple(pair) for pair in result.pairs.tolist()} == {(0, 1), (3, 5), (4, 5)}
+        assert [cluster.tolist() for cluster in result.clusters()] == [[0, 1], [3, 4, 5]]
+
+
+class StubSession:
+    """Records DML statements."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return MagicMock()
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestDuplicateClusters:
+    def test_cluster_rows_use_lowest_product_id_and_best_similarity(self):
+        names, brands = zip(*NAMES)
+        product_ids = [80, 20, 30, 70, 50, 60, 10, 40]
+
+        rows = cluster_rows(product_ids, find_near_duplicates(names, brands))
+
+        assert {row["product_id"]: row["cluster_id"] for row in rows} == {80: 20, 20: 20, 70: 50, 50: 50, 60: 50}
+        assert all(row["similarity"] >= 0.8 for row in rows)
+
+    def test_collapse_keeps_first_member_of_each_cluster(self):
+        collapsed = collapse_duplicate_ids([5, 9, 2, 7, 3, 8], {9: 1, 3: 1, 7: 4, 8: 4})
+
+        assert collapsed == [5, 9, 2, 7]
+
+    @pytest.mark.asyncio
+    async def test_write_replaces_table(self, monkeypatch):
+        monkeypatch.setattr("services.duplicate_clusters.WRITE_BATCH", 2)
+        session = StubSession()
+        rows = [{"product_id": pid, "cluster_id": 1, "similarity": 0.9} for pid in (1, 2, 3)]
+
+        written = await write_duplicate_clusters(rows, session, datetime(2026, 2, 16))
+
+        assert written == 3
+        assert session.commits == 1
+        sql = [str(statement.compile(dialect=postgresql.dialect())) for statement in session.statements]
+        assert sql[0] == "DELETE FROM product_duplicates"
+        assert all(statement.startswith("INSERT INTO product_duplicates") for statement in sql[1:])
+        assert len(sql) == 3
+        assert session.statements[1].compile().params["detector_version_m0"] == DUPLICATES_VERSION
@@ -0,0 +1,133 @@
+"""
+Tests for the ingest-time product classification (services/product_classification.py).
+"""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.product_classification import (
+    ACCESSORY_TERMS,
+    CLASSIFICATION_VERSION,
+    classify_product,
+    reclassify_products,
+    unclassified_product_ids_query,
+)
+from services.recommendation_engine import AdvancedRecommendationEngine, RecommendationRequest
+from services.search_service import KEYWORD_CATEGORIES, tsquery_phrase
+from sqlalchemy.dialects import postgresql
+
+
+class TestClassifyProduct:
+    @pytest.mark.parametrize(
+        "name,product_type",
+        [
+            ("Aria Oak Coffee Table", "center_tables"),
+            ("Brass Table Lamp", "portable_lighting"),
+            ("Bedside Table with Drawer", "bedside_tables"),
+            ("Table and Chair Set", "chairs"),
+            ("Hand-knotted Wool Area Rug", "rugs"),
+            ("Ceramic Bowl", None),
+            (None, None),
+        ],
+    )
+    def test_most_specific_phrase_wins(self, name, product_type):
+        assert classify_product(name)["product_type"] == product_type
+
+    def test_accessory_terms_match_whole_words(self):
+        assert classify_product("Velvet Sofa - Fabric Swatches")["is_accessory"]
+        assert classify_product("Throw-Pillow Set")["is_accessory"]
+        assert not classify_product("Partition Screen")["is_accessory"]
+        assert not classify_product("Coverlet Quilt")["is_accessory"]
+
+    def test_accessory_words_follow_tsquery_tokenization(self):
+        # Every term is looked up as the words the name_matches_any tsquery would match
+        for term in ACCESSORY_TERMS:
+            words = tsquery_phrase(term).replace("'", "").split(" <-> ")
+            assert classify_product(f"Oak {' '.join(words).upper()} Set")["is_accessory"]
+
+    def test_versioned(self):
+        assert classify_product("Sofa")["classification_version"] == CLASSIFICATION_VERSION
+        assert "sofas" in KEYWORD_CATEGORIES
+
+
+class StubSession:
+    """Answers the product read and records the update."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append((statement, params))
+        result = MagicMock()
+        result.fetchall.return_value = self.rows
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestReclassify:
+    @pytest.mark.asyncio
+    async def test_one_read_and_one_executemany_update(self):
+        session = StubSession([(1, "Sofa Swatch Kit", "sofas", True), (2, "Oak Coffee Table", None, None)])
+
+        counts = await reclassify_products([1, 2], session)
+
+        assert counts == {"classified": 2, "accessories": 1, "changed": 1}
+        assert len(session.statements) == 2 and session.commits == 1
+        statement, params = session.statements[1]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE products SET")
+        assert "last_updated=products.last_updated" in sql
+        assert params[1] == {
+            "row_id": 2,
+            "new_product_type": "center_tables",
+            "new_is_accessory": False,
+            "new_classification_version": CLASSIFICATION_VERSION,
+        }
+
+    @pytest.mark.asyncio
+    async def test_no_ids_no_queries(self):
+        session = StubSession([])
+
+        assert (await reclassify_products([], session))["classified"] == 0
+        assert session.statements == []
+
+    def test_unclassified_query_checks_version(self):
+        sql = str(unclassified_product_ids_query(10).compile(dialect=postgresql.dialect()))
+
+        assert "products.classification_version IS NULL" in sql
+        assert "products.classification_version !=" in sql
+
+
+class CandidateSession:
+    """Records the candidate query and returns no products."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        return result
+
+
+class TestCandidateQuery:
+    @pytest.mark.asyncio
+    async def test_accessories_filtered_on_column_with_name_check_for_unclassified(self):
+        session = CandidateSession()
+
+        await AdvancedRecommendationEngine()._get_candidate_products(RecommendationRequest(), session)
+
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        assert "products.is_accessory IS false" in sql
+        assert "products.is_accessory IS NULL AND NOT" in sql
+        assert sql.count("@@") == 1
@@ -0,0 +1,282 @@
+"""
+Tests for precomputed product ranking features (services/product_features.py).
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.product_features import (
+    FEATURES_VERSION,
+    STYLE_BITS,
+    build_product_features_row,
+    compute_product_features,
+    derive_product_features,
+    normalize_product_type,
+    parse_capacity,
+    rebuild_product_features,
+    source_hash,
+    stale_product_ids_query,
+    user_type_and_capacity,
+)
+from services.ranking_service import RankingService
+from sqlalchemy.dialects import postgresql
+
+
+def make_product(id=1, name="Sofa", primary_style=None, secondary_style=None):
+    return SimpleNamespace(id=id, name=name, primary_style=primary_style, secondary_style=secondary_style)
+
+
+class TestNormalization:
+    """Type / capacity parsing into the RankingService.ADJACENT_TYPES vocabulary."""
+
+    @pytest.mark.parametrize(
+        "text,expected",
+        [
+            ("Aria Three Seater Sofa", 3),
+            ("3-seater sofa in velvet", 3),
+            ("6 Seater Dining Set", 6),
+            ("Single seater recliner", 1),
+            ("two seats bench", 2),
+            ("Coffee Table", None),
+            (None, None),
+        ],
+    )
+    def test_parse_capacity(self, text, expected):
+        assert parse_capacity(text) == expected
+
+    @pytest.mark.parametrize(
+        "text,expected",
+        [
+            ("Aria Three Seater Sofa", "3-seater"),
+            ("L Shape Sofa with Chaise", "l-shaped"),
+            ("Modular corner sofa", "l-shaped"),
+            ("Sectional Sofa", "sectional"),
+            ("Queen Size Bed with Storage", "queen"),
+            ("Round Dining Table", "round"),
+            ("Circular side table", "round"),
+            ("Queen Anne armchair", None),  # Bed sizes only for beds
+            ("Round mirror", None),  # Table shapes only for tables
+            ("Floor Lamp", None),
+        ],
+    )
+    def test_normalize_product_type(self, text, expected):
+        assert normalize_product_type(text) == expected
+
+    def test_user_keywords_map_to_product_vocabulary(self):
+        assert user_type_and_capacity("three seater") == ("3-seater", 3)
+        assert user_type_and_capacity("l shaped") == ("l-shaped", None)
+        assert user_type_and_capacity("compact") == ("compact", None)
+        assert user_type_and_capacity(None) == (None, None)
+
+
+class TestDeriveProductFeatures:
+    def test_attributes_and_name(self):
+        product = make_product(name="Oslo 3 Seater Sofa", primary_style="Modern", secondary_style="Minimalist")
+        features = derive_product_features(
+            product, {"material_primary": "Oak ", "color_primary": "Grey", "furniture_type": "sofa"}
+        )
+
+        assert features["features_version"] == FEATURES_VERSION
+        assert features["product_type"] == "3-seater"
+        assert features["capacity"] == 3
+        assert features["material"] == "oak"
+        assert features["material_family_mask"] == RankingService.material_family_mask("oak")
+        assert features["color"] == "grey"
+        assert features["color_family_mask"] == RankingService.color_family_mask("grey")
+        assert features["primary_style"] == "modern"
+        assert features["secondary_style"] == "minimalist"
+        assert features["style_mask"] == STYLE_BITS["modern"] | STYLE_BITS["minimalist"]
+
+    def test_fallback_attribute_names(self):
+        features = derive_product_features(
+            make_product(name="Bench"),
+            {"material": "bamboo", "color": "navy", "seating_capacity": "4", "style": "boho", "size": "4 seater"},
+        )
+
+        assert features["capacity"] == 4
+        assert features["product_type"] == "4-seater"
+        # Bamboo belongs to both the wood and the rattan family
+        assert bin(features["material_family_mask"]).count("1") == 2
+        assert features["primary_style"] == "boho"
+        assert features["style_mask"] == STYLE_BITS["boho"]
+
+    def test_missing_data_is_empty(self):
+        features = derive_product_features(make_product(name="Vase"), {})
+
+        assert features["product_type"] is None
+        assert features["capacity"] is None
+        assert features["material"] is None
+        assert features["material_family_mask"] == 0
+        assert features["color_family_mask"] == 0
+        assert features["style_mask"] == 0
+
+
+class StubSession:
+    """Routes SELECTs by table; records DML statements."""
+
+    def __init__(self, products, attributes):
+        self.rows = {"products": products, "product_attributes": attributes}
+        self.selects = []
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        result = MagicMock()
+        if statement.is_dml:
+            self.statements.append(statement)
+            return result
+        table = statement.get_final_froms()[0].name
+        self.selects.append(table)
+        result.fetchall.return_value = self.rows[table]
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestSourceHash:
+    """source_hash keys staleness on the feature inputs, not on timestamps."""
+
+    def test_attribute_order_does_not_matter(self):
+        rows = [("material_primary", "Oak"), ("color_primary", "Grey"), ("material_primary", "Ash")]
+        assert source_hash("Sofa", "modern", None, rows) == source_hash("Sofa", "modern", None, rows[::-1])
+
+    @pytest.mark.parametrize(
+        "changed",
+        [
+            ("Sofa Bed", "modern", None, [("color_primary", "Grey")]),
+            ("Sofa", "boho", None, [("color_primary", "Grey")]),
+            ("Sofa", "modern", "boho", [("color_primary", "Grey")]),
+            ("Sofa", "modern", None, [("color_primary", "Navy")]),
+            ("Sofa", "modern", None, [("color_primary", "Grey"), ("material_primary", "Oak")]),
+        ],
+    )
+    def test_any_input_change_changes_the_hash(self, changed):
+        assert source_hash("Sofa", "modern", None, [("color_primary", "Grey")]) != source_hash(*changed)
+
+    def test_row_carries_features_and_hash(self):
+        product = make_product(7, "Two Seater Sofa", "modern")
+        row = build_product_features_row(product, [("material_primary", "Velvet"), ("material_primary", "Linen")])
+
+        assert row["product_id"] == 7
+        assert row["product_type"] == "2-seater"
+        assert row["material"] == "velvet"  # First row per attribute name wins
+        assert row["source_hash"] == source_hash(
+            "Two Seater Sofa", "modern", None, [("material_primary", "Linen"), ("material_primary", "Velvet")]
+        )
+
+
+class TestRebuild:
+    @pytest.fixture
+    def session(self):
+        products = [
+            make_product(1, "Two Seater Sofa", "modern", None),
+            make_product(2, "Round Coffee Table", None, None),
+        ]
+        attributes = [
+            (1, "material_primary", "Velvet"),
+            (1, "material_primary", "Linen"),
+            (1, "color_primary", "Navy"),
+        ]
+        return StubSession(products, attributes)
+
+    @pytest.mark.asyncio
+    async def test_one_read_per_table_and_source_hash(self, session):
+        rows = {row["product_id"]: row for row in await compute_product_features([1, 2], session)}
+
+        assert session.selects == ["products", "product_attributes"]
+        assert rows[1]["product_type"] == "2-seater"
+        assert rows[1]["material"] == "velvet"  # First row per attribute name wins
+        assert rows[1]["color"] == "navy"
+        assert rows[1]["source_hash"] == source_hash(
+            "Two Seater Sofa", "modern", None, [(name, value) for _, name, value in session.rows["product_attributes"]]
+        )
+        assert rows[2]["product_type"] == "round"
+        assert rows[2]["source_hash"] == source_hash("Round Coffee Table", None, None, [])
+
+    @pytest.mark.asyncio
+    async def test_rebuild_is_one_upsert(self, session):
+        written = await rebuild_product_features([1, 2], session)
+
+        assert written == 2
+        assert len(session.statements) == 1
+        assert session.commits == 1
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        assert "INSERT INTO product_features" in sql
+        assert "ON CONFLICT (product_id) DO UPDATE" in sql
+
+    @pytest.mark.asyncio
+    async def test_empty_ids_touch_nothing(self, session):
+        assert await rebuild_product_features([], session) == 0
+        assert session.selects == []
+        assert session.commits == 0
+
+    def test_stale_query_compares_version_and_source_hash(self):
+        sql = str(stale_product_ids_query(limit=10).compile(dialect=postgresql.dialect()))
+
+        assert "product_features.product_id IS NULL" in sql
+        assert "product_features.features_version !=" in sql
+        assert "product_features.source_hash IS DISTINCT FROM md5(concat_ws(" in sql
+        assert 'ORDER BY product_attributes.attribute_name COLLATE "C"' in sql
+        # Timestamps are not inputs: a re-crawl that only bumps them keeps the row fresh
+        assert "last_updated" not in sql
+        assert "LIMIT" in sql
+
+
+class TestRankingWithFeatures:
+    """rank_products(features=...) scores products from their precomputed rows."""
+
+    def test_features_match_attribute_based_ranking(self):
+        products, rows, attributed = [], {}, []
+        specs = [
+            ("Three Seater Sofa", "oak", "grey", "modern", "boho"),
+            ("L Shaped Sofa", "velvet", "navy", "boho", None),
+            ("2 seater sofa", "wood", "beige", None, None),
+            ("Sofa", None, None, "minimalist", "modern"),
+        ]
+        for i, (name, material, color, primary, secondary) in enumerate(specs, 1):
+            product = SimpleNamespace(id=i, name=name, category_id=1, price=None, primary_style=None, secondary_style=None)
+            features = derive_product_features(
+                make_product(i, name, primary, secondary),
+                {"material_primary": material, "color_primary": color} if material else {},
+            )
+            products.append(product)
+            rows[i] = SimpleNamespace(**features)
+            attributed.append(
+                SimpleNamespace(
+                    id=i,
+                    category_id=1,
+                    price=None,
+                    type=features["product_type"],
+                    capacity=features["capacity"],
+                    material_primary=material,
+                    color_primary=color,
+                    primary_style=primary,
+                    secondary_style=secondary,
+                )
+            )
+
+        service = RankingService()
+        preferences = dict(
+            user_type="3-seater",
+            user_capacity=3,
+            user_primary_style="boho",
+            user_secondary_style="modern",
+            user_materials=["wood"],
+            user_color="grey",
+        )
+        vector_scores = {1: 0.4, 2: 0.6, 3: 0.5, 4: 0.1}
+
+        with_features = service.rank_products(products, vector_scores, features=rows, **preferences)
+        reference = service._rank_products_rowwise(attributed, vector_scores, **preferences)
+
+        assert [(rp.product.id, rp.breakdown) for rp in with_features] == [(rp.product.id, rp.breakdown) for rp in reference]
+        # Without rows the same products have no attributes to match on
+        without = service.rank_products(products, vector_scores, **preferences)
+        assert all(rp.breakdown["material_color"] == 0.5 for rp in without)
@@ -0,0 +1,160 @@
+"""
+Tests for precomputed product neighbour lists (services/product_neighbours.py).
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_index import EmbeddingIndex
+from services.product_neighbours import (
+    NEIGHBOURS_VERSION,
+    compute_neighbours,
+    lists_entered,
+    price_band_mask,
+    rebuild_product_neighbours,
+    stale_product_ids_query,
+)
+from sqlalchemy.dialects import postgresql
+
+DIM = 16
+
+
+def _rows(n, seed=0, start_id=1):
+    rng = np.random.default_rng(seed)
+    return [
+        (
+            start_id + i,
+            rng.normal(size=DIM).astype(np.float32),
+            (i % 3) + 1 if i % 17 else None,
+            "storea",
+            None if i % 11 == 0 else float(rng.choice([500, 1000, 2000, 5000, 20000])),
+            i % 9 != 0,
+        )
+        for i in range(n)
+    ]
+
+
+def _index(rows):
+    index = EmbeddingIndex(dimension=DIM)
+    index.upsert_rows(rows)
+    return index
+
+
+def _brute_force(rows, product_id, limit, price_band=2.0):
+    by_id = {row[0]: row for row in rows}
+    _, vector, category, _, price, _ = by_id[product_id]
+    if category is None:
+        return [], 0
+    q = vector / np.linalg.norm(vector)
+    scored = []
+    for pid, vec, cat, _, cand_price, available in rows:
+        if pid == product_id or cat != category or not available:
+            continue
+        in_band = price is None or (cand_price is not None and price / price_band <= cand_price <= price * price_band)
+        scored.append((not in_band, -float(vec @ q / np.linalg.norm(vec)), pid))
+    scored.sort()
+    top = scored[:limit]
+    return [pid for _, _, pid in top], sum(1 for out, _, _ in top if not out)
+
+
+class TestComputeNeighbours:
+    @pytest.fixture
+    def rows(self):
+        return _rows(150)
+
+    def test_matches_brute_force(self, rows, monkeypatch):
+        monkeypatch.setattr("services.product_neighbours.BLOCK_ROWS", 7)
+        index = _index(rows)
+        neighbours = compute_neighbours(index, [row[0] for row in rows], limit=10)
+
+        assert set(neighbours) == {row[0] for row in rows}
+        for product_id, entry in neighbours.items():
+            expected_ids, expected_in_band = _brute_force(rows, product_id, 10)
+            assert entry.product_ids == expected_ids
+            assert entry.in_band_count == expected_in_band
+            assert entry.scores[: entry.in_band_count] == sorted(entry.scores[: entry.in_band_count], reverse=True)
+
+    def test_uncategorized_and_unknown_products(self, rows):
+        index = _index(rows)
+        uncategorized = next(row[0] for row in rows if row[2] is None)
+
+        neighbours = compute_neighbours(index, [uncategorized, 99999])
+
+        assert neighbours == {uncategorized: ([], [], 0)}
+
+    def test_price_band_mask(self):
+        mask = price_band_mask(np.array([1000.0, np.nan]), np.array([400.0, 600.0, 2000.0, 2100.0, np.nan]), 2.0)
+
+        assert mask[:, 0].tolist() == [False, True, True, False, False]
+        assert mask[:, 1].all()
+
+
+class TestIncrementalRefresh:
+    def test_affected_lists_recompute_to_the_full_rebuild(self):
+        """Adding products and recomputing only the affected lists gives the same lists as recomputing all."""
+        rows = _rows(120)
+        added = _rows(6, seed=1, start_id=1000)
+        index = _index(rows)
+        stored = compute_neighbours(index, [row[0] for row in rows], limit=8)
+
+        index.upsert_rows(added)
+        changed = [row[0] for row in added]
+        entered = lists_entered(
+            index, changed, {pid: (entry.scores, entry.in_band_count) for pid, entry in stored.items()}, limit=8
+        )
+        affected = (
+            set(changed) | set(entered) | {pid for pid, entry in stored.items() if set(entry.product_ids) & set(changed)}
+        )
+        stored.update(compute_neighbours(index, affected, limit=8))
+
+        full = compute_neighbours(index, index.product_ids.tolist(), limit=8)
+        assert stored == full
+        assert len(affected) < len(full)
+
+
+class StubSession:
+    """Records DML statements."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return MagicMock()
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestRebuild:
+    @pytest.mark.asyncio
+    async def test_upserts_lists_and_deletes_rows_without_embedding(self):
+        rows = _rows(30)
+        session = StubSession()
+
+        written = await rebuild_product_neighbours(_index(rows), [1, 2, 99999], session, datetime(2026, 2, 15))
+
+        assert written == 2
+        assert session.commits == 1
+        sql = [str(statement.compile(dialect=postgresql.dialect())) for statement in session.statements]
+        assert sql[0].startswith("DELETE FROM product_neighbours")
+        assert "INSERT INTO product_neighbours" in sql[1]
+        assert "ON CONFLICT (product_id) DO UPDATE" in sql[1]
+        assert session.statements[1].compile().params["neighbours_version_m0"] == NEIGHBOURS_VERSION
+
+    def test_stale_query_covers_every_staleness_source(self):
+        sql = str(stale_product_ids_query(limit=10).compile(dialect=postgresql.dialect()))
+
+        assert "product_neighbours.product_id IS NULL" in sql
+        assert "product_neighbours.neighbours_version !=" in sql
+        assert "products.embedding_updated_at > product_neighbours.computed_at" in sql
+        assert "products.category_id IS DISTINCT FROM product_neighbours.category_id" in sql
+        assert "LIMIT" in sql
@@ -0,0 +1,146 @@
+"""
+Tests for the compiled query analyzer (services/query_analyzer.py) and the search_service wrappers.
+"""
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.query_analyzer import PhraseTrie, QueryAnalyzer
+from services.search_service import (
+    KEYWORD_CATEGORIES,
+    SEARCH_EXCLUSIONS,
+    SEARCH_SYNONYMS,
+    analyze_query,
+    expand_search_query_grouped,
+    get_exclusion_terms,
+    get_query_analyzer,
+    normalize_singular_plural,
+)
+
+
+@pytest.fixture
+def analyzer():
+    return QueryAnalyzer(SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES, normalize_singular_plural)
+
+
+class TestPhraseTrie:
+    def test_matches_every_whole_word_occurrence(self):
+        rng = random.Random(7)
+        vocabulary = ["a", "b", "c"]
+        for _ in range(200):
+            phrases = list({" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3))) for _ in range(5)})
+            words = [rng.choice(vocabulary) for _ in range(10)]
+
+            expected = sorted(
+                (start, phrase)
+                for phrase in phrases
+                for start in range(len(words))
+                if words[start : start + len(phrase.split())] == phrase.split()
+            )
+            assert sorted(PhraseTrie(phrases).matches(words)) == expected
+
+    def test_no_phrases(self):
+        assert list(PhraseTrie([]).matches(["anything"])) == []
+
+
+class TestGroups:
+    def test_single_word_keys_and_inflections(self, analyzer):
+        for key, synonyms in SEARCH_SYNONYMS.items():
+            if " " not in key:
+                assert analyzer.analyze(key).groups == (tuple(synonyms),)
+        # Keys are matched case-insensitively; a word that is not a key becomes its singular/plural forms
+        assert analyzer.analyze("Drapes").groups == (tuple(SEARCH_SYNONYMS["drapes"]),)
+        assert set(analyzer.analyze("mirrors").groups[0]) == {"mirrors", "mirror"}
+
+    def test_multi_word_one_group_per_word(self, analyzer):
+        groups = analyzer.analyze("L-shaped sofa").groups
+
+        assert groups == (tuple(SEARCH_SYNONYMS["l-shaped"]), tuple(SEARCH_SYNONYMS["sofa"]))
+
+    def test_multi_word_synonym_keys_form_one_group(self, analyzer):
+        groups = analyzer.analyze("oak chest of drawers").groups
+
+        assert groups[1:] == (tuple(SEARCH_SYNONYMS["chest of drawers"]),)
+        assert set(groups[0]) == {"oak", "oaks"}
+
+    def test_longest_phrase_wins(self, analyzer):
+        assert analyzer.analyze("bedside tables").groups == (tuple(SEARCH_SYNONYMS["bedside tables"]),)
+        assert analyzer.analyze("wall art decor").groups[0] == tuple(SEARCH_SYNONYMS["wall art"])
+
+    def test_phrases_match_whole_words_only(self, analyzer):
+        # "drywall art" must not match "wall art"
+        groups = analyzer.analyze("drywall art").groups
+
+        assert len(groups) == 2
+        assert groups[1] == tuple(SEARCH_SYNONYMS["art"])
+
+    def test_empty_query(self, analyzer):
+        assert analyzer.analyze("   ").groups == ()
+
+
+class TestExclusionsAndCategory:
+    def test_exact_and_substring_exclusion_keys(self, analyzer):
+        assert analyzer.analyze("Coffee Table").exclusions == tuple(SEARCH_EXCLUSIONS["coffee table"])
+        assert analyzer.analyze("round coffee tables").exclusions == tuple(SEARCH_EXCLUSIONS["coffee table"])
+        assert analyzer.analyze("sofa").exclusions == ()
+
+    def test_first_key_in_dictionary_order_wins(self, analyzer):
+        # An exact key wins; otherwise "side table" (listed before "bedside table") does
+        assert analyzer.analyze("bedside table").exclusions == tuple(SEARCH_EXCLUSIONS["bedside table"])
+        assert analyzer.analyze("white bedside table lamp").exclusions == tuple(SEARCH_EXCLUSIONS["side table"])
+
+    def test_excludes_is_case_insensitive_substring(self, analyzer):
+        analysis = analyzer.analyze("center table")
+
+        assert analysis.excludes("Sheesham DINING Table")
+        assert analysis.excludes("Oak Side Tables (set of 2)")
+        assert not analysis.excludes("Round Center Table")
+        assert not analyzer.analyze("sofa").excludes("Dining sofa")
+
+    def test_category_prefers_longest_keyword(self, analyzer):
+        assert analyzer.analyze("walnut coffee table").category == "center_tables"
+        assert analyzer.analyze("velvet sofa chair").category == "chairs"
+        assert analyzer.analyze("grey sofa").category == "sofas"
+        assert analyzer.analyze("blue velvet").category is None
+
+    def test_keyword_category(self, analyzer):
+        assert analyzer.keyword_category("Floor Lamp") == "portable_lighting"
+        assert analyzer.keyword_category("lamp") == "general_lighting"
+        assert analyzer.keyword_category("spaceship") is None
+
+
+class TestCache:
+    def test_repeated_queries_hit_the_lru(self, analyzer):
+        first = analyzer.analyze("Velvet Sofa")
+        second = analyzer.analyze("  velvet sofa ")
+
+        assert first is second
+        assert analyzer.stats()["hits"] == 1
+        assert analyzer.stats()["misses"] == 1
+
+    def test_lru_is_bounded(self):
+        analyzer = QueryAnalyzer(
+            SEARCH_SYNONYMS, SEARCH_EXCLUSIONS, KEYWORD_CATEGORIES, normalize_singular_plural, cache_size=2
+        )
+        for query in ("sofa", "rug", "lamp"):
+            analyzer.analyze(query)
+
+        assert analyzer.stats()["entries"] == 2
+
+
+class TestSearchServiceWrappers:
+    def test_wrappers_return_fresh_lists(self):
+        groups = expand_search_query_grouped("sofa")
+        groups[0].append("mutated")
+
+        assert "mutated" not in expand_search_query_grouped("sofa")[0]
+        assert get_exclusion_terms("centre table") == SEARCH_EXCLUSIONS["centre table"]
+
+    def test_shared_singleton(self):
+        assert get_query_analyzer() is get_query_analyzer()
+        assert analyze_query("Rug").groups == (tuple(SEARCH_SYNONYMS["rug"]),)
@@ -756,6 +756,126 @@ class TestRankingService:
             assert rp.final_score == pytest.approx(expected_score, abs=0.001)
 
 
+# =========================================================================
+# PARITY TESTS - Columnar rank_products vs the row-wise reference
+# =========================================================================
+
+@dataclass
+class PricedProduct(MockProduct):
+    """Mock product with price, binary embedding and alternate attribute names."""
+    price: Optional[object] = None
+    embedding_vector: Optional[bytes] = None
+    product_type: Optional[str] = None
+    seating_capacity: Optional[int] = None
+
+
+class TestColumnarParity:
+    """rank_products must reproduce _rank_products_rowwise exactly (text intent to float rounding)."""
+
+    STYLES = [None, "modern", "Minimalist", "boho", "scandinavian", "industrial"]
+    MATERIALS = [None, "oak", "Wood", "velvet", "steel", "marble", "rattan", "cane", "leather"]
+    COLORS = [None, "brown", "Grey", "navy", "beige", "white", "olive", "rust"]
+    TYPES = [None, "3-seater", "2-Seater", "sectional", "l-shaped", "round", "queen", ""]
+    PRICES = [None, 0, 15000, 48000.5, "52000", "n/a", 90000, 120000]
+    CAPACITIES = [None, 2, 3, "4", "many", 6]
+
+    @pytest.fixture
+    def catalog(self):
+        import json
+
+        import numpy as np
+        from services.embedding_codec import encode_embedding
+
+        rng = np.random.default_rng(7)
+        products = []
+        for i in range(400):
+            vector = rng.normal(size=16)
+            kind = i % 5
+            products.append(PricedProduct(
+                id=i + 1,
+                name=f"Product {i}",
+                category_id=int(rng.integers(1, 4)),
+                primary_style=self.STYLES[rng.integers(len(self.STYLES))],
+                secondary_style=self.STYLES[rng.integers(len(self.STYLES))],
+                material_primary=self.MATERIALS[rng.integers(len(self.MATERIALS))],
+                color_primary=self.COLORS[rng.integers(len(self.COLORS))],
+                type=self.TYPES[rng.integers(len(self.TYPES))] if i % 2 else None,
+                product_type=self.TYPES[rng.integers(len(self.TYPES))],
+                capacity=self.CAPACITIES[rng.integers(len(self.CAPACITIES))] if i % 3 else None,
+                seating_capacity=3 if i % 7 == 0 else None,
+                price=self.PRICES[rng.integers(len(self.PRICES))],
+                embedding_vector=encode_embedding(vector) if kind in (0, 1) else None,
+                embedding=json.dumps(vector.tolist()) if kind == 2 else (json.dumps([0.0] * 16) if kind == 3 else None),
+            ))
+        # Wrong-dimension embedding scores 0.0 like the row-wise cosine
+        products[4].embedding_vector = encode_embedding(rng.normal(size=8))
+        return products
+
+    @pytest.fixture
+    def vector_scores(self, catalog):
+        return {p.id: (p.id % 17) / 17 for p in catalog if p.id % 9}
+
+    @pytest.mark.parametrize("preferences", [
+        {},
+        {"user_category": 2, "user_primary_style": "Modern"},
+        {"user_category": "1", "user_type": "3-seater", "user_capacity": 3},
+        {"user_primary_style": "boho", "user_secondary_style": "Minimalist", "user_color": "grey"},
+        {"user_materials": ["wood", "Velvet"], "user_color": "Brown", "user_budget_max": 50000},
+        {"user_type": "Sectional", "user_capacity": "4", "user_budget_max": "60000.0"},
+        {"user_category": 3, "user_type": "queen", "user_capacity": 2, "user_primary_style": "industrial",
+         "user_secondary_style": "modern", "user_materials": ["cane"], "user_color": "olive",
+         "user_budget_max": 30000},
+    ])
+    @pytest.mark.parametrize("with_query", [False, True])
+    def test_matches_rowwise_reference(self, catalog, vector_scores, preferences, with_query):
+        import numpy as np
+
+        service = RankingService()
+        query = np.random.default_rng(11).normal(size=16).tolist() if with_query else None
+
+        columnar = service.rank_products(catalog, vector_scores, query_embedding=query, **preferences)
+        rowwise = service._rank_products_rowwise(catalog, vector_scores, query_embedding=query, **preferences)
+
+        expected = {rp.product.id: rp for rp in rowwise}
+        assert len(columnar) == len(rowwise)
+        for rp in columnar:
+            reference = expected[rp.product.id]
+            assert rp.breakdown.keys() == reference.breakdown.keys()
+            for key, value in rp.breakdown.items():
+                if key == "text_intent":
+                    assert value == pytest.approx(reference.breakdown[key], abs=1e-4)
+                else:
+                    assert value == reference.breakdown[key], key
+            assert rp.final_score == pytest.approx(reference.final_score, abs=1e-4)
+
+        assert [rp.final_score for rp in columnar] == pytest.approx([rp.final_score for rp in rowwise], abs=1e-4)
+        if not with_query:
+            assert [rp.product.id for rp in columnar] == [rp.product.id for rp in rowwise]
+
+    def test_family_masks_match_string_lookups(self):
+        service = RankingService()
+        materials = sorted(
+            {m for members in service.MATERIAL_FAMILIES.values() for m in members}
+            | set(service.MATERIAL_FAMILIES) | {"plastic", "Oak", ""}
+        )
+        for preferences in (["wood"], ["oak"], ["bamboo", "velvet"], ["rattan"], ["Glass"], ["plastic", "cane"]):
+            packed = [
+                (pref.lower(), service._MATERIAL_FAMILY_BITS.get(pref.lower(), 0), service.material_family_mask(pref))
+                for pref in preferences
+            ]
+            for material in materials + [None]:
+                expected = service._compute_material_match(material, preferences)
+                assert service._material_mask_match(material.lower() if material else None, None, packed) == expected
+
+        colors = sorted({c for members in service.COLOR_FAMILIES.values() for c in members} | {"chartreuse", "Grey", ""})
+        for user_color in ("grey", "Navy", "walnut", "chartreuse"):
+            user_family = service.color_family_mask(user_color).bit_length()
+            for color in colors + [None]:
+                expected = service._compute_color_match(color, user_color)
+                lowered = color.lower() if color else None
+                assert service._color_mask_match(lowered, None, user_color.lower(), user_family) == expected
+
+
 # =========================================================================
 # INTEGRATION TESTS - Real-world Search Scenarios
 # =========================================================================
@@ -0,0 +1,117 @@
+"""
+Tests for the attribute prefetch of the content-based recommendation scoring
+(AdvancedRecommendationEngine._content_based_filtering).
+"""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.recommendation_engine import AdvancedRecommendationEngine, RecommendationRequest
+from sqlalchemy.dialects import postgresql
+
+from database.models import Product
+
+
+class CountingSession:
+    """Answers every query with the given (product_id, attribute_name, attribute_value) rows and counts queries."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        result = MagicMock()
+        result.all.return_value = self.rows
+        return result
+
+
+def _attribute_rows(product_ids):
+    rows = []
+    for product_id in product_ids:
+        rows += [
+            (product_id, "color_primary", "Navy" if product_id % 2 else "Beige"),
+            (product_id, "material_primary", "Oak Wood"),
+            (product_id, "width", "60"),
+            (product_id, "texture", "Smooth"),
+        ]
+    return rows
+
+
+def _candidates(n):
+    return [Product(id=product_id, name=f"Cabinet {product_id}", description=None) for product_id in range(1, n + 1)]
+
+
+def _request():
+    return RecommendationRequest(
+        user_colors=["blue"],
+        user_materials=["wood"],
+        user_textures=["smooth"],
+        user_patterns=["striped"],
+        user_dimensions={"room_width": 300},
+    )
+
+
+class TestAttributePrefetch:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("n", [3, 300])
+    async def test_one_query_regardless_of_candidate_count(self, n):
+        engine = AdvancedRecommendationEngine()
+        session = CountingSession(_attribute_rows(range(1, n + 1)))
+
+        scores = await engine._content_based_filtering(_candidates(n), _request(), session)
+
+        assert len(session.statements) == 1
+        assert len(scores) == n
+        sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+        assert "FROM product_attributes" in sql
+        assert "product_attributes.product_id IN" in sql
+
+    @pytest.mark.asyncio
+    async def test_scores_from_prefetched_attributes(self):
+        engine = AdvancedRecommendationEngine()
+        rows = _attribute_rows([1, 2]) + [(2, "pattern", "Striped"), (3, "color_primary", "red")]
+        session = CountingSession(rows)
+
+        scores = await engine._content_based_filtering(_candidates(3), _request(), session)
+
+        # 1: navy is in the blue family (0.5), wood contained in oak wood (0.7), fits (1.0), texture (1.0), no pattern (0.5)
+        assert scores[1] == pytest.approx(0.5 * 0.15 + 0.7 * 0.15 + 1.0 * 0.10 + 1.0 * 0.05 + 0.5 * 0.05)
+        # 2: beige misses blue (0.0), pattern matches (1.0)
+        assert scores[2] == pytest.approx(0.7 * 0.15 + 1.0 * 0.10 + 1.0 * 0.05 + 1.0 * 0.05)
+        # 3: no material (0.0), no dimensions (0.8), no texture/pattern (0.5)
+        assert scores[3] == pytest.approx(0.8 * 0.10 + 0.5 * 0.05 + 0.5 * 0.05)
+
+    @pytest.mark.asyncio
+    async def test_only_requested_attributes_are_fetched(self):
+        engine = AdvancedRecommendationEngine()
+        session = CountingSession([])
+
+        await engine._content_based_filtering(_candidates(5), RecommendationRequest(user_textures=["soft"]), session)
+        await engine._content_based_filtering(_candidates(5), RecommendationRequest(product_keywords=["cabinet"]), session)
+
+        assert len(session.statements) == 1
+        params = session.statements[0].compile().params
+        assert params["attribute_name_1"] == ["texture"]
+
+    @pytest.mark.asyncio
+    async def test_failed_prefetch_scores_neutral(self):
+        engine = AdvancedRecommendationEngine()
+        session = CountingSession([])
+
+        async def failing_execute(statement, params=None):
+            session.statements.append(statement)
+            raise RuntimeError("connection lost")
+
+        session.execute = failing_execute
+
+        scores = await engine._content_based_filtering(_candidates(4), _request(), session)
+
+        assert len(session.statements) == 1
+        neutral = 0.5 * 0.15 + 0.5 * 0.15 + 0.8 * 0.10 + 0.5 * 0.05 + 0.5 * 0.05
+        assert list(scores.values()) == pytest.approx([neutral] * 4)
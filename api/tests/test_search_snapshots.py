@@ -0,0 +1,186 @@
+"""
+Tests for cursor-addressed search result snapshots (services/search_snapshots.py).
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.hybrid_search import HybridCandidates
+from services.search_snapshots import SNAPSHOT_OVERHEAD_BYTES, SearchSnapshotStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(clock):
+    return SearchSnapshotStore(ttl_seconds=60, max_entries=3, max_bytes=1024 * 1024, clock=clock)
+
+
+class TestSearchSnapshotStore:
+    def test_round_trip_and_pages(self, store):
+        fingerprint = store.fingerprint(query="sofa", page_size=20)
+        snapshot = store.put(fingerprint, [5, 3, 9, 1], scores=[0.9, None, 0.5, None], primary=[True, True, False, False])
+
+        assert store.get(snapshot.cursor, fingerprint) is snapshot
+        assert snapshot.page(1, 2) == [(3, None, True), (9, pytest.approx(0.5), False)]
+        assert snapshot.page(10, 5) == []
+        assert snapshot.position(9) == 2
+        assert snapshot.position(42) is None
+        assert store.stats()["hits"] == 1
+
+    def test_fingerprint_binds_cursor_to_request(self, store):
+        snapshot = store.put(store.fingerprint(query="sofa"), [1, 2])
+
+        assert store.fingerprint(query="sofa", category_id=None) != store.fingerprint(query="sofa")
+        assert store.get(snapshot.cursor, store.fingerprint(query="chair")) is None
+        assert store.get("unknown", store.fingerprint(query="sofa")) is None
+        assert store.get(None, store.fingerprint(query="sofa")) is None  # First pages are not lookups
+        stats = store.stats()
+        assert stats["fingerprint_mismatches"] == 1
+        assert stats["misses"] == 2
+        assert stats["lookups"] == 2
+
+    def test_ttl_expiry(self, store, clock):
+        snapshot = store.put("fp", [1, 2, 3])
+        clock.now += 59
+        assert store.get(snapshot.cursor, "fp") is snapshot
+        clock.now += 2
+        assert store.get(snapshot.cursor, "fp") is None
+        assert len(store) == 0
+        assert store.stats()["expired"] == 1
+
+    def test_lru_eviction_by_entry_count(self, store):
+        first = store.put("fp", [1])
+        second = store.put("fp", [2])
+        store.put("fp", [3])
+        store.get(first.cursor, "fp")  # first becomes most recently used
+        store.put("fp", [4])
+
+        assert store.get(second.cursor, "fp") is None
+        assert store.get(first.cursor, "fp") is first
+        assert len(store) == 3
+        assert store.stats()["evicted_lru"] == 1
+
+    def test_memory_cap(self, clock):
+        per_snapshot = 1000 * (8 + 4 + 1) + SNAPSHOT_OVERHEAD_BYTES
+        store = SearchSnapshotStore(ttl_seconds=60, max_entries=100, max_bytes=2 * per_snapshot + 10, clock=clock)
+        snapshots = [store.put("fp", np.arange(1000)) for _ in range(3)]
+
+        assert snapshots[0].nbytes == per_snapshot
+        assert len(store) == 2
+        assert store.get(snapshots[0].cursor, "fp") is None
+        stats = store.stats()
+        assert stats["evicted_memory"] == 1
+        assert stats["memory_mb"] == round(2 * per_snapshot / (1024 * 1024), 2)
+
+        too_large = store.put("fp", np.arange(100000))
+        assert too_large.cursor is None
+        assert len(too_large) == 100000  # Still usable for the current request
+        assert store.stats()["rejected_too_large"] == 1
+        assert len(store) == 2
+
+
+class TestProductSearchPagination:
+    """/products/search runs retrieval once; later pages slice the snapshot."""
+
+    @pytest.mark.asyncio
+    async def test_second_page_reuses_snapshot(self, store):
+        from routers import products as products_router
+
+        candidates = HybridCandidates(
+            ordered_ids=[10, 11, 12],
+            semantic_scores={10: 0.8},
+            names={10: "Oak Sofa", 11: "Sofa Bed", 12: "Lamp"},
+            search_groups=[["sofa"]],
+        )
+        retrieve = AsyncMock(return_value=candidates)
+
+        async def hydrate(product_ids, db):
+            return [MagicMock(id=product_id) for product_id in product_ids]
+
+        with patch.object(products_router, "hybrid_candidates", retrieve), patch.object(
+            products_router, "hydrate_products", side_effect=hydrate
+        ), patch.object(products_router, "get_search_snapshot_store", return_value=store), patch.object(
+            products_router, "_format_product", side_effect=lambda p: {"id": p.id}
+        ):
+            params = dict(
+                query="sofa",
+                category_id=None,
+                source_website=None,
+                min_price=None,
+                max_price=None,
+                colors=None,
+                styles=None,
+                materials=None,
+                page_size=2,
+                collapse_duplicates=False,
+                db=SimpleNamespace(),
+            )
+            first = await products_router.search_products(page=1, cursor=None, **params)
+            second = await products_router.search_products(page=2, cursor=first["cursor"], **params)
+
+        assert retrieve.await_count == 1
+        assert [p["id"] for p in first["products"]] == [10, 11]
+        assert [p["id"] for p in second["products"]] == [12]
+        assert first["products"][0]["similarity_score"] == 0.8
+        assert second["products"][0]["is_primary_match"] is False
+        assert (second["total"], second["total_primary"], second["total_related"]) == (3, 2, 1)
+        assert first["has_more"] and not second["has_more"]
+
+    @pytest.mark.asyncio
+    async def test_collapse_duplicates_keeps_best_ranked_listing(self, store):
+        from routers import products as products_router
+
+        candidates = HybridCandidates(
+            ordered_ids=[10, 11, 12, 13],
+            semantic_scores={10: 0.8, 12: 0.7},
+            names={10: "Oak Sofa", 11: "Sofa Bed", 12: "OAK SOFA", 13: "Lamp"},
+            search_groups=[["sofa"]],
+        )
+
+        async def hydrate(product_ids, db):
+            return [MagicMock(id=product_id) for product_id in product_ids]
+
+        with patch.object(products_router, "hybrid_candidates", AsyncMock(return_value=candidates)), patch.object(
+            products_router, "hydrate_products", side_effect=hydrate
+        ), patch.object(products_router, "get_search_snapshot_store", return_value=store), patch.object(
+            products_router, "load_cluster_ids", AsyncMock(return_value={10: 10, 12: 10})
+        ), patch.object(
+            products_router, "_format_product", side_effect=lambda p: {"id": p.id}
+        ):
+            result = await products_router.search_products(
+                query="sofa",
+                category_id=None,
+                source_website=None,
+                min_price=None,
+                max_price=None,
+                colors=None,
+                styles=None,
+                materials=None,
+                page=1,
+                page_size=10,
+                cursor=None,
+                collapse_duplicates=True,
+                db=SimpleNamespace(),
+            )
+
+        assert [p["id"] for p in result["products"]] == [10, 11, 13]
+        assert result["total"] == 3
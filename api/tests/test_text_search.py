@@ -0,0 +1,93 @@
+"""
+Tests for the full-text keyword conditions (products.search_vector).
+
+The EXPLAIN tests seed a throwaway schema and need a PostgreSQL server with
+pg_trgm: set TEST_DATABASE_URL (sync URL, e.g. postgresql://localhost/omnishop_test).
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.search_service import (
+    build_keyword_conditions,
+    name_matches_any,
+    text_search_condition,
+    tsquery_any,
+    tsquery_phrase,
+)
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from database.models import Product
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def compile_clause(clause):
+    # No literal_binds: SQLAlchemy 2.1 has no literal renderer for the REGCONFIG argument of to_tsquery
+    return clause.compile(dialect=postgresql.dialect())
+
+
+def compile_sql(clause) -> str:
+    return str(compile_clause(clause))
+
+
+def tsquery_of(where_clause) -> str:
+    """The to_tsquery text of a keyword condition (its config is checked to be 'simple')."""
+    compiled = compile_clause(where_clause)
+    config, tsquery = compiled.params.values()
+    assert config == "simple"
+    return tsquery
+
+
+class TestTsqueryBuilders:
+    def test_phrase_words_in_order_with_weight(self):
+        assert tsquery_phrase("Coffee Table", "A") == "'coffee':A <-> 'table':A"
+        assert tsquery_phrase("sofa") == "'sofa'"
+
+    def test_phrase_drops_punctuation_and_operators(self):
+        assert tsquery_phrase("L-Shaped", "A") == "'l':A <-> 'shaped':A"
+        assert tsquery_phrase("it's & | ! (x)") == "'it' <-> 's' <-> 'x'"
+        assert tsquery_phrase(" - ") == ""
+
+    def test_any_builds_one_phrase_per_weight_and_deduplicates(self):
+        query = tsquery_any(["l-shaped", "l shaped", "corner"], "AB")
+
+        assert query == "('l':A <-> 'shaped':A) | ('l':B <-> 'shaped':B) | ('corner':A) | ('corner':B)"
+
+    def test_empty_query_matches_nothing(self):
+        assert compile_sql(text_search_condition("")) == "false"
+        assert compile_sql(name_matches_any(["--"])) == "false"
+
+
+class TestKeywordConditions:
+    def test_single_full_text_condition(self):
+        where_clause, groups = build_keyword_conditions("coffee table")
+        sql = compile_sql(where_clause)
+
+        assert groups
+        assert sql.startswith("products.search_vector @@ to_tsquery(")
+        assert "~*" not in sql
+        assert sql.count("@@") == 1
+        assert "'coffee':A" in tsquery_of(where_clause)
+
+    def test_groups_and_on_name_or_phrase_on_brand_and_description(self):
+        where_clause, groups = build_keyword_conditions("velvet sofa")
+        tsquery = tsquery_of(where_clause)
+
+        assert len(groups) == 2
+        assert ") & (" in tsquery
+        assert "'velvet':B <-> 'sofa':B" in tsquery
+        assert "'velvet':C <-> 'sofa':C" in tsquery
+
+    def test_broad_terms_skip_description(self):
+        tsquery = tsquery_of(build_keyword_conditions("decor")[0])
+
+        assert ":B" in tsquery
+        assert ":C" not in tsquery
\ No newline at end of file
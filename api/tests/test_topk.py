@@ -0,0 +1,155 @@
+"""
+Tests for the streaming top-k engine and the chunked DB-scan semantic search.
+"""
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.embedding_codec import encode_embedding
+from services.topk import StreamingTopK, iter_chunks
+
+
+def full_sort(ids, scores, k, min_score=None):
+    """Reference: stable descending sort of everything, cut to k."""
+    order = np.argsort(-scores, kind="stable")
+    pairs = [(int(ids[i]), float(scores[i])) for i in order if min_score is None or scores[i] >= min_score]
+    return pairs[:k]
+
+
+class TestStreamingTopK:
+    @pytest.mark.parametrize("k", [1, 5, 20, 200, 1000, 5000])
+    @pytest.mark.parametrize("chunk_size", [1, 64, 1000, 10000])
+    def test_matches_full_sort(self, k, chunk_size):
+        rng = np.random.default_rng(k + chunk_size)
+        ids = np.arange(1000, 4000, dtype=np.int64)
+        # Rounded scores produce many ties, including at the cut
+        scores = np.round(rng.random(len(ids)), 2).astype(np.float32)
+
+        top = StreamingTopK(k)
+        for id_chunk, score_chunk in zip(iter_chunks(ids, chunk_size), iter_chunks(scores, chunk_size)):
+            top.push(id_chunk, score_chunk)
+
+        assert list(top) == full_sort(ids, scores, k)
+        assert len(top) == min(k, len(ids))
+        assert top.pushed == len(ids)
+
+    def test_min_score(self):
+        rng = np.random.default_rng(0)
+        ids = np.arange(500, dtype=np.int64)
+        scores = rng.random(500).astype(np.float32)
+
+        top = StreamingTopK(1000, min_score=0.75)
+        for id_chunk, score_chunk in zip(iter_chunks(ids, 33), iter_chunks(scores, 33)):
+            top.push(id_chunk, score_chunk)
+
+        assert list(top) == full_sort(ids, scores, 1000, min_score=0.75)
+        assert all(score >= 0.75 for _, score in top)
+
+    def test_threshold_tracks_kth_best(self):
+        top = StreamingTopK(3)
+        assert top.threshold is None
+        top.push(np.array([1, 2]), np.array([0.9, 0.1]))
+        assert top.threshold is None
+        top.push(np.array([3, 4]), np.array([0.5, 0.7]))
+        assert top.threshold == pytest.approx(0.5)
+        assert [pid for pid, _ in top] == [1, 4, 3]
+
+    def test_empty_and_zero_k(self):
+        assert StreamingTopK(10).to_dict() == {}
+        top = StreamingTopK(0)
+        top.push(np.array([1]), np.array([1.0]))
+        assert top.to_dict() == {}
+
+
+class StubStreamSession:
+    """AsyncSession stand-in whose stream() yields the rows in partitions."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.partition_sizes = []
+        self.execute = AsyncMock(side_effect=AssertionError("DB-scan path must stream, not execute"))
+
+    async def stream(self, statement):
+        rows, sizes = self.rows, self.partition_sizes
+
+        class Result:
+            async def partitions(self, size):
+                for start in range(0, len(rows), size):
+                    sizes.append(len(rows[start : start + size]))
+                    yield rows[start : start + size]
+
+        return Result()
+
+
+class TestChunkedSemanticSearch:
+    DIM = 8
+
+    @pytest.fixture
+    def rows(self):
+        rng = np.random.default_rng(5)
+        rows = []
+        for pid in range(1, 301):
+            vector = rng.normal(size=self.DIM).astype(np.float32)
+            if pid % 10 == 0:
+                rows.append((pid, None, "[" + ",".join(str(v) for v in vector.tolist()) + "]"))  # Legacy JSON
+            else:
+                rows.append((pid, encode_embedding(vector), None))
+        rows.append((999, encode_embedding(np.ones(3, dtype=np.float32)), None))  # Wrong dimension: skipped
+        return rows
+
+    @pytest.fixture
+    def query(self):
+        return np.random.default_rng(6).normal(size=self.DIM).tolist()
+
+    def brute_force(self, rows, query, limit, min_score=None):
+        from services.embedding_codec import read_embedding
+
+        q = np.asarray(query, dtype=np.float64)
+        q = q / np.linalg.norm(q)
+        scored = []
+        for pid, vector, json_text in rows:
+            v = read_embedding(vector, json_text)
+            if v is None or v.shape != q.shape:
+                continue
+            score = float(v.astype(np.float64) @ q / np.linalg.norm(v))
+            if min_score is None or score >= min_score:
+                scored.append((pid, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    async def run_search(self, rows, query, **kwargs):
+        import services.search_service as search_service
+
+        embedding_service = MagicMock()
+        embedding_service.get_query_embedding = AsyncMock(return_value=query)
+        index = MagicMock(is_loaded=False)
+        session = StubStreamSession(rows)
+        with patch.object(search_service, "_get_embedding_service", return_value=embedding_service), patch.object(
+            search_service, "get_embedding_index", return_value=index
+        ), patch.object(search_service, "SCAN_CHUNK_SIZE", 64):
+            result = await search_service.semantic_search_products("sofa", session, **kwargs)
+        return result, session
+
+    @pytest.mark.asyncio
+    async def test_streams_in_chunks_and_matches_brute_force(self, rows, query):
+        result, session = await self.run_search(rows, query, limit=25)
+
+        expected = self.brute_force(rows, query, 25)
+        assert list(result) == [pid for pid, _ in expected]
+        for pid, score in expected:
+            assert result[pid] == pytest.approx(score, abs=1e-5)
+        assert session.partition_sizes == [64, 64, 64, 64, 45]
+        session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_min_score_and_large_limit(self, rows, query):
+        result, _ = await self.run_search(rows, query, limit=10000, min_score=0.3)
+
+        expected = self.brute_force(rows, query, 10000, min_score=0.3)
+        assert list(result) == [pid for pid, _ in expected]
@@ -123,6 +123,9 @@ class ProductItem(scrapy.Item):
     embedding_text = Field(
         output_processor=TakeFirst()
     )
+    embedding_hash = Field(
+        output_processor=TakeFirst()
+    )
 
     # Style classification
     primary_style = Field(
@@ -3,10 +3,14 @@ Scrapy pipelines for processing scraped data
 """
 import os
 import hashlib
+import json
 from urllib.parse import urlparse
 from datetime import datetime
+from types import SimpleNamespace
 from typing import Optional
 import logging
+import sys
+from pathlib import Path
 
 import scrapy
 from scrapy.pipelines.images import ImagesPipeline
@@ -16,10 +20,19 @@ from PIL import Image
 import requests
 
 from database.connection import get_db_session
-from database.models import Product, ProductImage, ProductAttribute, Category, ScrapingStatus
+from database.models import Product, ProductImage, ProductAttribute, ProductFeatures, Category, ScrapingStatus
 from config.settings import settings
+from api.services.embedding_codec import encode_embedding
+from api.services.product_classification import classify_product
 from .items import ProductItem, CategoryItem
 
+# api/ services import each other as services.* and config.* (both namespace packages with the root ones)
+API_DIR = str(Path(__file__).parent.parent / "api")
+if API_DIR not in sys.path:
+    sys.path.append(API_DIR)
+
+from services.product_features import build_product_features_row  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
 
@@ -298,8 +311,11 @@ class EmbeddingAndStylePipeline:
         self.google_ai_service = None
         self.items_processed = 0
         self.embeddings_generated = 0
+        self.embeddings_skipped = 0
         self.styles_classified = 0
         self.errors = 0
+        # source_website -> external_id -> stored embedding inputs (see _prefetch_embedding_state)
+        self.stored_state = {}
 
     def open_spider(self, spider):
         """Initialize services"""
@@ -326,18 +342,7 @@ class EmbeddingAndStylePipeline:
         adapter = ItemAdapter(item)
         self.items_processed += 1
 
-        # Generate embedding
-        try:
-            embedding = self._generate_embedding(adapter)
-            if embedding:
-                adapter['embedding'] = embedding
-                adapter['embedding_text'] = self._build_embedding_text(adapter)
-                self.embeddings_generated += 1
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            self.errors += 1
-
-        # Classify style
+        # Classify style first: the style is part of the embedding text
         try:
             primary_style, secondary_style, confidence = self._classify_style(adapter)
             if primary_style:
@@ -350,58 +355,105 @@ class EmbeddingAndStylePipeline:
             logger.error(f"Error classifying style: {e}")
             self.errors += 1
 
+        # Generate embedding (skipped when the stored one was built from the same text and model)
+        try:
+            if self.embedding_service:
+                stored = self._stored_embedding_state(adapter)
+                embedding_text = self._build_embedding_text(adapter, stored)
+                content_hash = self.embedding_service.embedding_content_hash(embedding_text)
+                if stored and content_hash == stored['embedding_hash']:
+                    self.embeddings_skipped += 1
+                elif embedding_text:
+                    embedding = self._generate_embedding(embedding_text)
+                    if embedding:
+                        adapter['embedding'] = embedding
+                        adapter['embedding_text'] = embedding_text
+                        adapter['embedding_hash'] = content_hash
+                        self.embeddings_generated += 1
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            self.errors += 1
+
         return item
 
-    def _build_embedding_text(self, adapter) -> str:
-        """Build text for embedding generation"""
-        parts = []
+    def _build_embedding_text(self, adapter, stored: Optional[dict]) -> str:
+        """Build text for embedding generation
+
+        Uses the same builder as the embedding backfill, applied to the product
+        as DatabasePipeline will save it (stored style, category and attributes
+        overlaid with the scraped ones), so both paths agree on embedding_hash.
+        """
+        stored = stored or {}
+
+        attributes = dict(stored.get('attributes', {}))
+        attributes.update({name: str(value) for name, value in (adapter.get('attributes') or {}).items() if value})
+
+        if adapter.get('primary_style'):
+            primary_style, secondary_style = adapter.get('primary_style'), adapter.get('secondary_style')
+        else:
+            primary_style, secondary_style = stored.get('primary_style'), stored.get('secondary_style')
+
+        product = SimpleNamespace(
+            name=adapter.get('name'),
+            description=adapter.get('description'),
+            brand=adapter.get('brand'),
+            primary_style=primary_style,
+            secondary_style=secondary_style,
+        )
+        return self.embedding_service.build_product_embedding_text(
+            product,
+            category_name=adapter.get('category') or stored.get('category'),
+            attributes=attributes,
+        )
 
-        # Product name (most important)
-        name = adapter.get('name', '')
-        if name:
-            parts.append(f"Product: {name}")
+    def _stored_embedding_state(self, adapter) -> Optional[dict]:
+        """Stored embedding inputs and hash of this product, if it was saved before"""
+        external_id = adapter.get('external_id')
+        if not external_id:
+            return None
 
-        # Category
-        category = adapter.get('category', '')
-        if category:
-            parts.append(f"Category: {category}")
+        source_website = adapter.get('source_website')
+        if source_website not in self.stored_state:
+            self.stored_state[source_website] = self._prefetch_embedding_state(source_website)
+        return self.stored_state[source_website].get(external_id)
 
-        # Brand
-        brand = adapter.get('brand', '')
-        if brand:
-            parts.append(f"Brand: {brand}")
+    def _prefetch_embedding_state(self, source_website) -> dict:
+        """Load the embedding inputs of every stored product of a website in two queries"""
+        state = {}
+        with get_db_session() as session:
+            rows = session.query(
+                Product.id, Product.external_id, Product.embedding_hash,
+                Product.primary_style, Product.secondary_style, Category.name
+            ).outerjoin(Category, Category.id == Product.category_id).filter(
+                Product.source_website == source_website
+            ).all()
+
+            by_product_id = {}
+            for product_id, external_id, embedding_hash, primary_style, secondary_style, category in rows:
+                by_product_id[product_id] = state[external_id] = {
+                    'embedding_hash': embedding_hash,
+                    'primary_style': primary_style,
+                    'secondary_style': secondary_style,
+                    'category': category,
+                    'attributes': {},
+                }
 
-        # Description (truncated)
-        description = adapter.get('description', '')
-        if description:
-            # Truncate long descriptions
-            desc_text = description[:500] if len(description) > 500 else description
-            parts.append(f"Description: {desc_text}")
+            attribute_rows = session.query(
+                ProductAttribute.product_id, ProductAttribute.attribute_name, ProductAttribute.attribute_value
+            ).join(Product, Product.id == ProductAttribute.product_id).filter(
+                Product.source_website == source_website
+            ).all()
+            for product_id, attribute_name, attribute_value in attribute_rows:
+                by_product_id[product_id]['attributes'][attribute_name] = attribute_value
 
-        # Extracted attributes (if available)
-        attributes = adapter.get('attributes', {})
-        if attributes:
-            attr_parts = []
-            if attributes.get('color_primary'):
-                attr_parts.append(f"Color: {attributes['color_primary']}")
-            if attributes.get('material_primary'):
-                attr_parts.append(f"Material: {attributes['material_primary']}")
-            if attributes.get('style'):
-                attr_parts.append(f"Style: {attributes['style']}")
-            if attr_parts:
-                parts.append("Attributes: " + ", ".join(attr_parts))
-
-        return " | ".join(parts)
-
-    def _generate_embedding(self, adapter) -> Optional[list]:
+        logger.info(f"Prefetched embedding state of {len(state)} stored products from {source_website}")
+        return state
+
+    def _generate_embedding(self, embedding_text: str) -> Optional[list]:
         """Generate embedding vector for product"""
         if not self.embedding_service or not self.embedding_service.client:
             return None
 
-        embedding_text = self._build_embedding_text(adapter)
-        if not embedding_text:
-            return None
-
         try:
             # Run async embedding generation in sync context
             import asyncio
@@ -598,6 +650,7 @@ Choose from ONLY the styles listed above."""
             f"EmbeddingAndStylePipeline finished. "
             f"Items: {self.items_processed}, "
             f"Embeddings: {self.embeddings_generated}, "
+            f"Unchanged embeddings skipped: {self.embeddings_skipped}, "
             f"Styles: {self.styles_classified}, "
             f"Errors: {self.errors}"
         )
@@ -659,11 +712,18 @@ class DatabasePipeline:
             product.is_on_sale = adapter.get('is_on_sale', False)
             product.stock_status = adapter.get('stock_status', 'in_stock')
 
+            # Product type / accessory flag from the name (recommendation candidates filter on is_accessory)
+            for column, value in classify_product(product.name).items():
+                setattr(product, column, value)
+
             # Save embedding if generated
             embedding = adapter.get('embedding')
             if embedding:
-                product.embedding = embedding
+                # Binary float32 column plus legacy JSON text (dual-write period)
+                product.embedding_vector = encode_embedding(embedding)
+                product.embedding = json.dumps(embedding)
                 product.embedding_text = adapter.get('embedding_text')
+                product.embedding_hash = adapter.get('embedding_hash')
                 product.embedding_updated_at = datetime.utcnow()
 
             # Save style classification if available
@@ -703,6 +763,9 @@ class DatabasePipeline:
             # Handle attributes
             self._save_product_attributes(product, adapter, session)
 
+            # Precomputed ranking features, from the name, style and attributes saved above
+            self._save_product_features(product, session)
+
             session.commit()
 
     def _save_product_images(self, product, adapter, session):
@@ -772,6 +835,19 @@ class DatabasePipeline:
                     # Update existing attribute
                     existing_attr.attribute_value = str(attr_value)
 
+    def _save_product_features(self, product, session):
+        """Compute the product's ranking features row; unchanged re-crawls keep the stored row"""
+        session.flush()  # Attributes added above (autoflush is off)
+        attribute_rows = session.query(ProductAttribute.attribute_name, ProductAttribute.attribute_value).filter_by(
+            product_id=product.id
+        ).all()
+        row = build_product_features_row(product, attribute_rows)
+
+        stored = session.get(ProductFeatures, product.id)
+        if stored and stored.features_version == row['features_version'] and stored.source_hash == row['source_hash']:
+            return
+        session.merge(ProductFeatures(**row))
+
     def close_spider(self, spider):
         """Log final statistics"""
         logger.info(f"DatabasePipeline finished. Items saved: {self.items_count}, Errors: {self.errors_count}")
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from api.database.connection import get_db_session
 from api.database.models import Product, ProductImage, Category, ScrapingLog
+from api.services.near_duplicates import DEFAULT_THRESHOLD, find_near_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -130,57 +131,38 @@ class DataQualityValidator:
 
 
 class DuplicateDetector:
-    """Detect and handle duplicate products"""
+    """Detect and handle duplicate products (MinHash/LSH over names, see api/services/near_duplicates.py)"""
 
     def __init__(self):
-        self.similarity_threshold = 0.85
+        self.similarity_threshold = DEFAULT_THRESHOLD
 
     def find_duplicates(self) -> List[Dict]:
         """Find potential duplicate products in database"""
         duplicates = []
 
         with get_db_session() as session:
-            products = session.query(Product).all()
-
-            # Group products by similarity
-            for i, product1 in enumerate(products):
-                for product2 in products[i+1:]:
-                    similarity = self._calculate_similarity(product1, product2)
-                    if similarity >= self.similarity_threshold:
-                        duplicates.append({
-                            'product1_id': product1.id,
-                            'product2_id': product2.id,
-                            'similarity': similarity,
-                            'reason': self._get_similarity_reason(product1, product2)
-                        })
+            products = session.query(
+                Product.id, Product.name, Product.brand, Product.price, Product.source_website
+            ).order_by(Product.id).all()
+
+            # Near-linear: only pairs sharing an LSH bucket are compared, never all n^2 pairs
+            result = find_near_duplicates(
+                [product.name for product in products],
+                [product.brand for product in products],
+                threshold=self.similarity_threshold,
+            )
+            for (row1, row2), similarity in zip(result.pairs.tolist(), result.similarity.tolist()):
+                product1, product2 = products[row1], products[row2]
+                duplicates.append({
+                    'product1_id': product1.id,
+                    'product2_id': product2.id,
+                    'cluster_id': products[result.labels[row1]].id,
+                    'similarity': round(similarity, 3),
+                    'reason': self._get_similarity_reason(product1, product2)
+                })
 
         return duplicates
 
-    def _calculate_similarity(self, product1: Product, product2: Product) -> float:
-        """Calculate similarity score between two products"""
-        scores = []
-
-        # Name similarity
-        name_sim = self._text_similarity(product1.name, product2.name)
-        scores.append(name_sim * 0.4)  # 40% weight
-
-        # Price similarity (within 5%)
-        if product1.price and product2.price:
-            price_diff = abs(product1.price - product2.price) / max(product1.price, product2.price)
-            price_sim = max(0, 1 - price_diff * 20)  # 5% diff = 0 similarity
-            scores.append(price_sim * 0.3)  # 30% weight
-
-        # Brand similarity
-        if product1.brand and product2.brand:
-            brand_sim = 1.0 if product1.brand.lower() == product2.brand.lower() else 0.0
-            scores.append(brand_sim * 0.2)  # 20% weight
-
-        # Source website penalty (same source more likely to be duplicate)
-        source_penalty = 0.1 if product1.source_website == product2.source_website else 0.0
-        scores.append(source_penalty * 0.1)  # 10% weight
-
-        return sum(scores) / len(scores) if scores else 0.0
-
     def _text_similarity(self, text1: str, text2: str) -> float:
         """Calculate text similarity using simple word overlap"""
         if not text1 or not text2: